@@ -0,0 +1,260 @@
+# coding=utf-8
+import os
+import re
+import hmac
+import time
+import hashlib
+import threading
+
+import utils
+
+logger = utils.get_logger(__name__)
+
+# 비밀번호 해시 형식 : pbkdf2_sha256$반복 횟수$salt(hex)$해시(hex)
+HASH_PREFIX = "pbkdf2_sha256"
+SALT_BYTE = 16
+
+# 사용자 이름 (db 조회 WHERE 문에 들어가므로 허용 문자만)
+_USERNAME_PATTERN = re.compile(r"[A-Za-z0-9_.@-]{1,64}")
+
+# 인증 결과
+AUTH_SUCCESS = "SUCCESS"
+AUTH_FAIL = "FAIL"
+AUTH_INVALID_USERNAME = "INVALID_USERNAME"
+AUTH_RATE_LIMITED = "RATE_LIMITED"
+
+
+class AuthService:
+    """
+    클라이언트 로그인 인증 클래스
+
+    비밀번호는 사용자 테이블 (mysql.user 의 User, Password) 에 salt 를 붙인 pbkdf2 해시 (hash_password) 로 저장하고 상수 시간 비교로 검사함
+    해시 형식이 아닌 값은 이전 평문 비밀번호로 보고 상수 시간 비교 (경고 로그, hash_password 로 바꿔 저장해야함)
+    저장된 비밀번호 조회는 database.QueryCache 로 cache_ttl_sec 동안 캐시하고 (재접속이 몰려도 사용자당 db 조회 한번),
+    검사에 성공한 비밀번호는 프로세스 비밀키로 만든 HMAC 을 cache_ttl_sec 동안 기억하여 같은 비밀번호로 다시 로그인하면 pbkdf2 를 건너뜀
+    실패가 fail_window_sec 안에 사용자별 max_fail_count 번 (접속 주소별 max_address_fail_count 번) 이 되면 lockout_sec 동안 로그인 거부
+
+    Attributes:
+        hash_iterations (int): 새로 만드는 해시의 pbkdf2 반복 횟수 (저장된 해시는 저장된 반복 횟수로 검사)
+            재접속 폭주시 모든 사용자의 첫 로그인이 pbkdf2 를 한번씩 계산하므로 (코어 하나에서 200명 기준 약 1초) 검사 한번이 수 ms 가 되도록 정함
+
+        cache_ttl_sec (float): 저장된 비밀번호 조회 / 검사 성공 캐시 유지 시간 (단위: 초)
+
+        max_fail_count (int): 사용자별 최대 실패 수
+
+        max_address_fail_count (int): 접속 주소별 최대 실패 수 (여러 사용자가 같은 주소로 접속할수 있으므로 사용자보다 크게)
+
+        fail_window_sec (float): 실패 수를 세는 시간 (단위: 초)
+
+        lockout_sec (float): 최대 실패 수를 넘은 후 로그인을 거부하는 시간 (단위: 초)
+
+        max_fail_entry_count (int): 실패 기록 수가 이 값을 넘으면 기간이 지난 기록을 정리
+
+        cache_key (bytes): 검사 성공 캐시의 HMAC 키 (프로세스 시작시 생성)
+
+        verified_dict (dict): 사용자 -> (저장된 비밀번호, 비밀번호 HMAC, 만료 시간 (time.monotonic))
+
+        fail_dict (dict): ("user" / "address", 사용자 / 접속 주소) -> [실패 수, 첫 실패 시간, 거부 종료 시간]
+
+        stats_dict (dict): 결과별 수 (success, fail, invalid_username, rate_limited, cache_verify, hash_verify)
+
+        lock (threading.Lock): verified_dict, fail_dict, stats_dict 변경시 사용하는 락
+    """
+
+    hash_iterations = 10000
+    cache_ttl_sec = 10
+    max_fail_count = 5
+    max_address_fail_count = 50
+    fail_window_sec = 60
+    lockout_sec = 60
+    max_fail_entry_count = 10000
+
+    cache_key = os.urandom(32)
+    verified_dict = {}
+    fail_dict = {}
+    stats_dict = {"success": 0, "fail": 0, "invalid_username": 0, "rate_limited": 0, "cache_verify": 0, "hash_verify": 0}
+    lock = threading.Lock()
+
+    # 없는 사용자도 pbkdf2 를 계산하여 응답 시간으로 사용자 존재 여부를 알수 없게 함
+    _dummy_hash = None
+
+    @classmethod
+    def hash_password(cls, password, iterations=None):
+        """
+        비밀번호 해시 생성 (사용자 테이블에 저장할 값)
+
+        Parameters:
+            password (str): 비밀번호
+
+            iterations (int): pbkdf2 반복 횟수 (None - hash_iterations)
+
+        Returns:
+            (str): pbkdf2_sha256$반복 횟수$salt$해시
+        """
+        iterations = iterations or cls.hash_iterations
+        salt = os.urandom(SALT_BYTE)
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+        return "{}${}${}${}".format(HASH_PREFIX, iterations, salt.hex(), digest.hex())
+
+    @staticmethod
+    def verify_password(password, stored_password):
+        """
+        비밀번호 검사 (상수 시간 비교)
+
+        Parameters:
+            password (str): 클라이언트가 보낸 비밀번호
+
+            stored_password (str): 사용자 테이블에 저장된 값 (hash_password 반환값 / 이전 평문 비밀번호)
+
+        Returns:
+            (bool): 일치 여부
+        """
+        password = password.encode("utf-8")
+        if not stored_password.startswith(HASH_PREFIX + "$"):
+            return hmac.compare_digest(password, stored_password.encode("utf-8"))
+
+        try:
+            iterations, salt, digest = stored_password.split("$")[1:]
+            iterations = int(iterations)
+            salt = bytes.fromhex(salt)
+            digest = bytes.fromhex(digest)
+        except ValueError:
+            logger.warning("invalid password hash format")
+            return False
+        return hmac.compare_digest(hashlib.pbkdf2_hmac("sha256", password, salt, iterations), digest)
+
+    @classmethod
+    def authenticate(cls, db_mysql, username, password, address=None):
+        """
+        로그인 인증
+
+        Parameters:
+            db_mysql (database.MariaDB): mysql db 인스턴스 (호출한 스레드 전용)
+
+            username (str): 사용자
+
+            password (str): 비밀번호
+
+            address (str): 접속 주소 (None - 주소별 제한 안함)
+
+        Returns:
+            (str): 인증 결과 (AUTH_SUCCESS / AUTH_FAIL / AUTH_INVALID_USERNAME / AUTH_RATE_LIMITED)
+        """
+        if not isinstance(username, str) or not isinstance(password, str) or not _USERNAME_PATTERN.fullmatch(username):
+            cls._count("invalid_username")
+            return AUTH_INVALID_USERNAME
+
+        key_list = [("user", username)]
+        if address is not None:
+            key_list.append(("address", address))
+        if cls.is_locked(key_list):
+            cls._count("rate_limited")
+            return AUTH_RATE_LIMITED
+
+        stored_password = db_mysql.select("user", "Password", "User = '" + username + "'", cls.cache_ttl_sec)
+        if isinstance(stored_password, (list, tuple)):
+            stored_password = stored_password[0]  # 같은 사용자가 여러 행 (호스트별) 인 경우 첫번째
+        if stored_password is not None and not isinstance(stored_password, str):
+            stored_password = str(stored_password)
+
+        password_mac = hmac.new(cls.cache_key, password.encode("utf-8"), "sha256").digest()
+        with cls.lock:
+            verified = cls.verified_dict.get(username)
+        if (
+            verified is not None
+            and verified[2] > time.monotonic()
+            and verified[0] == stored_password
+            and hmac.compare_digest(verified[1], password_mac)
+        ):
+            cls._count("cache_verify")
+            success = True
+        else:
+            if stored_password is None:
+                if cls._dummy_hash is None:
+                    cls._dummy_hash = cls.hash_password("")
+                cls.verify_password(password, cls._dummy_hash)
+                success = False
+            else:
+                if not stored_password.startswith(HASH_PREFIX + "$"):
+                    logger.warning("plaintext password stored : %s", username)
+                success = cls.verify_password(password, stored_password)
+            cls._count("hash_verify")
+
+        if success:
+            with cls.lock:
+                cls.verified_dict[username] = (stored_password, password_mac, time.monotonic() + cls.cache_ttl_sec)
+                cls.fail_dict.pop(("user", username), None)
+                cls.stats_dict["success"] += 1
+            return AUTH_SUCCESS
+
+        cls.record_fail(key_list)
+        return AUTH_FAIL
+
+    @classmethod
+    def is_locked(cls, key_list):
+        """
+        로그인 거부 여부
+
+        Parameters:
+            key_list (list[tuple]): ("user" / "address", 사용자 / 접속 주소) 리스트
+
+        Returns:
+            (bool): 하나라도 거부중이면 True
+        """
+        now = time.monotonic()
+        with cls.lock:
+            for key in key_list:
+                fail = cls.fail_dict.get(key)
+                if fail is not None and fail[2] > now:
+                    return True
+        return False
+
+    @classmethod
+    def record_fail(cls, key_list):
+        """
+        로그인 실패 기록 (최대 실패 수가 되면 lockout_sec 동안 거부)
+
+        Parameters:
+            key_list (list[tuple]): ("user" / "address", 사용자 / 접속 주소) 리스트
+        """
+        now = time.monotonic()
+        with cls.lock:
+            cls.stats_dict["fail"] += 1
+            if len(cls.fail_dict) >= cls.max_fail_entry_count:
+                # 여러 사용자 이름으로 시도해도 메모리가 계속 늘지 않도록 기간이 지난 기록 삭제
+                for old_key in [old_key for old_key, fail in cls.fail_dict.items() if fail[2] <= now and now - fail[1] > cls.fail_window_sec]:
+                    del cls.fail_dict[old_key]
+            for key in key_list:
+                fail = cls.fail_dict.get(key)
+                if fail is None or now - fail[1] > cls.fail_window_sec:
+                    fail = cls.fail_dict[key] = [0, now, 0.0]
+                fail[0] += 1
+                if fail[0] >= (cls.max_fail_count if key[0] == "user" else cls.max_address_fail_count):
+                    fail[:] = [0, now, now + cls.lockout_sec]
+                    logger.warning("login locked : %s %s", *key)
+
+    @classmethod
+    def _count(cls, key):
+        with cls.lock:
+            cls.stats_dict[key] += 1
+
+    @classmethod
+    def clear(cls):
+        """
+        검사 성공 캐시, 실패 기록 삭제 (통계 유지)
+        """
+        with cls.lock:
+            cls.verified_dict.clear()
+            cls.fail_dict.clear()
+
+    @classmethod
+    def get_stats(cls):
+        """
+        통계 반환
+
+        Returns:
+            (dict): 결과별 수, 로그인 거부중인 사용자 / 주소 수
+        """
+        now = time.monotonic()
+        with cls.lock:
+            return dict(cls.stats_dict, locked=sum(fail[2] > now for fail in cls.fail_dict.values()))
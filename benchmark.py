@@ -0,0 +1,2400 @@
+# coding=utf-8
+import sys
+import time
+import random
+import threading
+import tracemalloc
+
+
+def _measure_ns(func, count):
+    """
+    func를 count번 실행하여 1회당 평균 실행 시간(ns) 반환
+
+    Parameters:
+        func (function): 인자 없이 실행할 함수 (반환값은 무시)
+
+        count (int): 반복 횟수
+
+    Returns:
+        (float): 1회당 평균 실행 시간 (단위: ns)
+    """
+    start = time.perf_counter_ns()
+    for _ in range(count):
+        func()
+    return (time.perf_counter_ns() - start) / count
+
+
+def _measure_memory(func):
+    """
+    func 실행중 할당되어 남아있는 메모리 크기 반환
+
+    Parameters:
+        func (function): 측정할 함수 (반환값이 살아있는 동안의 메모리를 측정)
+
+    Returns:
+        (int): 할당된 메모리 (단위: byte)
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    ret = func()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del ret
+    return after - before
+
+
+_failed_check_list = []
+
+
+def _check(condition, message):
+    """
+    벤치마크 결과 검사 (실패하면 출력하고 기록, 하나라도 실패하면 main 이 1 로 종료)
+
+    Parameters:
+        condition (bool): 통과 여부
+
+        message (str): 검사 내용
+    """
+    if not condition:
+        print("CHECK FAILED : " + message)
+        _failed_check_list.append(message)
+
+
+def _print_result(title, result_dict):
+    print("[" + title + "]")
+    for key, value in result_dict.items():
+        if isinstance(value, float):
+            value = "{:.2f}".format(value)
+        print("    {:<40} {}".format(key, value))
+
+
+def bench_stock_symbol(symbol_count=2000, tick_count=500000):
+    """
+    종목 코드(str) dict 기반 실시간 처리와 종목 id(int) 리스트 기반 실시간 처리의 틱당 CPU 시간, 메모리 비교
+
+    Parameters:
+        symbol_count (int): 구독 종목 수
+
+        tick_count (int): 처리할 틱 수
+    """
+    from stock_symbol import StockSymbol
+
+    stock_code_list = ["A{:06d}".format(idx * 5) for idx in range(symbol_count)]
+    StockSymbol.load(stock_code_list)
+    held_code_set = set(stock_code_list[::10])
+
+    # 기존 방식 : 종목코드 dict 구독 상태 + 잔고 보유여부 확인
+    def build_code_state():
+        return {stock_code: {"ins": None, "user_list": ["user"]} for stock_code in stock_code_list}
+
+    # 변경 방식 : 종목 id 인덱스 리스트 구독 상태 + bytearray 잔고 보유여부
+    def build_id_state():
+        sub_status_list = [{"ins": None, "user_list": ["user"]} for _ in stock_code_list]
+        held_id_list = bytearray(symbol_count)
+        for stock_code in held_code_set:
+            held_id_list[StockSymbol.get_id(stock_code)] = 1
+        return sub_status_list, held_id_list
+
+    code_state = build_code_state()
+    sub_status_list, held_id_list = build_id_state()
+
+    rand = random.Random(0)
+    tick_idx_list = [rand.randrange(symbol_count) for _ in range(tick_count)]
+
+    # COM 에서 받아온 종목코드는 매번 새 문자열 객체 (hash 캐시 없음)
+    def code_tick_path():
+        hit = 0
+        for idx in tick_idx_list:
+            stock_code = "A" + stock_code_list[idx][1:]
+            sub_status = code_state.get(stock_code)
+            if sub_status is not None and stock_code in held_code_set:
+                hit += 1
+        return hit
+
+    def id_tick_path():
+        hit = 0
+        for stock_id in tick_idx_list:
+            sub_status = sub_status_list[stock_id]
+            if sub_status is not None and held_id_list[stock_id]:
+                hit += 1
+        return hit
+
+    # 클라이언트가 보낸 등록되지 않은 종목 코드는 id 를 만들지 않음 (종목 id 인덱스 리스트가 늘어나지 않음)
+    symbol_count_before = StockSymbol.get_count()
+    unknown_id_list = [StockSymbol.find_id(stock_code) for stock_code in ("Z999999", "A005930' --", "", None, ["A000000"])]
+    _check(
+        unknown_id_list == [None] * len(unknown_id_list) and StockSymbol.get_count() == symbol_count_before,
+        "stock_symbol unknown code registered : {} -> {}".format(symbol_count_before, StockSymbol.get_count()),
+    )
+
+    _print_result(
+        "stock_symbol ({} symbols, {} ticks)".format(symbol_count, tick_count),
+        {
+            "code(str) dict path ns/tick": _measure_ns(code_tick_path, 1) / tick_count,
+            "id(int) list path ns/tick": _measure_ns(id_tick_path, 1) / tick_count,
+            "code(str) dict state bytes": _measure_memory(build_code_state),
+            "id(int) list state bytes": _measure_memory(build_id_state),
+        },
+    )
+
+
+class _FakeBalanceDB:
+    """
+    KR_Stock_Balance 테이블만 흉내내는 db (select / update 호출 횟수 측정용)
+    """
+
+    def __init__(self, balance_dict):
+        self.balance_dict = balance_dict
+        self.call_count = 0
+
+    def select(self, table, columns, where):
+        self.call_count += 1
+        row = self.balance_dict.get(where.split("'")[1])
+        return [row[column] for column in columns] if row else None
+
+    def update(self, table, columns, data, where):
+        self.call_count += 1
+        if data and isinstance(data[0], list):
+            for row_data in data:
+                self.balance_dict[row_data[-1]].update(zip(columns, row_data))
+        else:
+            self.balance_dict[where.split("'")[1]].update(zip(columns, data))
+
+
+def bench_portfolio(symbol_count=2000, held_count=50, tick_count=200000, persist_interval_tick=10000):
+    """
+    틱 재생시 기존 방식(틱마다 db SELECT + UPDATE)과 메모리 잔고(portfolio.Portfolio) 방식의 틱당 처리시간, db 호출 수 비교
+
+    Parameters:
+        symbol_count (int): 구독 종목 수
+
+        held_count (int): 보유 종목 수
+
+        tick_count (int): 재생할 틱 수
+
+        persist_interval_tick (int): 메모리 잔고 방식에서 db 저장 주기 (틱 수 기준, 타이머 대신 사용)
+    """
+    from stock_symbol import StockSymbol
+    from portfolio import Portfolio, _EVALUATION_RATE
+
+    stock_code_list = ["A{:06d}".format(idx * 5) for idx in range(symbol_count)]
+    StockSymbol.load(stock_code_list)
+
+    balance_list = [[stock_code, 10000, 10030, 10, 10, 10000] for stock_code in stock_code_list[:held_count]]
+    Portfolio.load(balance_list)
+
+    rand = random.Random(0)
+    tick_list = [(rand.randrange(symbol_count), rand.randrange(9000, 11000)) for _ in range(tick_count)]
+
+    legacy_db = _FakeBalanceDB({row[0]: {"profit_unit_price": row[2], "quantity": row[3]} for row in balance_list})
+    pf_db = _FakeBalanceDB({row[0]: {} for row in balance_list})
+
+    # 기존 BalanceData.update_current_price
+    def legacy_replay():
+        for stock_id, cur_price in tick_list:
+            stock_code = StockSymbol.get_code(stock_id)
+            data_db = legacy_db.select("KR_Stock_Balance", ["profit_unit_price", "quantity"], "stock_code = '" + stock_code + "'")
+            if not data_db:
+                continue
+            profit_unit_price, qty = data_db
+            profit = (cur_price - profit_unit_price) * qty
+            profit_ratio = (cur_price / profit_unit_price) * 100 - 100
+            evaluation = cur_price * qty * _EVALUATION_RATE
+            legacy_db.update(
+                "KR_Stock_Balance",
+                ["current_price", "profit", "profit_ratio", "evaluation"],
+                [cur_price, int(profit), profit_ratio, int(evaluation)],
+                "stock_code ='" + stock_code + "'",
+            )
+
+    def portfolio_replay():
+        for tick_idx, (stock_id, cur_price) in enumerate(tick_list):
+            Portfolio.update_price(stock_id, cur_price)
+            if tick_idx % persist_interval_tick == 0:
+                Portfolio.persist(pf_db)
+        Portfolio.persist(pf_db)
+
+    _print_result(
+        "portfolio ({} symbols, {} held, {} ticks)".format(symbol_count, held_count, tick_count),
+        {
+            "legacy db read-modify-write ns/tick": _measure_ns(legacy_replay, 1) / tick_count,
+            "legacy db calls": legacy_db.call_count,
+            "in-memory portfolio ns/tick": _measure_ns(portfolio_replay, 1) / tick_count,
+            "in-memory portfolio db calls": pf_db.call_count,
+            "evaluate() whole portfolio us": _measure_ns(Portfolio.evaluate, 1000) / 1000,
+        },
+    )
+
+
+class _FakeOrderCom:
+    """
+    CpTd0311 / CpTd0313 / CpTd0303 / CpTd0314 를 흉내내는 주문 오브젝트 (BlockRequest 지연시간 설정 가능)
+    """
+
+    order_num = 0
+    order_num_lock = threading.Lock()
+
+    def __init__(self, latency_method):
+        self.latency_method = latency_method
+        self.input_dict = {}
+        self.header_value = None
+
+    def set_input_value(self, value_type, value):
+        self.input_dict[value_type] = value
+
+    def block_request(self):
+        time.sleep(self.latency_method(self.input_dict))
+        with _FakeOrderCom.order_num_lock:
+            _FakeOrderCom.order_num += 1
+            self.header_value = _FakeOrderCom.order_num
+
+    def check_rq_status(self):
+        return True
+
+    def get_header_value(self, value_type):
+        return self.header_value
+
+
+class _FakeCreonStockOrder:
+    """
+    creon_api.CreonStockOrder 를 흉내내는 클래스
+    """
+
+    def __init__(self, latency_method):
+        self.buy_sell = _FakeOrderCom(latency_method)
+        self.modify_price = _FakeOrderCom(latency_method)
+        self.modify_type = _FakeOrderCom(latency_method)
+        self.cancel = _FakeOrderCom(latency_method)
+
+
+def bench_order_dispatch(user_count=8, order_count_per_user=20, slow_latency=0.05, fast_latency=0.005):
+    """
+    주문 처리 스레드 1개(기존 TaskOrder)와 여러개일 때의 전체 처리시간, 취소 주문 응답시간 비교 및 (사용자, 종목) 순서 보장 확인
+
+    첫번째 사용자는 느린 주문(slow_latency), 나머지는 빠른 주문(fast_latency)을 보내며 각 사용자의 마지막 주문은 취소 주문
+
+    Parameters:
+        user_count (int): 사용자 수
+
+        order_count_per_user (int): 사용자별 주문 수
+
+        slow_latency (float): 느린 주문의 BlockRequest 지연시간 (단위: 초)
+
+        fast_latency (float): 빠른 주문의 BlockRequest 지연시간 (단위: 초)
+    """
+    from order_dispatch import OrderDispatcher
+
+    def latency_method(input_dict):
+        return slow_latency if input_dict.get(4) == "A000000" else fast_latency
+
+    def execute_method(req, creon_stock_order):
+        order_info = req["req_data"]
+        com = creon_stock_order.cancel if order_info["order_type"] == "cancel" else creon_stock_order.buy_sell
+        com.set_input_value(4, order_info["stock_code"])
+        com.block_request()
+        return com.get_header_value(8)
+
+    def run(lane_count):
+        done_list = []
+        done_event = threading.Event()
+        total_count = user_count * order_count_per_user
+
+        def done_method(req, order_num):
+            done_list.append(req)
+            if len(done_list) == total_count:
+                done_event.set()
+
+        dispatcher = OrderDispatcher(execute_method, done_method, lane_count, lambda: _FakeCreonStockOrder(latency_method))
+
+        start = time.perf_counter()
+        for seq in range(order_count_per_user):
+            for user_idx in range(user_count):
+                order_type = "cancel" if seq == order_count_per_user - 1 else "buy"
+                stock_code = "A000000" if user_idx == 0 else "A{:06d}".format(user_idx * 10 + seq % 2)
+                dispatcher.insert({"username": "user" + str(user_idx), "req_data": {"order_type": order_type, "stock_code": stock_code, "seq": seq}})
+        done_event.wait()
+        elapsed = time.perf_counter() - start
+
+        # (사용자, 종목)별 순서 확인
+        last_seq_dict = {}
+        in_order = True
+        for req in done_list:
+            key = (req["username"], req["req_data"]["stock_code"])
+            if last_seq_dict.get(key, -1) > req["req_data"]["seq"]:
+                in_order = False
+            last_seq_dict[key] = req["req_data"]["seq"]
+
+        cancel_ack_list = sorted(
+            (req["latency"]["ack"] - req["latency"]["submit"]) * 1000
+            for req in done_list
+            if req["req_data"]["order_type"] == "cancel" and req["username"] != "user0"
+        )
+        return elapsed, in_order, cancel_ack_list[len(cancel_ack_list) // 2]
+
+    result_dict = {}
+    for lane_count in (1, 4):
+        elapsed, in_order, cancel_ack_median = run(lane_count)
+        result_dict["lanes={} total s".format(lane_count)] = elapsed
+        result_dict["lanes={} (user, stock) in order".format(lane_count)] = in_order
+        result_dict["lanes={} cancel ack median ms".format(lane_count)] = cancel_ack_median
+        _check(in_order, "order_dispatch lanes={} (user, stock) out of order".format(lane_count))
+
+    _print_result("order_dispatch ({} users x {} orders)".format(user_count, order_count_per_user), result_dict)
+
+
+def bench_order_batch(order_count=200, stock_count=50, latency=0.002, lane_count=4):
+    """
+    바스켓 주문의 처리량, 종목별 순서 보장, 검증(매도 가능 수량 초과 거부) 확인
+
+    Parameters:
+        order_count (int): 바스켓 주문 수
+
+        stock_count (int): 바스켓의 종목 수
+
+        latency (float): 가짜 주문 오브젝트의 BlockRequest 지연시간 (단위: 초)
+
+        lane_count (int): 주문 처리 스레드 수
+    """
+    from stock_symbol import StockSymbol
+    from order_dispatch import OrderDispatcher, OrderBatch
+
+    # 서버 시작시처럼 종목 코드 등록 (등록되지 않은 종목 코드의 주문은 INVALID_ORDER)
+    StockSymbol.load(["A{:06d}".format(idx) for idx in range(stock_count)])
+
+    def execute_method(req, creon_stock_order):
+        order_info = req["req_data"]
+        creon_stock_order.buy_sell.set_input_value(3, order_info["stock_code"])
+        creon_stock_order.buy_sell.block_request()
+        return creon_stock_order.buy_sell.get_header_value(8)
+
+    ack_list = []
+    done_event = threading.Event()
+
+    def done_method(req, order_num):
+        ack_list.append((req["batch_idx"], order_num))
+        if req["batch"].set_result(req["batch_idx"], order_num):
+            done_event.set()
+
+    dispatcher = OrderDispatcher(execute_method, done_method, lane_count, lambda: _FakeCreonStockOrder(lambda input_dict: latency))
+
+    # 종목당 매도 가능 수량 10주, 마지막 종목은 초과 매도 주문
+    order_list = [
+        {
+            "order_type": "sell" if idx % 2 else "buy",
+            "stock_code": "A{:06d}".format(idx % stock_count),
+            "qty": 100 if idx == order_count - 1 else 1,
+            "e_order_condition": "NONE",
+            "e_price_type": "NORMAL",
+            "price": 10000,
+        }
+        for idx in range(order_count)
+    ]
+
+    start = time.perf_counter()
+    order_batch = OrderBatch("user", "bench", order_list)
+    order_batch.validate(lambda stock_code: 10)
+    validate_us = (time.perf_counter() - start) * 1000000
+    for req in order_batch.make_req_list():
+        dispatcher.insert(req)
+    done_event.wait()
+    elapsed = time.perf_counter() - start
+
+    # 종목별 주문번호가 바스켓 순서대로 증가했는지 확인
+    order_num_dict = dict(ack_list)
+    in_order = True
+    for stock_idx in range(stock_count):
+        order_num_list = [order_num_dict[idx] for idx in range(stock_idx, order_count, stock_count) if idx in order_num_dict]
+        in_order = in_order and order_num_list == sorted(order_num_list)
+
+    summary = order_batch.get_summary()
+    _check(in_order, "order_batch per stock out of order")
+    _check((summary["success"], summary["reject"]) == (order_count - 1, 1), "order_batch over-sell order not rejected alone")
+    _print_result(
+        "order_batch ({} orders, {} lanes, {} ms latency)".format(order_count, lane_count, latency * 1000),
+        {
+            "validate us": validate_us,
+            "orders/s": summary["success"] / elapsed,
+            "sequential orders/s (1 lane bound)": 1 / latency,
+            "per stock in order": in_order,
+            "success / reject": "{} / {}".format(summary["success"], summary["reject"]),
+        },
+    )
+
+
+def bench_order_risk(check_count=200000):
+    """
+    주문 전 위험 검사(order_risk.OrderRisk.check) 1회 소요시간 측정
+
+    Parameters:
+        check_count (int): 검사 횟수
+    """
+    from stock_symbol import StockSymbol
+    from portfolio import Portfolio
+    from order_risk import OrderRisk
+
+    StockSymbol.load(["A005930", "A000660"])
+    Portfolio.load([["A005930", 70000, 70200, 100, 100, 71000]])
+    OrderRisk.update_last_price(StockSymbol.get_id("A005930"), 71000)
+    OrderRisk.max_order_per_sec = float("inf")
+
+    buy_info = {"order_type": "buy", "stock_code": "A005930", "qty": 10, "price": 71100, "e_order_condition": "NONE", "e_price_type": "NORMAL"}
+    sell_info = dict(buy_info, order_type="sell", qty=50)
+    band_info = dict(buy_info, price=90000)
+
+    _print_result(
+        "order_risk",
+        {
+            "buy check ns": _measure_ns(lambda: OrderRisk.check("user", buy_info), check_count),
+            "sell check ns": _measure_ns(lambda: OrderRisk.check("user", sell_info), check_count),
+            "price band reject ns": _measure_ns(lambda: OrderRisk.check("user", band_info), check_count),
+            "price band reject reason": OrderRisk.check("user", band_info),
+        },
+    )
+
+
+def bench_metrics(symbol_count=2000, tick_count=500000):
+    """
+    틱당 지표 기록 비용 (종목별 틱 수 + 전송 메시지 수 + 지연시간 기록) 측정 및 http 출력 확인
+
+    Parameters:
+        symbol_count (int): 종목 수
+
+        tick_count (int): 기록할 틱 수
+    """
+    import urllib.request
+
+    from stock_symbol import StockSymbol
+    from metrics import Metrics
+
+    StockSymbol.load(["A{:06d}".format(idx * 5) for idx in range(symbol_count)])
+
+    tick_counter = Metrics.stock_counter("bench_tick_total", "bench ticks")
+    send_counter = Metrics.counter("bench_send_total", "bench sent messages")
+    histogram = Metrics.histogram("bench_latency_seconds", "bench latency")
+
+    rand = random.Random(0)
+    tick_idx_list = [rand.randrange(symbol_count) for _ in range(tick_count)]
+
+    def empty_path():
+        for stock_id in tick_idx_list:
+            pass
+
+    def counter_path():
+        for stock_id in tick_idx_list:
+            tick_counter.inc(stock_id)
+            send_counter.inc()
+
+    def histogram_path():
+        for stock_id in tick_idx_list:
+            histogram.record(stock_id)
+
+    empty_ns = _measure_ns(empty_path, 1) / tick_count
+    counter_ns = _measure_ns(counter_path, 1) / tick_count - empty_ns
+    histogram_ns = _measure_ns(histogram_path, 1) / tick_count - empty_ns
+
+    Metrics.start_http_server(0)
+    with urllib.request.urlopen("http://127.0.0.1:{}/metrics".format(Metrics.http_server.server_port)) as res:
+        body = res.read().decode("utf-8")
+    Metrics.http_server.shutdown()
+
+    _print_result(
+        "metrics ({} symbols, {} ticks)".format(symbol_count, tick_count),
+        {
+            "stock counter + counter ns/tick": counter_ns,
+            "histogram record ns/tick": histogram_ns,
+            "render bytes": len(body),
+            "http /metrics has tick counter": "bench_tick_total{stock_code=" in body,
+        },
+    )
+
+
+def bench_profiler(span_count=1000000, tick_count=50000):
+    """
+    프로파일링 구간 기록 비용(꺼짐 / 켜짐) 측정 및 스택 샘플링 결과 확인
+
+    Parameters:
+        span_count (int): 기록할 구간 수
+
+        tick_count (int): 스택 샘플링 중 처리할 틱 수
+    """
+    import os
+    import json
+    import tempfile
+
+    from profiler import Profiler
+
+    def empty_path():
+        for _ in range(span_count):
+            pass
+
+    def span_path():
+        for _ in range(span_count):
+            Profiler.end_span("bench_span", Profiler.start_span())
+
+    def tick_path():
+        for idx in range(tick_count):
+            span_start = Profiler.start_span()
+            json.dumps({"stock_code": "A005930", "price": idx, "vol": idx * 10})
+            Profiler.end_span("bench_fan_out", span_start)
+
+    empty_ns = _measure_ns(empty_path, 1) / span_count
+    disabled_ns = min(_measure_ns(span_path, 1) for _ in range(3)) / span_count - empty_ns
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        Profiler.start(0.001)
+        enabled_ns = min(_measure_ns(span_path, 1) for _ in range(3)) / span_count - empty_ns
+        tick_path()
+        result = Profiler.stop(os.path.join(tmp_dir, "profile"))
+
+        with open(result["folded_path"]) as folded_file:
+            folded_line_list = folded_file.readlines()
+
+    _print_result(
+        "profiler ({} spans)".format(span_count),
+        {
+            "span disabled ns/span": disabled_ns,
+            "span enabled + sampling ns/span": enabled_ns,
+            "folded stack lines": len(folded_line_list),
+            "folded has tick path": any("tick_path" in line for line in folded_line_list),
+            "bench_fan_out count": result["span"]["bench_fan_out"]["count"],
+        },
+    )
+
+
+def bench_creon_sim(symbol_count=100, tick_count=200000):
+    """
+    가상 creon 백엔드(creon_sim) 이벤트 재생 속도, 배속 재생 정확도, 주문 체결 이벤트, 요청 제한 확인
+
+    Parameters:
+        symbol_count (int): 종목 수
+
+        tick_count (int): 재생할 틱 수
+    """
+    import creon_api
+
+    creon_api.set_backend("sim")
+
+    from creon_api import CREON_BACKEND, LIMIT_TYPE, CpCybos, CreonStockCur, CreonStockJpBid, CreonCpConclusion, CreonStockOrder
+    from creon_sim import SimMarket, LIMIT_RULE_DICT
+
+    class CountEvent:
+        def __init__(self):
+            self.count = 0
+            self.header_list = []
+            self.client = None
+
+        def OnReceived(self):
+            self.count += 1
+            if self.client is not None:
+                self.header_list.append((self.client.get_header_value(14), self.client.get_header_value(5), self.client.get_header_value(3)))
+
+    SimMarket.reset()
+    SimMarket.load_stock_list(symbol_count)
+    stock_code_list = sorted(SimMarket.stock_dict)[:symbol_count]
+
+    handler_list = []
+    for stock_code in stock_code_list:
+        for creon_class in (CreonStockCur, CreonStockJpBid):
+            creon_rt = creon_class()
+            handler_list.append(creon_rt.get_handler(CountEvent))
+            creon_rt.set_input_value(0, stock_code)
+            creon_rt.subscribe()
+
+    event_list = SimMarket.make_event_list(stock_code_list, tick_count, seed=0)
+    start = time.perf_counter()
+    SimMarket.replay(event_list, speed=0)
+    replay_sec = time.perf_counter() - start
+
+    # 10배속 재생 (1배속 1초 분량)
+    paced_event_list = SimMarket.make_event_list(stock_code_list, 1000, seed=1, tick_interval=0.001, ask_bid_ratio=0)
+    start = time.perf_counter()
+    SimMarket.replay(paced_event_list, speed=10)
+    paced_sec = time.perf_counter() - start
+
+    def run_order():
+        SimMarket.reset()
+        SimMarket.limit_rule_dict[LIMIT_TYPE.TRADE_REQUEST.value] = (100000, 1.0)
+
+        creon_conclusion = CreonCpConclusion()
+        handler = creon_conclusion.get_handler(CountEvent)
+        handler.client = creon_conclusion
+        creon_conclusion.subscribe()
+
+        creon_stock_order = CreonStockOrder()
+        order_num_list = []
+        for idx, stock_code in enumerate(stock_code_list):
+            price = SimMarket.stock_dict[stock_code][2]
+            creon_stock_order.buy_sell.set_input_value(0, "2")
+            creon_stock_order.buy_sell.set_input_value(3, stock_code)
+            creon_stock_order.buy_sell.set_input_value(4, 10)
+            creon_stock_order.buy_sell.set_input_value(5, price)
+            creon_stock_order.buy_sell.set_input_value(7, "0")
+            creon_stock_order.buy_sell.set_input_value(8, "01")
+            creon_stock_order.buy_sell.block_request()
+            order_num_list.append(creon_stock_order.buy_sell.get_header_value(8))
+
+        creon_stock_order.cancel.set_input_value(1, order_num_list[0])
+        creon_stock_order.cancel.set_input_value(5, 0)
+        creon_stock_order.cancel.block_request()
+
+        SimMarket.replay(SimMarket.make_event_list(stock_code_list, 20000, seed=2), speed=0)
+        creon_conclusion.unsubscribe()
+        return handler.header_list
+
+    conclusion_list = run_order()
+    conclusion_stats_dict = dict(SimMarket.stats_dict)
+    same_conclusion = run_order() == conclusion_list
+
+    # 요청 제한 (구간당 5건)
+    SimMarket.limit_rule_dict[LIMIT_TYPE.TRADE_REQUEST.value] = (5, 60.0)
+    SimMarket.limit_dict = {}
+    creon_stock_order = CreonStockOrder()
+    rq_status_list = []
+    for _ in range(7):
+        creon_stock_order.modify_price.set_input_value(1, 0)
+        creon_stock_order.modify_price.set_input_value(6, 0)
+        creon_stock_order.modify_price.obj_com.BlockRequest()
+        rq_status_list.append(creon_stock_order.modify_price.obj_com.GetDibStatus())
+    limit_remain_count = CpCybos.get_limit_remain_count(LIMIT_TYPE.TRADE_REQUEST)
+    SimMarket.limit_rule_dict = dict(LIMIT_RULE_DICT)
+
+    _print_result(
+        "creon sim ({} backend, {} symbols, {} ticks)".format(CREON_BACKEND, symbol_count, tick_count),
+        {
+            "replayed events/s": len(event_list) / replay_sec,
+            "handler calls": sum(handler.count for handler in handler_list),
+            "1s stream at 10x sec": paced_sec,
+            "orders": conclusion_stats_dict["order"],
+            "conclusion events": len(conclusion_list),
+            "fills": conclusion_stats_dict["conclusion"],
+            "same events on rerun": same_conclusion,
+            "limit remain after 7 rq": limit_remain_count,
+            "limited rq statuses": rq_status_list,
+        },
+    )
+
+
+# 모듈 import 시간 측정 스크립트 (COM 오브젝트 생성 지연시간을 흉내내고 COM 생성, db 연결 횟수를 셈)
+_STARTUP_SCRIPT = """
+import sys, time, json
+import creon_sim, database_sim
+
+count_dict = {"dispatch": 0, "connect": 0}
+sim_dispatch, sim_connect = creon_sim.Dispatch, database_sim.connect
+
+def dispatch(prog_id):
+    count_dict["dispatch"] += 1
+    time.sleep(float(sys.argv[2]))
+    return sim_dispatch(prog_id)
+
+def connect(**kwargs):
+    count_dict["connect"] += 1
+    return sim_connect(**kwargs)
+
+creon_sim.Dispatch, database_sim.connect = dispatch, connect
+start = time.perf_counter()
+__import__(sys.argv[1])
+count_dict["import_ms"] = (time.perf_counter() - start) * 1000
+print(json.dumps(count_dict))
+"""
+
+
+def bench_startup(module_list=("stock_data", "trade", "server"), dispatch_latency=0.05):
+    """
+    모듈 import 시간, import 중 COM 오브젝트 생성 / db 연결 횟수 측정 (가상 creon, 메모리 db 백엔드, 모듈마다 새 프로세스)
+
+    Parameters:
+        module_list (tuple[str]): import 할 모듈 이름
+
+        dispatch_latency (float): COM 오브젝트 생성 지연시간 (단위: 초, 실제 creon 의 Dispatch 지연시간을 흉내냄)
+    """
+    import os
+    import json
+    import subprocess
+
+    env = dict(os.environ, CREON_BACKEND="sim", DB_BACKEND="sim")
+    cwd = os.path.dirname(os.path.abspath(__file__))
+
+    result_dict = {}
+    for module_name in module_list:
+        output = subprocess.check_output([sys.executable, "-c", _STARTUP_SCRIPT, module_name, str(dispatch_latency)], env=env, cwd=cwd)
+        count_dict = json.loads(output.decode().strip().splitlines()[-1])
+        result_dict[module_name + " import ms"] = count_dict["import_ms"]
+        result_dict[module_name + " com dispatch / db connect"] = "{} / {}".format(count_dict["dispatch"], count_dict["connect"])
+
+    _print_result("startup (dispatch latency {:.0f}ms)".format(dispatch_latency * 1000), result_dict)
+
+
+def _run_restart(mode, snapshot_path, position_count, order_count, user_count, sub_count, block_request_latency):
+    """
+    bench_warm_restart 의 자식 프로세스에서 실행 (가상 creon / 메모리 db 로 서버 시작 후 준비 시간을 json 으로 출력)
+
+    Parameters:
+        mode (str): "prepare" - 콜드 시작 후 구독 등록, 스냅샷 저장 / "cold" - 콜드 시작 후 클라이언트 재구독 / "warm" - 스냅샷 복원
+    """
+    import json
+    import logging
+
+    import bootstrap
+
+    bootstrap.init(creon_backend="sim", db_backend="sim")
+    logging.disable(logging.INFO)
+
+    import server
+    import loadtest
+    from creon_sim import SimMarket
+    from snapshot import ServerSnapshot
+
+    # 매번 같은 가상 계좌 상태 (warm 은 스냅샷 이후 잔고 1종목 추가)
+    SimMarket.reset()
+    SimMarket.load_stock_list(max(position_count + order_count, sub_count) + 1)
+    stock_code_list = sorted(SimMarket.stock_dict)
+    for stock_code in stock_code_list[:position_count]:
+        SimMarket.set_position(stock_code, 10, SimMarket.stock_dict[stock_code][2])
+    for stock_code in stock_code_list[position_count : position_count + order_count]:
+        SimMarket.place_order("2", stock_code, 1, 10, "0", "01")
+    if mode == "warm":
+        SimMarket.set_position(stock_code_list[-1], 5, SimMarket.stock_dict[stock_code_list[-1]][2])
+    SimMarket.block_request_latency = block_request_latency
+
+    username_list = ["bench{}".format(idx) for idx in range(user_count)]
+    loadtest.seed_db(stock_code_list, username_list)
+
+    server.PORT = 0
+    server.METRICS_PORT = 0
+    ServerSnapshot.file_path = snapshot_path
+
+    quant_server = server.QuantServer()
+    quant_server.start_server(warm_restart=mode == "warm")
+
+    # 클라이언트 재접속 후 구독 요청 (콜드 시작은 구독 목록이 없으므로 모든 클라이언트가 다시 요청해야 함)
+    resubscribe_start = time.perf_counter()
+    if mode != "warm":
+        for idx, username in enumerate(username_list):
+            client_stock_code_list = [stock_code_list[(idx * sub_count + sub_idx) % len(stock_code_list)] for sub_idx in range(sub_count)]
+            quant_server.task_list["stock_tick_rt_sub"].insert_q(
+                {"username": username, "req_type": "stock_tick_rt_sub", "req_data": {"set_status": True, "stock_code_list": client_stock_code_list}}
+            )
+            quant_server.task_list["trade_status_rt_sub"].insert_q({"username": username, "req_type": "trade_status_rt_sub", "req_data": {"set_status": True}})
+        quant_server.task_list["stock_tick_rt_sub"].sub_req_q.join()
+    resubscribe_sec = time.perf_counter() - resubscribe_start
+
+    if mode == "prepare":
+        ServerSnapshot.save(quant_server.get_subscription_dict())
+
+    subscription_dict = quant_server.get_subscription_dict()
+    print(
+        json.dumps(
+            {
+                "ready_sec": quant_server.ready_sec,
+                "resubscribe_sec": resubscribe_sec,
+                "tick_sub_count": len(subscription_dict["stock_tick_rt_sub"]),
+                "sub_user_count": len({username for user_list in subscription_dict["stock_tick_rt_sub"].values() for username in user_list}),
+                "position_count": len(server.Portfolio.get_position_list()),
+                "order_count": len(server.UnconcludedOrderBook.get_order_list()),
+                "snapshot_size": ServerSnapshot.last_size,
+            }
+        )
+    )
+
+
+def bench_warm_restart(position_count=50, order_count=50, user_count=20, sub_count=10, block_request_latency=0.02):
+    """
+    콜드 시작(creon 서버에서 전체 조회 + 클라이언트 재구독)과 스냅샷 복원 시작의 준비 시간 비교 (가상 creon, 메모리 db, 단계마다 새 프로세스)
+
+    Parameters:
+        position_count (int): 잔고 종목 수
+
+        order_count (int): 미체결 주문 수
+
+        user_count (int): 구독 사용자 수
+
+        sub_count (int): 사용자당 구독 종목 수
+
+        block_request_latency (float): creon BlockRequest 처리 시간 (단위: 초)
+    """
+    import os
+    import json
+    import tempfile
+    import subprocess
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+
+    def run_restart(mode, snapshot_path):
+        code = "import benchmark; benchmark._run_restart({!r}, {!r}, {}, {}, {}, {}, {})".format(
+            mode, snapshot_path, position_count, order_count, user_count, sub_count, block_request_latency
+        )
+        output = subprocess.check_output([sys.executable, "-c", code], cwd=cwd)
+        return json.loads(output.decode().strip().splitlines()[-1])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        snapshot_path = os.path.join(tmp_dir, "snapshot.json.gz")
+        prepare = run_restart("prepare", snapshot_path)
+        cold = run_restart("cold", snapshot_path)
+        warm = run_restart("warm", snapshot_path)
+
+    _print_result(
+        "warm restart ({} positions, {} orders, {} users x {} subs, rq latency {:.0f}ms)".format(
+            position_count, order_count, user_count, sub_count, block_request_latency * 1000
+        ),
+        {
+            "snapshot size byte": prepare["snapshot_size"],
+            "cold ready ms": cold["ready_sec"] * 1000,
+            "cold resubscribe ms": cold["resubscribe_sec"] * 1000,
+            "cold time-to-ready ms": (cold["ready_sec"] + cold["resubscribe_sec"]) * 1000,
+            "warm time-to-ready ms": warm["ready_sec"] * 1000,
+            "tick subs cold / warm": "{} / {}".format(cold["tick_sub_count"], warm["tick_sub_count"]),
+            "sub users cold / warm": "{} / {}".format(cold["sub_user_count"], warm["sub_user_count"]),
+            "positions cold / warm (+1 diff)": "{} / {}".format(cold["position_count"], warm["position_count"]),
+            "open orders cold / warm": "{} / {}".format(cold["order_count"], warm["order_count"]),
+        },
+    )
+
+
+def bench_tick_reconcile(symbol_count=20, tick_count=20000, drop_rate=0.05):
+    """
+    실시간 틱 누락 확인 / 보정(tick_reconcile) 정확도와 처리 시간 (가상 creon 에서 이벤트를 drop_rate 비율로 버린 틱 스트림, 메모리 db)
+
+    Parameters:
+        symbol_count (int): 종목 수
+
+        tick_count (int): 재생할 틱 수 (0.01초 간격, 1배속 기준 시분초)
+
+        drop_rate (float): 버릴 틱 이벤트 비율
+    """
+    from datetime import timedelta
+
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    from creon_sim import SimMarket
+    from stock_data_realtime import StockTickRt, TICK_RING
+    from tick_reconcile import TickReconciler
+
+    SimMarket.reset()
+    SimMarket.load_stock_list(symbol_count)
+    stock_code_list = sorted(SimMarket.stock_dict)[:symbol_count]
+
+    # 진행중인 분봉 제외 조건에 걸리지 않도록 전날 데이터로 확인
+    SimMarket.chart_end_date -= timedelta(days=1)
+    date = int(SimMarket.chart_end_date.strftime("%Y%m%d"))
+
+    tick_rt_list = [StockTickRt(stock_code) for stock_code in stock_code_list]
+    event_list = SimMarket.make_event_list(stock_code_list, tick_count, seed=0, tick_interval=0.01, ask_bid_ratio=0)
+    SimMarket.drop_rate = drop_rate
+    SimMarket.replay(event_list, speed=0)
+    TICK_RING.wait_empty()
+    SimMarket.drop_rate = 0.0
+
+    # 실제로 빠진 수량 (발생한 틱 수량 - 실시간 테이블 수량)
+    event_qty = sum(event["header"][17] for event in event_list)
+    table_qty = sum(tick[4] for stock_code in stock_code_list for tick in TickReconciler.get_tick_list(stock_code))
+
+    start = time.perf_counter()
+    report_list = TickReconciler.reconcile_all(stock_code_list, date)
+    reconcile_sec = time.perf_counter() - start
+    check_report_list = TickReconciler.reconcile_all(stock_code_list, date, fill=False)
+
+    for tick_rt in tick_rt_list:
+        tick_rt.unsubscribe()
+    SimMarket.chart_end_date += timedelta(days=1)
+
+    # 분봉 비교로 빠진 수량을 모두 찾고, 보정 후에는 모자란 분봉이 없어야함 (거래량 차이로는 마지막 틱 이후에 빠진 수량을 찾을 수 없음)
+    _check(sum(report["short_qty"] for report in report_list) == event_qty - table_qty, "tick reconcile short qty != dropped qty")
+    _check(sum(report["vol_gap_qty"] + report["head_qty"] for report in report_list) <= event_qty - table_qty, "tick reconcile vol gap qty > dropped qty")
+    _check(sum(report["mismatch_bar_count"] for report in report_list) == 0, "tick reconcile mismatch bar found")
+    _check(sum(report["short_bar_count"] + report["mismatch_bar_count"] for report in check_report_list) == 0, "tick reconcile short bar after fill")
+
+    _print_result(
+        "tick reconcile ({} symbols, {} ticks, drop rate {})".format(symbol_count, tick_count, drop_rate),
+        {
+            "dropped events": SimMarket.stats_dict["drop"],
+            "dropped qty": event_qty - table_qty,
+            "vol gap count": sum(report["vol_gap_count"] for report in report_list),
+            "vol gap qty (+ head qty)": sum(report["vol_gap_qty"] + report["head_qty"] for report in report_list),
+            "short bar count": sum(report["short_bar_count"] for report in report_list),
+            "short qty": sum(report["short_qty"] for report in report_list),
+            "mismatch bar count": sum(report["mismatch_bar_count"] for report in report_list),
+            "filled bar count": sum(report["fill_bar_count"] for report in report_list),
+            "short bar after fill": sum(report["short_bar_count"] + report["mismatch_bar_count"] for report in check_report_list),
+            "reconcile ms / symbol": reconcile_sec * 1000 / symbol_count,
+        },
+    )
+
+
+def bench_event_ring(symbol_count=50, event_count=20000):
+    """
+    실시간 틱 COM 콜백 처리 방식 비교 (가상 creon, 메모리 db)
+    콜백 안에서 모두 처리(inline)하는 경우와 링 버퍼에 헤더 값만 넣고 처리 스레드에서 처리(ring)하는 경우의
+    콜백 실행 시간(COM 메시지 루프가 다음 이벤트를 전달하지 못하는 시간)과 최대 처리량, 링 버퍼가 가득 찬 경우 버린 이벤트 수
+
+    Parameters:
+        symbol_count (int): 종목 수
+
+        event_count (int): 틱 이벤트 수 (링 버퍼 크기 이하)
+    """
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    from creon_sim import SimMarket
+    from latency_stats import LatencyHistogram
+    from stock_symbol import StockSymbol
+    from stock_data_realtime import StockTickRt, StockRtEvent, TickDbBuffer, TICK_RING
+
+    class InlineRtEvent(StockRtEvent):
+        # 링 버퍼 이전 방식 (콜백 안에서 헤더 읽기 + 처리)
+        def OnReceived(self):
+            get_header_value = self.client.get_header_value
+            self.process([self, get_header_value(18), get_header_value(20), get_header_value(13), get_header_value(2), get_header_value(17), get_header_value(9)])
+            TickDbBuffer.flush()  # 틱마다 db insert
+
+    send_list = []
+
+    def fan_out(rt_data):
+        # 서버의 클라이언트 전송 데이터 생성 흉내
+        send_list.append(rt_data.to_json(StockSymbol.get_code(rt_data.stock_id)))
+
+    drop_notice_list = []
+
+    def drop_event(stock_id, evt_type, drop_count):
+        # 서버의 feed_drop 알림 흉내
+        drop_notice_list.append(drop_count)
+
+    SimMarket.reset()
+    SimMarket.load_stock_list(symbol_count)
+    stock_code_list = sorted(SimMarket.stock_dict)[:symbol_count]
+    tick_rt_dict = {stock_code: StockTickRt(stock_code, fan_out, drop_event) for stock_code in stock_code_list}
+    inline_handler_dict = {}
+    for stock_code, tick_rt in tick_rt_dict.items():
+        inline_handler_dict[stock_code] = tick_rt.creon_stock_cur.get_handler(InlineRtEvent)
+        inline_handler_dict[stock_code].set_params("tick", tick_rt.creon_stock_cur, tick_rt.stock_id, fan_out)
+    ring_handler_dict = {stock_code: tick_rt.handler for stock_code, tick_rt in tick_rt_dict.items()}
+
+    def run(handler_dict, event_list):
+        # COM 메시지 루프 흉내 (헤더 세팅 후 콜백 호출)
+        histogram = LatencyHistogram()
+        del send_list[:]
+        start = time.perf_counter()
+        for event in event_list:
+            handler = handler_dict[event["stock_code"]]
+            handler.client.obj_com.header_dict = event["header"]
+            callback_start = time.perf_counter()
+            handler.OnReceived()
+            histogram.record((time.perf_counter() - callback_start) * 1000000)
+        pump_sec = time.perf_counter() - start
+        TICK_RING.wait_empty()
+        total_sec = time.perf_counter() - start
+        return histogram.get_stats(), pump_sec, total_sec, len(send_list)
+
+    event_list = SimMarket.make_event_list(stock_code_list, min(event_count, TICK_RING.capacity), seed=0, ask_bid_ratio=0)
+    inline_stats, inline_pump_sec, inline_total_sec, inline_count = run(inline_handler_dict, event_list)
+    ring_stats, ring_pump_sec, ring_total_sec, ring_count = run(ring_handler_dict, event_list)
+    ring_max_depth = TICK_RING.max_depth
+
+    # 링 버퍼 크기의 2배를 한번에 넣어 버린 이벤트 수 확인
+    overflow_start = TICK_RING.overflow_count
+    publish_start = TICK_RING.publish_count
+    burst_event_list = SimMarket.make_event_list(stock_code_list, TICK_RING.capacity * 2, seed=1, ask_bid_ratio=0)
+    run(ring_handler_dict, burst_event_list)
+    overflow_count = TICK_RING.overflow_count - overflow_start
+    publish_count = TICK_RING.publish_count - publish_start
+
+    for tick_rt in tick_rt_dict.values():
+        tick_rt.unsubscribe()
+
+    _check(inline_count == ring_count == len(event_list), "event ring sent count mismatch")
+    _check(ring_count / ring_total_sec >= inline_count / inline_total_sec, "event ring processed slower than inline")
+    _check(sum(drop_notice_list) == overflow_count, "event ring dropped events not notified")
+
+    _print_result(
+        "event ring ({} symbols, {} ticks, ring capacity {})".format(symbol_count, len(event_list), TICK_RING.capacity),
+        {
+            "inline callback mean us": inline_stats["mean"] * 1000,
+            "inline callback p99 us": inline_stats["p99"] * 1000,
+            "inline callback max us": inline_stats["max"] * 1000,
+            "ring callback mean us": ring_stats["mean"] * 1000,
+            "ring callback p99 us": ring_stats["p99"] * 1000,
+            "ring callback max us": ring_stats["max"] * 1000,
+            "inline max event/sec": inline_count / inline_total_sec,
+            "ring callback event/sec": len(event_list) / ring_pump_sec,
+            "ring processed event/sec": ring_count / ring_total_sec,
+            "ring max depth": ring_max_depth,
+            "burst events": len(burst_event_list),
+            "burst published / overflow": "{} / {}".format(publish_count, overflow_count),
+            "burst drop notices / notified events": "{} / {}".format(len(drop_notice_list), sum(drop_notice_list)),
+        },
+    )
+
+
+def bench_header_decode(event_count=20000, call_overhead_ns_list=(0, 500)):
+    """
+    실시간 이벤트 헤더 읽기 비교 (필드마다 CreonDataComm.get_header_value 호출 vs HeaderDecoder 일괄 읽기)
+    win32com 동적 디스패치를 흉내낸 가짜 COM 오브젝트 사용 (속성 접근마다 메소드 생성, 호출마다 call_overhead_ns 만큼 대기)
+
+    Parameters:
+        event_count (int): 이벤트 종류별 읽기 횟수
+
+        call_overhead_ns_list (list[int]): 가짜 COM 호출 비용 (단위: ns)
+    """
+    import types
+    import creon_api
+
+    creon_api.set_backend("sim")
+
+    from creon_api import CreonStockCur
+    from stock_data_realtime import _TICK_HEADER_DECODER, _ASK_BID_HEADER_DECODER
+    from trade_status_realtime import _CONCLUSION_HEADER_DECODER
+
+    class FakeDynamicCom:
+        def __init__(self, call_overhead_ns):
+            self.call_overhead_ns = call_overhead_ns
+            self.header_dict = {idx: idx * 10 for idx in range(64)}
+
+        def _get_header_value(self, value_type):
+            if self.call_overhead_ns:
+                end = time.perf_counter_ns() + self.call_overhead_ns
+                while time.perf_counter_ns() < end:
+                    pass
+            return self.header_dict[value_type]
+
+        def __getattr__(self, name):
+            # win32com.client.dynamic.CDispatch 처럼 속성 접근마다 메소드 오브젝트 생성
+            if name == "GetHeaderValue":
+                return types.MethodType(FakeDynamicCom._get_header_value, self)
+            raise AttributeError(name)
+
+    result_dict = {}
+    for call_overhead_ns in call_overhead_ns_list:
+        client = CreonStockCur()
+        client.obj_com = FakeDynamicCom(call_overhead_ns)
+        header_reader = client.get_header_reader()
+        result_dict["fake COM call ns (overhead {})".format(call_overhead_ns)] = _measure_ns(lambda: header_reader(13), event_count)
+
+        for name, decoder in (("tick", _TICK_HEADER_DECODER), ("ask_bid", _ASK_BID_HEADER_DECODER), ("conclusion", _CONCLUSION_HEADER_DECODER)):
+            record = [None] * (1 + len(decoder))
+            index_list = decoder.index_list
+
+            def read_each():
+                # 이전 방식 (필드마다 파이썬 래퍼 메소드 호출)
+                for pos, header_idx in enumerate(index_list, 1):
+                    record[pos] = client.get_header_value(header_idx)
+
+            each_ns = _measure_ns(read_each, event_count)
+            bulk_ns = _measure_ns(lambda: decoder.read_into(header_reader, record), event_count)
+            key = "{} ({} fields, overhead {}) us".format(name, len(decoder), call_overhead_ns)
+            result_dict[key + " each / bulk"] = "{:.2f} / {:.2f} ({:.1f}x)".format(each_ns / 1000, bulk_ns / 1000, each_ns / bulk_ns)
+
+    _print_result("header decode ({} events)".format(event_count), result_dict)
+
+
+def _measure_peak_memory(func):
+    """
+    func 실행중 최대로 할당된 메모리 크기 반환 (실행 후 해제되는 임시 할당 포함)
+
+    Parameters:
+        func (function): 측정할 함수
+
+    Returns:
+        (int): 최대 할당 메모리 (단위: byte)
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - before
+
+
+def bench_tick_record(record_count=10000):
+    """
+    실시간 데이터 형식 비교 (이전 dict + 열거형 + json.dumps vs __slots__ 레코드 + 캐시된 열거형 이름 + 직접 직렬화)
+    이벤트 하나 처리(레코드 생성, db 행, 클라이언트 json)시 시간과 최대 임시 할당 메모리, 레코드 record_count 개를 들고 있을 때의 메모리
+
+    Parameters:
+        record_count (int): 메모리 측정 레코드 수
+    """
+    import json
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    from stock_data_realtime import TickRecord, AskBidRecord, MARKET_HOURS_KIND
+    from trade_status_realtime import TradeStatusRecord
+    from trade_info_enum import ORDER_TYPE, CONCLUSION_TYPE, MODIFY_CANCEL_TYPE, PRICE_TYPE, ORDER_CONDITION
+
+    tick_values = [123456, 153000, ord("2"), 71500, -300, 12, 1234567]
+    ask_bid_values = [71500 + idx * 100 if idx % 4 < 2 else idx * 10 for idx in range(40)] + [123456, 654321]
+    trade_values = [None, time.time(), 0, "삼성전자", 10, 71500, 1001, 0, "A005930", "2", "1", "1", "01", "0", 71000, 10, 10]
+
+    # 이전 방식 (stock_data_realtime.StockRtEvent.process -> server.TaskStockDataRt.event)
+    def old_tick():
+        rt_data = {
+            "stock_id": tick_values[0],
+            "date_time": tick_values[1],
+            "e_market_hours_kind": MARKET_HOURS_KIND(tick_values[2]),
+            "price": tick_values[3],
+            "day_changed": tick_values[4],
+            "qty": tick_values[5],
+            "vol": tick_values[6],
+        }
+        data_db = [rt_data["date_time"], rt_data["e_market_hours_kind"].name, rt_data["price"], rt_data["day_changed"], rt_data["qty"], rt_data["vol"]]
+        rt_data["e_market_hours_kind"] = rt_data["e_market_hours_kind"].name
+        del rt_data["stock_id"]
+        rt_data["stock_code"] = "A005930"
+        return data_db, json.dumps({"res_type": "stock_tick_rt_data", "res_data": rt_data})
+
+    def new_tick():
+        rt_data = TickRecord(*tick_values)
+        return rt_data.to_db_row(), rt_data.to_json("A005930")
+
+    def old_ask_bid():
+        rt_data = {
+            "stock_id": 0,
+            "ask": ask_bid_values[0:40:4],
+            "bid": ask_bid_values[1:40:4],
+            "ask_vol": ask_bid_values[2:40:4],
+            "bid_vol": ask_bid_values[3:40:4],
+            "tot_ask": ask_bid_values[40],
+            "tot_bid": ask_bid_values[41],
+        }
+        del rt_data["stock_id"]
+        rt_data["stock_code"] = "A005930"
+        return json.dumps({"res_type": "stock_askbid_rt_data", "res_data": rt_data})
+
+    def new_ask_bid():
+        return AskBidRecord(0, ask_bid_values[:]).to_json("A005930")
+
+    # 이전 방식 (trade_status_realtime.TradeStatusRtEvent.process -> trade.TradeData.add_trade_history -> server.TaskTradeStatusRt.event)
+    def old_trade():
+        record = trade_values
+        trade_info = {
+            "date_time": int(time.strftime("%Y%m%d%H%M%S", time.localtime(record[1]))),
+            "stock_name": record[3],
+            "qty": record[4],
+            "price": record[5],
+            "order_num": record[6],
+            "origin_order_num": record[7],
+            "stock_code": record[8],
+            "e_order_type": ORDER_TYPE(record[9]),
+            "e_conclusion_type": CONCLUSION_TYPE(record[10]),
+            "e_modify_cancel_type": MODIFY_CANCEL_TYPE(record[11]),
+            "e_price_type": PRICE_TYPE(record[12]),
+            "e_order_condition": ORDER_CONDITION(record[13]),
+            "avg_price": record[14],
+            "able_sell_qty": record[15],
+            "balance_qty": record[16],
+            "total_price": None,
+        }
+        trade_info["total_price"] = trade_info["price"] * trade_info["qty"]
+        trade_info_db = {
+            "date_time": trade_info["date_time"],
+            "order_number": trade_info["order_num"],
+            "conclusion_type": trade_info["e_conclusion_type"].name,
+            "order_type": trade_info["e_order_type"].name,
+            "modify_cancel_type": trade_info["e_modify_cancel_type"].name,
+            "origin_order_number": trade_info["origin_order_num"],
+            "stock_code": trade_info["stock_code"],
+            "stock_name": trade_info["stock_name"],
+            "quantity": trade_info["qty"],
+            "price_type": trade_info["e_price_type"].name,
+            "order_condition": trade_info["e_order_condition"].name,
+            "price": trade_info["price"],
+            "total_price": trade_info["total_price"],
+            "average_price": trade_info["avg_price"],
+            "able_sell_quantity": trade_info["able_sell_qty"],
+            "balance_quantity": trade_info["balance_qty"],
+        }
+        columns_db = []
+        data_db = []
+        for key, value in trade_info_db.items():
+            columns_db.append(key)
+            data_db.append(value)
+        for key in ("e_order_type", "e_conclusion_type", "e_modify_cancel_type", "e_price_type", "e_order_condition"):
+            trade_info[key] = trade_info[key].name
+        return data_db, json.dumps({"res_type": "trade_status", "res_data": trade_info})
+
+    def new_trade():
+        trade_info = TradeStatusRecord.from_record(trade_values)
+        trade_info.total_price = trade_info.price * trade_info.qty
+        return trade_info.to_db_row(), trade_info.to_json()
+
+    # 직렬화 결과가 이전 방식과 같은지 확인
+    _check(old_tick() == new_tick(), "tick record serialization differs")
+    _check(old_ask_bid() == new_ask_bid(), "ask bid record serialization differs")
+    _check(old_trade() == new_trade(), "trade status record serialization differs")
+
+    tick_record = TickRecord(*tick_values)
+    _check(TickRecord.unpack(tick_record.pack()).to_json("A005930") == tick_record.to_json("A005930"), "tick record pack round trip differs")
+    ask_bid_record = AskBidRecord(0, ask_bid_values[:])
+    _check(AskBidRecord.unpack(ask_bid_record.pack()).to_json("A005930") == ask_bid_record.to_json("A005930"), "ask bid record pack round trip differs")
+    trade_record = TradeStatusRecord.from_record(trade_values)
+    trade_record.total_price = trade_record.price * trade_record.qty
+    _check(TradeStatusRecord.unpack(trade_record.pack()).to_json() == trade_record.to_json(), "trade status record pack round trip differs")
+    # 40 바이트를 넘는 주식이름은 글자 단위로 잘림 (14 글자 = 42 바이트)
+    trade_record.stock_name = "가나다라마바사아자차카타파하"
+    _check(TradeStatusRecord.unpack(trade_record.pack()).stock_name == "가나다라마바사아자차카타파", "trade status record stock name not cut on a character boundary")
+
+    # 처리 대기중인 이벤트 데이터를 들고 있을 때의 메모리
+    def hold_old_tick():
+        return [
+            {
+                "stock_id": tick_values[0],
+                "date_time": tick_values[1],
+                "e_market_hours_kind": MARKET_HOURS_KIND(tick_values[2]),
+                "price": tick_values[3],
+                "day_changed": tick_values[4],
+                "qty": tick_values[5],
+                "vol": idx,
+            }
+            for idx in range(record_count)
+        ]
+
+    def hold_new_tick():
+        return [TickRecord(tick_values[0], tick_values[1], tick_values[2], tick_values[3], tick_values[4], tick_values[5], idx) for idx in range(record_count)]
+
+    result_dict = {}
+    for name, old_func, new_func in (("tick", old_tick, new_tick), ("ask_bid", old_ask_bid, new_ask_bid), ("trade_status", old_trade, new_trade)):
+        old_ns = _measure_ns(old_func, record_count)
+        new_ns = _measure_ns(new_func, record_count)
+        result_dict[name + " us / event dict / record"] = "{:.2f} / {:.2f} ({:.1f}x)".format(old_ns / 1000, new_ns / 1000, old_ns / new_ns)
+        result_dict[name + " peak alloc byte / event dict / record"] = "{} / {}".format(_measure_peak_memory(old_func), _measure_peak_memory(new_func))
+
+    result_dict["tick held byte / event dict / record"] = "{:.0f} / {:.0f}".format(
+        _measure_memory(hold_old_tick) / record_count, _measure_memory(hold_new_tick) / record_count
+    )
+    result_dict["binary byte / event tick / ask_bid / trade_status"] = "{} / {} / {}".format(
+        TickRecord.STRUCT.size, AskBidRecord.STRUCT.size, TradeStatusRecord.STRUCT.size
+    )
+
+    _print_result("tick record ({} events)".format(record_count), result_dict)
+
+
+def bench_client_protocol(message_count=20000, symbol_count=50):
+    """
+    클라이언트 전송 인코딩 비교 (json vs binary)
+    메시지당 크기, 서버 변환 시간(레코드 -> 전송 bytes), 클라이언트 디코딩 시간(client_protocol.ClientStreamDecoder)
+
+    Parameters:
+        message_count (int): 메시지 수
+
+        symbol_count (int): 종목 수
+    """
+    import json
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    from stock_symbol import StockSymbol
+    from stock_data_realtime import TickRecord, AskBidRecord, MARKET_HOURS_KIND
+    from client_protocol import ClientStreamDecoder, encode_send_data, encode_json_frame, ENCODING_JSON, ENCODING_BINARY, BINARY_PROTOCOL_VERSION
+
+    stock_code_list = ["A{:06d}".format(idx) for idx in range(symbol_count)]
+    StockSymbol.load(stock_code_list)
+    stock_id_list = [StockSymbol.get_id(stock_code) for stock_code in stock_code_list]
+
+    rand = random.Random(0)
+    record_dict = {
+        "tick": [
+            TickRecord(stock_id_list[idx % symbol_count], 90000 + idx % 60000, ord("2"), rand.randint(1000, 500000), rand.randint(-5000, 5000), rand.randint(1, 1000), idx * 10)
+            for idx in range(message_count)
+        ],
+        "ask_bid": [
+            AskBidRecord(stock_id_list[idx % symbol_count], [rand.randint(1, 500000) for _ in range(42)]) for idx in range(message_count)
+        ],
+    }
+
+    protocol_frame = encode_json_frame(
+        json.dumps({"res_type": "protocol", "res_data": {"encoding": ENCODING_BINARY, "version": BINARY_PROTOCOL_VERSION, "market_hours_kind": {e.value: e.name for e in MARKET_HOURS_KIND}}})
+    )
+    symbol_map_frame = encode_json_frame(
+        json.dumps({"res_type": "symbol_map", "res_data": {stock_code: StockSymbol.get_id(stock_code) for stock_code in stock_code_list}})
+    )
+
+    result_dict = {}
+    for name, record_list in record_dict.items():
+        json_list = [record.to_json(StockSymbol.get_code(record.stock_id)) for record in record_list]
+        frame_list = [record.pack_frame() for record in record_list]
+        json_data = b"".join(encode_send_data(data_json, ENCODING_JSON) for data_json in json_list)
+        binary_data = protocol_frame + symbol_map_frame + b"".join(frame_list)
+
+        # 두 인코딩의 디코딩 결과가 같은지 확인
+        json_res_list = ClientStreamDecoder(ENCODING_JSON).feed(json_data)
+        binary_res_list = ClientStreamDecoder(ENCODING_BINARY).feed(binary_data)[2:]
+        _check(json_res_list == binary_res_list, "client protocol {} json / binary decode differs".format(name))
+
+        idx_list = [0]
+
+        def encode_json():
+            record = record_list[idx_list[0] % message_count]
+            idx_list[0] += 1
+            return encode_send_data(record.to_json(StockSymbol.get_code(record.stock_id)), ENCODING_JSON)
+
+        def encode_binary():
+            record = record_list[idx_list[0] % message_count]
+            idx_list[0] += 1
+            return encode_send_data(record.pack_frame(), ENCODING_BINARY)
+
+        # 클라이언트가 64KB 씩 받는 경우
+        def decode(encoding, data):
+            def run():
+                decoder = ClientStreamDecoder(encoding)
+                for pos in range(0, len(data), 65536):
+                    decoder.feed(data[pos : pos + 65536])
+
+            return run
+
+        def decode_raw():
+            decoder = ClientStreamDecoder(ENCODING_BINARY)
+            decoder.feed(protocol_frame + symbol_map_frame)
+            for pos in range(0, len(binary_data), 65536):
+                decoder.feed_raw(binary_data[pos : pos + 65536])
+
+        json_byte = len(json_data) / message_count
+        binary_byte = (len(binary_data) - len(protocol_frame) - len(symbol_map_frame)) / message_count
+        result_dict[name + " byte / msg json / binary"] = "{:.1f} / {:.1f} ({:.1f}x)".format(json_byte, binary_byte, json_byte / binary_byte)
+
+        encode_json_ns = _measure_ns(encode_json, message_count)
+        encode_binary_ns = _measure_ns(encode_binary, message_count)
+        result_dict[name + " encode us / msg json / binary"] = "{:.2f} / {:.2f} ({:.1f}x)".format(
+            encode_json_ns / 1000, encode_binary_ns / 1000, encode_json_ns / encode_binary_ns
+        )
+
+        decode_json_ns = _measure_ns(decode(ENCODING_JSON, json_data), 3) / message_count
+        decode_binary_ns = _measure_ns(decode(ENCODING_BINARY, binary_data), 3) / message_count
+        decode_raw_ns = _measure_ns(decode_raw, 3) / message_count
+        result_dict[name + " decode us / msg json / binary dict / binary tuple"] = "{:.2f} / {:.2f} / {:.2f}".format(
+            decode_json_ns / 1000, decode_binary_ns / 1000, decode_raw_ns / 1000
+        )
+
+    _print_result("client protocol ({} messages)".format(message_count), result_dict)
+
+
+def bench_compressed_transport(tick_rate_list=(1000, 4000, 10000), duration=2.0, bandwidth_kbps=12000, symbol_count=50):
+    """
+    클라이언트 전송 압축 비교 (server.ClientConn 전송 스레드 + 루프백 소켓, 대역폭은 프로세스 안에서 제한)
+    틱 발생률마다 압축 안함 / zlib (대기열에 쌓인 만큼 묶음) / zlib (10ms 묶음)의 틱당 전송 크기와 틱 발생 ~ 클라이언트 디코딩 지연시간
+
+    Parameters:
+        tick_rate_list (list[float]): 초당 틱 수
+
+        duration (float): 틱 발생 시간 (단위: 초)
+
+        bandwidth_kbps (float): 서버 -> 클라이언트 대역폭 (단위: kbit/s)
+
+        symbol_count (int): 종목 수
+    """
+    import socket
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    import server
+    from stock_symbol import StockSymbol
+    from latency_stats import LatencyHistogram
+    from stock_data_realtime import TickRecord
+    from client_protocol import ClientStreamDecoder, ENCODING_JSON, COMPRESSION_NONE, COMPRESSION_ZLIB
+
+    stock_code_list = ["A{:06d}".format(idx) for idx in range(symbol_count)]
+    StockSymbol.load(stock_code_list)
+    byte_per_sec = bandwidth_kbps * 1000 / 8
+
+    class ShapedSocket:
+        # 대역폭 제한 링크 흉내 (보낸 데이터가 링크를 다 지나갈때까지 sendall 이 반환되지 않음)
+        def __init__(self, socket_conn):
+            self.socket_conn = socket_conn
+            self.free_time = 0.0
+            self.sent_byte = 0
+
+        def sendall(self, data):
+            self.sent_byte += len(data)
+            self.free_time = max(self.free_time, time.perf_counter()) + len(data) / byte_per_sec
+            delay = self.free_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.socket_conn.sendall(data)
+
+        def recv(self, size):
+            return self.socket_conn.recv(size)
+
+        def close(self):
+            self.socket_conn.close()
+
+    class FakeServer:
+        task_list = {}
+
+        def delete_client(self, username):
+            pass
+
+    def run(tick_rate, compression, flush_ms):
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_socket.bind(("127.0.0.1", 0))
+        listen_socket.listen(1)
+        client_socket = socket.create_connection(listen_socket.getsockname())
+        server_socket = listen_socket.accept()[0]
+        listen_socket.close()
+        for socket_conn in (client_socket, server_socket):
+            socket_conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        tick_count = int(tick_rate * duration)
+        send_time_list = [0.0] * tick_count
+        histogram = LatencyHistogram()
+        recv_count = [0]
+
+        def recv():
+            decoder = ClientStreamDecoder(ENCODING_JSON, compression)
+            while recv_count[0] < tick_count:
+                recv_data = client_socket.recv(65536)
+                if not recv_data:
+                    break
+                recv_time = time.perf_counter()
+                for res in decoder.feed(recv_data):
+                    histogram.record((recv_time - send_time_list[res["res_data"]["vol"]]) * 1000000)
+                    recv_count[0] += 1
+
+        recv_thread = threading.Thread(target=recv, daemon=True)
+        recv_thread.start()
+
+        shaped_socket = ShapedSocket(server_socket)
+        client_conn = server.ClientConn("bench", shaped_socket, FakeServer(), ENCODING_JSON, compression, flush_ms)
+        rand = random.Random(0)
+        price_list = [rand.randint(1000, 500000) for _ in range(symbol_count)]
+        start = time.perf_counter()
+        for idx in range(tick_count):
+            send_time = start + idx / tick_rate
+            while time.perf_counter() < send_time:
+                time.sleep(0.0005)
+            stock_id = idx % symbol_count
+            price_list[stock_id] += rand.choice((-10, 0, 10))
+            record = TickRecord(stock_id, 90000 + int(idx / tick_rate), ord("2"), price_list[stock_id], rand.randint(-500, 500), rand.randint(1, 100), idx)
+            send_time_list[idx] = time.perf_counter()
+            client_conn.insert_send_q(record.to_json(StockSymbol.get_code(stock_id)))
+
+        recv_thread.join(30)
+        wire_byte = shaped_socket.sent_byte
+        client_conn.close_client()
+        client_socket.close()
+        return recv_count[0], wire_byte / max(1, recv_count[0]), histogram.get_stats()
+
+    result_dict = {}
+    for tick_rate in tick_rate_list:
+        for name, compression, flush_ms in (("none", COMPRESSION_NONE, 0), ("zlib", COMPRESSION_ZLIB, 0), ("zlib 10ms", COMPRESSION_ZLIB, 10)):
+            recv_count, byte_per_tick, stats = run(tick_rate, compression, flush_ms)
+            result_dict["{} tick/s {}".format(tick_rate, name)] = "recv {} byte/tick {:.1f} latency ms p50 {:.2f} p99 {:.2f} max {:.2f}".format(
+                recv_count, byte_per_tick, stats["p50"], stats["p99"], stats["max"]
+            )
+
+    _print_result("compressed transport ({} kbps, {} sec)".format(bandwidth_kbps, duration), result_dict)
+
+
+def bench_query_cache(symbol_count=20, tick_count=20000, held_count=5, order_count=5, query_count=2000):
+    """
+    조회 요청(server.TaskQuery) 응답과 db 비교, 캐시 응답 / db 조회 처리 시간 (가상 creon, 메모리 db)
+    마지막 틱 / 분봉은 실시간 테이블의 틱, 호가는 마지막 호가 이벤트, 잔고 / 미체결 주문은 KR_Stock_Balance / KR_Unconcluded_Order 와 비교
+
+    Parameters:
+        symbol_count (int): 종목 수
+
+        tick_count (int): 재생할 틱 수 (0.01초 간격)
+
+        held_count (int): 잔고 종목 수
+
+        order_count (int): 미체결 주문 수
+
+        query_count (int): 처리 시간 측정 반복 횟수
+    """
+    from queue import Queue
+
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    import server
+    import loadtest
+    from creon_sim import SimMarket, ASK_BID_HEADER_INDEX_LIST
+    from database import MariaDB
+    from latency_stats import OrderLatency
+    from stock_symbol import StockSymbol
+    from trade import BalanceData, TradeData
+    from portfolio import Portfolio
+    from stock_data_realtime import StockTickRt, StockAskBidRt, RtDataCache, TICK_RING, ASK_BID_RING, BACKFILL_MARKET_HOURS_KIND
+    from tick_reconcile import TickReconciler
+
+    class FakeServer:
+        def __init__(self):
+            self.send_q = Queue()
+
+        def insert_send_q(self, username, data):
+            self.send_q.put(data)
+
+    SimMarket.reset()
+    SimMarket.load_stock_list(symbol_count)
+    stock_code_list = sorted(SimMarket.stock_dict)[:symbol_count]
+    for stock_code in stock_code_list[:held_count]:
+        SimMarket.set_position(stock_code, 10, SimMarket.stock_dict[stock_code][2])
+    for stock_code in stock_code_list[held_count : held_count + order_count]:
+        SimMarket.place_order("2", stock_code, 1, 10, "0", "01")
+
+    loadtest.seed_db(stock_code_list, ["bench"])
+    db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
+    BalanceData.update_stock_balance()
+    TradeData.update_unconcluded_order()
+
+    tick_rt_list = [StockTickRt(stock_code) for stock_code in stock_code_list]
+    ask_bid_rt_list = [StockAskBidRt(stock_code) for stock_code in stock_code_list]
+    event_list = SimMarket.make_event_list(stock_code_list, tick_count, seed=0, tick_interval=0.01, ask_bid_ratio=0.2)
+    SimMarket.replay(event_list, speed=0)
+    TICK_RING.wait_empty()
+    ASK_BID_RING.wait_empty()
+    Portfolio.persist(db_kr_operation_data)
+
+    fake_server = FakeServer()
+    task_query = server.TaskQuery(fake_server)
+
+    # 응답과 db 비교
+    tick_mismatch = 0
+    bar_mismatch = 0
+    bar_count = 0
+    for stock_code in stock_code_list:
+        tick_list = [tick for tick in TickReconciler.get_tick_list(stock_code) if tick[1] != BACKFILL_MARKET_HOURS_KIND]
+        last_tick = task_query.query_last_tick({"stock_code_list": [stock_code]})[stock_code]
+        if last_tick is None or [last_tick[key] for key in ("date_time", "e_market_hours_kind", "price", "day_changed", "qty", "vol")] != tick_list[-1]:
+            tick_mismatch += 1
+
+        db_bar_dict = TickReconciler.build_minute_bar(tick_list)
+        res = task_query.query_recent_bar({"stock_code": stock_code, "count": len(db_bar_dict)})
+        bar_count += len(res["bar_list"])
+        if {bar[0] % 10000: bar[1:] for bar in res["bar_list"]} != db_bar_dict:
+            bar_mismatch += 1
+
+    last_ask_bid_dict = {event["stock_code"]: event["header"] for event in event_list if event["type"] == "ask_bid"}
+    ask_bid_mismatch = 0
+    ask_bid_res = task_query.query_last_askbid({"stock_code_list": stock_code_list})
+    for stock_code, header_dict in last_ask_bid_dict.items():
+        ask_bid = ask_bid_res[stock_code]
+        if ask_bid is None or (
+            ask_bid["ask"] != [header_dict[header_idx] for header_idx in ASK_BID_HEADER_INDEX_LIST]
+            or ask_bid["bid"] != [header_dict[header_idx + 1] for header_idx in ASK_BID_HEADER_INDEX_LIST]
+            or (ask_bid["tot_ask"], ask_bid["tot_bid"]) != (header_dict[23], header_dict[24])
+        ):
+            ask_bid_mismatch += 1
+
+    # 메모리 db 테이블은 TEXT 컬럼(유효숫자 15자리)이므로 숫자로 바꿔 소수점 6자리까지 비교
+    balance_column_list = list(server.BALANCE_POSITION_COLUMNS)
+    db_balance_dict = {
+        row[0]: [row[0]] + [round(float(value), 6) for value in row[1:]]
+        for row in db_kr_operation_data.select("KR_Stock_Balance", balance_column_list) or ()
+    }
+    balance = task_query.query_balance({})
+    balance_mismatch = sum(
+        [position["stock_code"]] + [round(position[column], 6) for column in balance_column_list[1:]] != db_balance_dict.get(position["stock_code"])
+        for position in balance["position_list"]
+    ) + abs(len(balance["position_list"]) - len(db_balance_dict))
+
+    db_order_dict = {
+        int(row[0]): int(float(row[1])) for row in db_kr_operation_data.select("KR_Unconcluded_Order", ["order_number", "quantity"]) or ()
+    }
+    order_list = task_query.query_unconcluded_order({})
+    order_mismatch = sum(db_order_dict.get(int(order["order_number"])) != int(order["quantity"]) for order in order_list) + abs(
+        len(order_list) - len(db_order_dict)
+    )
+
+    # 캐시 응답 / db 조회 처리 시간 (마지막 틱은 캐시를 비운 상태의 db 조회, 분봉은 실시간 테이블 틱으로 만드는 경우와 비교)
+    stock_code = stock_code_list[0]
+    stock_id = StockSymbol.get_id(stock_code)
+    tick_hit_ns = _measure_ns(lambda: RtDataCache.get_last_tick(stock_code), query_count)
+    rt_data = RtDataCache.tick_list[stock_id]
+    RtDataCache.tick_list[stock_id] = None
+    tick_miss_ns = _measure_ns(lambda: RtDataCache.get_last_tick(stock_code), query_count)
+    RtDataCache.tick_list[stock_id] = rt_data
+    bar_hit_ns = _measure_ns(lambda: RtDataCache.get_recent_bar_list(stock_code, 3), query_count)
+    bar_db_ns = _measure_ns(lambda: TickReconciler.build_minute_bar(TickReconciler.get_tick_list(stock_code)), query_count // 10)
+
+    # 요청 종류별 지연시간 (조회 처리 스레드, 소켓 수신 ~ 응답 전송 대기열 추가)
+    req_list = [
+        ("balance", {}),
+        ("unconcluded_order", {}),
+        ("last_tick", {"stock_code_list": stock_code_list}),
+        ("last_askbid", {"stock_code_list": stock_code_list}),
+        ("recent_bar", {"stock_code": stock_code, "count": 3}),
+    ]
+    for req_type, _ in req_list:
+        OrderLatency.histogram_dict.pop("query>" + req_type, None)
+    for _ in range(query_count // 10):
+        for req_type, req_data in req_list:
+            task_query.insert_q({"username": "bench", "req_type": req_type, "req_data": req_data, "latency": {"socket_recv": time.perf_counter()}})
+            fake_server.send_q.get()
+    latency_stats = OrderLatency.get_stats()
+
+    for tick_rt in tick_rt_list:
+        tick_rt.unsubscribe()
+    for ask_bid_rt in ask_bid_rt_list:
+        ask_bid_rt.unsubscribe()
+
+    _check(tick_mismatch == 0, "query cache last tick mismatch")
+    _check(bar_mismatch == 0, "query cache recent bar mismatch")
+    _check(ask_bid_mismatch == 0, "query cache last ask bid mismatch")
+    _check(balance_mismatch == 0, "query cache balance mismatch")
+    _check(order_mismatch == 0, "query cache open order mismatch")
+
+    result_dict = {
+        "last tick mismatch": "{} / {}".format(tick_mismatch, symbol_count),
+        "recent bar mismatch": "{} / {} ({} bars)".format(bar_mismatch, symbol_count, bar_count),
+        "last ask bid mismatch": "{} / {}".format(ask_bid_mismatch, len(last_ask_bid_dict)),
+        "balance mismatch": "{} / {}".format(balance_mismatch, len(db_balance_dict)),
+        "open order mismatch": "{} / {}".format(order_mismatch, len(db_order_dict)),
+        "last tick cache us": tick_hit_ns / 1000,
+        "last tick db fallback us": tick_miss_ns / 1000,
+        "recent bar cache us": bar_hit_ns / 1000,
+        "recent bar from db ticks us": bar_db_ns / 1000,
+    }
+    for req_type, _ in req_list:
+        stats = latency_stats["query>" + req_type]
+        result_dict[req_type + " p50 / p99 ms"] = "{:.3f} / {:.3f}".format(stats["p50"], stats["p99"])
+    _print_result("query cache ({} symbols, {} ticks)".format(symbol_count, tick_count), result_dict)
+
+
+def bench_history_stream(symbol_count=20, day_count=60, chunk_row_count=5000, window=8, worker_count=4):
+    """
+    과거 1분봉 조회 비교 (메모리 db): 종목 테이블마다 직접 SELECT 하는 경우와 서버 history 요청으로 받는 경우
+    (server.TaskHistory + ClientConn + 루프백 소켓, 클라이언트는 묶음마다 ack 하고 행 수 / 합계만 확인)의 걸린 시간과 최대 메모리
+    직접 조회는 종목 하나의 결과 전체를, history 는 전송 창 크기의 묶음만 메모리에 올림
+
+    Parameters:
+        symbol_count (int): 종목 수 (요청 예시 - 100)
+
+        day_count (int): 일 수 (하루 381개 분봉, 요청 예시 - 5년 약 1250일)
+
+        chunk_row_count (int): 묶음당 행 수
+
+        window (int): 전송 창
+
+        worker_count (int): 종목을 동시에 읽는 처리 스레드 수
+    """
+    import json
+    import socket
+
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    import server
+    from database import MariaDB
+    from stock_symbol import StockSymbol
+    from stock_data import CHART_MINUTE_COLUMNS_AND_TYPES
+    from client_protocol import ClientStreamDecoder, FRAME_JSON, FRAME_HISTORY, ENCODING_JSON, ENCODING_BINARY, COMPRESSION_NONE
+
+    stock_code_list = ["H{:06d}".format(idx) for idx in range(symbol_count)]
+    StockSymbol.load(stock_code_list)  # 서버 시작시처럼 종목 코드 등록 (등록되지 않은 종목 코드는 INVALID_REQUEST)
+    column_list = list(CHART_MINUTE_COLUMNS_AND_TYPES)
+    db_kr_stock_data_1min = MariaDB("KR_STOCK_DATA_1MIN")
+
+    # 종목별 day_count 일 x 381개 (09:00 ~ 15:20 + 15:30) 분봉
+    minute_list = [hour * 100 + minute for hour in range(9, 15) for minute in range(60)] + [1500 + minute for minute in range(21)] + [1530]
+    rand = random.Random(0)
+    for stock_code in stock_code_list:
+        price = rand.randint(1000, 100000)
+        data_db = []
+        for day in range(day_count):
+            date = 20200101 + day // 28 % 12 * 100 + (day // 336) * 10000 + day % 28
+            for minute in minute_list:
+                price = max(10, price + rand.choice((-10, 0, 10)))
+                data_db.append([date * 10000 + minute, price, price + 10, price - 10, price, rand.randint(1, 10000)])
+        db_kr_stock_data_1min.create(stock_code, column_list, list(CHART_MINUTE_COLUMNS_AND_TYPES.values()))
+        db_kr_stock_data_1min.delete(stock_code)
+        db_kr_stock_data_1min.insert(stock_code, column_list, data_db)
+    start_date_time, end_date_time = 202001010000, 209912312359
+    total_row_count = symbol_count * day_count * len(minute_list)
+
+    def run_direct():
+        # 백테스트 클라이언트가 종목 테이블마다 SELECT (결과 전체를 받은 후 처리)
+        row_count = 0
+        close_sum = 0
+        db = MariaDB("KR_STOCK_DATA_1MIN")
+        for stock_code in stock_code_list:
+            row_list = db.select(stock_code, column_list, "date_time BETWEEN {} AND {} ORDER BY date_time".format(start_date_time, end_date_time))
+            row_count += len(row_list)
+            close_sum += sum(row[4] for row in row_list)
+        return row_count, close_sum, 0
+
+    class FakeServer:
+        def __init__(self):
+            self.client_conn_dict = {}
+            self.task_list = {}
+
+        def get_encoding(self, username):
+            client_conn = self.client_conn_dict.get(username)
+            return client_conn.encoding if client_conn is not None else None
+
+        def insert_send_q(self, username, data):
+            if username in self.client_conn_dict:
+                self.client_conn_dict[username].insert_send_q(data)
+
+        def delete_client(self, username):
+            self.task_list["history"].delete_user(username)
+            self.client_conn_dict.pop(username, None)
+
+    fake_server = FakeServer()
+    task_history = server.TaskHistory(fake_server, worker_count)
+    fake_server.task_list = {"history": task_history, "history_ack": task_history}
+
+    def run_stream(encoding):
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_socket.bind(("127.0.0.1", 0))
+        listen_socket.listen(1)
+        client_socket = socket.create_connection(listen_socket.getsockname())
+        server_socket = listen_socket.accept()[0]
+        listen_socket.close()
+
+        fake_server.client_conn_dict["bench"] = server.ClientConn("bench", server_socket, fake_server, encoding, COMPRESSION_NONE)
+        req = {"req_type": "history", "req_data": {"req_id": 1, "stock_code_list": stock_code_list, "timeframe": "1min", "start": start_date_time, "end": end_date_time}}
+        req["req_data"].update(chunk_row_count=chunk_row_count, window=window)
+        client_socket.sendall(json.dumps(req).encode())
+
+        # 묶음을 받을때마다 ack (클라이언트 처리 속도만큼만 서버가 보냄)
+        ack_data = json.dumps({"req_type": "history_ack", "req_data": {"req_id": 1, "count": 1}}).encode()
+        decoder = ClientStreamDecoder(encoding)
+        row_count = 0
+        close_sum = 0
+        recv_byte = 0
+        done = False
+        while not done:
+            recv_data = client_socket.recv(262144)
+            if not recv_data:
+                break
+            recv_byte += len(recv_data)
+            if encoding == ENCODING_BINARY:
+                res_list = [(FRAME_HISTORY, value[3]) if frame_type == FRAME_HISTORY else (frame_type, value) for frame_type, value in decoder.feed_raw(recv_data)]
+            else:
+                res_list = [(FRAME_HISTORY, res["res_data"]["column_dict"]) if res["res_type"] == "history_chunk" else (FRAME_JSON, res) for res in decoder.feed(recv_data)]
+            for frame_type, value in res_list:
+                if frame_type == FRAME_HISTORY:
+                    row_count += len(value["close"])
+                    close_sum += sum(value["close"])
+                    client_socket.sendall(ack_data)
+                elif value["res_type"] == "history_end":
+                    done = True
+
+        client_socket.sendall(b"CLOSE")
+        client_socket.close()
+        while "bench" in fake_server.client_conn_dict:
+            time.sleep(0.01)
+        return row_count, close_sum, recv_byte
+
+    result_dict = {}
+    for name, func in (("direct select", run_direct), ("history json", lambda: run_stream(ENCODING_JSON)), ("history binary", lambda: run_stream(ENCODING_BINARY))):
+        start = time.perf_counter()
+        row_count, close_sum, recv_byte = func()
+        elapsed = time.perf_counter() - start
+        peak_byte = _measure_peak_memory(func)
+        result_dict[name] = "rows {} ({}) close sum {} sec {:.2f} peak mem MB {:.1f}{}".format(
+            row_count,
+            "ok" if row_count == total_row_count else "MISMATCH",
+            close_sum,
+            elapsed,
+            peak_byte / 1024 / 1024,
+            " byte/row {:.1f}".format(recv_byte / row_count) if recv_byte else "",
+        )
+
+    for stock_code in stock_code_list:
+        db_kr_stock_data_1min.drop(stock_code)
+
+    _print_result(
+        "history stream ({} symbols x {} days 1min = {} rows, chunk {} rows, window {}, {} workers)".format(
+            symbol_count, day_count, total_row_count, chunk_row_count, window, worker_count
+        ),
+        result_dict,
+    )
+
+
+def bench_db_cache(key_count=50, writer_count=4, reader_count=8, duration=2.0, query_count=20000):
+    """
+    db 조회 캐시(database.QueryCache) 검사와 처리 시간 (메모리 db)
+    쓰기 스레드가 행의 version 을 올리고 update 가 끝난 후 version 을 공개하면, 읽기 스레드는 조회 전에 공개된 version 을 기억하고
+    캐시 조회 결과가 그보다 작으면 (무효화 후에도 이전 값이 남으면) 오류로 셈
+    무효화되지 않는 쓰기 (execute 직접 실행) 의 유지 시간 만료, 최대 항목 수를 넘을때 오래된 항목 삭제도 확인
+
+    Parameters:
+        key_count (int): 행 수
+
+        writer_count (int): 쓰기 스레드 수 (행을 나눠서 씀)
+
+        reader_count (int): 읽기 스레드 수
+
+        duration (float): 동시 쓰기 / 읽기 시간 (단위: 초)
+
+        query_count (int): 처리 시간 측정 반복 횟수
+    """
+    import database
+
+    database.set_config(backend="sim")
+
+    from database import MariaDB, QueryCache
+
+    db_name = "BENCH_DB_CACHE"
+    table = "bench_version"
+    table_key = db_name + "." + table
+    db = MariaDB(db_name)
+    db.create(table, ["id", "version"], ["INT PRIMARY KEY", "INT"])
+    db.insert(table, ["id", "version"], [[key, 0] for key in range(key_count)])
+    QueryCache.clear()
+
+    # 동시 쓰기 / 읽기 (행 하나는 쓰기 스레드 하나만 쓰므로 version 은 증가만 함)
+    committed_list = [0] * key_count
+    stop_event = threading.Event()
+    error_list = []
+    count_list = [0, 0]  # 쓰기 수, 읽기 수
+
+    def run_writer(writer_index):
+        writer_db = MariaDB(db_name)
+        key_list = list(range(writer_index, key_count, writer_count))
+        rand = random.Random(writer_index)
+        write_count = 0
+        while not stop_event.is_set():
+            key = rand.choice(key_list)
+            version = committed_list[key] + 1
+            writer_db.update(table, "version", version, "id = " + str(key))
+            committed_list[key] = version
+            write_count += 1
+            time.sleep(0.0005)
+        count_list[0] += write_count
+
+    def run_reader(reader_index):
+        reader_db = MariaDB(db_name)
+        rand = random.Random(1000 + reader_index)
+        read_count = 0
+        while not stop_event.is_set():
+            key = rand.randrange(key_count)
+            expected = committed_list[key]
+            version = reader_db.select(table, "version", "id = " + str(key), cache_ttl=60)
+            if version < expected:
+                error_list.append((key, version, expected))
+            read_count += 1
+        count_list[1] += read_count
+
+    thread_list = [threading.Thread(target=run_writer, args=(index,)) for index in range(writer_count)]
+    thread_list += [threading.Thread(target=run_reader, args=(index,)) for index in range(reader_count)]
+    for thread in thread_list:
+        thread.start()
+    time.sleep(duration)
+    stop_event.set()
+    for thread in thread_list:
+        thread.join()
+
+    final_mismatch = sum(
+        db.select(table, "version", "id = " + str(key), cache_ttl=60) != committed_list[key] for key in range(key_count)
+    )
+    concurrent_stats = QueryCache.get_stats()[table_key]
+
+    # 무효화되지 않는 쓰기는 유지 시간까지 이전 값
+    QueryCache.clear()
+    where = "id = 0"
+    before = db.select(table, "version", where, cache_ttl=0.2)
+    db.execute("UPDATE " + table + " SET version = version + 1 WHERE " + where)
+    db.db_conn.commit()
+    stale = db.select(table, "version", "id  =  0", cache_ttl=0.2) == before  # 공백만 다른 WHERE 문은 같은 항목
+    time.sleep(0.25)
+    fresh = db.select(table, "version", where, cache_ttl=0.2) == before + 1
+
+    # 최대 항목 수
+    max_entry_count = QueryCache.max_entry_count
+    QueryCache.max_entry_count = key_count // 2
+    QueryCache.clear()
+    evict_before = QueryCache.get_stats()[table_key]["evict"]
+    for key in range(key_count):
+        db.select(table, ["id", "version"], "id = " + str(key), cache_ttl=60)
+    lru_stats = QueryCache.get_stats()[table_key]
+    QueryCache.max_entry_count = max_entry_count
+
+    # 처리 시간
+    QueryCache.clear()
+    uncached_ns = _measure_ns(lambda: db.select(table, ["id", "version"], "id = 1"), query_count)
+    cached_ns = _measure_ns(lambda: db.select(table, ["id", "version"], "id = 1", cache_ttl=60), query_count)
+    invalidate_ns = _measure_ns(lambda: QueryCache.invalidate(db_name, "bench_uncached_table"), query_count)
+
+    db.drop(table)
+    QueryCache.clear()
+
+    _check(not error_list, "db cache stale read after committed write")
+    _check(final_mismatch == 0, "db cache final value mismatch")
+    _check(stale and fresh, "db cache raw write not stale until ttl / fresh after")
+    _check(lru_stats["entry"] <= key_count // 2, "db cache entry count over max_entry_count")
+
+    _print_result(
+        "db cache ({} rows, {} writers, {} readers, {:.1f} sec)".format(key_count, writer_count, reader_count, duration),
+        {
+            "writes / reads": "{} / {}".format(*count_list),
+            "hit / miss / invalidate": "{hit} / {miss} / {invalidate}".format(**concurrent_stats),
+            "stale read after committed write": len(error_list),
+            "final value mismatch": final_mismatch,
+            "raw write stale until ttl / fresh after": "{} / {}".format(stale, fresh),
+            "lru max {} entries (entry / evict)".format(key_count // 2): "{} / {}".format(lru_stats["entry"], lru_stats["evict"] - evict_before),
+            "select uncached (ns)": uncached_ns,
+            "select cached (ns)": cached_ns,
+            "invalidate uncached table (ns)": invalidate_ns,
+        },
+    )
+
+
+def bench_login_storm(client_count=200, worker_count=8, db_latency_ms=20, connect_latency_ms=20, first_login_p50_budget_ms=1000):
+    """
+    재접속 폭주 (client_count 개 클라이언트가 동시에 로그인) 처리 시간과 db 연결 수 (메모리 db, 연결 / 쿼리 지연 추가)
+    이전 방식 (접속마다 스레드 + db 연결을 새로 만들고 평문 비교) 과 server.TaskLogin + auth.AuthService (처리 스레드별 db 연결,
+    pbkdf2 해시 검사, 조회 / 검사 성공 캐시) 를 비교하고, 같은 사용자의 실패가 반복되면 로그인이 거부되는지 확인
+
+    Parameters:
+        client_count (int): 동시에 로그인하는 클라이언트 수
+
+        worker_count (int): 로그인 처리 스레드 수
+
+        db_latency_ms (float): db 쿼리 지연 (단위: ms)
+
+        connect_latency_ms (float): db 연결 생성 지연 (단위: ms)
+
+        first_login_p50_budget_ms (float): 첫 로그인 폭주 (캐시 없음, 모두 pbkdf2 검사) p50 응답 시간 허용치 (단위: ms)
+    """
+    import json
+    import socket
+
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    import server
+    from auth import AuthService, AUTH_FAIL, AUTH_RATE_LIMITED
+    from database import MariaDB, QueryCache
+    from database_sim import SimConnection
+
+    class FakeServer:
+        login = server.QuantServer.login
+
+        def __init__(self):
+            self.client_conn_dict = {}
+            self.task_list = {}
+
+        def delete_client(self, username):
+            self.client_conn_dict.pop(username, None)
+
+    password = "storm-password"
+    username_list = ["storm{:03d}".format(idx) for idx in range(client_count)]
+    db_mysql = MariaDB("mysql")
+    db_mysql.create("user", ["User", "Password"], ["TEXT", "TEXT"])
+    db_mysql.delete("user", "User LIKE 'storm%'")
+
+    p50_ms_list = []
+
+    def run_storm(accept_func):
+        listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listen_socket.bind(("127.0.0.1", 0))
+        listen_socket.listen(client_count)
+        accept_sec = [0.0]
+
+        def run_accept():
+            start = time.perf_counter()
+            for _ in range(client_count):
+                socket_conn, addr = listen_socket.accept()
+                accept_func(socket_conn, addr)
+            accept_sec[0] = time.perf_counter() - start
+
+        latency_list = []
+        result_list = []
+        socket_list = []
+        list_lock = threading.Lock()
+        start_event = threading.Event()
+
+        def run_client(username):
+            start_event.wait()
+            start = time.perf_counter()
+            client_socket = socket.create_connection(listen_socket.getsockname())
+            client_socket.sendall(json.dumps({"username": username, "password": password}).encode("utf-8"))
+            result = client_socket.recv(7)
+            with list_lock:
+                latency_list.append(time.perf_counter() - start)
+                result_list.append(result)
+                socket_list.append(client_socket)
+
+        accept_thread = threading.Thread(target=run_accept)
+        accept_thread.start()
+        thread_list = [threading.Thread(target=run_client, args=(username,)) for username in username_list]
+        for thread in thread_list:
+            thread.start()
+        connect_count = SimConnection.connect_count
+        start = time.perf_counter()
+        start_event.set()
+        for thread in thread_list:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        accept_thread.join()
+        listen_socket.close()
+
+        for client_socket in socket_list:
+            try:
+                client_socket.sendall(b"CLOSE")
+            except OSError:
+                pass
+            client_socket.close()
+
+        latency_list.sort()
+        p50_ms_list.append(latency_list[len(latency_list) // 2] * 1000)
+        return "ok {} / {} sec {:.2f} p50 / p99 ms {:.1f} / {:.1f} accept all ms {:.1f} db connections {}".format(
+            result_list.count(b"SUCCESS"),
+            client_count,
+            elapsed,
+            latency_list[len(latency_list) // 2] * 1000,
+            latency_list[int(len(latency_list) * 0.99)] * 1000,
+            accept_sec[0] * 1000,
+            SimConnection.connect_count - connect_count,
+        )
+
+    # 이전 방식 : 접속마다 스레드, 로그인마다 db 연결, 평문 비교
+    def legacy_login(socket_conn):
+        login_req = json.loads(socket_conn.recv(1024).decode("utf-8"))
+        legacy_db = MariaDB("mysql")
+        if login_req["password"] == legacy_db.select("user", "Password", "User = '" + login_req["username"] + "'"):
+            socket_conn.send(b"SUCCESS")
+        else:
+            socket_conn.send(b"FAIL")
+        socket_conn.close()
+
+    result_dict = {}
+    SimConnection.query_latency = db_latency_ms / 1000
+    SimConnection.connect_latency = connect_latency_ms / 1000
+    try:
+        db_mysql.insert("user", ["User", "Password"], [[username, password] for username in username_list])
+        result_dict["legacy (thread + connection per login)"] = run_storm(
+            lambda socket_conn, addr: threading.Thread(target=legacy_login, args=(socket_conn,)).start()
+        )
+
+        db_mysql.delete("user", "User LIKE 'storm%'")
+        db_mysql.insert("user", ["User", "Password"], [[username, AuthService.hash_password(password)] for username in username_list])
+        QueryCache.clear()
+        AuthService.clear()
+        fake_server = FakeServer()
+        task_login = server.TaskLogin(fake_server, worker_count)
+        result_dict["auth service first login"] = run_storm(lambda socket_conn, addr: task_login.insert_q((socket_conn, addr)))
+        first_login_p50_ms = p50_ms_list[-1]
+        while fake_server.client_conn_dict:
+            time.sleep(0.01)
+        result_dict["auth service reconnect (cached)"] = run_storm(lambda socket_conn, addr: task_login.insert_q((socket_conn, addr)))
+        while fake_server.client_conn_dict:
+            time.sleep(0.01)
+    finally:
+        SimConnection.query_latency = 0.0
+        SimConnection.connect_latency = 0.0
+
+    # 같은 사용자로 틀린 비밀번호를 반복하면 맞는 비밀번호도 거부
+    username = username_list[0]
+    fail_result_list = [AuthService.authenticate(db_mysql, username, "wrong", "10.0.0.1") for _ in range(AuthService.max_fail_count + 1)]
+    locked_result = AuthService.authenticate(db_mysql, username, password, "10.0.0.2")
+    AuthService.clear()
+    unlocked_result = AuthService.authenticate(db_mysql, username, password, "10.0.0.2")
+
+    stored_password = db_mysql.select("user", "Password", "User = '" + username + "'")
+    result_dict["hash verify ms"] = _measure_ns(lambda: AuthService.verify_password(password, stored_password), 20) / 1000000
+    result_dict["wrong password results"] = "{} FAIL, {} RATE_LIMITED".format(fail_result_list.count(AUTH_FAIL), fail_result_list.count(AUTH_RATE_LIMITED))
+    result_dict["correct password while locked / after"] = "{} / {}".format(locked_result, unlocked_result)
+    result_dict["auth stats"] = AuthService.get_stats()
+    result_dict["unknown user"] = AuthService.authenticate(db_mysql, "storm_unknown", password)
+    result_dict["injection username"] = AuthService.authenticate(db_mysql, "x' OR '1'='1", password)
+
+    db_mysql.delete("user", "User LIKE 'storm%'")
+    AuthService.clear()
+
+    result_dict["first login p50 budget ms"] = first_login_p50_budget_ms
+    _check(
+        first_login_p50_ms <= first_login_p50_budget_ms,
+        "login storm first login p50 {:.1f} ms > budget {} ms".format(first_login_p50_ms, first_login_p50_budget_ms),
+    )
+    _check(locked_result == AUTH_RATE_LIMITED, "login storm correct password while locked : " + locked_result)
+
+    _print_result(
+        "login storm ({} clients, {} workers, db query {} ms, db connect {} ms)".format(client_count, worker_count, db_latency_ms, connect_latency_ms),
+        result_dict,
+    )
+
+
+def bench_rt_shard(symbol_count=40, tick_count=30000, shard_count_list=(1, 2, 4)):
+    """
+    실시간 틱 처리량 비교 (가상 creon, 메모리 db): 서버 프로세스의 TICK_RING 처리 스레드 하나 (종목별 묶음 insert)와
+    rt_shard.RtShardPool 처리 프로세스 수별 (종목별 묶음 insert, 분봉 생성은 처리 프로세스, 가격 갱신 / 전송은 서버 프로세스)
+    재생 시작부터 모든 틱이 전송 함수까지 처리될때까지의 초당 틱 수, 종목별 전송 순서와 메모리 분봉이 같은지 확인
+    메모리 db 는 프로세스마다 따로이므로 처리 프로세스의 저장 행 수는 샤드 통계로 확인
+    처리량은 샤드 수보다 cpu 가 많아야 늘어남 (cpu 1개에서는 직렬화 / 프로세스간 전달 비용으로 오히려 줄어듦, 서버는 이 경우 샤드를 사용 안함)
+
+    Parameters:
+        symbol_count (int): 종목 수
+
+        tick_count (int): 재생할 틱 수 (링 버퍼 크기 이하)
+
+        shard_count_list (tuple[int]): 처리 프로세스 수 리스트
+    """
+    import os
+
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    from creon_sim import SimMarket
+    from stock_symbol import StockSymbol
+    from stock_data_realtime import StockTickRt, RtDataCache, TICK_RING, start_tick_shard
+    from rt_shard import RtShardPool
+
+    SimMarket.reset()
+    SimMarket.load_stock_list(symbol_count)
+    stock_code_list = sorted(SimMarket.stock_dict)[:symbol_count]
+    stock_id_list = [StockSymbol.get_id(stock_code) for stock_code in stock_code_list]
+    event_list = SimMarket.make_event_list(stock_code_list, tick_count, seed=0, tick_interval=0.01, ask_bid_ratio=0)
+
+    sent_dict = {}  # 종목 id -> 전송 함수가 받은 (시분초, 현재가, 거래량) 리스트
+
+    def send(rt_data):
+        sent_dict[rt_data.stock_id].append((rt_data.date_time, rt_data.price, rt_data.vol))
+
+    tick_rt_list = [StockTickRt(stock_code, send) for stock_code in stock_code_list]
+
+    def run(shard_count):
+        for stock_id in stock_id_list:
+            sent_dict[stock_id] = []
+            RtDataCache.clear(stock_id, "tick")
+        if shard_count:
+            start_tick_shard(shard_count)
+        overflow_count = TICK_RING.overflow_count
+
+        start = time.perf_counter()
+        SimMarket.replay(event_list, speed=0)
+        if shard_count:
+            RtShardPool.wait_empty()
+        else:
+            TICK_RING.wait_empty()
+        elapsed = time.perf_counter() - start
+
+        stats = RtShardPool.get_stats()
+        RtShardPool.stop()
+        bar_dict = {stock_id: [list(bar) for bar in RtDataCache.bar_list[stock_id] or ()] for stock_id in stock_id_list}
+        sent_count = sum(len(sent_list) for sent_list in sent_dict.values())
+        return elapsed, sent_count, {stock_id: list(sent_list) for stock_id, sent_list in sent_dict.items()}, bar_dict, stats, TICK_RING.overflow_count - overflow_count
+
+    result_dict = {"cpu count": os.cpu_count()}
+    base_elapsed, base_count, base_sent_dict, base_bar_dict, _, base_overflow = run(0)
+    result_dict["in-process ticks/sec"] = "{:.0f} ({} ticks, dropped {})".format(base_count / base_elapsed, base_count, base_overflow)
+
+    for shard_count in shard_count_list:
+        elapsed, sent_count, shard_sent_dict, shard_bar_dict, stats, _ = run(shard_count)
+        order_mismatch = sum(shard_sent_dict[stock_id] != base_sent_dict[stock_id] for stock_id in stock_id_list)
+        bar_mismatch = sum(shard_bar_dict[stock_id] != base_bar_dict[stock_id] for stock_id in stock_id_list)
+        shard_list = stats["shard_list"]
+        result_dict["{} shard ticks/sec".format(shard_count)] = "{:.0f} (x{:.2f}) stored {} db error {} batch {} dropped {} order / bar mismatch {} / {}".format(
+            sent_count / elapsed,
+            base_elapsed / elapsed * sent_count / max(base_count, 1),
+            sum(shard["process"] for shard in shard_list),
+            sum(shard["db_error"] for shard in shard_list),
+            sum(shard["batch"] for shard in shard_list),
+            sum(shard["overflow"] for shard in shard_list),
+            order_mismatch,
+            bar_mismatch,
+        )
+        _check(order_mismatch == 0 and bar_mismatch == 0, "rt shard {} shard order / bar mismatch".format(shard_count))
+        _check(sum(shard["db_error"] for shard in shard_list) == 0, "rt shard {} shard db error".format(shard_count))
+
+    for tick_rt in tick_rt_list:
+        tick_rt.unsubscribe()
+
+    _print_result("rt shard ({} symbols, {} ticks)".format(symbol_count, tick_count), result_dict)
+
+
+def bench_unconcluded_order(symbol_count=20, order_count=2000):
+    """
+    주문 체결 이벤트 재생 후 미체결 주문 목록 (메모리 / KR_Unconcluded_Order) 과 잔고 검사 (가상 creon, 메모리 db)
+    주문마다 접수 -> 부분 체결 -> 정정 (수량 0, 원주문 잔량 전체) -> 부분 취소 -> 전량 체결 이벤트 중 앞의 일부 (주문마다 0 ~ 5단계) 를
+    CONCLUSION_RING 으로 TradeStatusRtEvent.process 에 넣음 (이벤트 수가 링 버퍼보다 많으므로 spill 경로도 지남)
+
+    Parameters:
+        symbol_count (int): 종목 수
+
+        order_count (int): 주문 수
+    """
+    import creon_api
+    import database
+
+    creon_api.set_backend("sim")
+    database.set_config(backend="sim")
+
+    import loadtest
+    from creon_sim import SimMarket
+    from database import MariaDB
+    from portfolio import Portfolio
+    from trade import BalanceData, TradeData, TradeDbWriter
+    from unconcluded_order import UnconcludedOrderBook
+    from trade_status_realtime import TradeStatusRtEvent, CONCLUSION_RING
+    from trade_info_enum import ORDER_TYPE, CONCLUSION_TYPE, MODIFY_CANCEL_TYPE, PRICE_TYPE, ORDER_CONDITION
+
+    SimMarket.reset()
+    SimMarket.load_stock_list(symbol_count)
+    stock_code_list = sorted(SimMarket.stock_dict)[:symbol_count]
+    loadtest.seed_db(stock_code_list, ["bench"])
+    db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
+    BalanceData.update_stock_balance()
+    TradeData.update_unconcluded_order()
+
+    handler = TradeStatusRtEvent()
+    CONCLUSION_RING.start()
+    publish_start = CONCLUSION_RING.publish_count
+    overflow_start = CONCLUSION_RING.overflow_count
+    spill_start = CONCLUSION_RING.spill_count
+
+    def make_event(stock_code, conclusion_type, modify_cancel_type, order_num, origin_order_num, qty, price):
+        # 레코드 순서 : 핸들러, 수신 시간, 수신 시간(perf_counter), _CONCLUSION_HEADER_DECODER 필드 (매도 가능 / 잔고 수량은 넣는 순서대로 채움)
+        return [
+            handler, time.time(), time.perf_counter(), SimMarket.stock_dict[stock_code][0], qty, price, order_num, origin_order_num, stock_code,
+            ORDER_TYPE.BUY.value, conclusion_type.value, modify_cancel_type.value, PRICE_TYPE.NORMAL.value, ORDER_CONDITION.NONE.value,
+            price, 0, 0,
+        ]
+
+    # 주문별 이벤트 (주문 번호 : 원주문 i * 10 + 1, 정정 주문 i * 10 + 2, 취소 주문 i * 10 + 3)
+    # 정정 주문은 원주문 잔량 7 을 새 가격으로, 취소는 정정 주문에서 2, 전량 체결은 남은 5
+    stage_event_list = [[] for _ in range(5)]
+    expected_order_dict = {}
+    for i in range(order_count):
+        stock_code = stock_code_list[i % symbol_count]
+        order_num, modify_order_num, cancel_order_num = i * 10 + 1, i * 10 + 2, i * 10 + 3
+        price, modify_price = 1000 + i % 50, 990 + i % 50
+        stage_count = i % 6
+
+        stage_list = [
+            [make_event(stock_code, CONCLUSION_TYPE.RECEIVED, MODIFY_CANCEL_TYPE.NONE, order_num, 0, 10, price)],
+            [make_event(stock_code, CONCLUSION_TYPE.CONCLUDED, MODIFY_CANCEL_TYPE.NONE, order_num, 0, 3, price)],
+            [
+                make_event(stock_code, CONCLUSION_TYPE.RECEIVED, MODIFY_CANCEL_TYPE.MODIFY, modify_order_num, order_num, 0, modify_price),
+                make_event(stock_code, CONCLUSION_TYPE.CONFIRMED, MODIFY_CANCEL_TYPE.MODIFY, modify_order_num, order_num, 0, modify_price),
+            ],
+            [
+                make_event(stock_code, CONCLUSION_TYPE.RECEIVED, MODIFY_CANCEL_TYPE.CANCEL, cancel_order_num, modify_order_num, 2, modify_price),
+                make_event(stock_code, CONCLUSION_TYPE.CONFIRMED, MODIFY_CANCEL_TYPE.CANCEL, cancel_order_num, modify_order_num, 2, modify_price),
+            ],
+            [make_event(stock_code, CONCLUSION_TYPE.CONCLUDED, MODIFY_CANCEL_TYPE.NONE, modify_order_num, 0, 5, modify_price)],
+        ]
+        for stage in range(stage_count):
+            stage_event_list[stage] += stage_list[stage]
+
+        expected_order = (None, (order_num, 10, price), (order_num, 7, price), (modify_order_num, 7, modify_price), (modify_order_num, 5, modify_price), None)[stage_count]
+        if expected_order is not None:
+            expected_order_dict[expected_order[0]] = (stock_code,) + expected_order[1:]
+
+    # 접수 / 체결 / 정정 / 취소 단계별로 모든 주문을 번갈아 넣음 (같은 주문의 이벤트 순서는 유지)
+    event_list = [event for stage_list in stage_event_list for event in stage_list]
+    balance_dict = dict.fromkeys(stock_code_list, 0)
+    for event in event_list:
+        if event[10] == CONCLUSION_TYPE.CONCLUDED.value:
+            balance_dict[event[8]] += event[4]
+        event[15] = event[16] = balance_dict[event[8]]
+    start_time = time.perf_counter()
+    for event in event_list:
+        record = CONCLUSION_RING.claim()
+        record[:] = event
+        CONCLUSION_RING.publish()
+    publish_sec = time.perf_counter() - start_time
+    CONCLUSION_RING.wait_empty()
+    process_sec = time.perf_counter() - start_time
+
+    # db 반영 (저장 스레드 대신 직접)
+    persist_start = time.perf_counter()
+    while not UnconcludedOrderBook.persist_q.empty():
+        UnconcludedOrderBook.persist(db_kr_operation_data, UnconcludedOrderBook.persist_q.get())
+    while not TradeDbWriter.persist_q.empty():
+        TradeDbWriter.persist(db_kr_operation_data, TradeDbWriter.persist_q.get())
+    persist_sec = time.perf_counter() - persist_start
+
+    book_order_dict = {
+        order["order_number"]: (order["stock_code"], order["quantity"], order["price"]) for order in UnconcludedOrderBook.get_order_list()
+    }
+    db_order_dict = {
+        int(row[0]): (row[1], int(float(row[2])), int(float(row[3])))
+        for row in db_kr_operation_data.select("KR_Unconcluded_Order", ["order_number", "stock_code", "quantity", "price"]) or ()
+    }
+    db_balance_dict = {
+        row[0]: int(float(row[1])) for row in db_kr_operation_data.select("KR_Stock_Balance", ["stock_code", "quantity"]) or ()
+    }
+    expected_balance_dict = {stock_code: qty for stock_code, qty in balance_dict.items() if qty}
+    portfolio_balance_dict = {position[0]: position[3] for position in Portfolio.get_position_list()}
+
+    _check(CONCLUSION_RING.overflow_count == overflow_start, "conclusion events dropped")
+    _check(book_order_dict == expected_order_dict, "UnconcludedOrderBook mismatch")
+    _check(db_order_dict == expected_order_dict, "KR_Unconcluded_Order mismatch")
+    _check(db_balance_dict == expected_balance_dict, "KR_Stock_Balance mismatch")
+    _check(portfolio_balance_dict == expected_balance_dict, "Portfolio mismatch")
+
+    _print_result(
+        "unconcluded order ({} orders, {} events)".format(order_count, len(event_list)),
+        {
+            "published / spilled / dropped": "{} / {} / {}".format(
+                CONCLUSION_RING.publish_count - publish_start, CONCLUSION_RING.spill_count - spill_start, CONCLUSION_RING.overflow_count - overflow_start
+            ),
+            "open orders (book / db / expected)": "{} / {} / {}".format(len(book_order_dict), len(db_order_dict), len(expected_order_dict)),
+            "balance stocks (db / expected)": "{} / {}".format(len(db_balance_dict), len(expected_balance_dict)),
+            "publish us/event": publish_sec * 1000000 / len(event_list),
+            "process us/event": process_sec * 1000000 / len(event_list),
+            "db persist us/event (background)": persist_sec * 1000000 / len(event_list),
+        },
+    )
+
+
+BENCHMARK_DICT = {
+    "stock_symbol": bench_stock_symbol,
+    "portfolio": bench_portfolio,
+    "order_dispatch": bench_order_dispatch,
+    "order_batch": bench_order_batch,
+    "order_risk": bench_order_risk,
+    "metrics": bench_metrics,
+    "profiler": bench_profiler,
+    "creon_sim": bench_creon_sim,
+    "startup": bench_startup,
+    "warm_restart": bench_warm_restart,
+    "tick_reconcile": bench_tick_reconcile,
+    "event_ring": bench_event_ring,
+    "header_decode": bench_header_decode,
+    "tick_record": bench_tick_record,
+    "client_protocol": bench_client_protocol,
+    "compressed_transport": bench_compressed_transport,
+    "query_cache": bench_query_cache,
+    "history_stream": bench_history_stream,
+    "db_cache": bench_db_cache,
+    "login_storm": bench_login_storm,
+    "rt_shard": bench_rt_shard,
+    "unconcluded_order": bench_unconcluded_order,
+}
+
+
+def main():
+    """
+    벤치마크 실행 (python benchmark.py [벤치마크 이름 ...], 이름이 없으면 전체 실행)
+    """
+    for name in sys.argv[1:] or BENCHMARK_DICT.keys():
+        BENCHMARK_DICT[name]()
+
+    if _failed_check_list:
+        print("{} check(s) failed".format(len(_failed_check_list)))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# coding=utf-8
+import os
+import json
+
+import utils
+import database
+import creon_api
+
+logger = utils.get_logger(__name__)
+
+# 설정 파일 경로 (환경변수 QUANT_CONFIG 로 변경 가능)
+DEFAULT_CONFIG_PATH = "config.json"
+
+# 기본 설정 (설정 파일 -> 환경변수 -> init 인자 순서로 덮어씀)
+DEFAULT_CONFIG = {
+    "creon_backend": "creon",  # "creon" - 실제 creon PLUS (win32com), "sim" - 가상 시장 (creon_sim)
+    "db_backend": "mariadb",  # "mariadb" - 실제 maria db (pymysql), "sim" - 메모리 sqlite db (database_sim)
+    "maria_db_host": None,
+    "maria_db_port": None,
+    "maria_db_user": None,
+    "maria_db_password": None,
+    "maria_db_charset": None,
+    "rt_shard_count": 0,  # 실시간 틱 저장 / 분봉 생성 처리 프로세스 수 (0 - 서버 프로세스에서 처리, rt_shard.RtShardPool, cpu 수 이상이면 사용 안함)
+}
+
+# 환경변수 이름 -> 설정 이름
+_ENV_CONFIG_DICT = {
+    "CREON_BACKEND": "creon_backend",
+    "DB_BACKEND": "db_backend",
+}
+
+
+def load_config(config_path=None, **override):
+    """
+    설정 읽기
+
+    Parameters:
+        config_path (str): 설정 파일 경로 (None 이면 환경변수 QUANT_CONFIG 또는 config.json, 파일이 없으면 기본 설정 사용)
+
+        override: 덮어쓸 설정 (DEFAULT_CONFIG 의 키, None 인 값은 무시)
+
+    Returns:
+        (dict): 설정
+    """
+    config = dict(DEFAULT_CONFIG)
+
+    config_path = config_path or os.environ.get("QUANT_CONFIG", DEFAULT_CONFIG_PATH)
+    if os.path.isfile(config_path):
+        with open(config_path) as config_file:
+            file_config = json.load(config_file)
+
+        unknown_key_list = [key for key in file_config if not key in DEFAULT_CONFIG]
+        if unknown_key_list:
+            raise KeyError("unknown config key : " + ", ".join(unknown_key_list))
+        config.update(file_config)
+
+    for env_name, key in _ENV_CONFIG_DICT.items():
+        if env_name in os.environ:
+            config[key] = os.environ[env_name]
+
+    for key, value in override.items():
+        if not key in DEFAULT_CONFIG:
+            raise KeyError("unknown config key : " + key)
+        if value is not None:
+            config[key] = value
+
+    return config
+
+
+def init(config_path=None, **override):
+    """
+    설정에 따라 creon api, db 백엔드 선택 (COM 오브젝트 생성, db 연결은 처음 사용할때 함)
+
+    Parameters:
+        config_path (str): 설정 파일 경로 (load_config 참고)
+
+        override: 덮어쓸 설정 (load_config 참고)
+
+    Returns:
+        (dict): 적용된 설정
+    """
+    config = load_config(config_path, **override)
+
+    creon_api.set_backend(config["creon_backend"])
+    database.set_config(
+        backend=config["db_backend"],
+        host=config["maria_db_host"],
+        port=config["maria_db_port"],
+        user=config["maria_db_user"],
+        password=config["maria_db_password"],
+        charset=config["maria_db_charset"],
+    )
+
+    logger.info("backend creon : %s, db : %s", config["creon_backend"], config["db_backend"])
+    return config
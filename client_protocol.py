@@ -0,0 +1,407 @@
+# coding=utf-8
+import sys
+import zlib
+import json
+import codecs
+import struct
+from array import array
+
+import utils
+
+logger = utils.get_logger(__name__)
+
+# 클라이언트 전송 인코딩 (로그인 요청의 "encoding" 으로 선택, 없거나 지원하지 않으면 json)
+ENCODING_JSON = "json"  # json 문자열을 구분자 없이 이어서 보냄
+ENCODING_BINARY = "binary"  # 프레임 단위 (프레임 종류 1 byte + 내용), 실시간 시세는 고정 길이 struct
+ENCODING_LIST = (ENCODING_JSON, ENCODING_BINARY)
+
+BINARY_PROTOCOL_VERSION = 1
+
+# 클라이언트 전송 압축 (로그인 요청의 "compression" 으로 선택, 없거나 지원하지 않으면 압축 안함)
+COMPRESSION_NONE = "none"
+COMPRESSION_ZLIB = "zlib"  # 연결마다 하나의 zlib 스트림, 전송 묶음마다 Z_SYNC_FLUSH
+COMPRESSION_LIST = (COMPRESSION_NONE, COMPRESSION_ZLIB)
+
+# zlib 스트림 첫 byte (기본 wbits 헤더, json 은 "{", binary 는 FRAME_JSON 으로 시작하므로 구분됨)
+_ZLIB_HEADER_BYTE = 0x78
+
+# 바이너리 프레임 종류
+FRAME_JSON = 0  # json (길이 4 byte + utf-8 json 문자열)
+FRAME_TICK = 1  # 실시간 틱 (TICK_STRUCT)
+FRAME_ASK_BID = 2  # 실시간 10차 호가 (ASK_BID_STRUCT)
+FRAME_HISTORY = 3  # 과거 봉 묶음 (HISTORY_FRAME_HEADER_STRUCT + 컬럼별 배열, 컬럼 형식은 history_start 메시지로 알려줌)
+
+# 바이너리 레코드 형식 (종목은 종목 id 로 보내고 종목 코드는 symbol_map 메시지로 알려줌)
+TICK_STRUCT = struct.Struct("<IIBiiiq")  # 종목 id, 시분초, 시장 시간 구분 플래그, 현재가, 대비, 순간체결수량, 거래량
+ASK_BID_STRUCT = struct.Struct("<I40i2q")  # 종목 id, 1 ~ 10차 (매도호가, 매수호가, 매도잔량, 매수잔량), 총 매도잔량, 총 매수잔량
+
+# 프레임 형식 (프레임 종류 포함)
+JSON_FRAME_HEADER_STRUCT = struct.Struct("<BI")
+TICK_FRAME_STRUCT = struct.Struct("<B" + TICK_STRUCT.format[1:])
+ASK_BID_FRAME_STRUCT = struct.Struct("<B" + ASK_BID_STRUCT.format[1:])
+HISTORY_FRAME_HEADER_STRUCT = struct.Struct("<BIIII")  # 프레임 종류, 요청 id, 종목 id, 묶음 번호, 행 수
+
+_json_decoder = json.JSONDecoder()
+_BIG_ENDIAN = sys.byteorder == "big"
+
+
+def split_json(buffer):
+    """
+    소켓으로 받은 문자열을 json 단위로 분리 (여러개의 요청이 붙어서 오거나 요청이 나뉘어 오는 경우)
+
+    Parameters:
+        buffer (str): 받은 문자열
+
+    Returns:
+        (list[dict]): 완성된 json 리스트
+
+        (str): 아직 완성되지 않은 나머지 문자열
+    """
+    json_list = []
+    idx = 0
+    while True:
+        while idx < len(buffer) and buffer[idx].isspace():
+            idx += 1
+        if idx == len(buffer):
+            return json_list, ""
+
+        try:
+            json_data, idx = _json_decoder.raw_decode(buffer, idx)
+        except json.JSONDecodeError as e:
+            # 문자열 / 이스케이프 / 리터럴 중간에서 잘린 경우도 오류 위치가 끝이 아니므로 나머지 데이터를 기다림
+            if e.pos < len(buffer) and not e.msg.startswith("Unterminated string") and len(buffer) - e.pos >= 8:
+                logger.warning("invalid json : %s", buffer[idx : idx + 100])
+                return json_list, ""
+            return json_list, buffer[idx:]
+        json_list.append(json_data)
+
+
+def encode_json_frame(data_json):
+    """
+    json 문자열을 바이너리 json 프레임으로 변환
+
+    Parameters:
+        data_json (str): json 문자열
+
+    Returns:
+        (bytes): 프레임
+    """
+    data = data_json.encode("utf-8")
+    return JSON_FRAME_HEADER_STRUCT.pack(FRAME_JSON, len(data)) + data
+
+
+def encode_send_data(send_data, encoding):
+    """
+    전송 대기열 데이터를 소켓으로 보낼 bytes 로 변환
+
+    Parameters:
+        send_data
+            (str): json 문자열 (모든 인코딩)
+
+            (bytes): 바이너리 프레임 (binary 인코딩 클라이언트에만 넣음)
+
+        encoding (str): 클라이언트 인코딩
+
+    Returns:
+        (bytes): 보낼 데이터
+    """
+    if not isinstance(send_data, str):
+        return send_data
+    if encoding == ENCODING_BINARY:
+        return encode_json_frame(send_data)
+    return send_data.encode("utf-8")
+
+
+def encode_history_frame(req_id, stock_id, seq, typecode_list, column_list):
+    """
+    과거 봉 묶음을 컬럼 단위 바이너리 프레임으로 변환 (컬럼마다 행 수만큼의 little endian 배열을 이어 붙임)
+
+    Parameters:
+        req_id (int): 요청 id
+
+        stock_id (int): 종목 id
+
+        seq (int): 종목별 묶음 번호 (0부터)
+
+        typecode_list (list[str]): 컬럼별 array 타입 코드 ("i", "q", "d")
+
+        column_list (list[tuple]): 컬럼별 값 리스트 (행 수는 모두 같음)
+
+    Returns:
+        (bytes): 프레임
+    """
+    data_list = [HISTORY_FRAME_HEADER_STRUCT.pack(FRAME_HISTORY, req_id, stock_id, seq, len(column_list[0]) if column_list else 0)]
+    for typecode, column in zip(typecode_list, column_list):
+        column_array = array(typecode, column)
+        if _BIG_ENDIAN:
+            column_array.byteswap()
+        data_list.append(column_array.tobytes())
+    return b"".join(data_list)
+
+
+class StreamCompressor:
+    """
+    연결별 스트리밍 압축 (zlib)
+
+    이전에 보낸 데이터를 압축 사전으로 계속 사용하므로 반복되는 키 이름 / 종목 코드가 작게 압축되고,
+    전송 묶음마다 Z_SYNC_FLUSH 하므로 클라이언트는 받은 데이터를 바로 풀 수 있음 (지연시간은 전송 묶음 단위로 제한됨)
+
+    Attributes:
+        compressor (zlib.Compress): zlib 압축 오브젝트
+
+        raw_byte (int): 압축 전 크기 합계
+
+        compressed_byte (int): 압축 후 크기 합계
+    """
+
+    def __init__(self, level=1):
+        """
+        Parameters:
+            level (int): 압축 레벨 (1 - 빠름 ~ 9 - 작음)
+        """
+        self.compressor = zlib.compressobj(level)
+        self.raw_byte = 0
+        self.compressed_byte = 0
+
+    def compress(self, data):
+        """
+        전송 묶음 압축 (묶음 끝에서 flush 하므로 반환값만으로 data 전체를 풀 수 있음)
+
+        Parameters:
+            data (bytes): 보낼 데이터
+
+        Returns:
+            (bytes): 압축된 데이터
+        """
+        compressed = self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+        self.raw_byte += len(data)
+        self.compressed_byte += len(compressed)
+        return compressed
+
+
+class ClientStreamDecoder:
+    """
+    클라이언트 수신 데이터 디코더 (클라이언트 참고 구현, 표준 라이브러리만 사용)
+
+    binary 인코딩으로 로그인했더라도 서버가 binary 를 지원하지 않으면 json 으로 오므로
+    첫 데이터가 json 프레임(FRAME_JSON)으로 시작하지 않으면 json 으로 처리함 (압축도 첫 byte 로 확인)
+    바이너리 시세 프레임은 json 과 같은 형식의 dict 로 변환함 (종목 id -> 종목 코드는 symbol_map 메시지로 받음)
+
+    Attributes:
+        encoding (str): 로그인시 요청한 인코딩 (첫 데이터 수신후 실제 인코딩)
+
+        encoding_checked (bool): 첫 데이터로 실제 인코딩을 확인했는지 여부
+
+        decompressor (zlib.Decompress): zlib 압축 해제 오브젝트 (None - 압축 안함)
+
+        compression_checked (bool): 첫 데이터로 실제 압축 여부를 확인했는지 여부
+
+        buffer (bytearray): 아직 완성되지 않은 바이너리 데이터
+
+        text_buffer (str): 아직 완성되지 않은 json 문자열
+
+        utf8_decoder (codecs.IncrementalDecoder): json 인코딩 utf-8 디코더
+
+        code_dict (dict): 종목 id -> 종목 코드
+
+        market_hours_kind_name_dict (dict): 시장 시간 구분 플래그 값 -> 이름
+
+        history_column_dict (dict): 과거 봉 요청 id -> 컬럼 리스트 ([컬럼 이름, array 타입 코드], history_start 메시지로 받음)
+    """
+
+    def __init__(self, encoding=ENCODING_JSON, compression=COMPRESSION_NONE):
+        self.encoding = encoding
+        self.encoding_checked = encoding == ENCODING_JSON
+        self.decompressor = zlib.decompressobj() if compression == COMPRESSION_ZLIB else None
+        self.compression_checked = self.decompressor is None
+        self.buffer = bytearray()
+        self.text_buffer = ""
+        self.utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.code_dict = {}
+        self.market_hours_kind_name_dict = {}
+        self.history_column_dict = {}
+
+    def feed(self, data):
+        """
+        받은 데이터를 메시지 단위로 분리
+
+        Parameters:
+            data (bytes): 소켓으로 받은 데이터
+
+        Returns:
+            (list[dict]): 완성된 메시지 리스트 ({"res_type", "res_data"})
+        """
+        data = self.decompress(data)
+        if not self.encoding_checked and data:
+            self.encoding_checked = True
+            if data[0] != FRAME_JSON:
+                self.encoding = ENCODING_JSON
+
+        if self.encoding == ENCODING_JSON:
+            res_list, self.text_buffer = split_json(self.text_buffer + self.utf8_decoder.decode(data))
+            return res_list
+
+        self.buffer += data
+        return [self.to_dict(frame_type, value) for frame_type, value in self.feed_raw(b"")]
+
+    def feed_raw(self, data):
+        """
+        받은 바이너리 데이터를 프레임 단위로 분리 (시세 프레임은 dict 로 바꾸지 않음)
+
+        Parameters:
+            data (bytes): 소켓으로 받은 데이터
+
+        Returns:
+            (list[tuple]): (프레임 종류, 내용) 리스트
+                (FRAME_JSON, dict), (FRAME_TICK, TICK_STRUCT 값 tuple), (FRAME_ASK_BID, ASK_BID_STRUCT 값 tuple),
+                (FRAME_HISTORY, (요청 id, 종목 id, 묶음 번호, 컬럼 이름 -> array dict))
+        """
+        buffer = self.buffer
+        buffer += self.decompress(data)
+        frame_list = []
+        pos = 0
+        size = len(buffer)
+        while pos < size:
+            frame_type = buffer[pos]
+            if frame_type == FRAME_TICK:
+                if size - pos < TICK_FRAME_STRUCT.size:
+                    break
+                frame_list.append((FRAME_TICK, TICK_STRUCT.unpack_from(buffer, pos + 1)))
+                pos += TICK_FRAME_STRUCT.size
+
+            elif frame_type == FRAME_ASK_BID:
+                if size - pos < ASK_BID_FRAME_STRUCT.size:
+                    break
+                frame_list.append((FRAME_ASK_BID, ASK_BID_STRUCT.unpack_from(buffer, pos + 1)))
+                pos += ASK_BID_FRAME_STRUCT.size
+
+            elif frame_type == FRAME_HISTORY:
+                if size - pos < HISTORY_FRAME_HEADER_STRUCT.size:
+                    break
+                _, req_id, stock_id, seq, row_count = HISTORY_FRAME_HEADER_STRUCT.unpack_from(buffer, pos)
+                column_spec_list = self.history_column_dict[req_id]
+                end = pos + HISTORY_FRAME_HEADER_STRUCT.size + sum(array(typecode).itemsize for _, typecode in column_spec_list) * row_count
+                if size < end:
+                    break
+                column_pos = pos + HISTORY_FRAME_HEADER_STRUCT.size
+                column_dict = {}
+                for column, typecode in column_spec_list:
+                    column_array = array(typecode)
+                    column_end = column_pos + column_array.itemsize * row_count
+                    column_array.frombytes(buffer[column_pos:column_end])
+                    if _BIG_ENDIAN:
+                        column_array.byteswap()
+                    column_dict[column] = column_array
+                    column_pos = column_end
+                frame_list.append((FRAME_HISTORY, (req_id, stock_id, seq, column_dict)))
+                pos = end
+
+            elif frame_type == FRAME_JSON:
+                if size - pos < JSON_FRAME_HEADER_STRUCT.size:
+                    break
+                data_size = JSON_FRAME_HEADER_STRUCT.unpack_from(buffer, pos)[1]
+                end = pos + JSON_FRAME_HEADER_STRUCT.size + data_size
+                if size < end:
+                    break
+                res = json.loads(buffer[pos + JSON_FRAME_HEADER_STRUCT.size : end].decode("utf-8"))
+                self.handle_control(res)
+                frame_list.append((FRAME_JSON, res))
+                pos = end
+
+            else:
+                logger.warning("invalid frame type : %s", frame_type)
+                pos = size
+        del buffer[:pos]
+        return frame_list
+
+    def decompress(self, data):
+        """
+        압축된 데이터 풀기 (압축을 요청했더라도 첫 byte 가 zlib 헤더가 아니면 압축 안함으로 처리)
+
+        Parameters:
+            data (bytes): 소켓으로 받은 데이터
+
+        Returns:
+            (bytes): 압축을 푼 데이터
+        """
+        if not self.compression_checked and data:
+            self.compression_checked = True
+            if data[0] != _ZLIB_HEADER_BYTE:
+                self.decompressor = None
+
+        if self.decompressor is None or not data:
+            return data
+        return self.decompressor.decompress(data)
+
+    def handle_control(self, res):
+        """
+        프로토콜 메시지 처리 (protocol - 시장 시간 구분 이름, symbol_map - 종목 id -> 종목 코드, history_start - 과거 봉 컬럼 형식)
+
+        Parameters:
+            res (dict): json 프레임 메시지
+        """
+        if res["res_type"] == "protocol":
+            self.market_hours_kind_name_dict = {int(value): name for value, name in res["res_data"]["market_hours_kind"].items()}
+        elif res["res_type"] == "symbol_map":
+            for stock_code, stock_id in res["res_data"].items():
+                self.code_dict[stock_id] = stock_code
+        elif res["res_type"] == "history_start":
+            self.history_column_dict[res["res_data"]["req_id"]] = res["res_data"]["column_list"]
+            for stock_code, stock_id in res["res_data"].get("symbol_map", {}).items():
+                self.code_dict[stock_id] = stock_code
+        elif res["res_type"] == "history_end":
+            self.history_column_dict.pop(res["res_data"]["req_id"], None)
+
+    def to_dict(self, frame_type, value):
+        """
+        프레임 내용을 json 인코딩과 같은 형식의 dict 로 변환
+
+        Parameters:
+            frame_type (int): 프레임 종류
+
+            value (dict | tuple): 프레임 내용 (feed_raw 반환값)
+
+        Returns:
+            (dict): {"res_type", "res_data"}
+        """
+        if frame_type == FRAME_TICK:
+            return {
+                "res_type": "stock_tick_rt_data",
+                "res_data": {
+                    "date_time": value[1],
+                    "e_market_hours_kind": self.market_hours_kind_name_dict.get(value[2], value[2]),
+                    "price": value[3],
+                    "day_changed": value[4],
+                    "qty": value[5],
+                    "vol": value[6],
+                    "stock_code": self.code_dict.get(value[0]),
+                },
+            }
+
+        if frame_type == FRAME_HISTORY:
+            req_id, stock_id, seq, column_dict = value
+            return {
+                "res_type": "history_chunk",
+                "res_data": {
+                    "req_id": req_id,
+                    "stock_code": self.code_dict.get(stock_id),
+                    "seq": seq,
+                    "column_dict": {column: column_array.tolist() for column, column_array in column_dict.items()},
+                },
+            }
+
+        if frame_type == FRAME_ASK_BID:
+            return {
+                "res_type": "stock_askbid_rt_data",
+                "res_data": {
+                    "ask": list(value[1:41:4]),
+                    "bid": list(value[2:41:4]),
+                    "ask_vol": list(value[3:41:4]),
+                    "bid_vol": list(value[4:41:4]),
+                    "tot_ask": value[41],
+                    "tot_bid": value[42],
+                    "stock_code": self.code_dict.get(value[0]),
+                },
+            }
+
+        return value
@@ -2,12 +2,53 @@
 import os
 import time
 import enum
+import threading
 
-import win32com.client
-from pywinauto import application
-
+import utils
 from stock_info_enum import MARKET_KIND, CONTROL_KIND, SUPERVISION_KIND, STOCK_STATUS_KIND, SECTION_KIND
 
+# creon api 백엔드 ("creon" - 실제 creon PLUS (win32com), "sim" - 가상 시장 (creon_sim))
+CREON_BACKEND = os.environ.get("CREON_BACKEND", "creon")
+
+logger = utils.get_logger(__name__)
+
+_com_client = None
+_com_lock = threading.RLock()
+
+
+def set_backend(backend):
+    """
+    creon api 백엔드 설정 (COM 오브젝트를 처음 생성하기 전에 호출해야 함)
+
+    Parameters:
+        backend (str): "creon" - 실제 creon PLUS (win32com), "sim" - 가상 시장 (creon_sim)
+    """
+    global CREON_BACKEND
+
+    if _com_client is not None and backend != CREON_BACKEND:
+        raise RuntimeError("creon backend already initialized : " + CREON_BACKEND)
+    CREON_BACKEND = backend
+
+
+def get_com_client():
+    """
+    백엔드의 COM 모듈 반환 (처음 호출시 import)
+
+    Returns:
+        (module): Dispatch, WithEvents 가 있는 모듈 (win32com.client / creon_sim)
+    """
+    global _com_client
+
+    if _com_client is None:
+        with _com_lock:
+            if _com_client is None:
+                if CREON_BACKEND == "sim":
+                    import creon_sim as com_client
+                else:
+                    import win32com.client as com_client
+                _com_client = com_client
+    return _com_client
+
 
 class LIMIT_TYPE(enum.Enum):
     """
@@ -24,10 +65,24 @@ class CpCybos:
     크레온 api 관련 클래스
 
     Attributes:
-        obj_com (obj_win32com): win32com 오브젝트
+        obj_com (obj_win32com): win32com 오브젝트 (get_com 처음 호출시 생성)
     """
 
-    obj_com = win32com.client.Dispatch("CpUtil.CpCybos")
+    obj_com = None
+
+    @classmethod
+    def get_com(cls):
+        """
+        COM 오브젝트 반환 (처음 호출시 생성)
+
+        Returns:
+            (COM_obj): win32com 오브젝트
+        """
+        if cls.obj_com is None:
+            with _com_lock:
+                if cls.obj_com is None:
+                    cls.obj_com = get_com_client().Dispatch("CpUtil.CpCybos")
+        return cls.obj_com
 
     @classmethod
     def get_connect_status(cls):
@@ -37,7 +92,7 @@ class CpCybos:
         Returns:
             (bool): 연결상태 (True - 연결 정상, False - 연결 끊김)
         """
-        if cls.obj_com.IsConnect == 0:
+        if cls.get_com().IsConnect == 0:
             return False
         return True
 
@@ -47,7 +102,7 @@ class CpCybos:
         크레온api와 연결 해제
         """
         if cls.get_connect_status():
-            cls.obj_com.PlusDisconnect()
+            cls.get_com().PlusDisconnect()
 
     @classmethod
     def get_limit_request_remain_time(cls):
@@ -57,7 +112,7 @@ class CpCybos:
         Returns:
             (int): 남은 시간 (단위: ms)
         """
-        return cls.obj_com.LimitRequestRemainTime
+        return cls.get_com().LimitRequestRemainTime
 
     @classmethod
     def get_limit_remain_count(cls, e_limit_type):
@@ -70,7 +125,7 @@ class CpCybos:
         Returns:
             (int): 남은 요청 횟수
         """
-        return cls.obj_com.GetLimitRemainCount(e_limit_type.value)
+        return cls.get_com().GetLimitRemainCount(e_limit_type.value)
 
     @classmethod
     def wait_to_do_request(cls, e_limit_type):
@@ -92,10 +147,24 @@ class CreonCpCodeMgr:
     주식 종목 정보 관련 클래스
 
     Attributes:
-        obj_com (COM_obj): win32com 오브젝트(creon api 종목 정보 관련)
+        obj_com (COM_obj): win32com 오브젝트(creon api 종목 정보 관련, get_com 처음 호출시 생성)
     """
 
-    obj_com = win32com.client.Dispatch("CpUtil.CpCodeMgr")
+    obj_com = None
+
+    @classmethod
+    def get_com(cls):
+        """
+        COM 오브젝트 반환 (처음 호출시 생성)
+
+        Returns:
+            (COM_obj): win32com 오브젝트
+        """
+        if cls.obj_com is None:
+            with _com_lock:
+                if cls.obj_com is None:
+                    cls.obj_com = get_com_client().Dispatch("CpUtil.CpCodeMgr")
+        return cls.obj_com
 
     @classmethod
     def get_stock_name(cls, stock_code):
@@ -108,7 +177,7 @@ class CreonCpCodeMgr:
         Returns:
             (str): 종목 이름
         """
-        return cls.obj_com.CodeToName(stock_code)
+        return cls.get_com().CodeToName(stock_code)
 
     @classmethod
     def get_stock_industry_code(cls, stock_code):
@@ -121,7 +190,7 @@ class CreonCpCodeMgr:
         Returns:
             (str?): 증권 전산 업종 코드
         """
-        return cls.obj_com.GetStockIndustryCode(stock_code)
+        return cls.get_com().GetStockIndustryCode(stock_code)
 
     @classmethod
     def get_stock_market_kind(cls, stock_code):
@@ -134,7 +203,7 @@ class CreonCpCodeMgr:
         Returns :
             (MARKET_KIND): 소속부
         """
-        return MARKET_KIND(cls.obj_com.GetStockMarketKind(stock_code))
+        return MARKET_KIND(cls.get_com().GetStockMarketKind(stock_code))
 
     @classmethod
     def get_stock_control_kind(cls, stock_code):
@@ -147,7 +216,7 @@ class CreonCpCodeMgr:
         Returns:
             (CONTROL_KIND): 감리구분
         """
-        return CONTROL_KIND(cls.obj_com.GetStockControlKind(stock_code))
+        return CONTROL_KIND(cls.get_com().GetStockControlKind(stock_code))
 
     @classmethod
     def get_stock_supervision_kind(cls, stock_code):
@@ -160,7 +229,7 @@ class CreonCpCodeMgr:
         Returns:
             (SUPERVISION_KIND): 관리구분
         """
-        return SUPERVISION_KIND(cls.obj_com.GetStockSupervisionKind(stock_code))
+        return SUPERVISION_KIND(cls.get_com().GetStockSupervisionKind(stock_code))
 
     @classmethod
     def get_stock_status_kind(cls, stock_code):
@@ -173,7 +242,7 @@ class CreonCpCodeMgr:
         Returns:
             (STOCK_STATUS_KIND): 주식 상태
         """
-        return STOCK_STATUS_KIND(cls.obj_com.GetStockStatusKind(stock_code))
+        return STOCK_STATUS_KIND(cls.get_com().GetStockStatusKind(stock_code))
 
     @classmethod
     def get_stock_section_kind(cls, stock_code):
@@ -186,7 +255,7 @@ class CreonCpCodeMgr:
         Returns:
             (SECTION_KIND): 부구분코드
         """
-        return SECTION_KIND(cls.obj_com.GetStockSectionKind(stock_code))
+        return SECTION_KIND(cls.get_com().GetStockSectionKind(stock_code))
 
     @classmethod
     def get_stock_code_list(cls, e_market_kind):
@@ -199,7 +268,60 @@ class CreonCpCodeMgr:
         Returns:
             (list): 시장에 해당하는 종목코드 전체
         """
-        return cls.obj_com.GetStockListByMarket(e_market_kind.value)
+        return cls.get_com().GetStockListByMarket(e_market_kind.value)
+
+
+class HeaderDecoder:
+    """
+    실시간 이벤트 헤더 일괄 읽기 클래스
+
+    이벤트 종류마다 읽을 헤더 필드를 한번 선언해두고, 이벤트마다 COM 메소드(CreonDataComm.get_header_reader)를
+    헤더 인덱스 튜플에 map 으로 적용하여 레코드에 한번에 채움 (필드마다 파이썬 메소드를 거치지 않음)
+
+    Attributes:
+        name_list (tuple[str]): 필드 이름 (레코드 순서)
+
+        index_list (tuple[int]): 필드의 헤더 인덱스 (레코드 순서)
+
+        pos_dict (dict): 필드 이름 -> 필드 순서
+    """
+
+    def __init__(self, field_list):
+        """
+        Parameters:
+            field_list (list[tuple]): (필드 이름, 헤더 인덱스) 리스트
+        """
+        self.name_list = tuple(name for name, _ in field_list)
+        self.index_list = tuple(header_idx for _, header_idx in field_list)
+        self.pos_dict = {name: pos for pos, name in enumerate(self.name_list)}
+
+    def __len__(self):
+        return len(self.index_list)
+
+    def read(self, header_reader):
+        """
+        모든 필드 읽기
+
+        Parameters:
+            header_reader (method): 헤더 읽기 COM 메소드 (CreonDataComm.get_header_reader)
+
+        Returns:
+            (tuple): 필드 값 (레코드 순서)
+        """
+        return tuple(map(header_reader, self.index_list))
+
+    def read_into(self, header_reader, record, start=1):
+        """
+        모든 필드를 미리 할당된 레코드에 읽기 (레코드 크기는 그대로)
+
+        Parameters:
+            header_reader (method): 헤더 읽기 COM 메소드 (CreonDataComm.get_header_reader)
+
+            record (list): 레코드
+
+            start (int): 첫 필드를 넣을 레코드 칸
+        """
+        record[start : start + len(self.index_list)] = map(header_reader, self.index_list)
 
 
 class CreonDataComm:
@@ -210,11 +332,17 @@ class CreonDataComm:
         obj_com (COM_obj): win32com 오브젝트
 
         e_limit_type (LIMIT_TYPE): 요청 타입
+
+        rq_start_time (float): 마지막 BlockRequest 시작 시간 (time.perf_counter)
+
+        rq_end_time (float): 마지막 BlockRequest 종료 시간 (time.perf_counter)
     """
 
     def __init__(self, com_obj_name, e_limit_type):
-        self.obj_com = win32com.client.Dispatch(com_obj_name)
+        self.obj_com = get_com_client().Dispatch(com_obj_name)
         self.e_limit_type = e_limit_type
+        self.rq_start_time = None
+        self.rq_end_time = None
 
     def check_rq_status(self):
         """
@@ -232,7 +360,7 @@ class CreonDataComm:
             return True
             # print("통신상태 정상[{}]{}".format(rqStatus, rqRet), end=' ')
 
-        print("RQ ERROR : {}\n\nMSG : {}".format(rq_status, rq_msg))
+        logger.error("RQ ERROR : %s MSG : %s", rq_status, rq_msg)
         return False
 
     def set_input_value(self, value_type, value):
@@ -258,6 +386,15 @@ class CreonDataComm:
         """
         return self.obj_com.GetHeaderValue(value_type)
 
+    def get_header_reader(self):
+        """
+        헤더 데이터 읽기 COM 메소드 반환 (한번 찾아두고 반복 호출하여 get_header_value 의 파이썬 호출 단계를 생략, HeaderDecoder 참고)
+
+        Returns:
+            (method): 헤더 인덱스 -> 값
+        """
+        return self.obj_com.GetHeaderValue
+
     def get_data_value(self, value_type, index):
         """
         데이터를 받아옴
@@ -277,7 +414,9 @@ class CreonDataComm:
         데이터를 요청
         """
         CpCybos.wait_to_do_request(self.e_limit_type)
+        self.rq_start_time = time.perf_counter()
         self.obj_com.BlockRequest()
+        self.rq_end_time = time.perf_counter()
 
     def is_continue(self):
         """
@@ -341,7 +480,7 @@ class CreonDataComm:
         if CpCybos.get_limit_remain_count(self.e_limit_type):
             self.obj_com.Subscribe()
         else:
-            print("NO REMAIN SUBSCRIBE RQ COUNT")
+            logger.warning("NO REMAIN SUBSCRIBE RQ COUNT")
 
     def unsubscribe(self):
         """
@@ -359,7 +498,7 @@ class CreonDataComm:
         Returns:
             (event_class): event_class의 인스턴스
         """
-        return win32com.client.WithEvents(self.obj_com, event_class)
+        return get_com_client().WithEvents(self.obj_com, event_class)
 
 
 class CreonStockChart(CreonDataComm):
@@ -451,7 +590,7 @@ class CreonCpTdUtil:
     """
 
     def __init__(self):
-        self.obj_com = win32com.client.Dispatch("CpTrade.CpTdUtil")
+        self.obj_com = get_com_client().Dispatch("CpTrade.CpTdUtil")
         self.account = None  # 계좌
         self.product_code = None  # 계좌 상품 코드
 
@@ -464,7 +603,7 @@ class CreonCpTdUtil:
         """
         # 주문 초기화 오류시 오류 메시지 출력후 False 리턴
         if self.obj_com.TradeInit(0) != 0:
-            print("주문 오브젝트 초기화 오류")
+            logger.error("주문 오브젝트 초기화 오류")
             return False
 
         # 계좌와 계좌 상품코드 받아오기
@@ -482,8 +621,13 @@ CERT_PWD = "a"
 class CreonLogin:
     """
     creon 자동 실행, 로그인 관련 클래스
+
+    Attributes:
+        generation (int): creon 재실행 후 연결된 횟수 (바뀌면 이전에 만든 COM 오브젝트는 다시 만들어야함)
     """
 
+    generation = 0
+
     @classmethod
     def kill_client(cls):
         """
@@ -498,7 +642,7 @@ class CreonLogin:
         os.system("wmic process where \"name like '%DibServer%'\" call terminate")
 
     @classmethod
-    def connect(cls, id_=CREON_ID, pwd=CREON_PWD, pwdcert=CERT_PWD):
+    def connect(cls, id_=CREON_ID, pwd=CREON_PWD, pwdcert=CERT_PWD, timeout=None):
         """
         creon PLUS 실행 후 자동로그인하는 메서드
 
@@ -508,19 +652,39 @@ class CreonLogin:
             pwd (str): creon 암호
 
             pwdcert (str): creon 공인인증서 암호
+
+            timeout (float): 연결 대기 최대 시간 (단위: 초, None - 연결될때까지 대기)
+
+        Returns:
+            (bool): 연결 여부
         """
+        restarted = False
         if not CpCybos.get_connect_status():
             CpCybos.disconnect()
-            cls.kill_client()
+            restarted = True
 
-            app = application.Application()
-            app.start(
-                "C:\\CREON\\STARTER\\coStarter.exe /prj:cp /id:{id} /pwd:{pwd} /pwdcert:{pwdcert} /autostart".format(id=id_, pwd=pwd, pwdcert=pwdcert)
-            )
+            if CREON_BACKEND == "sim":
+                get_com_client().start_client()
+            else:
+                cls.kill_client()
 
+                from pywinauto import application
+
+                app = application.Application()
+                app.start(
+                    "C:\\CREON\\STARTER\\coStarter.exe /prj:cp /id:{id} /pwd:{pwd} /pwdcert:{pwdcert} /autostart".format(id=id_, pwd=pwd, pwdcert=pwdcert)
+                )
+
+        deadline = None if timeout is None else time.monotonic() + timeout
         while not CpCybos.get_connect_status():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
             time.sleep(1)
 
+        if restarted:
+            cls.generation += 1
+        return True
+
 
 def main():
     """
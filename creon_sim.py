@@ -0,0 +1,1235 @@
+# coding=utf-8
+import json
+import time
+import zlib
+import random
+import threading
+from queue import Queue
+from datetime import datetime, timedelta
+
+from portfolio import TRADE_FEE_PERCENT, SELL_TAX_PERCENT
+
+# 요청 타입(creon_api.LIMIT_TYPE 값) -> (구간당 최대 요청 수, 구간 길이 (단위: 초))
+LIMIT_RULE_DICT = {
+    0: (20, 15.0),  # TRADE_REQUEST
+    1: (60, 15.0),  # NONTRADE_REQUEST
+}
+MAX_SUBSCRIBE_COUNT = 400  # 최대 실시간 등록 수 (SUBSCRIBE)
+
+# 실시간 10차 호가 헤더 인덱스 (매도호가, 매수호가, 매도잔량, 매수잔량 순으로 4개씩)
+ASK_BID_HEADER_INDEX_LIST = (3, 7, 11, 15, 19, 27, 31, 35, 39, 43)
+
+# 요청 오류 (GetDibStatus, GetDibMsg1)
+_DIB_STATUS_OK = (0, "")
+_DIB_STATUS_LIMIT = (4, "요청 개수 초과")
+_DIB_STATUS_INVALID_ORDER = (-1, "주문 정보 오류")
+_DIB_STATUS_NO_ORDER = (-1, "원주문 없음")
+_DIB_STATUS_NO_ABLE_SELL = (-1, "매도 가능 수량 부족")
+_DIB_STATUS_DISCONNECTED = (-1, "통신 연결 끊김")
+
+
+def _get_seed(*key_list):
+    return zlib.crc32("|".join(str(key) for key in key_list).encode("utf-8"))
+
+
+class SimMarket:
+    """
+    가상 creon 시장 클래스 (creon_api 의 시뮬레이터 백엔드가 공유하는 상태)
+
+    기록된 (또는 생성한) 실시간 틱 / 호가 이벤트를 1배속 ~ N배속으로 재생하여 구독중인 이벤트 핸들러의 OnReceived 를 실행하고,
+    주문을 받아 체결 이벤트(CpConclusion)를 발생시키며, 요청 타입별 요청 제한을 적용함
+
+    모든 이벤트 핸들러는 이벤트 스레드 하나에서 순서대로 실행됨 (creon 이벤트가 한 스레드에서만 발생하는 것과 같음)
+    같은 이벤트 리스트와 같은 주문을 넣으면 항상 같은 순서의 이벤트가 발생함
+
+    Attributes:
+        lock (threading.RLock): 상태 변경시 사용하는 락
+
+        event_q (queue.Queue): 이벤트 스레드가 실행할 이벤트 큐 ({"type", "stock_code", "header"})
+
+        event_thread (threading.Thread): 이벤트 스레드
+
+        replay_thread (threading.Thread): 이벤트 재생 스레드
+
+        stock_dict (dict): 종목 코드 -> [종목 이름, 소속부(MARKET_KIND 값), 기준가]
+
+        sub_dict (dict): (실시간 종류, 종목 코드) -> 구독중인 SimCom 리스트 (실시간 종류 - "tick", "ask_bid")
+
+        conclusion_sub_list (list): 실시간 체결 데이터를 구독중인 SimCom 리스트
+
+        last_price_dict (dict): 종목 코드 -> 최근 체결가
+
+        order_dict (dict): 주문번호 -> 미체결 주문 정보
+
+        position_dict (dict): 종목 코드 -> [잔고 수량, 매도 가능 수량, 평균 단가]
+
+        order_num (int): 마지막으로 발급한 주문번호
+
+        limit_dict (dict): 요청 타입 -> [구간 시작 시간, 구간 요청 수]
+
+        limit_rule_dict (dict): 요청 타입 -> (구간당 최대 요청 수, 구간 길이)
+
+        max_subscribe_count (int): 최대 실시간 등록 수
+
+        block_request_latency (float): BlockRequest 처리 시간 (단위: 초)
+
+        connected (bool): creon 연결 상태 (False - 요청 / 실시간 등록 실패, 이벤트 전달 안함)
+
+        connect_latency (float): start_client 로 다시 연결되기까지 걸리는 시간 (단위: 초)
+
+        drop_rate (float): 실시간 틱 / 호가 이벤트를 전달하지 않고 버리는 비율 (이벤트 누락 흉내, 분봉에는 포함됨)
+
+        drop_random (random.Random): 버릴 이벤트를 정하는 난수 생성기 (reset 에서 시드 0으로 초기화)
+
+        minute_bar_dict (dict): 종목 코드 -> {분봉 시간(hhmm, 봉 끝 시간): [시가, 고가, 저가, 종가, 거래량]} (발생한 틱으로 만든 당일 분봉)
+
+        chart_end_date (datetime.date): 차트 데이터 마지막 날짜
+
+        chart_day_count (int): 차트 데이터 날짜 수
+
+        chart_page_size (int): BlockRequest 한번에 받는 차트 데이터 수
+
+        stats_dict (dict): 통계 (이벤트 수, 주문 수, 체결 수, 요청 제한 수, 실시간 등록 제한 수, 연결 끊김 수, 버린 이벤트 수)
+    """
+
+    lock = threading.RLock()
+    event_q = Queue()
+    event_thread = None
+    replay_thread = None
+
+    stock_dict = {}
+    sub_dict = {}
+    conclusion_sub_list = []
+
+    last_price_dict = {}
+    order_dict = {}
+    position_dict = {}
+    order_num = 1000
+
+    limit_dict = {}
+    limit_rule_dict = dict(LIMIT_RULE_DICT)
+    max_subscribe_count = MAX_SUBSCRIBE_COUNT
+    block_request_latency = 0.0
+
+    connected = True
+    client_generation = 0
+    connect_latency = 0.0
+    drop_rate = 0.0
+    drop_random = random.Random(0)
+    minute_bar_dict = {}
+
+    chart_end_date = datetime.now().date()
+    chart_day_count = 30
+    chart_page_size = 2000
+
+    stats_dict = {"event": 0, "order": 0, "conclusion": 0, "limit_reject": 0, "subscribe_reject": 0, "disconnect": 0, "drop": 0}
+
+    @classmethod
+    def load_stock_list(cls, stock_count=100):
+        """
+        가상 종목 목록 생성 (종목 코드 A000000 부터 5 간격, 절반은 코스피 / 절반은 코스닥)
+
+        Parameters:
+            stock_count (int): 종목 수
+        """
+        with cls.lock:
+            for idx in range(stock_count):
+                cls.add_stock("A{:06d}".format(idx * 5), market_kind=1 if idx % 2 == 0 else 2)
+
+    @classmethod
+    def add_stock(cls, stock_code, stock_name=None, market_kind=1, base_price=None):
+        """
+        가상 종목 추가 (이미 있으면 무시)
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            stock_name (str): 종목 이름 (None - "SIM" + 종목 코드)
+
+            market_kind (int): 소속부 (MARKET_KIND 값)
+
+            base_price (int): 기준가 (None - 종목 코드로 정해지는 값)
+        """
+        with cls.lock:
+            if stock_code in cls.stock_dict:
+                return
+            if base_price is None:
+                base_price = 1000 + _get_seed(stock_code) % 200 * 500
+            cls.stock_dict[stock_code] = [stock_name or "SIM" + stock_code, market_kind, base_price]
+
+    @classmethod
+    def set_position(cls, stock_code, qty, avg_price):
+        """
+        가상 계좌 잔고 설정
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            qty (int): 잔고 수량 (매도 가능 수량도 같은 값으로 설정, 0 - 잔고 삭제)
+
+            avg_price (int): 평균 단가
+        """
+        with cls.lock:
+            cls.add_stock(stock_code)
+            if qty:
+                cls.position_dict[stock_code] = [qty, qty, avg_price]
+            else:
+                cls.position_dict.pop(stock_code, None)
+
+    @classmethod
+    def reset(cls):
+        """
+        주문 / 잔고 / 구독 / 요청 제한 / 통계 초기화 (종목 목록은 유지)
+        """
+        with cls.lock:
+            cls.sub_dict = {}
+            cls.conclusion_sub_list = []
+            cls.last_price_dict = {}
+            cls.order_dict = {}
+            cls.position_dict = {}
+            cls.order_num = 1000
+            cls.limit_dict = {}
+            cls.connected = True
+            cls.drop_random = random.Random(0)
+            cls.minute_bar_dict = {}
+            cls.stats_dict = {key: 0 for key in cls.stats_dict}
+
+    # ----- 연결 -----
+
+    @classmethod
+    def disconnect(cls, silent=False):
+        """
+        creon 연결 끊김 흉내 (모든 실시간 등록이 해지되고 이벤트가 전달되지 않음, 시장의 틱은 계속 발생함)
+
+        Parameters:
+            silent (bool): True - 연결 상태는 정상으로 보이고 실시간 등록만 해지됨 (이벤트가 조용히 끊기는 경우)
+        """
+        with cls.lock:
+            cls.sub_dict = {}
+            cls.conclusion_sub_list = []
+            cls.connected = silent
+            cls.stats_dict["disconnect"] += 1
+
+    @classmethod
+    def connect(cls):
+        """
+        creon 다시 연결 (실시간 등록은 다시 해야함)
+        """
+        with cls.lock:
+            cls.connected = True
+
+    # ----- 요청 제한 -----
+
+    @classmethod
+    def get_limit_remain_count(cls, limit_type):
+        """
+        요청 타입의 남은 요청 수 반환
+
+        Parameters:
+            limit_type (int): 요청 타입 (LIMIT_TYPE 값)
+
+        Returns:
+            (int): 남은 요청 수
+        """
+        with cls.lock:
+            if limit_type == 2:
+                return cls.max_subscribe_count - cls.get_subscribe_count()
+
+            max_count, interval = cls.limit_rule_dict[limit_type]
+            limit = cls.limit_dict.get(limit_type)
+            if limit is None or time.monotonic() - limit[0] >= interval:
+                return max_count
+            return max_count - limit[1]
+
+    @classmethod
+    def get_limit_remain_time(cls):
+        """
+        요청 수가 초기화 되기까지 남은 시간 반환 (가장 먼저 초기화되는 요청 타입 기준)
+
+        Returns:
+            (int): 남은 시간 (단위: ms)
+        """
+        with cls.lock:
+            now = time.monotonic()
+            remain_time_list = [
+                cls.limit_rule_dict[limit_type][1] - (now - limit[0]) for limit_type, limit in cls.limit_dict.items() if now - limit[0] < cls.limit_rule_dict[limit_type][1]
+            ]
+            return int(min(remain_time_list) * 1000) if remain_time_list else 0
+
+    @classmethod
+    def take_request(cls, limit_type):
+        """
+        요청 수를 하나 사용
+
+        Parameters:
+            limit_type (int): 요청 타입 (LIMIT_TYPE 값)
+
+        Returns:
+            (bool): 요청 가능 여부 (False - 요청 제한)
+        """
+        with cls.lock:
+            max_count, interval = cls.limit_rule_dict[limit_type]
+            now = time.monotonic()
+            limit = cls.limit_dict.get(limit_type)
+            if limit is None or now - limit[0] >= interval:
+                limit = cls.limit_dict[limit_type] = [now, 0]
+
+            if limit[1] >= max_count:
+                cls.stats_dict["limit_reject"] += 1
+                return False
+
+            limit[1] += 1
+            return True
+
+    # ----- 실시간 등록 -----
+
+    @classmethod
+    def get_subscribe_count(cls):
+        with cls.lock:
+            return sum(len(sub_list) for sub_list in cls.sub_dict.values()) + len(cls.conclusion_sub_list)
+
+    @classmethod
+    def subscribe(cls, sim_com, sub_key):
+        """
+        실시간 등록
+
+        Parameters:
+            sim_com (SimCom): 등록할 오브젝트
+
+            sub_key
+                (tuple): (실시간 종류, 종목 코드)
+
+                (None): 실시간 체결 데이터
+
+        Returns:
+            (bool): 등록 여부 (False - 최대 실시간 등록 수 초과)
+        """
+        with cls.lock:
+            if cls.get_subscribe_count() >= cls.max_subscribe_count:
+                cls.stats_dict["subscribe_reject"] += 1
+                return False
+
+            sub_list = cls.conclusion_sub_list if sub_key is None else cls.sub_dict.setdefault(sub_key, [])
+            if not sim_com in sub_list:
+                sub_list.append(sim_com)
+            return True
+
+    @classmethod
+    def unsubscribe(cls, sim_com, sub_key):
+        with cls.lock:
+            sub_list = cls.conclusion_sub_list if sub_key is None else cls.sub_dict.get(sub_key, [])
+            if sim_com in sub_list:
+                sub_list.remove(sim_com)
+            if sub_key is not None and not sub_list:
+                cls.sub_dict.pop(sub_key, None)
+
+    # ----- 이벤트 -----
+
+    @classmethod
+    def start_event_thread(cls):
+        with cls.lock:
+            if cls.event_thread is None:
+                cls.event_thread = threading.Thread(target=cls._run_event, daemon=True)
+                cls.event_thread.start()
+
+    @classmethod
+    def _run_event(cls):
+        while True:
+            event = cls.event_q.get()
+            try:
+                cls._fire_event(event)
+            finally:
+                cls.event_q.task_done()
+
+    @classmethod
+    def _fire_event(cls, event):
+        """
+        이벤트 실행 (이벤트 스레드에서 실행)
+
+        Parameters:
+            event (dict): {"type": "tick" / "ask_bid" / "conclusion", "stock_code", "header": 헤더 인덱스 -> 값}
+        """
+        event_type = event["type"]
+        header_dict = event["header"]
+
+        with cls.lock:
+            if event_type == "tick":
+                cls._match_tick(event["stock_code"], header_dict)
+                cls._add_minute_bar(event["stock_code"], header_dict)
+            sub_list = list(cls.conclusion_sub_list if event_type == "conclusion" else cls.sub_dict.get((event_type, event["stock_code"]), []))
+            if sub_list and cls.drop_rate and event_type != "conclusion" and cls.drop_random.random() < cls.drop_rate:
+                cls.stats_dict["drop"] += 1
+                return
+
+        for sim_com in sub_list:
+            sim_com.header_dict = header_dict
+            if sim_com.handler is not None:
+                sim_com.handler.OnReceived()
+            cls.stats_dict["event"] += 1
+
+    @classmethod
+    def _add_minute_bar(cls, stock_code, header_dict):
+        """
+        틱을 당일 분봉에 추가 (락 안에서 호출, creon 과 같이 봉이 끝나는 분을 봉 시간으로 사용)
+        """
+        hhmmss = header_dict[18]
+        minute = hhmmss // 10000 * 60 + hhmmss // 100 % 100 + 1
+        bar_time = minute // 60 * 100 + minute % 60
+        price = header_dict[13]
+
+        bar_dict = cls.minute_bar_dict.setdefault(stock_code, {})
+        bar = bar_dict.get(bar_time)
+        if bar is None:
+            bar_dict[bar_time] = [price, price, price, price, header_dict[17]]
+        else:
+            bar[1] = max(bar[1], price)
+            bar[2] = min(bar[2], price)
+            bar[3] = price
+            bar[4] += header_dict[17]
+
+    @classmethod
+    def put_conclusion_list(cls, conclusion_list):
+        """
+        체결 이벤트들을 이벤트 스레드에 추가 (락 안에서 호출하여 주문 접수 이벤트가 체결 이벤트보다 먼저 실행되도록 함)
+
+        Parameters:
+            conclusion_list (list[dict]): 체결 이벤트 헤더 리스트
+        """
+        for conclusion_header_dict in conclusion_list:
+            cls.put_event({"type": "conclusion", "stock_code": conclusion_header_dict[9], "header": conclusion_header_dict})
+
+    @classmethod
+    def put_event(cls, event):
+        """
+        이벤트 스레드에 이벤트 추가
+
+        Parameters:
+            event (dict): {"type": "tick" / "ask_bid" / "conclusion", "stock_code", "header": 헤더 인덱스 -> 값}
+        """
+        cls.start_event_thread()
+        cls.event_q.put(event)
+
+    @classmethod
+    def wait_event(cls):
+        """
+        이벤트 큐의 모든 이벤트가 실행될때까지 대기
+        """
+        cls.event_q.join()
+
+    # ----- 재생 -----
+
+    @classmethod
+    def make_event_list(cls, stock_code_list, tick_count, seed=0, tick_interval=0.001, ask_bid_ratio=1.0, start_time=90000):
+        """
+        재생할 가상 실시간 이벤트 리스트 생성 (종목별 가격은 호가 단위로 무작위 이동)
+
+        Parameters:
+            stock_code_list (list): 종목 코드 리스트
+
+            tick_count (int): 틱 이벤트 수
+
+            seed (int): 난수 시드 (같은 시드는 같은 이벤트 리스트)
+
+            tick_interval (float): 틱 이벤트 간격 (단위: 초, 1배속 기준)
+
+            ask_bid_ratio (float): 틱 이벤트당 호가 이벤트 비율
+
+            start_time (int): 첫 틱의 시분초 (hhmmss)
+
+        Returns:
+            (list[dict]): 이벤트 리스트 ({"time": 재생 시작 기준 시간 (단위: 초), "type", "stock_code", "header"})
+        """
+        rand = random.Random(seed)
+        for stock_code in stock_code_list:
+            cls.add_stock(stock_code)
+
+        price_dict = {stock_code: cls.stock_dict[stock_code][2] for stock_code in stock_code_list}
+        vol_dict = {stock_code: 0 for stock_code in stock_code_list}
+        start_second = start_time // 10000 * 3600 + start_time // 100 % 100 * 60 + start_time % 100
+
+        event_list = []
+        ask_bid_acc = 0.0
+        for idx in range(tick_count):
+            event_time = idx * tick_interval
+            stock_code = stock_code_list[rand.randrange(len(stock_code_list))]
+            base_price = cls.stock_dict[stock_code][2]
+            tick_size = _get_tick_size(price_dict[stock_code])
+
+            price = max(tick_size, price_dict[stock_code] + rand.choice((-1, 0, 0, 1)) * tick_size)
+            qty = rand.randint(1, 100)
+            price_dict[stock_code] = price
+            vol_dict[stock_code] += qty
+
+            second = int(start_second + event_time)
+            event_list.append(
+                {
+                    "time": event_time,
+                    "type": "tick",
+                    "stock_code": stock_code,
+                    "header": {
+                        0: stock_code,
+                        2: price - base_price,
+                        9: vol_dict[stock_code],
+                        13: price,
+                        17: qty,
+                        18: second // 3600 * 10000 + second // 60 % 60 * 100 + second % 60,
+                        20: ord("2"),
+                    },
+                }
+            )
+
+            ask_bid_acc += ask_bid_ratio
+            while ask_bid_acc >= 1:
+                ask_bid_acc -= 1
+                header_dict = {0: stock_code, 23: 0, 24: 0}
+                for level, header_idx in enumerate(ASK_BID_HEADER_INDEX_LIST):
+                    ask_vol = rand.randint(1, 1000)
+                    bid_vol = rand.randint(1, 1000)
+                    header_dict[header_idx] = price + tick_size * (level + 1)
+                    header_dict[header_idx + 1] = max(tick_size, price - tick_size * level)
+                    header_dict[header_idx + 2] = ask_vol
+                    header_dict[header_idx + 3] = bid_vol
+                    header_dict[23] += ask_vol
+                    header_dict[24] += bid_vol
+                event_list.append({"time": event_time, "type": "ask_bid", "stock_code": stock_code, "header": header_dict})
+
+        return event_list
+
+    @classmethod
+    def save_event_list(cls, file_path, event_list):
+        """
+        이벤트 리스트를 파일로 저장 (json lines, 한줄에 이벤트 하나)
+
+        Parameters:
+            file_path (str): 파일 경로
+
+            event_list (list[dict]): 이벤트 리스트
+        """
+        with open(file_path, "w") as event_file:
+            for event in event_list:
+                event_file.write(json.dumps(event) + "\n")
+
+    @classmethod
+    def load_event_list(cls, file_path):
+        """
+        파일에 기록된 이벤트 리스트 반환 (save_event_list 형식)
+
+        Parameters:
+            file_path (str): 파일 경로
+
+        Returns:
+            (list[dict]): 이벤트 리스트
+        """
+        event_list = []
+        with open(file_path) as event_file:
+            for line in event_file:
+                event = json.loads(line)
+                event["header"] = {int(header_idx): value for header_idx, value in event["header"].items()}
+                event_list.append(event)
+        return event_list
+
+    @classmethod
+    def replay(cls, event_list, speed=1.0, wait=True):
+        """
+        이벤트 리스트 재생
+
+        Parameters:
+            event_list (list[dict]): 이벤트 리스트
+
+            speed
+                (float): 재생 배속 (1 - 기록된 시간 간격 그대로)
+
+                (0): 시간 간격 없이 최대한 빠르게
+
+            wait (bool): 재생과 이벤트 실행이 끝날때까지 대기 여부 (False - 재생 스레드에서 재생)
+        """
+        cls.start_event_thread()
+
+        if not wait:
+            cls.replay_thread = threading.Thread(target=cls.replay, args=(event_list, speed, True), daemon=True)
+            cls.replay_thread.start()
+            return
+
+        start = time.perf_counter()
+        for event in event_list:
+            if speed:
+                delay = event["time"] / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            cls.event_q.put(event)
+
+        cls.wait_event()
+
+    # ----- 주문 -----
+
+    @classmethod
+    def place_order(cls, order_type, stock_code, qty, price, order_condition, price_type):
+        """
+        신규 매수 / 매도 주문 (CpTd0311)
+
+        Returns:
+            (int): 주문번호
+
+            (tuple): 요청 오류 (dib status, 메시지)
+        """
+        with cls.lock:
+            if qty <= 0 or (price_type != "03" and price <= 0):
+                return _DIB_STATUS_INVALID_ORDER
+
+            cls.add_stock(stock_code)
+            if order_type == "1":
+                position = cls.position_dict.get(stock_code)
+                if position is None or position[1] < qty:
+                    return _DIB_STATUS_NO_ABLE_SELL
+                position[1] -= qty
+
+            cls.order_num += 1
+            order = {
+                "order_num": cls.order_num,
+                "order_type": order_type,
+                "stock_code": stock_code,
+                "qty": qty,
+                "price": price,
+                "order_condition": order_condition,
+                "price_type": price_type,
+            }
+            cls.order_dict[order["order_num"]] = order
+            cls.stats_dict["order"] += 1
+
+            conclusion_list = [cls._make_conclusion(order, "4", "1", qty, price)]
+            conclusion_list += cls._match_order(order)
+            cls.put_conclusion_list(conclusion_list)
+
+        return order["order_num"]
+
+    @classmethod
+    def modify_order(cls, origin_order_num, qty, price=None, order_condition=None, price_type=None):
+        """
+        정정 주문 (CpTd0313, CpTd0303), 원주문의 qty 만큼(0 - 전체) 새 주문번호로 옮김
+
+        Returns:
+            (int): 새 주문번호
+
+            (tuple): 요청 오류 (dib status, 메시지)
+        """
+        with cls.lock:
+            origin_order = cls.order_dict.get(origin_order_num)
+            if origin_order is None:
+                return _DIB_STATUS_NO_ORDER
+
+            qty = min(qty, origin_order["qty"]) or origin_order["qty"]
+            origin_order["qty"] -= qty
+            if not origin_order["qty"]:
+                del cls.order_dict[origin_order_num]
+
+            cls.order_num += 1
+            order = dict(origin_order, order_num=cls.order_num, qty=qty)
+            if price is not None:
+                order["price"] = price
+            if order_condition is not None:
+                order["order_condition"] = order_condition
+            if price_type is not None:
+                order["price_type"] = price_type
+            cls.order_dict[order["order_num"]] = order
+            cls.stats_dict["order"] += 1
+
+            conclusion_list = [
+                cls._make_conclusion(order, "4", "2", qty, order["price"], origin_order_num),
+                cls._make_conclusion(order, "2", "2", qty, order["price"], origin_order_num),
+            ]
+            conclusion_list += cls._match_order(order)
+            cls.put_conclusion_list(conclusion_list)
+
+        return order["order_num"]
+
+    @classmethod
+    def cancel_order(cls, origin_order_num, qty):
+        """
+        취소 주문 (CpTd0314)
+
+        Returns:
+            (int): 취소 주문번호
+
+            (tuple): 요청 오류 (dib status, 메시지)
+        """
+        with cls.lock:
+            origin_order = cls.order_dict.get(origin_order_num)
+            if origin_order is None:
+                return _DIB_STATUS_NO_ORDER
+
+            qty = min(qty, origin_order["qty"]) or origin_order["qty"]
+            origin_order["qty"] -= qty
+            if not origin_order["qty"]:
+                del cls.order_dict[origin_order_num]
+
+            if origin_order["order_type"] == "1":
+                cls.position_dict[origin_order["stock_code"]][1] += qty
+
+            cls.order_num += 1
+            order = dict(origin_order, order_num=cls.order_num, qty=qty)
+            cls.stats_dict["order"] += 1
+
+            conclusion_list = [
+                cls._make_conclusion(order, "4", "3", qty, order["price"], origin_order_num),
+                cls._make_conclusion(order, "2", "3", qty, order["price"], origin_order_num),
+            ]
+            cls.put_conclusion_list(conclusion_list)
+
+        return order["order_num"]
+
+    @classmethod
+    def _match_order(cls, order):
+        """
+        새 주문을 최근 체결가로 체결 (락 안에서 호출, 최근 체결가가 없으면 다음 틱까지 대기)
+
+        Returns:
+            (list[dict]): 체결 이벤트 헤더 리스트
+        """
+        last_price = cls.last_price_dict.get(order["stock_code"])
+        if last_price is None or not cls._is_marketable(order, last_price):
+            return []
+        return [cls._fill(order, order["qty"], last_price)]
+
+    @classmethod
+    def _match_tick(cls, stock_code, header_dict):
+        """
+        틱 이벤트로 미체결 주문 체결 후 체결 이벤트 추가 (틱 체결 수량 안에서 주문번호 순서대로 체결, 락 안에서 호출)
+        """
+        price = header_dict[13]
+        cls.last_price_dict[stock_code] = price
+
+        conclusion_list = []
+        remain_qty = header_dict.get(17, 0)
+        for order in list(cls.order_dict.values()):
+            if not remain_qty:
+                break
+            if order["stock_code"] != stock_code or not cls._is_marketable(order, price):
+                continue
+
+            fill_qty = min(order["qty"], remain_qty)
+            remain_qty -= fill_qty
+            conclusion_list.append(cls._fill(order, fill_qty, order["price"] if order["price_type"] != "03" else price))
+        cls.put_conclusion_list(conclusion_list)
+
+    @staticmethod
+    def _is_marketable(order, price):
+        if order["price_type"] == "03":
+            return True
+        if order["order_type"] == "2":
+            return order["price"] >= price
+        return order["price"] <= price
+
+    @classmethod
+    def _fill(cls, order, fill_qty, fill_price):
+        """
+        주문 체결 후 잔고 갱신 (락 안에서 호출)
+
+        Returns:
+            (dict): 체결 이벤트 헤더
+        """
+        order["qty"] -= fill_qty
+        if not order["qty"]:
+            cls.order_dict.pop(order["order_num"], None)
+
+        position = cls.position_dict.get(order["stock_code"])
+        if order["order_type"] == "2":
+            if position is None:
+                position = cls.position_dict[order["stock_code"]] = [0, 0, 0]
+            position[2] = round((position[0] * position[2] + fill_qty * fill_price) / (position[0] + fill_qty))
+            position[0] += fill_qty
+            position[1] += fill_qty
+        else:
+            position[0] -= fill_qty
+            if not position[0]:
+                del cls.position_dict[order["stock_code"]]
+
+        cls.stats_dict["conclusion"] += 1
+        return cls._make_conclusion(order, "1", "1", fill_qty, fill_price)
+
+    @classmethod
+    def _make_conclusion(cls, order, conclusion_type, modify_cancel_type, qty, price, origin_order_num=0):
+        """
+        체결 이벤트 헤더 생성 (trade_status_realtime.TradeStatusRtEvent 가 읽는 헤더)
+
+        Parameters:
+            conclusion_type (str): 체결 타입 (CONCLUSION_TYPE 값)
+
+            modify_cancel_type (str): 정정 취소 타입 (MODIFY_CANCEL_TYPE 값)
+        """
+        position = cls.position_dict.get(order["stock_code"]) or [0, 0, 0]
+        return {
+            2: cls.stock_dict[order["stock_code"]][0],
+            3: qty,
+            4: price,
+            5: order["order_num"],
+            6: origin_order_num,
+            9: order["stock_code"],
+            12: order["order_type"],
+            14: conclusion_type,
+            16: modify_cancel_type,
+            18: order["price_type"],
+            19: order["order_condition"],
+            21: position[2],
+            22: position[1],
+            23: position[0],
+        }
+
+    # ----- 차트 -----
+
+    @classmethod
+    def get_chart_row_list(cls, stock_code, chart_type, field_list, row_count):
+        """
+        가상 차트 데이터 생성 (최근 데이터부터, 종목 코드와 날짜로 정해지는 값)
+        분봉은 발생한 틱으로 만든 당일 분봉(minute_bar_dict)이 있으면 당일 데이터로 사용함
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            chart_type (str): 차트 종류 ("D" - 일봉, "m" - 분봉)
+
+            field_list (list): 데이터 종류 (StockChart 필드 인덱스)
+
+            row_count (int): 최대 데이터 수
+
+        Returns:
+            (list[list]): 차트 데이터
+        """
+        cls.add_stock(stock_code)
+        base_price = cls.stock_dict[stock_code][2]
+
+        row_list = []
+        date = cls.chart_end_date
+        with cls.lock:
+            bar_list = [(time_int, tuple(bar)) for time_int, bar in cls.minute_bar_dict.get(stock_code, {}).items()] if chart_type == "m" else []
+        if bar_list:
+            date_int = date.year * 10000 + date.month * 100 + date.day
+            for time_int, (open_, high, low, close, vol) in sorted(bar_list, reverse=True):
+                field_dict = {0: date_int, 1: time_int, 2: open_, 3: high, 4: low, 5: close, 8: vol}
+                row_list.append([field_dict.get(field, 0) for field in field_list])
+                if len(row_list) == row_count:
+                    return row_list
+            date -= timedelta(days=1)
+
+        date_list = []
+        while len(date_list) < cls.chart_day_count:
+            if date.weekday() < 5:
+                date_list.append(date)
+            date -= timedelta(days=1)
+
+        for date in date_list:
+            date_int = date.year * 10000 + date.month * 100 + date.day
+            rand = random.Random(_get_seed(stock_code, date_int))
+            tick_size = _get_tick_size(base_price)
+
+            if chart_type == "m":
+                time_list = [hour * 100 + minute for hour in range(15, 8, -1) for minute in range(59, -1, -1) if 901 <= hour * 100 + minute <= 1530]
+            else:
+                time_list = [0]
+
+            close = base_price + rand.randint(-20, 20) * tick_size
+            for time_int in time_list:
+                open_ = max(tick_size, close + rand.randint(-3, 3) * tick_size)
+                field_dict = {
+                    0: date_int,
+                    1: time_int,
+                    2: open_,
+                    3: max(open_, close) + rand.randint(0, 3) * tick_size,
+                    4: max(tick_size, min(open_, close) - rand.randint(0, 3) * tick_size),
+                    5: close,
+                    8: rand.randint(100, 100000),
+                }
+                row_list.append([field_dict.get(field, 0) for field in field_list])
+                if len(row_list) == row_count:
+                    return row_list
+                close = open_
+
+        return row_list
+
+
+def _get_tick_size(price):
+    if price < 2000:
+        return 1
+    if price < 5000:
+        return 5
+    if price < 20000:
+        return 10
+    if price < 50000:
+        return 50
+    if price < 200000:
+        return 100
+    if price < 500000:
+        return 500
+    return 1000
+
+
+class SimCom:
+    """
+    가상 creon COM 오브젝트 기본 클래스 (win32com Dispatch 오브젝트와 같은 메소드)
+
+    Attributes:
+        prog_id (str): COM 오브젝트 이름
+
+        input_dict (dict): SetInputValue 로 설정된 값
+
+        header_dict (dict): GetHeaderValue 로 읽을 값
+
+        data_list (list[list]): GetDataValue 로 읽을 값 ([행][열])
+
+        dib_status (tuple): 마지막 요청 상태 (status, 메시지)
+
+        Continue (int): 연속 데이터 유무 (1 - 있음)
+
+        handler (): 이벤트 핸들러 (WithEvents)
+
+        client_generation (int): 오브젝트를 만들때의 creon 실행 번호
+
+        stale_after_restart (bool): True - creon 재실행 후에는 요청이 실패함 (주문 오브젝트)
+    """
+
+    limit_type = 1
+    stale_after_restart = False
+
+    def __init__(self, prog_id):
+        self.prog_id = prog_id
+        self.client_generation = SimMarket.client_generation
+        self.input_dict = {}
+        self.header_dict = {}
+        self.data_list = []
+        self.dib_status = _DIB_STATUS_OK
+        self.Continue = 0
+        self.handler = None
+
+    def SetInputValue(self, value_type, value):
+        self.input_dict[value_type] = value
+
+    def GetHeaderValue(self, value_type):
+        return self.header_dict.get(value_type, 0)
+
+    def GetDataValue(self, value_type, index):
+        return self.data_list[index][value_type]
+
+    def GetDibStatus(self):
+        return self.dib_status[0]
+
+    def GetDibMsg1(self):
+        return self.dib_status[1]
+
+    def BlockRequest(self):
+        if SimMarket.block_request_latency:
+            time.sleep(SimMarket.block_request_latency)
+
+        if not SimMarket.connected or (self.stale_after_restart and self.client_generation != SimMarket.client_generation):
+            self.dib_status = _DIB_STATUS_DISCONNECTED
+            return
+
+        if not SimMarket.take_request(self.limit_type):
+            self.dib_status = _DIB_STATUS_LIMIT
+            return
+
+        self.dib_status = _DIB_STATUS_OK
+        self.request()
+
+    def request(self):
+        pass
+
+    def Subscribe(self):
+        if not SimMarket.connected:
+            self.dib_status = _DIB_STATUS_DISCONNECTED
+        elif not SimMarket.subscribe(self, self.get_sub_key()):
+            self.dib_status = _DIB_STATUS_LIMIT
+        else:
+            self.dib_status = _DIB_STATUS_OK
+
+    def Unsubscribe(self):
+        SimMarket.unsubscribe(self, self.get_sub_key())
+
+    def get_sub_key(self):
+        return None
+
+
+class SimCpCybos(SimCom):
+    """
+    CpUtil.CpCybos
+    """
+
+    @property
+    def IsConnect(self):
+        return 1 if SimMarket.connected else 0
+
+    def PlusDisconnect(self):
+        SimMarket.disconnect()
+
+    @property
+    def LimitRequestRemainTime(self):
+        return SimMarket.get_limit_remain_time()
+
+    def GetLimitRemainCount(self, limit_type):
+        return SimMarket.get_limit_remain_count(limit_type)
+
+
+class SimCpCodeMgr(SimCom):
+    """
+    CpUtil.CpCodeMgr
+    """
+
+    def CodeToName(self, stock_code):
+        SimMarket.add_stock(stock_code)
+        return SimMarket.stock_dict[stock_code][0]
+
+    def GetStockIndustryCode(self, stock_code):
+        return ""
+
+    def GetStockMarketKind(self, stock_code):
+        SimMarket.add_stock(stock_code)
+        return SimMarket.stock_dict[stock_code][1]
+
+    def GetStockControlKind(self, stock_code):
+        return 0
+
+    def GetStockSupervisionKind(self, stock_code):
+        return 0
+
+    def GetStockStatusKind(self, stock_code):
+        return 0
+
+    def GetStockSectionKind(self, stock_code):
+        return 1
+
+    def GetStockListByMarket(self, market_kind):
+        with SimMarket.lock:
+            return tuple(stock_code for stock_code, stock in SimMarket.stock_dict.items() if stock[1] == market_kind)
+
+
+class SimStockChart(SimCom):
+    """
+    CpSysDib.StockChart (GetDataValue 의 열은 요청한 데이터 종류 순서)
+    """
+
+    def __init__(self, prog_id):
+        SimCom.__init__(self, prog_id)
+        self.row_list = None
+        self.row_idx = 0
+
+    def SetInputValue(self, value_type, value):
+        SimCom.SetInputValue(self, value_type, value)
+        self.row_list = None  # 입력값이 바뀌면 처음부터 다시 요청
+
+    def request(self):
+        if self.row_list is None:
+            self.row_list = SimMarket.get_chart_row_list(
+                self.input_dict[0], chr(self.input_dict.get(6, ord("D"))), list(self.input_dict[5]), self.input_dict.get(4, SimMarket.chart_page_size)
+            )
+            self.row_idx = 0
+
+        self.data_list = self.row_list[self.row_idx : self.row_idx + SimMarket.chart_page_size]
+        self.row_idx += len(self.data_list)
+        self.header_dict = {0: self.input_dict[0], 3: len(self.data_list)}
+        self.Continue = 1 if self.row_idx < len(self.row_list) else 0
+
+
+class SimStockCur(SimCom):
+    """
+    Dscbo1.StockCur
+    """
+
+    def get_sub_key(self):
+        return ("tick", self.input_dict.get(0))
+
+
+class SimStockJpBid(SimCom):
+    """
+    Dscbo1.StockJpBid
+    """
+
+    def get_sub_key(self):
+        return ("ask_bid", self.input_dict.get(0))
+
+
+class SimCpConclusion(SimCom):
+    """
+    Dscbo1.CpConclusion
+    """
+
+    limit_type = 2
+
+
+class SimCpTdUtil(SimCom):
+    """
+    CpTrade.CpTdUtil
+    """
+
+    AccountNumber = ("00000000",)
+
+    def TradeInit(self, value):
+        return 0
+
+    def GoodsList(self, account, goods_type):
+        return ("01",)
+
+
+class SimCpTd0311(SimCom):
+    """
+    CpTrade.CpTd0311 (매수 / 매도 주문)
+    """
+
+    limit_type = 0
+    stale_after_restart = True
+
+    def request(self):
+        ret = SimMarket.place_order(self.input_dict[0], self.input_dict[3], self.input_dict[4], self.input_dict.get(5, 0), self.input_dict.get(7, "0"), self.input_dict.get(8, "01"))
+        self.set_order_result(ret, 8)
+
+    def set_order_result(self, ret, header_idx):
+        if isinstance(ret, tuple):
+            self.dib_status = ret
+            self.header_dict = {}
+        else:
+            self.header_dict = {header_idx: ret}
+
+
+class SimCpTd0313(SimCpTd0311):
+    """
+    CpTrade.CpTd0313 (가격 정정 주문)
+    """
+
+    def request(self):
+        self.set_order_result(SimMarket.modify_order(self.input_dict[1], self.input_dict.get(5, 0), price=self.input_dict[6]), 7)
+
+
+class SimCpTd0303(SimCpTd0311):
+    """
+    CpTrade.CpTd0303 (유형 정정 주문)
+    """
+
+    def request(self):
+        ret = SimMarket.modify_order(
+            self.input_dict[1], self.input_dict.get(5, 0), price=self.input_dict.get(6), order_condition=self.input_dict.get(8), price_type=self.input_dict.get(9)
+        )
+        self.set_order_result(ret, 8)
+
+
+class SimCpTd0314(SimCpTd0311):
+    """
+    CpTrade.CpTd0314 (취소 주문)
+    """
+
+    def request(self):
+        self.set_order_result(SimMarket.cancel_order(self.input_dict[1], self.input_dict.get(5, 0)), 6)
+
+
+class SimCpTd5339(SimCom):
+    """
+    CpTrade.CpTd5339 (미체결 잔량)
+    """
+
+    limit_type = 0
+
+    def request(self):
+        with SimMarket.lock:
+            self.data_list = [
+                {1: order["order_num"], 3: order["stock_code"], 4: SimMarket.stock_dict[order["stock_code"]][0], 7: order["price"], 11: order["qty"], 13: order["order_type"], 21: order["price_type"]}
+                for order in SimMarket.order_dict.values()
+            ]
+        self.header_dict = {5: len(self.data_list)}
+
+
+class SimCpTd6033(SimCom):
+    """
+    CpTrade.CpTd6033 (잔고 평가, 손익 / 평가금액은 creon 과 같이 1000배 값)
+    """
+
+    limit_type = 0
+
+    def request(self):
+        with SimMarket.lock:
+            self.data_list = []
+            for stock_code, (qty, able_sell_qty, avg_price) in SimMarket.position_dict.items():
+                cur_price = SimMarket.last_price_dict.get(stock_code, avg_price)
+                profit_unit_price = avg_price / (1 - (TRADE_FEE_PERCENT / 100 + SELL_TAX_PERCENT / 100))
+                profit = (cur_price - profit_unit_price) * qty
+                self.data_list.append(
+                    {
+                        0: SimMarket.stock_dict[stock_code][0],
+                        7: qty,
+                        9: cur_price * qty * 1000,
+                        10: profit * 1000,
+                        11: profit / (profit_unit_price * qty) * 100 if qty else 0,
+                        12: stock_code,
+                        15: able_sell_qty,
+                        17: avg_price,
+                        18: profit_unit_price,
+                    }
+                )
+        self.header_dict = {7: len(self.data_list)}
+
+
+class SimCpTdNew5331(SimCom):
+    """
+    CpTrade.CpTdNew5331A / CpTrade.CpTdNew5331B (거래 가능 수량)
+    """
+
+    limit_type = 0
+
+    def request(self):
+        with SimMarket.lock:
+            position = SimMarket.position_dict.get(self.input_dict.get(2))
+            self.header_dict = {18: position[1] if position else 0}
+
+
+# COM 오브젝트 이름 -> 가상 COM 오브젝트 클래스
+SIM_COM_CLASS_DICT = {
+    "CpUtil.CpCybos": SimCpCybos,
+    "CpUtil.CpCodeMgr": SimCpCodeMgr,
+    "CpSysDib.StockChart": SimStockChart,
+    "Dscbo1.StockCur": SimStockCur,
+    "Dscbo1.StockJpBid": SimStockJpBid,
+    "Dscbo1.CpConclusion": SimCpConclusion,
+    "CpTrade.CpTdUtil": SimCpTdUtil,
+    "CpTrade.CpTd0311": SimCpTd0311,
+    "CpTrade.CpTd0313": SimCpTd0313,
+    "CpTrade.CpTd0303": SimCpTd0303,
+    "CpTrade.CpTd0314": SimCpTd0314,
+    "CpTrade.CpTd5339": SimCpTd5339,
+    "CpTrade.CpTd6033": SimCpTd6033,
+    "CpTrade.CpTdNew5331A": SimCpTdNew5331,
+    "CpTrade.CpTdNew5331B": SimCpTdNew5331,
+}
+
+
+def start_client():
+    """
+    creon PLUS 실행, 로그인 대체 (connect_latency 후 다시 연결)
+    """
+    if SimMarket.connect_latency:
+        time.sleep(SimMarket.connect_latency)
+    SimMarket.client_generation += 1
+    SimMarket.connect()
+
+
+def Dispatch(prog_id):
+    """
+    win32com.client.Dispatch 대체 (가상 COM 오브젝트 생성)
+
+    Parameters:
+        prog_id (str): COM 오브젝트 이름
+
+    Returns:
+        (SimCom): 가상 COM 오브젝트
+    """
+    return SIM_COM_CLASS_DICT.get(prog_id, SimCom)(prog_id)
+
+
+def WithEvents(sim_com, event_class):
+    """
+    win32com.client.WithEvents 대체 (이벤트 발생시 반환된 인스턴스의 OnReceived 가 이벤트 스레드에서 실행됨)
+
+    Parameters:
+        sim_com (SimCom): 가상 COM 오브젝트
+
+        event_class (class): 이벤트 클래스
+
+    Returns:
+        (event_class): event_class의 인스턴스
+    """
+    sim_com.handler = event_class()
+    return sim_com.handler
@@ -0,0 +1,245 @@
+# coding=utf-8
+import time
+import json
+import threading
+from datetime import datetime, timedelta
+
+import utils
+from creon_api import CpCybos, CreonLogin
+from stock_symbol import StockSymbol
+from portfolio import Portfolio
+from stock_data import StockData
+from stock_data_realtime import FeedHeartbeat
+
+logger = utils.get_logger(__name__)
+
+# 분봉 데이터 인덱스 (creon api 기준, 날짜, 시간, 시가, 고가, 저가, 종가, 거래량)
+_MINUTE_BAR_CREON_IDXS = (0, 1, 2, 3, 4, 5, 8)
+
+
+class CreonSupervisor(threading.Thread):
+    """
+    creon 연결 감시 / 자동 재접속 스레드
+
+    연결 상태(CpCybos.get_connect_status)와 실시간 이벤트 수신 기록(stock_data_realtime.FeedHeartbeat)을 주기적으로 확인하고
+    연결이 끊기거나 장중에 구독중인 모든 종목의 이벤트가 stale_sec 이상 끊기면
+    creon 을 다시 실행(CreonLogin)한 후 모든 실시간 등록을 우선순위 순서로 다시 하고 (SUBSCRIBE 제한 안에서)
+    끊긴 동안의 분봉을 가져와 끊김 구간과 함께 구독중인 클라이언트에게 보냄
+
+    재등록 우선순위: 실시간 주문 체결 -> 보유 종목 틱 -> 구독자가 많은 종목 틱 -> 구독자가 많은 종목 호가
+
+    Attributes:
+        caller (server.QuantServer): 서버
+
+        check_interval (float): 확인 주기 (단위: 초)
+
+        stale_sec (float): 이벤트가 끊겼다고 판단하는 시간 (단위: 초)
+
+        market_open_time (int): 이벤트 끊김 확인 시작 시분초 (hhmmss)
+
+        market_close_time (int): 이벤트 끊김 확인 종료 시분초 (hhmmss)
+
+        reconnect_timeout (float): creon 재실행 후 연결 대기 최대 시간 (단위: 초)
+
+        retry_interval (float): 재접속 실패시 다시 시도하기까지 대기 시간 (단위: 초)
+
+        status (str): 연결 상태 ("CONNECTED" / "RECONNECTING")
+
+        watch_start_time (float): 이벤트 끊김 확인 기준 시간 (time.monotonic, 시작 / 복구 시점)
+
+        stats_dict (dict): 통계 (끊김 감지 수, 재접속 수, 재접속 실패 수, 재등록 수, 재등록 실패 수, 받아온 분봉 수, 마지막 복구 시간(ms))
+    """
+
+    def __init__(self, caller, check_interval=1.0, stale_sec=60.0, reconnect_timeout=120.0, retry_interval=5.0):
+        threading.Thread.__init__(self)
+
+        self.caller = caller
+        self.check_interval = check_interval
+        self.stale_sec = stale_sec
+        self.market_open_time = 90000
+        self.market_close_time = 153000
+        self.reconnect_timeout = reconnect_timeout
+        self.retry_interval = retry_interval
+
+        self.status = "CONNECTED"
+        self.watch_start_time = time.monotonic()
+        self.stats_dict = {"detect": 0, "reconnect": 0, "reconnect_fail": 0, "resubscribe": 0, "resubscribe_fail": 0, "backfill_bar": 0, "last_recover_ms": 0.0}
+
+        self.setDaemon(True)
+        self.start()
+
+    def run(self):
+        while True:
+            time.sleep(self.check_interval)
+
+            reason = self.check()
+            if reason:
+                self.recover(reason)
+
+    def check(self):
+        """
+        연결 상태 확인
+
+        Returns:
+            (str): 끊김 사유 ("DISCONNECTED" - 연결 끊김, "STALE" - 장중 모든 구독 종목의 이벤트 끊김)
+
+            (None): 정상
+        """
+        if not CpCybos.get_connect_status():
+            return "DISCONNECTED"
+
+        now_time = utils.get_current_datetime("%H%M%S")
+        if not self.market_open_time <= now_time < self.market_close_time:
+            return None
+
+        if not self.caller.task_list["stock_tick_rt_sub"].get_subscription():
+            return None
+
+        if time.monotonic() - max(FeedHeartbeat.last_time, self.watch_start_time) > self.stale_sec:
+            return "STALE"
+        return None
+
+    def recover(self, reason):
+        """
+        creon 재접속 -> 실시간 재등록 -> 끊긴 구간 분봉 가져오기 -> 클라이언트에 끊김 구간 전송
+
+        Parameters:
+            reason (str): 끊김 사유 (check 반환값)
+        """
+        self.status = "RECONNECTING"
+        self.stats_dict["detect"] += 1
+        start = time.perf_counter()
+
+        # 마지막 이벤트 수신 시점을 끊김 시작으로 봄
+        last_time = max(FeedHeartbeat.last_time, self.watch_start_time)
+        gap_start = datetime.now() - timedelta(seconds=time.monotonic() - last_time)
+        logger.warning("creon feed lost : %s (last event %s)", reason, gap_start.strftime("%H:%M:%S"))
+        self.broadcast({"res_type": "feed_status", "res_data": {"status": "DISCONNECTED", "reason": reason, "gap_start": int(gap_start.strftime("%Y%m%d%H%M%S"))}})
+
+        # 연결은 정상으로 보이지만 이벤트가 끊긴 경우 creon 을 강제로 다시 실행
+        if reason == "STALE":
+            CpCybos.disconnect()
+
+        while not CreonLogin.connect(timeout=self.reconnect_timeout):
+            self.stats_dict["reconnect_fail"] += 1
+            logger.error("creon reconnect failed, retry after %s sec", self.retry_interval)
+            time.sleep(self.retry_interval)
+        self.stats_dict["reconnect"] += 1
+
+        tick_code_list, failed_code_list = self.resubscribe()
+        gap_end = datetime.now()
+        bar_dict = self.backfill(tick_code_list, gap_start)
+        self.notify_gap(gap_start, gap_end, bar_dict, failed_code_list)
+
+        self.stats_dict["last_recover_ms"] = (time.perf_counter() - start) * 1000
+        self.status = "CONNECTED"
+        self.watch_start_time = time.monotonic()
+        logger.info(
+            "creon feed recovered : %.0f ms (resubscribed %d, failed %d)", self.stats_dict["last_recover_ms"], len(tick_code_list), len(failed_code_list)
+        )
+        self.broadcast(
+            {
+                "res_type": "feed_status",
+                "res_data": {"status": "CONNECTED", "recover_ms": self.stats_dict["last_recover_ms"], "not_restored": failed_code_list},
+            }
+        )
+
+    def resubscribe(self):
+        """
+        모든 실시간 등록을 우선순위 순서로 다시 등록
+
+        Returns:
+            (list[str]): 다시 등록된 틱 구독 종목 코드 리스트 (우선순위 순서)
+
+            (list[str]): 다시 등록하지 못한 종목 코드 리스트 (틱 / 호가)
+        """
+        if not self.caller.task_list["trade_status_rt_sub"].resubscribe():
+            logger.error("trade status resubscribe failed")
+
+        held_code_set = {position[0] for position in Portfolio.get_position_list()}
+        tick_sub_dict = self.caller.task_list["stock_tick_rt_sub"].get_subscription()
+        tick_code_list = sorted(tick_sub_dict, key=lambda stock_code: (not stock_code in held_code_set, -len(tick_sub_dict[stock_code])))
+        ask_bid_sub_dict = self.caller.task_list["stock_askbid_rt_sub"].get_subscription()
+        ask_bid_code_list = sorted(ask_bid_sub_dict, key=lambda stock_code: -len(ask_bid_sub_dict[stock_code]))
+
+        failed_tick_code_list = self.caller.task_list["stock_tick_rt_sub"].resubscribe(tick_code_list)
+        failed_ask_bid_code_list = self.caller.task_list["stock_askbid_rt_sub"].resubscribe(ask_bid_code_list)
+
+        failed_code_list = failed_tick_code_list + [stock_code for stock_code in failed_ask_bid_code_list if not stock_code in failed_tick_code_list]
+        self.stats_dict["resubscribe"] += len(tick_code_list) + len(ask_bid_code_list) - len(failed_tick_code_list) - len(failed_ask_bid_code_list)
+        self.stats_dict["resubscribe_fail"] += len(failed_tick_code_list) + len(failed_ask_bid_code_list)
+
+        return [stock_code for stock_code in tick_code_list if not stock_code in failed_tick_code_list], failed_code_list
+
+    def backfill(self, stock_code_list, gap_start):
+        """
+        끊긴 동안의 분봉 가져오기 (종목별로 마지막으로 받은 틱이 포함된 분봉부터)
+
+        Parameters:
+            stock_code_list (list[str]): 종목 코드 리스트
+
+            gap_start (datetime.datetime): 끊김 시작 시간 (틱을 받은 적 없는 종목 기준)
+
+        Returns:
+            (dict): 종목 코드 -> 분봉 리스트 ([날짜시간(YYYYMMDDhhmm), 시가, 고가, 저가, 종가, 거래량], 오래된 순)
+        """
+        today = gap_start.year * 10000 + gap_start.month * 100 + gap_start.day
+        now = datetime.now()
+
+        bar_dict = {}
+        for stock_code in stock_code_list:
+            last_tick_time = FeedHeartbeat.get_last_tick_time(StockSymbol.get_id(stock_code))
+            if last_tick_time:
+                bar_start = datetime(gap_start.year, gap_start.month, gap_start.day, last_tick_time // 10000, last_tick_time // 100 % 100)
+            else:
+                bar_start = gap_start.replace(second=0, microsecond=0)
+
+            # 분봉 시간은 봉이 끝나는 분이므로 마지막 틱이 포함된 분봉은 (마지막 틱의 분 + 1)
+            recent_date_time = today * 10000 + bar_start.hour * 100 + bar_start.minute
+            rq_data_count = max(2, int((now - bar_start).total_seconds() // 60) + 2)
+
+            bar_list = StockData.get_chart_data(stock_code, _MINUTE_BAR_CREON_IDXS, "m", 1, recent_date_time, rq_data_count) or []
+            bar_list.reverse()
+            bar_dict[stock_code] = bar_list
+            self.stats_dict["backfill_bar"] += len(bar_list)
+
+        return bar_dict
+
+    def notify_gap(self, gap_start, gap_end, bar_dict, failed_code_list):
+        """
+        구독중인 클라이언트에게 끊김 구간과 끊긴 동안의 분봉 전송
+
+        Parameters:
+            gap_start (datetime.datetime): 끊김 시작 시간
+
+            gap_end (datetime.datetime): 실시간 재등록 완료 시간
+
+            bar_dict (dict): 종목 코드 -> 분봉 리스트 (backfill 반환값)
+
+            failed_code_list (list[str]): 다시 등록하지 못한 종목 코드 리스트
+        """
+        user_stock_code_dict = {}
+        for req_type in ("stock_tick_rt_sub", "stock_askbid_rt_sub"):
+            for stock_code, user_list in self.caller.task_list[req_type].get_subscription().items():
+                for username in user_list:
+                    user_stock_code_dict.setdefault(username, set()).add(stock_code)
+
+        for username, stock_code_set in user_stock_code_dict.items():
+            res_data = {
+                "gap_start": int(gap_start.strftime("%Y%m%d%H%M%S")),
+                "gap_end": int(gap_end.strftime("%Y%m%d%H%M%S")),
+                "stock_list": [{"stock_code": stock_code, "bar_list": bar_dict[stock_code]} for stock_code in sorted(stock_code_set) if stock_code in bar_dict],
+                "not_restored": [stock_code for stock_code in failed_code_list if stock_code in stock_code_set],
+            }
+            self.caller.insert_send_q(username, json.dumps({"res_type": "feed_gap", "res_data": res_data}))
+
+    def broadcast(self, data):
+        """
+        접속중인 모든 클라이언트에게 전송
+
+        Parameters:
+            data (dict): 보낼 데이터
+        """
+        data_json = json.dumps(data)
+        for username in list(self.caller.client_conn_dict):
+            self.caller.insert_send_q(username, data_json)
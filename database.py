@@ -1,12 +1,256 @@
 # coding=utf-8
-import pymysql
+import os
+import re
+import time
+import threading
+from collections import OrderedDict
+
+from metrics import Metrics
+
+# db 백엔드 ("mariadb" - 실제 maria db (pymysql), "sim" - 메모리 sqlite db (database_sim))
+DB_BACKEND = os.environ.get("DB_BACKEND", "mariadb")
 
 MARIA_DB_HOST = ""
-MARIA_DB_PORT = 
+MARIA_DB_PORT = 3306
 MARIA_DB_USER = ""
 MARIA_DB_PASSWORD = ""
 MARIA_DB_CHARSET = ""
 
+_db_client = None
+
+STOCK_LIST_CACHE_TTL_SEC = 300  # 종목 정보 (KR_Stock_List) 조회 캐시 유지 시간 (다른 프로세스의 변경이 반영되는 최대 시간)
+
+# WHERE 문 정규화 (따옴표 문자열 밖의 연속된 공백을 하나로)
+_WHERE_NORMALIZE_PATTERN = re.compile(r"('(?:[^'\\]|\\.)*')|\s+")
+
+
+def set_config(backend=None, host=None, port=None, user=None, password=None, charset=None):
+    """
+    db 백엔드, 접속 정보 설정 (None 인 항목은 기존 값 유지, 첫 연결 전에 호출해야함)
+
+    Parameters:
+        backend (str): db 백엔드 ("mariadb" / "sim")
+
+        host (str): maria db 주소
+
+        port (int): maria db 포트
+
+        user (str): maria db 사용자
+
+        password (str): maria db 비밀번호
+
+        charset (str): maria db 문자셋
+    """
+    global DB_BACKEND, MARIA_DB_HOST, MARIA_DB_PORT, MARIA_DB_USER, MARIA_DB_PASSWORD, MARIA_DB_CHARSET
+
+    if backend is not None and backend != DB_BACKEND:
+        if _db_client is not None:
+            raise RuntimeError("db backend already initialized : " + DB_BACKEND)
+        DB_BACKEND = backend
+
+    MARIA_DB_HOST = MARIA_DB_HOST if host is None else host
+    MARIA_DB_PORT = MARIA_DB_PORT if port is None else port
+    MARIA_DB_USER = MARIA_DB_USER if user is None else user
+    MARIA_DB_PASSWORD = MARIA_DB_PASSWORD if password is None else password
+    MARIA_DB_CHARSET = MARIA_DB_CHARSET if charset is None else charset
+
+
+def get_db_client():
+    """
+    db 백엔드 모듈 반환 (처음 호출시 import)
+
+    Returns:
+        (module): pymysql / database_sim
+    """
+    global _db_client
+
+    if _db_client is None:
+        if DB_BACKEND == "sim":
+            import database_sim as db_client
+        else:
+            import pymysql as db_client
+        _db_client = db_client
+    return _db_client
+
+
+class QueryCache:
+    """
+    MariaDB.select 조회 결과 캐시 (cache_ttl 을 준 조회만 사용, 프로세스 안의 모든 MariaDB 인스턴스가 공유)
+
+    키는 (db 이름, 테이블, 컬럼, 정규화한 WHERE 문) 이고 LRU 로 최대 max_entry_count 개, 항목마다 cache_ttl 초가 지나면 만료됨
+    같은 프로세스에서 insert / update / delete / drop 하면 쓰기가 끝난 후 그 테이블의 항목을 모두 지우고 테이블 세대를 올림
+    조회가 db 를 읽는 동안 세대가 바뀌면 읽은 결과를 저장하지 않으므로 지워진 값이 다시 들어가지 않음
+    다른 프로세스의 쓰기는 알수 없으므로 cache_ttl 만큼 늦게 반영될 수 있음
+
+    Attributes:
+        entry_dict (collections.OrderedDict): 키 -> (만료 시간 (time.monotonic), 조회 결과), 오래 안쓴 순서
+
+        table_key_dict (dict): (db 이름, 테이블) -> 항목 키 set
+
+        generation_dict (dict): (db 이름, 테이블) -> 세대 (캐시 조회가 한번이라도 있었던 테이블만)
+
+        stats_dict (dict): (db 이름, 테이블) -> {"hit", "miss", "invalidate", "evict"}
+
+        max_entry_count (int): 최대 항목 수
+
+        lock (threading.Lock): 캐시 변경시 사용하는 락
+    """
+
+    entry_dict = OrderedDict()
+    table_key_dict = {}
+    generation_dict = {}
+    stats_dict = {}
+    max_entry_count = 4096
+    lock = threading.Lock()
+
+    @staticmethod
+    def make_key(db_name, table, columns, where):
+        """
+        조회 키 생성
+
+        Parameters:
+            db_name (str): db 이름
+
+            table (str): 테이블 이름
+
+            columns (str / list[str] / None): 컬럼
+
+            where (str / None): WHERE 문
+
+        Returns:
+            (tuple): 키
+        """
+        if columns is None:
+            columns = ("*",)
+        elif isinstance(columns, (list, tuple)):
+            columns = tuple(columns)
+        else:
+            columns = (columns,)
+
+        if not where:
+            where = ""
+        elif "  " in where or not where.isprintable():
+            # 연속된 공백, 탭, 줄바꿈이 있는 경우만 정규식 사용
+            where = _WHERE_NORMALIZE_PATTERN.sub(lambda match: match.group(1) or " ", where)
+        return db_name, table, columns, where.strip()
+
+    @classmethod
+    def _get_stats(cls, table_key):
+        stats = cls.stats_dict.get(table_key)
+        if stats is None:
+            stats = cls.stats_dict[table_key] = {"hit": 0, "miss": 0, "invalidate": 0, "evict": 0}
+        return stats
+
+    @classmethod
+    def get(cls, key):
+        """
+        캐시된 조회 결과 반환 (없거나 만료된 경우 miss 로 기록하고 현재 테이블 세대 반환)
+
+        Parameters:
+            key (tuple): 키 (make_key)
+
+        Returns:
+            (bool): 캐시에 있는지 여부
+
+            (): 조회 결과 (있는 경우) / 테이블 세대 (없는 경우, put 에 전달)
+        """
+        table_key = key[:2]
+        with cls.lock:
+            entry = cls.entry_dict.get(key)
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    cls.entry_dict.move_to_end(key)
+                    cls._get_stats(table_key)["hit"] += 1
+                    return True, entry[1]
+                cls._remove(key)
+
+            cls._get_stats(table_key)["miss"] += 1
+            return False, cls.generation_dict.setdefault(table_key, 0)
+
+    @classmethod
+    def put(cls, key, value, cache_ttl, generation):
+        """
+        조회 결과 저장 (조회 시작 후 테이블에 쓰기가 있었으면 저장하지 않음)
+
+        Parameters:
+            key (tuple): 키 (make_key)
+
+            value (): 조회 결과
+
+            cache_ttl (float): 유지 시간 (단위: 초)
+
+            generation (int): 조회 시작시 테이블 세대 (get 반환값)
+        """
+        table_key = key[:2]
+        with cls.lock:
+            if cls.generation_dict.get(table_key) != generation:
+                return
+
+            if key in cls.entry_dict:
+                cls.entry_dict.move_to_end(key)
+            cls.entry_dict[key] = (time.monotonic() + cache_ttl, value)
+            cls.table_key_dict.setdefault(table_key, set()).add(key)
+
+            while len(cls.entry_dict) > cls.max_entry_count:
+                old_key = next(iter(cls.entry_dict))
+                cls._remove(old_key)
+                cls._get_stats(old_key[:2])["evict"] += 1
+
+    @classmethod
+    def _remove(cls, key):
+        del cls.entry_dict[key]
+        key_set = cls.table_key_dict.get(key[:2])
+        if key_set is not None:
+            key_set.discard(key)
+
+    @classmethod
+    def invalidate(cls, db_name, table):
+        """
+        테이블의 캐시 항목 삭제 (쓰기가 끝난 후 호출, 캐시 조회가 없었던 테이블은 바로 반환)
+
+        Parameters:
+            db_name (str): db 이름
+
+            table (str): 테이블 이름
+        """
+        table_key = (db_name, table)
+        # 캐시 조회를 시작한 적 없는 테이블은 지울 항목도, 읽는 중인 조회도 없음 (실시간 틱 insert 등은 락 없이 반환)
+        if not table_key in cls.generation_dict:
+            return
+
+        with cls.lock:
+            cls.generation_dict[table_key] += 1
+            key_set = cls.table_key_dict.pop(table_key, None)
+            if key_set:
+                for key in key_set:
+                    del cls.entry_dict[key]
+            cls._get_stats(table_key)["invalidate"] += 1
+
+    @classmethod
+    def clear(cls):
+        """
+        모든 항목 삭제 (통계 유지)
+        """
+        with cls.lock:
+            for table_key in cls.generation_dict:
+                cls.generation_dict[table_key] += 1
+            cls.entry_dict.clear()
+            cls.table_key_dict.clear()
+
+    @classmethod
+    def get_stats(cls):
+        """
+        테이블별 통계 반환
+
+        Returns:
+            (dict): "db 이름.테이블" -> {"hit", "miss", "invalidate", "evict", "entry"}
+        """
+        with cls.lock:
+            return {
+                db_name + "." + table: dict(stats, entry=len(cls.table_key_dict.get((db_name, table), ())))
+                for (db_name, table), stats in cls.stats_dict.items()
+            }
+
 
 class MariaDB:
     """
@@ -15,9 +259,9 @@ class MariaDB:
     Attributes:
         db_name (str): 접속할 db 이름
 
-        db_conn (pymysql.connect): pymysql 연결 인스턴스
+        db_conn (pymysql.connect / database_sim.SimConnection): db 연결 인스턴스
 
-        db_cursor (pymysql.cursor): pymysql 커서 인스턴스
+        db_cursor (pymysql.cursor / database_sim.SimCursor): db 커서 인스턴스
     """
 
     def __init__(self, db_name):
@@ -26,7 +270,7 @@ class MariaDB:
             db_name (str): 접속할 db 이름
         """
         self.db_name = db_name
-        self.db_conn = pymysql.connect(
+        self.db_conn = get_db_client().connect(
             host=MARIA_DB_HOST, port=MARIA_DB_PORT, user=MARIA_DB_USER, password=MARIA_DB_PASSWORD, db=self.db_name, charset=MARIA_DB_CHARSET,
         )
 
@@ -52,6 +296,15 @@ class MariaDB:
         """
         # print("EXECUTE QUERY ON DB : " + self.db_name)
 
+        # 쿼리 종류별 실행 시간 기록
+        histogram = Metrics.histogram("quant_db_query_seconds", "MariaDB query latency", {"op": query.split(" ", 1)[0].lower()})
+        start = time.perf_counter()
+        try:
+            self._execute(query, data)
+        finally:
+            histogram.record((time.perf_counter() - start) * 1000000)
+
+    def _execute(self, query, data=None):
         # data가 없을경우
         if not data:
             # print(query)
@@ -73,7 +326,7 @@ class MariaDB:
 
         self.db_cursor.execute(query, data)
 
-    def is_exist(self, table, where):
+    def is_exist(self, table, where, cache_ttl=None):
         """
         테이블 table의 column 컬럼에 data가 있는지 확인
 
@@ -82,9 +335,14 @@ class MariaDB:
 
             where (str): WHERE 조건
 
+            cache_ttl (float): 조회 결과 캐시 유지 시간 (단위: 초, None - 캐시 사용 안함)
+
         Returns:
             (bool): 존재여부 (True - 있음, False - 없음)
         """
+        if cache_ttl is not None:
+            return self.select(table, "1", where + " LIMIT 1", cache_ttl) is not None
+
         self.execute("SELECT * FROM " + table + " WHERE " + where)
 
         if self.db_cursor.fetchall():
@@ -92,7 +350,7 @@ class MariaDB:
         else:
             return False
 
-    def select(self, table, columns=None, where=None):
+    def select(self, table, columns=None, where=None, cache_ttl=None):
         """
         mysql SELECT 문
 
@@ -108,6 +366,11 @@ class MariaDB:
                 (str): mysql WHERE 문
 
                 (None): 테이블의 컬럼에 해당하는 데이터 전부 가져오기
+
+            cache_ttl
+                (float): 조회 결과 캐시 유지 시간 (단위: 초, QueryCache 에 있으면 db 조회 안함)
+
+                (None): 캐시 사용 안함
         
         Returns:
             (): 단일 데이터
@@ -116,6 +379,20 @@ class MariaDB:
 
             (list[][]): 다행 다열 데이터
         """
+        if cache_ttl is None:
+            return self._select(table, columns, where)
+
+        key = QueryCache.make_key(self.db_name, table, columns, where)
+        found, value = QueryCache.get(key)
+        if not found:
+            generation = value
+            value = self._select(table, columns, where)
+            QueryCache.put(key, value, cache_ttl, generation)
+
+        # 1행 / 1열 결과는 리스트이므로 호출한 쪽에서 바꿔도 캐시가 바뀌지 않도록 복사본 반환
+        return list(value) if isinstance(value, list) else value
+
+    def _select(self, table, columns, where):
         self.db_conn.commit()
 
         query = "SELECT "
@@ -157,6 +434,44 @@ class MariaDB:
             else:
                 return db_data
 
+    def select_chunk(self, table, columns, where=None, chunk_row_count=10000):
+        """
+        mysql SELECT 문 결과를 chunk_row_count 행씩 나눠서 반환 (server-side 커서, 결과 전체를 메모리에 올리지 않음)
+        다 읽거나 중간에 그만둘 때까지 이 인스턴스의 연결로 다른 쿼리를 실행할수 없음
+
+        Parameters:
+            table (str): 테이블 이름
+
+            columns (list[str]): 컬럼 리스트
+
+            where
+                (str): mysql WHERE 문
+
+                (None): 테이블 전체
+
+            chunk_row_count (int): 한번에 반환할 최대 행 수
+
+        Yields:
+            (tuple[tuple]): 행 리스트 (최대 chunk_row_count 행)
+        """
+        query = "SELECT " + ", ".join(columns) + " FROM " + table
+        if where:
+            query += " WHERE " + where
+
+        histogram = Metrics.histogram("quant_db_query_seconds", "MariaDB query latency", {"op": "select_chunk"})
+        start = time.perf_counter()
+        cursor = self.db_conn.cursor(get_db_client().cursors.SSCursor)
+        try:
+            cursor.execute(query)
+            histogram.record((time.perf_counter() - start) * 1000000)
+            while True:
+                row_list = cursor.fetchmany(chunk_row_count)
+                if not row_list:
+                    break
+                yield row_list
+        finally:
+            cursor.close()
+
     def insert(self, table, columns, data):
         """
         mysql INSERT 문
@@ -197,8 +512,11 @@ class MariaDB:
         query = query[:-2]
         query += ")"
 
-        self.execute(query, data)
-        self.db_conn.commit()
+        try:
+            self.execute(query, data)
+            self.db_conn.commit()
+        finally:
+            QueryCache.invalidate(self.db_name, table)
 
     def update(self, table, columns, data, where):
         """
@@ -235,8 +553,11 @@ class MariaDB:
         query = query[:-2]
         query += " WHERE " + where
 
-        self.execute(query, data)
-        self.db_conn.commit()
+        try:
+            self.execute(query, data)
+            self.db_conn.commit()
+        finally:
+            QueryCache.invalidate(self.db_name, table)
 
     def create(self, table, columns, data_types):
         """
@@ -287,8 +608,11 @@ class MariaDB:
         if where:
             query += " WHERE " + where
 
-        self.execute(query)
-        self.db_conn.commit()
+        try:
+            self.execute(query)
+            self.db_conn.commit()
+        finally:
+            QueryCache.invalidate(self.db_name, table)
 
     def drop(self, table):
         """
@@ -299,5 +623,8 @@ class MariaDB:
         """
         query = "DROP TABLE " + table
 
-        self.execute(query)
-        self.db_conn.commit()
+        try:
+            self.execute(query)
+            self.db_conn.commit()
+        finally:
+            QueryCache.invalidate(self.db_name, table)
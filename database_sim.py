@@ -0,0 +1,155 @@
+# coding=utf-8
+import re
+import time
+import sqlite3
+import threading
+
+# mysql 데이터 타입 -> sqlite 데이터 타입
+_TYPE_REPLACE_LIST = (
+    (re.compile(r"\bBIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY\b", re.IGNORECASE), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bAUTO_INCREMENT\b", re.IGNORECASE), "AUTOINCREMENT"),
+    (re.compile(r"\bENUM\([^)]*\)", re.IGNORECASE), "TEXT"),
+)
+
+
+class SimConnection:
+    """
+    pymysql 연결 대체 클래스 (db 이름마다 메모리 sqlite db 하나를 모든 연결이 공유함)
+
+    Attributes:
+        db_dict (dict): db 이름 -> (sqlite3.Connection, threading.RLock)
+
+        db_dict_lock (threading.Lock): db_dict 변경시 사용하는 락
+
+        connect_latency (float): 연결 생성 시간 (단위: 초, 느린 db 흉내)
+
+        query_latency (float): 쿼리 왕복 시간 (단위: 초, db 락 밖에서 대기하므로 동시 쿼리는 겹쳐서 기다림)
+
+        connect_count (int): 생성된 연결 수
+
+        db_name (str): db 이름
+    """
+
+    db_dict = {}
+    db_dict_lock = threading.Lock()
+    connect_latency = 0.0
+    query_latency = 0.0
+    connect_count = 0
+
+    def __init__(self, db_name):
+        if self.connect_latency:
+            time.sleep(self.connect_latency)
+        self.db_name = db_name
+        with self.db_dict_lock:
+            if not db_name in self.db_dict:
+                self.db_dict[db_name] = (sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None), threading.RLock())
+            SimConnection.connect_count += 1
+        self.sqlite_conn, self.lock = self.db_dict[db_name]
+
+    def cursor(self, cursor_class=None):
+        return (cursor_class or SimCursor)(self)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+    @classmethod
+    def reset(cls):
+        """
+        모든 메모리 db 삭제
+        """
+        with cls.db_dict_lock:
+            cls.db_dict = {}
+
+
+class SimCursor:
+    """
+    pymysql 커서 대체 클래스 (%s 포맷코드와 mysql 데이터 타입을 sqlite 형식으로 바꿔 실행)
+
+    Attributes:
+        conn (SimConnection): 연결
+
+        row_list (list[tuple]): 마지막 쿼리 결과
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.row_list = []
+
+    @staticmethod
+    def _convert(query):
+        query = query.replace("%s", "?")
+        if query.startswith("CREATE"):
+            for pattern, replace in _TYPE_REPLACE_LIST:
+                query = pattern.sub(replace, query)
+        return query
+
+    def execute(self, query, data=None):
+        if SimConnection.query_latency:
+            time.sleep(SimConnection.query_latency)
+        with self.conn.lock:
+            self.row_list = self.conn.sqlite_conn.execute(self._convert(query), data or ()).fetchall()
+
+    def executemany(self, query, data):
+        with self.conn.lock:
+            self.conn.sqlite_conn.executemany(self._convert(query), data)
+            self.row_list = []
+
+    def fetchall(self):
+        return tuple(self.row_list)
+
+    def close(self):
+        pass
+
+
+class SimSSCursor(SimCursor):
+    """
+    pymysql.cursors.SSCursor 대체 클래스 (결과를 한번에 가져오지 않고 fetchmany 할때마다 sqlite 커서에서 읽음)
+
+    Attributes:
+        sqlite_cursor (sqlite3.Cursor): 실행중인 sqlite 커서
+    """
+
+    def __init__(self, conn):
+        SimCursor.__init__(self, conn)
+        self.sqlite_cursor = None
+
+    def execute(self, query, data=None):
+        with self.conn.lock:
+            self.sqlite_cursor = self.conn.sqlite_conn.execute(self._convert(query), data or ())
+
+    def fetchmany(self, size):
+        with self.conn.lock:
+            return tuple(self.sqlite_cursor.fetchmany(size))
+
+    def fetchall(self):
+        with self.conn.lock:
+            return tuple(self.sqlite_cursor.fetchall())
+
+    def close(self):
+        if self.sqlite_cursor is not None:
+            self.sqlite_cursor.close()
+            self.sqlite_cursor = None
+
+
+class cursors:
+    """
+    pymysql.cursors 대체 (MariaDB.select_chunk 에서 get_db_client().cursors.SSCursor 로 사용)
+    """
+
+    SSCursor = SimSSCursor
+
+
+def connect(host=None, port=None, user=None, password=None, db=None, charset=None):
+    """
+    pymysql.connect 대체 (접속 정보는 무시하고 db 이름만 사용)
+
+    Parameters:
+        db (str): db 이름
+
+    Returns:
+        (SimConnection): 연결
+    """
+    return SimConnection(db)
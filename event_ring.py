@@ -0,0 +1,259 @@
+# coding=utf-8
+import time
+import threading
+from collections import deque
+
+import utils
+
+logger = utils.get_logger(__name__)
+
+
+class EventRing:
+    """
+    COM 이벤트 콜백과 처리 스레드 사이의 고정 크기 링 버퍼 (단일 생산자 / 단일 소비자)
+
+    creon 실시간 이벤트는 COM 메시지 루프 스레드 하나에서만 호출되므로 생산자는 하나이고,
+    소비자(처리 스레드)도 하나이므로 락 없이 생산자는 tail, 소비자는 head 만 증가시킴
+    레코드(리스트)는 미리 만들어두고 콜백에서는 레코드 칸에 헤더 값만 채워 넣음 (레코드 0번 칸은 처리할 핸들러)
+    버퍼가 가득 차면 새 이벤트를 버리고 overflow_count 를 증가시킴 (콜백이 기다리면 COM 메시지 루프가 멈추므로)
+    버리면 안되는 이벤트(주문 체결)는 spill=True 로 만들어 가득 찬 경우 새 레코드를 크기 제한 없는 spill_deque 에 넣음
+    (spill_deque 가 비워질 때까지는 이후 이벤트도 spill_deque 에 넣고, 처리 스레드는 링 버퍼를 먼저 비운 후 spill_deque 를 처리하므로 순서 유지)
+    처리를 묶어서 하는 경우 (틱 db insert 등) flush_method 를 주면 처리 스레드가 flush_count 개 처리할 때마다, 그리고 처리할 이벤트가 없어지면 호출함
+    가득 차서 이벤트를 버린 생산자는 핸들러를 drop_deque 에 넣고, 처리 스레드는 처리할 이벤트가 없어지면 handler.notify_drop() 을 호출함
+
+    Attributes:
+        name (str): 이름 (지표 라벨)
+
+        capacity (int): 레코드 수 (2의 거듭제곱)
+
+        mask (int): 레코드 인덱스 마스크 (capacity - 1)
+
+        record_list (list[list]): 미리 할당한 레코드 리스트
+
+        head (int): 다음에 처리할 레코드 번호 (소비자만 변경)
+
+        tail (int): 다음에 채울 레코드 번호 (생산자만 변경)
+
+        publish_count (int): 추가된 이벤트 수
+
+        overflow_count (int): 버퍼가 가득 차서 버린 이벤트 수
+
+        max_depth (int): 최대 대기 레코드 수
+
+        record_size (int): 레코드 칸 수
+
+        spill_deque (collections.deque): 버퍼가 가득 찬 경우 레코드를 넣는 큐 (None - spill 사용 안함)
+
+        spill_record (list): claim 에서 만든 spill 레코드 (publish 에서 spill_deque 에 넣음)
+
+        spill_count (int): spill_deque 에 넣은 이벤트 수 (생산자만 변경)
+
+        spill_done_count (int): spill_deque 에서 처리한 이벤트 수 (소비자만 변경)
+
+        drop_deque (collections.deque): 버린 이벤트를 알려야 하는 핸들러 (notify_drop 메소드가 있어야함)
+
+        flush_method (function): 묶음 처리 함수 (처리 스레드에서 호출, None - 사용 안함)
+
+        flush_count (int): flush_method 를 호출하는 처리 이벤트 수
+
+        flushed_count (int): flush_method 호출까지 끝난 이벤트 수 (소비자만 변경)
+
+        waiting (bool): 처리 스레드가 대기중인지 여부 (대기중일때만 wake_event 로 깨움)
+
+        wake_event (threading.Event): 처리 스레드를 깨우는 이벤트
+
+        worker_thread (threading.Thread): 처리 스레드 (start 호출시 생성)
+
+        start_lock (threading.Lock): 처리 스레드 생성시 사용하는 락
+    """
+
+    def __init__(self, name, capacity, record_size, spill=False, flush_method=None, flush_count=256):
+        """
+        Parameters:
+            name (str): 이름
+
+            capacity (int): 레코드 수 (2의 거듭제곱으로 올림)
+
+            record_size (int): 레코드 칸 수 (핸들러 칸 포함)
+
+            spill (bool): 버퍼가 가득 찬 경우 이벤트를 버리지 않고 spill_deque 에 넣을지 여부
+
+            flush_method (function): 묶음 처리 함수 (None - 사용 안함)
+
+            flush_count (int): flush_method 를 호출하는 처리 이벤트 수
+        """
+        self.name = name
+        self.capacity = 1 << max(0, capacity - 1).bit_length()
+        self.mask = self.capacity - 1
+        self.record_size = record_size
+        self.record_list = [[None] * record_size for _ in range(self.capacity)]
+
+        self.spill_deque = deque() if spill else None
+        self.spill_record = None
+        self.spill_count = 0
+        self.spill_done_count = 0
+
+        self.drop_deque = deque()
+
+        self.flush_method = flush_method
+        self.flush_count = flush_count
+        self.flushed_count = 0
+
+        self.head = 0
+        self.tail = 0
+        self.publish_count = 0
+        self.overflow_count = 0
+        self.max_depth = 0
+
+        self.waiting = False
+        self.wake_event = threading.Event()
+        self.worker_thread = None
+        self.start_lock = threading.Lock()
+
+    def claim(self):
+        """
+        채울 레코드 반환 (생산자, 채운 후 publish 호출)
+
+        Returns:
+            (list): 레코드
+
+            (None): 버퍼가 가득 참 (이벤트를 버림, spill 사용시에는 None 을 반환하지 않음)
+        """
+        depth = self.tail - self.head
+        if self.spill_deque is not None and (self.spill_deque or depth >= self.capacity):
+            self.spill_record = [None] * self.record_size
+            return self.spill_record
+        if depth >= self.capacity:
+            self.overflow_count += 1
+            return None
+        if depth >= self.max_depth:
+            self.max_depth = depth + 1
+        return self.record_list[self.tail & self.mask]
+
+    def publish(self):
+        """
+        claim 으로 받은 레코드를 처리 스레드에 넘김 (생산자)
+        """
+        if self.spill_record is not None:
+            self.spill_deque.append(self.spill_record)
+            self.spill_record = None
+            self.spill_count += 1
+        else:
+            self.tail += 1
+        self.publish_count += 1
+        if self.waiting:
+            self.wake_event.set()
+
+    def get_depth(self):
+        """
+        처리 대기중인 레코드 수 반환 (spill_deque 포함)
+        """
+        return self.tail - self.head + self.spill_count - self.spill_done_count
+
+    def start(self):
+        """
+        처리 스레드 시작 (이미 시작된 경우 무시, 레코드마다 record[0].process(record) 실행)
+        """
+        with self.start_lock:
+            if self.worker_thread is None:
+                self.worker_thread = threading.Thread(target=self.run_worker, daemon=True)
+                self.worker_thread.start()
+
+    def run_worker(self):
+        # COM 콜백(생산자)이 처리 스레드 때문에 늦게 실행되지 않도록 처리 스레드 우선순위를 낮춤
+        utils.lower_thread_priority()
+
+        while True:
+            if self.head == self.tail:
+                if self.spill_deque:
+                    # 링 버퍼가 빈 후에 spill_deque 처리 (spill_deque 가 빌 때까지 생산자는 링 버퍼에 넣지 않음)
+                    record = self.spill_deque.popleft()
+                    try:
+                        record[0].process(record)
+                    except Exception:
+                        logger.exception("%s event process error", self.name)
+                    self.spill_done_count += 1
+                    self.check_flush()
+                    continue
+
+                # 처리할 이벤트가 없으면 묶어둔 처리, 버린 이벤트 알림을 먼저 끝냄
+                if self.flush_method is not None and self.flushed_count != self.head + self.spill_done_count:
+                    self.flush()
+                    continue
+                if self.drop_deque:
+                    # 알린 후에 꺼냄 (wait_empty 가 알림까지 기다리도록)
+                    try:
+                        self.drop_deque[0].notify_drop()
+                    except Exception:
+                        logger.exception("%s drop notify error", self.name)
+                    self.drop_deque.popleft()
+                    continue
+
+                # waiting 을 켠 후 다시 확인하므로 그 사이에 추가된 이벤트를 놓치지 않음
+                self.waiting = True
+                if self.head == self.tail and not self.spill_deque:
+                    self.wake_event.wait(0.1)
+                    self.wake_event.clear()
+                self.waiting = False
+                continue
+
+            record = self.record_list[self.head & self.mask]
+            try:
+                record[0].process(record)
+            except Exception:
+                logger.exception("%s event process error", self.name)
+            self.head += 1
+            self.check_flush()
+
+    def check_flush(self):
+        """
+        flush_count 개 이상 처리했으면 flush 호출 (처리 스레드)
+        """
+        if self.flush_method is not None and self.head + self.spill_done_count - self.flushed_count >= self.flush_count:
+            self.flush()
+
+    def flush(self):
+        """
+        묶어둔 처리 실행 (처리 스레드)
+        """
+        done_count = self.head + self.spill_done_count
+        try:
+            self.flush_method()
+        except Exception:
+            logger.exception("%s flush error", self.name)
+        self.flushed_count = done_count
+
+    def wait_empty(self, timeout=None):
+        """
+        추가된 이벤트가 모두 처리될 때까지 대기 (flush_method 사용시 flush, 버린 이벤트 알림까지)
+
+        Parameters:
+            timeout (float): 최대 대기 시간 (단위: 초, None - 무한)
+
+        Returns:
+            (bool): 모두 처리됨 여부
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        tail = self.tail
+        spill_count = self.spill_count
+        while self.head < tail or self.spill_done_count < spill_count or (self.flush_method is not None and self.flushed_count < tail + spill_count) or self.drop_deque:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    def get_stats(self):
+        """
+        통계 반환
+
+        Returns:
+            (dict): 추가된 이벤트 수, 버린 이벤트 수, spill_deque 에 넣은 이벤트 수, 대기 레코드 수, 최대 대기 레코드 수, 레코드 수
+        """
+        return {
+            "publish": self.publish_count,
+            "overflow": self.overflow_count,
+            "spill": self.spill_count,
+            "depth": self.get_depth(),
+            "max_depth": self.max_depth,
+            "capacity": self.capacity,
+        }
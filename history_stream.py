@@ -0,0 +1,324 @@
+# coding=utf-8
+import json
+import time
+import threading
+
+import utils
+from stock_symbol import StockSymbol
+from stock_data import CHART_DAY_COLUMNS_AND_TYPES, CHART_MINUTE_COLUMNS_AND_TYPES
+from client_protocol import ENCODING_BINARY, encode_history_frame
+
+logger = utils.get_logger(__name__)
+
+# 봉 종류 -> (db 이름, 날짜시간 컬럼, 컬럼 -> db 타입)
+HISTORY_TIMEFRAME_DICT = {
+    "1min": ("KR_STOCK_DATA_1MIN", "date_time", CHART_MINUTE_COLUMNS_AND_TYPES),
+    "1day": ("KR_STOCK_DATA_1DAY", "date", CHART_DAY_COLUMNS_AND_TYPES),
+}
+# db 타입 -> 바이너리 프레임 컬럼의 array 타입 코드
+_TYPECODE_DICT = {"INT": "i", "BIGINT": "q", "DOUBLE": "d"}
+
+DEFAULT_CHUNK_ROW_COUNT = 5000  # 묶음당 기본 행 수
+MAX_CHUNK_ROW_COUNT = 50000  # 묶음당 최대 행 수
+DEFAULT_WINDOW = 8  # 기본 전송 창 (ack 받지 않고 보낼수 있는 묶음 수)
+MAX_WINDOW = 64  # 최대 전송 창
+ACK_TIMEOUT_SEC = 30  # 전송 창이 가득 찬 후 ack 를 기다리는 최대 시간 (지나면 요청 취소, server.TaskHistory 에서 검사)
+
+
+class HistoryStream:
+    """
+    과거 봉 조회 요청 하나의 전송 상태 (server.TaskHistory)
+
+    종목마다 날짜시간 (기본 키) 순서로 chunk_row_count 행씩 읽어 컬럼 단위로 묶어 보내고 (binary - FRAME_HISTORY 프레임, json - history_chunk 메시지)
+    클라이언트가 history_ack 로 처리한 묶음 수를 알려줄 때까지 window 개를 넘게 보내지 않으므로
+    서버 메모리는 요청당 최대 window 개 묶음으로 제한되고 느린 클라이언트는 db 읽기를 멈추게 함
+    종목은 여러 처리 스레드가 나눠서 읽으므로 묶음은 종목끼리 섞여서 감 (종목 안에서는 seq 순서)
+    전송 창이 비면 처리 스레드는 ack 를 기다리지 않고 종목 작업을 멈춰두고 (parked_list, 마지막으로 보낸 날짜시간 기억) 다른 작업을 처리하며
+    ack 가 오면 멈춰둔 작업을 다시 작업 대기열에 넣음 (ack 하지 않는 클라이언트가 처리 스레드를 잡고 있지 않음)
+
+    Attributes:
+        username (str): 요청한 사용자
+
+        req_id (int): 클라이언트가 정한 요청 id
+
+        stock_code_list (list[str]): 종목 코드 리스트
+
+        timeframe (str): 봉 종류 (HISTORY_TIMEFRAME_DICT 키)
+
+        encoding (str): 클라이언트 인코딩
+
+        chunk_row_count (int): 묶음당 최대 행 수
+
+        db_name (str): db 이름
+
+        column_list (list[str]): 컬럼 리스트
+
+        typecode_list (list[str]): 컬럼별 array 타입 코드
+
+        date_column (str): 날짜시간 컬럼 (기본 키, 이어서 읽을 위치)
+
+        key_index (int): 행에서 날짜시간 컬럼 위치
+
+        start (int): 시작 날짜시간 (포함)
+
+        end (int): 끝 날짜시간 (포함)
+
+        window (int): 전송 창 크기
+
+        credit (int): 남은 전송 창 (묶음을 보낼때 하나씩 쓰고 ack 받으면 돌려받음)
+
+        parked_list (list[tuple]): 전송 창이 비어 멈춰둔 작업 (HistoryStream, 종목 코드, 다음 seq, 마지막으로 보낸 날짜시간) 리스트
+
+        park_time (float): 작업을 멈춰두기 시작한 시간 (time.monotonic, None - 멈춘 작업 없음)
+
+        active (bool): 전송중 여부 (취소시 False)
+
+        lock (threading.Lock): 전송 창 / 멈춘 작업 / 통계 / 남은 종목 수 변경시 사용하는 락
+
+        remain_count (int): 아직 다 보내지 않은 종목 수
+
+        row_count (int): 보낸 행 수
+
+        chunk_count (int): 보낸 묶음 수
+
+        error_list (list[str]): 읽지 못한 종목 코드 리스트 (테이블 없음 등)
+
+        start_time (float): 요청 시작 시간 (time.perf_counter)
+    """
+
+    def __init__(self, username, req_id, stock_code_list, timeframe, start, end, encoding, chunk_row_count=DEFAULT_CHUNK_ROW_COUNT, window=DEFAULT_WINDOW):
+        """
+        Parameters:
+            username (str): 요청한 사용자
+
+            req_id (int): 요청 id
+
+            stock_code_list (list[str]): 종목 코드 리스트
+
+            timeframe (str): 봉 종류 ("1min" - 1분봉 (날짜시간 YYYYMMDDhhmm), "1day" - 일봉 (날짜 YYYYMMDD))
+
+            start (int): 시작 날짜시간 (포함)
+
+            end (int): 끝 날짜시간 (포함)
+
+            encoding (str): 클라이언트 인코딩
+
+            chunk_row_count (int): 묶음당 최대 행 수
+
+            window (int): 전송 창
+        """
+        self.username = username
+        self.req_id = req_id
+        self.stock_code_list = stock_code_list
+        self.timeframe = timeframe
+        self.encoding = encoding
+        self.chunk_row_count = chunk_row_count
+
+        self.db_name, self.date_column, columns_and_types = HISTORY_TIMEFRAME_DICT[timeframe]
+        self.column_list = list(columns_and_types)
+        self.key_index = self.column_list.index(self.date_column)
+        self.typecode_list = [_TYPECODE_DICT[data_type.split(" ", 1)[0]] for data_type in columns_and_types.values()]
+        self.start = int(start)
+        self.end = int(end)
+
+        self.window = window
+        self.credit = window
+        self.parked_list = []
+        self.park_time = None
+        self.active = True
+
+        self.lock = threading.Lock()
+        self.remain_count = len(stock_code_list)
+        self.row_count = 0
+        self.chunk_count = 0
+        self.error_list = []
+        self.start_time = time.perf_counter()
+
+    @classmethod
+    def from_req_data(cls, username, req_data, encoding):
+        """
+        history 요청으로 생성 (잘못된 요청이면 ValueError / KeyError / TypeError)
+
+        Parameters:
+            username (str): 요청한 사용자
+
+            req_data (dict): {"req_id", "stock_code_list", "timeframe", "start", "end", "chunk_row_count" (선택), "window" (선택)}
+
+            encoding (str): 클라이언트 인코딩
+        """
+        if not req_data["timeframe"] in HISTORY_TIMEFRAME_DICT:
+            raise ValueError("invalid timeframe : " + str(req_data["timeframe"]))
+        stock_code_list = [str(stock_code) for stock_code in req_data["stock_code_list"]]
+        if not stock_code_list or not all(StockSymbol.find_id(stock_code) is not None for stock_code in stock_code_list):
+            raise ValueError("invalid stock_code_list")  # 등록되지 않은 종목 코드 (StockSymbol 에 등록하지 않음)
+
+        return cls(
+            username,
+            int(req_data["req_id"]),
+            stock_code_list,
+            req_data["timeframe"],
+            int(req_data["start"]),
+            int(req_data["end"]),
+            encoding,
+            min(max(int(req_data.get("chunk_row_count", DEFAULT_CHUNK_ROW_COUNT)), 1), MAX_CHUNK_ROW_COUNT),
+            min(max(int(req_data.get("window", DEFAULT_WINDOW)), 1), MAX_WINDOW),
+        )
+
+    def get_start_json(self):
+        """
+        요청 시작 메시지 (컬럼 형식, binary 인코딩은 종목 id -> 종목 코드 포함)
+        """
+        res_data = {
+            "req_id": self.req_id,
+            "timeframe": self.timeframe,
+            "stock_code_list": self.stock_code_list,
+            "column_list": [[column, typecode] for column, typecode in zip(self.column_list, self.typecode_list)],
+        }
+        if self.encoding == ENCODING_BINARY:
+            res_data["symbol_map"] = {stock_code: StockSymbol.get_id(stock_code) for stock_code in self.stock_code_list}
+        return json.dumps({"res_type": "history_start", "res_data": res_data})
+
+    def get_end_json(self):
+        """
+        요청 종료 메시지 (보낸 행 / 묶음 수, 읽지 못한 종목, 취소 여부, 걸린 시간)
+        """
+        res_data = {
+            "req_id": self.req_id,
+            "row_count": self.row_count,
+            "chunk_count": self.chunk_count,
+            "error_list": self.error_list,
+            "cancelled": not self.active,
+            "elapsed_ms": (time.perf_counter() - self.start_time) * 1000,
+        }
+        return json.dumps({"res_type": "history_end", "res_data": res_data})
+
+    def encode_chunk(self, stock_code, seq, row_list):
+        """
+        행 리스트를 컬럼 단위 묶음으로 변환
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            seq (int): 종목별 묶음 번호
+
+            row_list (tuple[tuple]): db 행 리스트 (column_list 순서)
+
+        Returns:
+            (bytes): FRAME_HISTORY 프레임 (binary 인코딩)
+
+            (str): history_chunk json 문자열 (json 인코딩)
+        """
+        column_list = list(zip(*row_list))
+        if self.encoding == ENCODING_BINARY:
+            return encode_history_frame(self.req_id, StockSymbol.get_id(stock_code), seq, self.typecode_list, column_list)
+
+        res_data = {"req_id": self.req_id, "stock_code": stock_code, "seq": seq, "column_dict": dict(zip(self.column_list, column_list))}
+        return json.dumps({"res_type": "history_chunk", "res_data": res_data})
+
+    def get_where(self, last_key=None):
+        """
+        다음 묶음 조회 조건 (마지막으로 보낸 날짜시간 다음부터 chunk_row_count 행)
+
+        Parameters:
+            last_key (int): 마지막으로 보낸 날짜시간 (None - 처음부터)
+        """
+        if last_key is None:
+            return "{0} BETWEEN {1} AND {2} ORDER BY {0} LIMIT {3}".format(self.date_column, self.start, self.end, self.chunk_row_count)
+        return "{0} > {1} AND {0} <= {2} ORDER BY {0} LIMIT {3}".format(self.date_column, last_key, self.end, self.chunk_row_count)
+
+    def fetch(self, db, stock_code, send, seq=0, last_key=None):
+        """
+        종목 하나의 봉을 묶음 단위로 읽어 보냄 (처리 스레드, 전송 창이 비면 작업을 parked_list 에 멈춰두고 반환)
+
+        Parameters:
+            db (database.MariaDB): 처리 스레드의 db 인스턴스 (db_name)
+
+            stock_code (str): 종목 코드
+
+            send (function): 묶음을 전송 대기열에 넣는 함수 (인자 - encode_chunk 반환값)
+
+            seq (int): 다음 묶음 번호 (멈춘 작업을 이어서 읽는 경우)
+
+            last_key (int): 마지막으로 보낸 날짜시간 (None - 처음부터)
+
+        Returns:
+            (bool): 요청의 마지막 종목이었는지 여부 (True 면 호출한 쪽에서 종료 메시지 전송, 작업을 멈춰둔 경우 False)
+        """
+        try:
+            while True:
+                # 전송 창을 먼저 받은 후 읽음 (창이 비면 읽지 않고 멈춰둠)
+                with self.lock:
+                    if not self.active:
+                        break
+                    if self.credit == 0:
+                        self.parked_list.append((self, stock_code, seq, last_key))
+                        if self.park_time is None:
+                            self.park_time = time.monotonic()
+                        return False
+                    self.credit -= 1
+
+                chunk_iter = db.select_chunk(stock_code, self.column_list, self.get_where(last_key), self.chunk_row_count)
+                try:
+                    row_list = next(chunk_iter, None)
+                finally:
+                    chunk_iter.close()
+                if not row_list:
+                    with self.lock:
+                        self.credit += 1
+                    break
+
+                send(self.encode_chunk(stock_code, seq, row_list))
+                seq += 1
+                last_key = row_list[-1][self.key_index]
+                with self.lock:
+                    self.row_count += len(row_list)
+                    self.chunk_count += 1
+                if len(row_list) < self.chunk_row_count:
+                    break
+        except Exception as e:
+            logger.warning("history fetch error : %s (%s)", stock_code, e)
+            with self.lock:
+                self.error_list.append(stock_code)
+
+        with self.lock:
+            self.remain_count -= 1
+            return self.remain_count == 0
+
+    def ack(self, count=1):
+        """
+        클라이언트가 처리한 묶음 수만큼 전송 창을 돌려받음 (보내고 ack 받지 않은 묶음 수까지만)
+
+        Parameters:
+            count (int): 처리한 묶음 수
+
+        Returns:
+            (list[tuple]): 다시 작업 대기열에 넣을 멈춘 작업 리스트 (돌려받은 전송 창 수까지)
+        """
+        with self.lock:
+            count = min(max(1, int(count)), self.window - self.credit)
+            self.credit += count
+            resume_list = self.parked_list[:count]
+            del self.parked_list[:count]
+            self.park_time = time.monotonic() if self.parked_list else None
+        return resume_list
+
+    def is_ack_timeout(self):
+        """
+        멈춘 작업이 ACK_TIMEOUT_SEC 동안 ack 를 받지 못했는지 여부
+        """
+        park_time = self.park_time
+        return park_time is not None and time.monotonic() - park_time > ACK_TIMEOUT_SEC
+
+    def cancel(self):
+        """
+        전송 중단
+
+        Returns:
+            (list[tuple]): 다시 작업 대기열에 넣을 멈춘 작업 리스트 (처리 스레드가 종목을 끝내고 마지막 종목이면 종료 메시지 전송)
+        """
+        with self.lock:
+            self.active = False
+            resume_list = self.parked_list
+            self.parked_list = []
+            self.park_time = None
+        return resume_list
@@ -0,0 +1,280 @@
+# coding=utf-8
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# 히스토그램 구간 설정 (2의 거듭제곱 구간마다 _SUB_BUCKET_HALF 개의 구간, 상대 오차 약 3%)
+_SUB_BUCKET_BITS = 5
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF = _SUB_BUCKET_COUNT >> 1
+_MAX_SHIFT = 40
+_BUCKET_COUNT = _SUB_BUCKET_COUNT + _MAX_SHIFT * _SUB_BUCKET_HALF
+
+# 통계로 보여줄 백분위
+STATS_PERCENTILE_LIST = (50, 90, 99, 99.9)
+
+
+class LatencyHistogram:
+    """
+    HDR 히스토그램 방식의 지연시간 분포 클래스 (단위: us, 고정 크기 구간 배열로 기록 비용이 일정함)
+
+    Attributes:
+        bucket_list (list[int]): 구간별 기록 횟수
+
+        count (int): 전체 기록 횟수
+
+        total (int): 기록된 값의 합
+
+        min_value (int): 최소값
+
+        max_value (int): 최대값
+
+        lock (threading.Lock): 초기화시 사용하는 락
+    """
+
+    def __init__(self):
+        self.bucket_list = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total = 0
+        self.min_value = None
+        self.max_value = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _get_index(value):
+        if value < _SUB_BUCKET_COUNT:
+            return value
+        shift = min(value.bit_length() - _SUB_BUCKET_BITS, _MAX_SHIFT)
+        top = min(value >> shift, _SUB_BUCKET_COUNT - 1)
+        return _SUB_BUCKET_COUNT + (shift - 1) * _SUB_BUCKET_HALF + (top - _SUB_BUCKET_HALF)
+
+    @staticmethod
+    def _get_value(index):
+        if index < _SUB_BUCKET_COUNT:
+            return index
+        shift = (index - _SUB_BUCKET_COUNT) // _SUB_BUCKET_HALF + 1
+        top = (index - _SUB_BUCKET_COUNT) % _SUB_BUCKET_HALF + _SUB_BUCKET_HALF
+        return (top << shift) + (1 << (shift - 1))  # 구간의 중간값
+
+    def record(self, value):
+        """
+        값 기록 (락 없이 기록하므로 여러 스레드에서 동시에 기록하면 일부 누락될 수 있음)
+
+        Parameters:
+            value (int / float): 기록할 값 (단위: us, 음수는 0으로 기록)
+        """
+        value = int(value)
+        if value < _SUB_BUCKET_COUNT:
+            if value < 0:
+                value = 0
+            index = value
+        else:
+            shift = value.bit_length() - _SUB_BUCKET_BITS
+            if shift > _MAX_SHIFT:
+                index = _BUCKET_COUNT - 1
+            else:
+                index = _SUB_BUCKET_COUNT - _SUB_BUCKET_HALF * 2 + shift * _SUB_BUCKET_HALF + (value >> shift)
+
+        self.bucket_list[index] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max_value:
+            self.max_value = value
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+
+    def get_percentile(self, percentile):
+        """
+        백분위 값 반환
+
+        Parameters:
+            percentile (float): 백분위 (0 ~ 100)
+
+        Returns:
+            (int): 백분위 값 (단위: us, 기록이 없으면 0)
+        """
+        if not self.count:
+            return 0
+
+        target = max(1, self.count * percentile / 100)
+        acc = 0
+        for index, bucket_count in enumerate(self.bucket_list):
+            acc += bucket_count
+            if acc >= target:
+                return min(self._get_value(index), self.max_value)
+        return self.max_value
+
+    def get_stats(self):
+        """
+        통계 반환 (단위: ms)
+
+        Returns:
+            (dict): 기록 횟수, 최소, 평균, 백분위, 최대값
+        """
+        stats = {
+            "count": self.count,
+            "min": (self.min_value or 0) / 1000,
+            "mean": self.total / self.count / 1000 if self.count else 0,
+        }
+        for percentile in STATS_PERCENTILE_LIST:
+            stats["p" + str(percentile)] = self.get_percentile(percentile) / 1000
+        stats["max"] = self.max_value / 1000
+        return stats
+
+    def merge(self, histogram):
+        """
+        다른 히스토그램의 기록을 합침 (스레드별로 따로 기록한 히스토그램 합산)
+
+        Parameters:
+            histogram (LatencyHistogram): 합칠 히스토그램
+        """
+        with self.lock:
+            for index, count in enumerate(histogram.bucket_list):
+                if count:
+                    self.bucket_list[index] += count
+            self.count += histogram.count
+            self.total += histogram.total
+            self.max_value = max(self.max_value, histogram.max_value)
+            if histogram.min_value is not None and (self.min_value is None or histogram.min_value < self.min_value):
+                self.min_value = histogram.min_value
+
+    def reset(self):
+        """
+        기록 초기화
+        """
+        with self.lock:
+            self.bucket_list = [0] * _BUCKET_COUNT
+            self.count = 0
+            self.total = 0
+            self.min_value = None
+            self.max_value = 0
+
+
+class OrderLatency:
+    """
+    주문 처리 단계별 지연시간 측정 클래스
+
+    주문 요청의 단계별 시간(time.perf_counter)을 주문번호로 묶어 실시간 주문 체결 이벤트까지 추적하고
+    단계 구간마다 LatencyHistogram 에 기록함
+
+    단계:
+        socket_recv - 소켓에서 요청 수신 (ClientConn.socket_recv)
+        execute_recv_req - 수신 큐에서 꺼냄 (ClientConn.execute_recv_req)
+        submit - 주문 대기열에 추가 (OrderDispatcher.insert)
+        dispatch - 주문 처리 스레드가 대기열에서 꺼냄 (TaskOrder)
+        block_request_start, block_request_end - creon BlockRequest 시작 / 끝
+        ack - 주문번호 반환
+        RECEIVED, CONFIRMED, CONCLUDED - 실시간 주문 체결 이벤트 수신 (TradeStatusRtEvent.OnReceived)
+
+    Attributes:
+        histogram_dict (dict): 구간 이름 -> LatencyHistogram
+
+        order_dict (collections.OrderedDict): 주문번호 -> 주문번호 반환 시간 (실시간 이벤트 대기중인 주문, 최대 max_order_count개)
+
+        max_order_count (int): 추적할 최대 주문 수
+
+        lock (threading.Lock): order_dict 변경시 사용하는 락
+    """
+
+    # (구간 이름, 시작 단계, 끝 단계)
+    STAGE_SECTION_LIST = (
+        ("socket_recv>execute_recv_req", "socket_recv", "execute_recv_req"),
+        ("execute_recv_req>dispatch", "execute_recv_req", "dispatch"),
+        ("submit>dispatch", "submit", "dispatch"),
+        ("dispatch>block_request_start", "dispatch", "block_request_start"),
+        ("block_request", "block_request_start", "block_request_end"),
+        ("block_request_end>ack", "block_request_end", "ack"),
+        ("socket_recv>ack", "socket_recv", "ack"),
+    )
+
+    histogram_dict = {}
+    order_dict = OrderedDict()
+    max_order_count = 10000
+    lock = threading.Lock()
+
+    @classmethod
+    def get_histogram(cls, name):
+        """
+        구간 이름의 히스토그램 반환 (없으면 생성)
+
+        Parameters:
+            name (str): 구간 이름
+
+        Returns:
+            (LatencyHistogram): 히스토그램
+        """
+        histogram = cls.histogram_dict.get(name)
+        if histogram is None:
+            histogram = cls.histogram_dict.setdefault(name, LatencyHistogram())
+        return histogram
+
+    @classmethod
+    def add_order(cls, order_num, latency):
+        """
+        주문번호를 받은 주문의 단계별 시간 기록
+
+        Parameters:
+            order_num (int / bool): 주문번호 (False - 주문 실패, 실시간 이벤트 추적 안함)
+
+            latency (dict): 단계 이름 -> 시간 (time.perf_counter)
+        """
+        for name, start_stage, end_stage in cls.STAGE_SECTION_LIST:
+            if start_stage in latency and end_stage in latency:
+                cls.get_histogram(name).record((latency[end_stage] - latency[start_stage]) * 1000000)
+
+        if not order_num or not "ack" in latency:
+            return
+
+        with cls.lock:
+            cls.order_dict[order_num] = latency["ack"]
+            if len(cls.order_dict) > cls.max_order_count:
+                cls.order_dict.popitem(last=False)
+
+    @classmethod
+    def add_trade_status(cls, order_num, conclusion_type_name, recv_time=None):
+        """
+        실시간 주문 체결 이벤트 수신 시간 기록 (주문번호 반환 시점 기준)
+
+        Parameters:
+            order_num (int): 주문번호
+
+            conclusion_type_name (str): 체결 타입 이름 (RECEIVED, CONFIRMED, CONCLUDED, REJECTED)
+
+            recv_time (float): 이벤트 수신 시간 (time.perf_counter, None - 현재)
+        """
+        now = time.perf_counter() if recv_time is None else recv_time
+        ack_time = cls.order_dict.get(order_num)
+        if ack_time is None:
+            return
+
+        cls.get_histogram("ack>" + conclusion_type_name).record((now - ack_time) * 1000000)
+
+    @classmethod
+    def get_stats(cls):
+        """
+        구간별 지연시간 통계 반환
+
+        Returns:
+            (dict): 구간 이름 -> 통계 (LatencyHistogram.get_stats, 단위: ms)
+        """
+        return {name: histogram.get_stats() for name, histogram in list(cls.histogram_dict.items())}
+
+    @classmethod
+    def dump(cls, file_path):
+        """
+        구간별 지연시간 통계와 히스토그램 구간 데이터를 파일로 저장
+
+        Parameters:
+            file_path (str): 저장할 파일 경로 (json)
+        """
+        dump_data = {
+            "date_time": time.strftime("%Y%m%d%H%M%S"),
+            "stats": cls.get_stats(),
+            "bucket": {
+                name: {str(LatencyHistogram._get_value(index)): count for index, count in enumerate(histogram.bucket_list) if count}
+                for name, histogram in list(cls.histogram_dict.items())
+            },
+        }
+        with open(file_path, "w") as dump_file:
+            json.dump(dump_data, dump_file, indent=4)
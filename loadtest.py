@@ -0,0 +1,532 @@
+# coding=utf-8
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import subprocess
+import threading
+import logging
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import utils
+import server
+import bootstrap
+from creon_sim import SimMarket
+from snapshot import ServerSnapshot
+from database import MariaDB
+from auth import AuthService
+from latency_stats import LatencyHistogram
+from unconcluded_order import UNCONCLUDED_ORDER_COLUMNS
+from creon_api import LIMIT_TYPE
+from client_protocol import ClientStreamDecoder, ENCODING_JSON, COMPRESSION_NONE
+
+LOADTEST_PASSWORD = "loadtest"
+
+# 부하 테스트용 메모리 db 테이블 (db 이름, 테이블 이름) -> 컬럼
+_LOADTEST_TABLE_DICT = {
+    ("mysql", "user"): ("User", "Password"),
+    ("KR_OPERATION_DATA", "KR_Stock_List"): ("stock_code", "stock_name", "market_kind", "section_kind", "wics_code"),
+    ("KR_OPERATION_DATA", "KR_Stock_Balance"): (
+        "stock_code",
+        "stock_name",
+        "market_kind",
+        "section_kind",
+        "wics_code",
+        "average_unit_price",
+        "profit_unit_price",
+        "quantity",
+        "able_sell_quantity",
+        "profit",
+        "profit_ratio",
+        "evaluation",
+        "current_price",
+    ),
+    ("KR_OPERATION_DATA", "KR_Unconcluded_Order"): UNCONCLUDED_ORDER_COLUMNS,
+}
+_TRADE_HISTORY_COLUMNS = (
+    "date_time",
+    "order_number",
+    "conclusion_type",
+    "order_type",
+    "modify_cancel_type",
+    "origin_order_number",
+    "stock_code",
+    "stock_name",
+    "quantity",
+    "price_type",
+    "order_condition",
+    "price",
+    "total_price",
+    "average_price",
+    "able_sell_quantity",
+    "balance_quantity",
+)
+_LOADTEST_TABLE_DICT[("KR_OPERATION_DATA", "KR_Order_History")] = _TRADE_HISTORY_COLUMNS
+_LOADTEST_TABLE_DICT[("KR_OPERATION_DATA", "KR_Conclusion_History")] = _TRADE_HISTORY_COLUMNS
+
+
+class LoadTestClient:
+    """
+    부하 테스트용 가상 클라이언트 (로그인 -> 종목 실시간 구독 -> 주문)
+
+    Attributes:
+        username (str): 사용자
+
+        stock_code_list (list[str]): 구독할 종목 코드 리스트
+
+        tick_time_dict (dict): (종목 코드, 누적 거래량) -> 틱 발생 시간 (time.perf_counter, 모든 클라이언트 공유)
+
+        tick_histogram (LatencyHistogram): 틱 발생 ~ 클라이언트 수신 시간 (단위: us)
+
+        order_histogram (LatencyHistogram): 주문 요청 ~ 주문번호 수신 시간 (단위: us)
+
+        order_send_time_list (list[float]): 응답을 기다리는 주문의 요청 시간 (같은 종목만 주문하므로 요청 순서대로 응답)
+
+        count_dict (dict): 수신 / 주문 통계
+
+        encoding (str): 로그인시 요청할 전송 인코딩 (client_protocol.ENCODING_LIST)
+
+        compression (str): 로그인시 요청할 전송 압축 (client_protocol.COMPRESSION_LIST)
+    """
+
+    def __init__(self, username, stock_code_list, tick_time_dict, encoding=ENCODING_JSON, compression=COMPRESSION_NONE):
+        self.username = username
+        self.stock_code_list = stock_code_list
+        self.tick_time_dict = tick_time_dict
+        self.encoding = encoding
+        self.compression = compression
+
+        self.tick_histogram = LatencyHistogram()
+        self.order_histogram = LatencyHistogram()
+        self.order_send_time_list = []
+        self.count_dict = {"tick": 0, "unknown_tick": 0, "order": 0, "order_ack": 0, "order_fail": 0, "order_reject": 0, "recv_byte": 0, "feed_status": 0, "feed_gap": 0, "gap_bar": 0}
+
+        self.socket_conn = None
+        self.send_lock = threading.Lock()
+
+    def connect(self, port):
+        """
+        서버 접속 후 로그인
+
+        Returns:
+            (bool): 로그인 성공 여부
+        """
+        self.socket_conn = socket.create_connection(("127.0.0.1", port))
+        self.socket_conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.socket_conn.sendall(json.dumps({"username": self.username, "password": LOADTEST_PASSWORD, "encoding": self.encoding, "compression": self.compression}).encode("utf-8"))
+
+        login_result = self.socket_conn.recv(7)
+        if login_result != b"SUCCESS":
+            return False
+
+        recv_thread = threading.Thread(target=self.run_recv, daemon=True)
+        recv_thread.start()
+        return True
+
+    def send(self, req):
+        with self.send_lock:
+            self.socket_conn.sendall(json.dumps(req).encode("utf-8"))
+
+    def subscribe(self):
+        self.send({"req_type": "stock_tick_rt_sub", "req_data": {"set_status": True, "stock_code_list": self.stock_code_list}})
+
+    def order(self, stock_code, price):
+        self.order_send_time_list.append(time.perf_counter())
+        self.count_dict["order"] += 1
+        self.send(
+            {
+                "req_type": "order",
+                "req_data": {"order_type": "buy", "stock_code": stock_code, "qty": 1, "e_order_condition": "NONE", "e_price_type": "NORMAL", "price": price},
+            }
+        )
+
+    def run_recv(self):
+        decoder = ClientStreamDecoder(self.encoding, self.compression)
+        while True:
+            try:
+                recv_data = self.socket_conn.recv(65536)
+            except OSError:
+                break
+            if not recv_data:
+                break
+
+            self.count_dict["recv_byte"] += len(recv_data)
+            res_list = decoder.feed(recv_data)
+            recv_time = time.perf_counter()
+            for res in res_list:
+                self.handle(res, recv_time)
+
+    def handle(self, res, recv_time):
+        if res["res_type"] == "stock_tick_rt_data":
+            tick_time = self.tick_time_dict.get((res["res_data"]["stock_code"], res["res_data"]["vol"]))
+            if tick_time is None:
+                self.count_dict["unknown_tick"] += 1
+                return
+            self.tick_histogram.record((recv_time - tick_time) * 1000000)
+            self.count_dict["tick"] += 1
+
+        elif res["res_type"] == "order":
+            if self.order_send_time_list:
+                self.order_histogram.record((recv_time - self.order_send_time_list.pop(0)) * 1000000)
+            if res["res_data"]["order_num"]:
+                self.count_dict["order_ack"] += 1
+            elif "reject_reason" in res["res_data"]:
+                self.count_dict["order_reject"] += 1
+            else:
+                self.count_dict["order_fail"] += 1
+
+        elif res["res_type"] == "feed_status":
+            self.count_dict["feed_status"] += 1
+
+        elif res["res_type"] == "feed_gap":
+            self.count_dict["feed_gap"] += 1
+            self.count_dict["gap_bar"] += sum(len(stock["bar_list"]) for stock in res["res_data"]["stock_list"])
+
+    def close(self):
+        try:
+            self.socket_conn.sendall(b"CLOSE")
+            self.socket_conn.close()
+        except OSError:
+            pass
+
+
+def seed_db(stock_code_list, username_list):
+    """
+    부하 테스트용 메모리 db 테이블 생성 및 종목 / 사용자 데이터 추가 (같은 프로세스에서 여러번 호출해도 이미 있는 행은 추가 안함)
+    """
+    for (db_name, table), columns in _LOADTEST_TABLE_DICT.items():
+        MariaDB(db_name).create(table, columns, ["TEXT"] * len(columns))
+
+    db_mysql = MariaDB("mysql")
+    password_hash = AuthService.hash_password(LOADTEST_PASSWORD)
+    user_list = [[username, password_hash] for username in username_list if not db_mysql.is_exist("user", "User = '" + username + "'")]
+    if user_list:
+        db_mysql.insert("user", ["User", "Password"], user_list)
+
+    db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
+    stock_list = [
+        [stock_code, SimMarket.stock_dict[stock_code][0], "KOSPI", "ST", ""]
+        for stock_code in stock_code_list
+        if not db_kr_operation_data.is_exist("KR_Stock_List", "stock_code = '" + stock_code + "'")
+    ]
+    if stock_list:
+        db_kr_operation_data.insert("KR_Stock_List", ["stock_code", "stock_name", "market_kind", "section_kind", "wics_code"], stock_list)
+
+
+def get_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as tmp_socket:
+        tmp_socket.bind(("127.0.0.1", 0))
+        return tmp_socket.getsockname()[1]
+
+
+def get_git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_rss_mb():
+    """
+    현재 / 최대 메모리 사용량 반환 (단위: MB, 지원하지 않는 os 는 None)
+    """
+    cur_rss = None
+    try:
+        with open("/proc/self/statm") as statm_file:
+            cur_rss = int(statm_file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1048576
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    return cur_rss, max_rss
+
+
+def run_load_test(client_count=20, symbol_count=50, sub_count=10, tick_rate=2000, duration=10.0, order_rate=2.0, trade_limit=1000, seed=0, drain_timeout=10.0, disconnect_at=None, silent_disconnect=False, encoding=ENCODING_JSON, compression=COMPRESSION_NONE):
+    """
+    가상 creon / 메모리 db 백엔드로 QuantServer 를 실행하고 클라이언트 부하를 걸어 성능 측정
+
+    클라이언트와 서버가 같은 프로세스에서 실행되므로 cpu 사용량에는 클라이언트 처리도 포함됨
+
+    Parameters:
+        client_count (int): 클라이언트 수
+
+        symbol_count (int): 종목 수
+
+        sub_count (int): 클라이언트당 구독 종목 수
+
+        tick_rate (float): 초당 틱 수 (전체 종목 합계)
+
+        duration (float): 틱 발생 시간 (단위: 초)
+
+        order_rate (float): 클라이언트당 초당 주문 수 (0 - 주문 안함)
+
+        trade_limit (int): 가상 creon 의 초당 주문 요청 제한
+
+        seed (int): 틱 생성 난수 시드
+
+        drain_timeout (float): 틱 발생 종료후 남은 메시지 수신 대기 최대 시간 (단위: 초)
+
+        disconnect_at (float): 틱 발생 시작후 가상 creon 연결을 끊는 시점 (단위: 초, None - 끊지 않음, 재접속 감시 스레드 테스트용)
+
+        silent_disconnect (bool): 연결 상태는 정상으로 두고 실시간 이벤트만 끊음 (STALE 감지 테스트용)
+
+        encoding (str): 클라이언트 전송 인코딩 (client_protocol.ENCODING_LIST)
+
+        compression (str): 클라이언트 전송 압축 (client_protocol.COMPRESSION_LIST)
+
+    Returns:
+        (dict): 측정 결과 (server_error - 서버 스레드 예외, 접속 종료 후 남은 클라이언트 수)
+    """
+    bootstrap.init(creon_backend="sim", db_backend="sim")
+
+    # 서버 스레드에서 처리되지 않은 예외 기록 (기본 출력은 유지)
+    thread_error_list = []
+    default_excepthook = threading.excepthook
+
+    def record_thread_error(args):
+        thread_error_list.append("{} : {!r}".format(args.thread.name if args.thread else None, args.exc_value))
+        default_excepthook(args)
+
+    threading.excepthook = record_thread_error
+
+    SimMarket.reset()
+    SimMarket.load_stock_list(symbol_count)
+    SimMarket.limit_rule_dict[LIMIT_TYPE.TRADE_REQUEST.value] = (trade_limit, 1.0)
+    stock_code_list = sorted(SimMarket.stock_dict)[:symbol_count]
+
+    username_list = ["loadtest{}".format(idx) for idx in range(client_count)]
+    seed_db(stock_code_list, username_list)
+
+    # 서버 시작
+    server.PORT = get_free_port()
+    server.METRICS_PORT = 0
+    ServerSnapshot.file_path = os.path.join(tempfile.gettempdir(), "loadtest_snapshot_{}.json.gz".format(os.getpid()))
+    start = time.perf_counter()
+    quant_server = server.QuantServer()
+    quant_server.start_server(warm_restart=False)
+    if disconnect_at is not None:
+        # 장 시간과 관계없이 짧은 주기로 끊김 확인
+        quant_server.creon_supervisor.check_interval = 0.1
+        quant_server.creon_supervisor.stale_sec = 0.5
+        quant_server.creon_supervisor.market_open_time = 0
+        quant_server.creon_supervisor.market_close_time = 240000
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", server.PORT)).close()
+            break
+        except OSError:
+            time.sleep(0.01)
+    startup_sec = time.perf_counter() - start
+
+    # 클라이언트 접속, 구독
+    tick_time_dict = {}
+    client_list = []
+    sub_user_count_dict = {}
+    for idx, username in enumerate(username_list):
+        client_stock_code_list = [stock_code_list[(idx * sub_count + sub_idx) % symbol_count] for sub_idx in range(sub_count)]
+        client = LoadTestClient(username, client_stock_code_list, tick_time_dict, encoding, compression)
+        if not client.connect(server.PORT):
+            raise RuntimeError("login failed : " + username)
+        time.sleep(0.01)  # 서버가 접속을 등록할 시간
+        client.subscribe()
+        client_list.append(client)
+
+        for stock_code in set(client_stock_code_list):
+            sub_user_count_dict[stock_code] = sub_user_count_dict.get(stock_code, 0) + 1
+
+    sub_stock_code_list = sorted(sub_user_count_dict)
+    deadline = time.monotonic() + 30
+    while len([sub_key for sub_key in SimMarket.sub_dict if sub_key[0] == "tick"]) < len(sub_stock_code_list):
+        if time.monotonic() > deadline:
+            raise RuntimeError("subscribe timeout")
+        time.sleep(0.05)
+
+    # 틱 발생 (1배속) + 주문
+    event_list = SimMarket.make_event_list(sub_stock_code_list, int(tick_rate * duration), seed=seed, tick_interval=1 / tick_rate, ask_bid_ratio=0)
+    expected_tick_count = sum(sub_user_count_dict[event["stock_code"]] for event in event_list)
+
+    stop_event = threading.Event()
+
+    def run_order(client):
+        interval = 1 / order_rate
+        next_time = time.perf_counter()
+        while not stop_event.is_set():
+            stock_code = client.stock_code_list[0]
+            client.order(stock_code, SimMarket.last_price_dict.get(stock_code, SimMarket.stock_dict[stock_code][2]))
+            next_time += interval
+            stop_event.wait(max(0, next_time - time.perf_counter()))
+
+    if order_rate:
+        for client in client_list:
+            threading.Thread(target=run_order, args=(client,), daemon=True).start()
+
+    SimMarket.start_event_thread()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    for event in event_list:
+        if disconnect_at is not None and SimMarket.connected and SimMarket.stats_dict["disconnect"] == 0 and event["time"] >= disconnect_at:
+            SimMarket.disconnect(silent=silent_disconnect)
+        delay = event["time"] - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+        tick_time_dict[(event["stock_code"], event["header"][9])] = time.perf_counter()
+        SimMarket.event_q.put(event)
+    inject_sec = time.perf_counter() - start
+    stop_event.set()
+    if disconnect_at is not None:
+        quant_server.creon_supervisor.market_close_time = 0  # 틱 발생이 끝난 후는 끊김으로 보지 않음
+
+    # 남은 메시지 수신 대기 (수신 수가 변하지 않거나 모두 받을때까지)
+    SimMarket.wait_event()
+    deadline = time.monotonic() + drain_timeout
+    last_recv_count = -1
+    while time.monotonic() < deadline:
+        recv_count = sum(client.count_dict["tick"] for client in client_list)
+        if recv_count >= expected_tick_count or recv_count == last_recv_count:
+            break
+        last_recv_count = recv_count
+        time.sleep(0.5)
+    wall_sec = time.perf_counter() - start
+    cpu_sec = time.process_time() - cpu_start
+
+    tick_histogram = LatencyHistogram()
+    order_histogram = LatencyHistogram()
+    count_dict = {}
+    for client in client_list:
+        tick_histogram.merge(client.tick_histogram)
+        order_histogram.merge(client.order_histogram)
+        for key, value in client.count_dict.items():
+            count_dict[key] = count_dict.get(key, 0) + value
+        client.close()
+
+    # 접속 종료된 클라이언트가 서버에서 모두 정리되었는지 확인
+    deadline = time.monotonic() + 5
+    while quant_server.client_conn_dict and time.monotonic() < deadline:
+        time.sleep(0.05)
+    stale_client_list = list(quant_server.client_conn_dict)
+    threading.excepthook = default_excepthook
+
+    cur_rss, max_rss = get_rss_mb()
+    if os.path.isfile(ServerSnapshot.file_path):
+        os.remove(ServerSnapshot.file_path)
+    return {
+        "startup_sec": startup_sec,
+        "tick": {
+            "injected": len(event_list),
+            "inject_per_sec": len(event_list) / inject_sec,
+            "expected_delivery": expected_tick_count,
+            "delivered": count_dict["tick"],
+            "delivered_per_sec": count_dict["tick"] / wall_sec,
+            "dropped": expected_tick_count - count_dict["tick"],
+            "latency_ms": tick_histogram.get_stats(),
+        },
+        "order": {
+            "sent": count_dict["order"],
+            "ack": count_dict["order_ack"],
+            "fail": count_dict["order_fail"],
+            "reject": count_dict["order_reject"],
+            "latency_ms": order_histogram.get_stats(),
+        },
+        "recv_mb": count_dict["recv_byte"] / 1048576,
+        "recv_byte_per_tick": count_dict["recv_byte"] / max(1, count_dict["tick"]),
+        "cpu_percent": cpu_sec / wall_sec * 100,
+        "rss_mb": cur_rss,
+        "max_rss_mb": max_rss,
+        "sim_stats": dict(SimMarket.stats_dict),
+        "snapshot": ServerSnapshot.get_stats(),
+        "supervisor": dict(
+            quant_server.creon_supervisor.stats_dict, feed_status=count_dict["feed_status"], feed_gap=count_dict["feed_gap"], gap_bar=count_dict["gap_bar"]
+        ),
+        "server_error": {"thread_exception": thread_error_list, "stale_client": stale_client_list},
+    }
+
+
+def compare_result(old_result, new_result, prefix=""):
+    """
+    이전 결과와 숫자 값 비교 출력
+    """
+    for key, new_value in new_result.items():
+        old_value = old_result.get(key) if isinstance(old_result, dict) else None
+        if isinstance(new_value, dict):
+            compare_result(old_value or {}, new_value, prefix + key + ".")
+        elif isinstance(new_value, (int, float)) and isinstance(old_value, (int, float)):
+            change = "{:+.1f}%".format((new_value - old_value) / old_value * 100) if old_value else ""
+            print("    {:<40} {:>14.2f} -> {:>14.2f} {}".format(prefix + key, old_value, new_value, change))
+
+
+def main():
+    """
+    부하 테스트 실행 후 결과를 json 파일로 저장 (python loadtest.py [--client N --symbol M ...] [--compare 이전 결과 파일])
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--client", type=int, default=20, help="클라이언트 수")
+    parser.add_argument("--symbol", type=int, default=50, help="종목 수")
+    parser.add_argument("--sub", type=int, default=10, help="클라이언트당 구독 종목 수")
+    parser.add_argument("--tick-rate", type=float, default=2000, help="초당 틱 수")
+    parser.add_argument("--duration", type=float, default=10, help="틱 발생 시간 (초)")
+    parser.add_argument("--order-rate", type=float, default=2, help="클라이언트당 초당 주문 수")
+    parser.add_argument("--trade-limit", type=int, default=1000, help="가상 creon 초당 주문 요청 제한")
+    parser.add_argument("--seed", type=int, default=0, help="틱 생성 난수 시드")
+    parser.add_argument("--disconnect-at", type=float, default=None, help="틱 발생 시작후 가상 creon 연결을 끊는 시점 (초)")
+    parser.add_argument("--silent-disconnect", action="store_true", help="연결 상태는 정상으로 두고 실시간 이벤트만 끊음")
+    parser.add_argument("--encoding", default=ENCODING_JSON, help="클라이언트 전송 인코딩 (json / binary)")
+    parser.add_argument("--compression", default=COMPRESSION_NONE, help="클라이언트 전송 압축 (none / zlib)")
+    parser.add_argument("--output", default=None, help="결과 파일 경로 (기본 loadtest_<날짜시간>.json)")
+    parser.add_argument("--compare", default=None, help="비교할 이전 결과 파일 경로")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format=utils.LOG_FORMAT)
+
+    param_dict = {
+        "client_count": args.client,
+        "symbol_count": args.symbol,
+        "sub_count": min(args.sub, args.symbol),
+        "tick_rate": args.tick_rate,
+        "duration": args.duration,
+        "order_rate": args.order_rate,
+        "trade_limit": args.trade_limit,
+        "seed": args.seed,
+        "disconnect_at": args.disconnect_at,
+        "silent_disconnect": args.silent_disconnect,
+        "encoding": args.encoding,
+        "compression": args.compression,
+    }
+    result = run_load_test(**param_dict)
+
+    output = {
+        "date_time": time.strftime("%Y%m%d%H%M%S"),
+        "git_revision": get_git_revision(),
+        "python": sys.version.split()[0],
+        "param": param_dict,
+        "result": result,
+    }
+    output_path = args.output or "loadtest_" + output["date_time"] + ".json"
+    with open(output_path, "w") as output_file:
+        json.dump(output, output_file, indent=4)
+
+    print(json.dumps(output, indent=4))
+    print("saved :", output_path)
+
+    if args.compare:
+        with open(args.compare) as compare_file:
+            old_output = json.load(compare_file)
+        print("[compare with {} ({})]".format(args.compare, old_output.get("git_revision")))
+        compare_result(old_output["result"], result)
+
+    # 서버 스레드 예외 / 정리되지 않은 클라이언트가 있으면 실패
+    server_error = result["server_error"]
+    if server_error["thread_exception"] or server_error["stale_client"]:
+        print("server error :", server_error)
+        os._exit(1)
+    os._exit(0)  # 서버 스레드(데몬 아닌 로그인 스레드 포함) 종료
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+# coding=utf-8
+import threading
+from array import array
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from stock_symbol import StockSymbol
+from latency_stats import LatencyHistogram, STATS_PERCENTILE_LIST
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join('{}="{}"'.format(key, value) for key, value in labels) + "}"
+
+
+class Counter:
+    """
+    증가만 하는 값 (락 없이 기록하므로 여러 스레드에서 동시에 증가시키면 일부 누락될 수 있음)
+
+    Attributes:
+        value (int / float): 현재 값
+    """
+
+    metric_type = "counter"
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def render(self, name, labels):
+        return ["{}{} {}".format(name, _format_labels(labels), self.value)]
+
+
+class Gauge:
+    """
+    임의로 바뀌는 값 (값을 직접 넣거나, 조회할때마다 실행할 함수를 지정)
+
+    Attributes:
+        value (int / float): 현재 값
+
+        method (function): 조회시 값을 반환할 함수 (None - value 사용)
+    """
+
+    metric_type = "gauge"
+
+    def __init__(self, method=None):
+        self.value = 0
+        self.method = method
+
+    def set(self, value):
+        self.value = value
+
+    def render(self, name, labels):
+        value = self.value
+        if self.method:
+            try:
+                value = self.method()
+            except Exception:
+                return []
+        return ["{}{} {}".format(name, _format_labels(labels), value)]
+
+
+class StockCounter:
+    """
+    종목 id 인덱스 배열로 관리하는 종목별 증가값 (종목 코드 라벨로 출력)
+
+    Attributes:
+        value_list (array): 종목 id 인덱스의 값
+    """
+
+    metric_type = "counter"
+
+    def __init__(self):
+        self.value_list = array("q")
+
+    def inc(self, stock_id, amount=1):
+        if stock_id >= len(self.value_list):
+            StockSymbol.fit_list(self.value_list, 0)
+        self.value_list[stock_id] += amount
+
+    def render(self, name, labels):
+        return [
+            "{}{} {}".format(name, _format_labels(labels + (("stock_code", StockSymbol.get_code(stock_id)),)), value)
+            for stock_id, value in enumerate(self.value_list)
+            if value
+        ]
+
+
+class Histogram(LatencyHistogram):
+    """
+    지연시간 분포 (latency_stats.LatencyHistogram, 단위: us), summary 형식(백분위, 단위: 초)으로 출력
+    """
+
+    metric_type = "summary"
+
+    def render(self, name, labels):
+        line_list = [
+            "{}{} {}".format(name, _format_labels(labels + (("quantile", str(percentile / 100)),)), self.get_percentile(percentile) / 1000000)
+            for percentile in STATS_PERCENTILE_LIST
+        ]
+        line_list.append("{}_sum{} {}".format(name, _format_labels(labels), self.total / 1000000))
+        line_list.append("{}_count{} {}".format(name, _format_labels(labels), self.count))
+        return line_list
+
+
+class Metrics:
+    """
+    서버 전체 지표 등록 / 출력 클래스
+
+    Attributes:
+        metric_dict (dict): (이름, 라벨) -> 지표 인스턴스
+
+        help_dict (dict): 이름 -> (설명, 지표 타입)
+
+        lock (threading.Lock): 지표 등록시 사용하는 락
+
+        http_server (http.server.ThreadingHTTPServer): 지표 조회 http 서버
+    """
+
+    metric_dict = {}
+    help_dict = {}
+    lock = threading.Lock()
+    http_server = None
+
+    @classmethod
+    def _get(cls, metric_class, name, help_text, labels, *args):
+        labels = tuple(sorted(labels.items())) if labels else ()
+        metric = cls.metric_dict.get((name, labels))
+        if metric is None:
+            with cls.lock:
+                metric = cls.metric_dict.get((name, labels))
+                if metric is None:
+                    metric = metric_class(*args)
+                    cls.metric_dict[(name, labels)] = metric
+                    cls.help_dict.setdefault(name, (help_text, metric.metric_type))
+        return metric
+
+    @classmethod
+    def counter(cls, name, help_text="", labels=None):
+        """
+        Counter 반환 (없으면 등록)
+
+        Parameters:
+            name (str): 지표 이름
+
+            help_text (str): 지표 설명
+
+            labels (dict): 라벨
+
+        Returns:
+            (Counter): 지표 인스턴스
+        """
+        return cls._get(Counter, name, help_text, labels)
+
+    @classmethod
+    def gauge(cls, name, help_text="", labels=None, method=None):
+        """
+        Gauge 반환 (없으면 등록)
+
+        Parameters:
+            name (str): 지표 이름
+
+            help_text (str): 지표 설명
+
+            labels (dict): 라벨
+
+            method (function): 조회시 값을 반환할 함수
+
+        Returns:
+            (Gauge): 지표 인스턴스
+        """
+        gauge = cls._get(Gauge, name, help_text, labels, method)
+        if method:
+            gauge.method = method
+        return gauge
+
+    @classmethod
+    def stock_counter(cls, name, help_text="", labels=None):
+        """
+        StockCounter 반환 (없으면 등록)
+
+        Parameters:
+            name (str): 지표 이름
+
+            help_text (str): 지표 설명
+
+            labels (dict): 라벨
+
+        Returns:
+            (StockCounter): 지표 인스턴스
+        """
+        return cls._get(StockCounter, name, help_text, labels)
+
+    @classmethod
+    def histogram(cls, name, help_text="", labels=None):
+        """
+        Histogram 반환 (없으면 등록)
+
+        Parameters:
+            name (str): 지표 이름
+
+            help_text (str): 지표 설명
+
+            labels (dict): 라벨
+
+        Returns:
+            (Histogram): 지표 인스턴스
+        """
+        return cls._get(Histogram, name, help_text, labels)
+
+    @classmethod
+    def remove(cls, name, labels=None):
+        """
+        지표 삭제 (접속 종료된 클라이언트 지표 등)
+
+        Parameters:
+            name (str): 지표 이름
+
+            labels (dict): 라벨
+        """
+        labels = tuple(sorted(labels.items())) if labels else ()
+        with cls.lock:
+            cls.metric_dict.pop((name, labels), None)
+
+    @classmethod
+    def render(cls):
+        """
+        전체 지표를 prometheus text 형식으로 반환
+
+        Returns:
+            (str): 지표 텍스트
+        """
+        with cls.lock:
+            metric_item_list = sorted(cls.metric_dict.items(), key=lambda item: item[0])
+
+        line_list = []
+        last_name = None
+        for (name, labels), metric in metric_item_list:
+            if name != last_name:
+                help_text, metric_type = cls.help_dict[name]
+                line_list.append("# HELP {} {}".format(name, help_text))
+                line_list.append("# TYPE {} {}".format(name, metric_type))
+                last_name = name
+            line_list += metric.render(name, labels)
+        return "\n".join(line_list) + "\n"
+
+    @classmethod
+    def start_http_server(cls, port, host="127.0.0.1"):
+        """
+        지표 조회 http 서버 시작 (GET /metrics)
+
+        Parameters:
+            port (int): 포트
+
+            host (str): 접속 허용 주소 (기본 로컬만 허용)
+        """
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+
+                body = cls.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        cls.http_server = ThreadingHTTPServer((host, port), MetricsHandler)
+        http_server_thread = threading.Thread(target=cls.http_server.serve_forever, daemon=True)
+        http_server_thread.start()
@@ -0,0 +1,359 @@
+# coding=utf-8
+import time
+import threading
+from collections import deque
+
+import utils
+from stock_symbol import StockSymbol
+from trade_info_enum import ORDER_CONDITION, PRICE_TYPE
+
+logger = utils.get_logger(__name__)
+
+# 신규 주문보다 먼저 처리할 주문 종류 (정정 / 취소)
+PRIORITY_ORDER_TYPE_SET = {"modify_price", "modify_type", "cancel"}
+
+
+class OrderDispatcher:
+    """
+    주문 분배 클래스
+
+    여러개의 주문 처리 스레드(레인)가 각자의 주문 오브젝트로 동시에 주문을 처리함
+    같은 (사용자, 종목)의 주문은 한번에 하나씩 들어온 순서대로 처리되며,
+    처리할 주문을 고를때는 사용자를 돌아가며 선택하고(공정 분배) 정정/취소 주문을 신규 주문보다 먼저 선택함
+
+    Attributes:
+        execute_method (method): 주문 처리 메소드 (주문 요청, 레인의 주문 오브젝트) -> 주문번호
+
+        done_method (method): 주문 처리 완료시 실행할 메소드 (주문 요청, 주문번호)
+
+        cond (threading.Condition): 대기열 변경시 사용하는 조건 변수
+
+        key_q_dict (dict): (사용자, 종목코드) -> 대기중인 주문 요청 deque
+
+        busy_key_set (set): 처리중인 (사용자, 종목코드)
+
+        user_key_dict (dict): 사용자 -> 대기 주문이 있는 (사용자, 종목코드) 리스트
+
+        user_order (collections.deque): 사용자 선택 순서
+    """
+
+    def __init__(self, execute_method, done_method, lane_count=4, com_factory=None, com_generation=None):
+        """
+        Parameters:
+            execute_method (method): 주문 처리 메소드 (주문 요청, 레인의 주문 오브젝트) -> 주문번호
+
+            done_method (method): 주문 처리 완료시 실행할 메소드 (주문 요청, 주문번호)
+
+            lane_count (int): 주문 처리 스레드 수
+
+            com_factory
+                (function): 레인마다 사용할 주문 오브젝트 생성 함수 (레인 스레드에서 호출됨)
+
+                (None): 주문 오브젝트 없음
+
+            com_generation
+                (function): 주문 오브젝트 세대 반환 함수 (값이 바뀌면 레인이 주문 오브젝트를 다시 생성, creon 재연결 등)
+
+                (None): 주문 오브젝트를 다시 만들지 않음
+        """
+        self.execute_method = execute_method
+        self.done_method = done_method
+
+        self.cond = threading.Condition()
+        self.key_q_dict = {}
+        self.busy_key_set = set()
+        self.user_key_dict = {}
+        self.user_order = deque()
+
+        for _ in range(lane_count):
+            lane_thread = threading.Thread(target=self.run_lane, args=(com_factory, com_generation), daemon=True)
+            lane_thread.start()
+
+    def insert(self, req):
+        """
+        주문 요청을 대기열에 추가
+
+        Parameters:
+            req (dict): 주문 요청 ({"username", "req_type", "req_data"})
+        """
+        req.setdefault("latency", {})["submit"] = time.perf_counter()
+        key = (req["username"], req["req_data"]["stock_code"])
+
+        with self.cond:
+            key_q = self.key_q_dict.get(key)
+            if key_q is None:
+                key_q = self.key_q_dict[key] = deque()
+
+                if not req["username"] in self.user_key_dict:
+                    self.user_key_dict[req["username"]] = []
+                    self.user_order.append(req["username"])
+                self.user_key_dict[req["username"]].append(key)
+
+            key_q.append(req)
+            self.cond.notify()
+
+    def get_queue_size(self):
+        """
+        대기중인 주문 수 반환
+
+        Returns:
+            (int): 대기중인 주문 수
+        """
+        with self.cond:
+            return sum(len(key_q) for key_q in self.key_q_dict.values())
+
+    def run_lane(self, com_factory, com_generation):
+        creon_stock_order = None
+        generation = None
+
+        while True:
+            with self.cond:
+                key = self._pick_key()
+                while key is None:
+                    self.cond.wait()
+                    key = self._pick_key()
+
+                req = self.key_q_dict[key].popleft()
+                self.busy_key_set.add(key)
+
+            req["latency"]["dispatch"] = time.perf_counter()
+            try:
+                if com_factory is not None:
+                    current_generation = com_generation() if com_generation else None
+                    if creon_stock_order is None or current_generation != generation:
+                        creon_stock_order = com_factory()
+                        generation = current_generation
+                order_num = self.execute_method(req, creon_stock_order)
+            except Exception:
+                logger.exception("ORDER ERROR")
+                order_num = False
+            req["latency"]["ack"] = time.perf_counter()
+
+            with self.cond:
+                self.busy_key_set.discard(key)
+                if not self.key_q_dict[key]:
+                    self._remove_key(key)
+                self.cond.notify()
+
+            self.done_method(req, order_num)
+
+    def _pick_key(self):
+        """
+        다음에 처리할 (사용자, 종목코드) 선택 (cond 안에서 호출)
+
+        정정/취소 주문이 맨 앞에 있는 키를 먼저 찾고 없으면 처리 가능한 아무 키나 선택하며
+        선택된 사용자는 선택 순서의 맨 뒤로 보냄
+
+        Returns:
+            (tuple): (사용자, 종목코드)
+
+            (None): 처리 가능한 주문 없음
+        """
+        for is_priority in (True, False):
+            for username in self.user_order:
+                for key in self.user_key_dict[username]:
+                    if key in self.busy_key_set:
+                        continue
+
+                    if is_priority and not self.key_q_dict[key][0]["req_data"]["order_type"] in PRIORITY_ORDER_TYPE_SET:
+                        continue
+
+                    self.user_order.remove(username)
+                    self.user_order.append(username)
+                    return key
+        return None
+
+    def _remove_key(self, key):
+        """
+        대기 주문이 없는 키 삭제 (cond 안에서 호출)
+        """
+        del self.key_q_dict[key]
+
+        user_key_list = self.user_key_dict[key[0]]
+        user_key_list.remove(key)
+        if not user_key_list:
+            del self.user_key_dict[key[0]]
+            self.user_order.remove(key[0])
+
+
+# 주문 종류별 필수 입력값
+_ORDER_REQUIRED_KEY_DICT = {
+    "buy": ("stock_code", "qty", "e_order_condition", "e_price_type", "price"),
+    "sell": ("stock_code", "qty", "e_order_condition", "e_price_type", "price"),
+    "modify_type": ("origin_order_num", "stock_code", "qty", "e_order_condition", "e_price_type", "price"),
+    "modify_price": ("origin_order_num", "stock_code", "qty", "price"),
+    "cancel": ("origin_order_num", "stock_code", "qty"),
+}
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def is_valid_order(order_info):
+    """
+    단일 주문 요청의 입력값 검사 (주문 종류, 필수 입력값, 입력값 타입 / 범위, 등록된 종목 코드)
+
+    Parameters:
+        order_info (dict): 주문 정보 (order 요청의 req_data)
+
+    Returns:
+        (bool): 검사 통과 여부
+    """
+    if not isinstance(order_info, dict):
+        return False
+
+    required_key_list = _ORDER_REQUIRED_KEY_DICT.get(order_info.get("order_type"))
+    if required_key_list is None or not all(key in order_info for key in required_key_list):
+        return False
+
+    # 등록되지 않은 종목 코드는 거부 (StockSymbol 에 등록하지 않음)
+    if StockSymbol.find_id(order_info["stock_code"]) is None:
+        return False
+
+    qty = order_info["qty"]
+    if not isinstance(qty, int) or isinstance(qty, bool) or qty < 0 or (order_info["order_type"] in ("buy", "sell") and qty == 0):
+        return False
+
+    if "price" in order_info and not (_is_number(order_info["price"]) and order_info["price"] >= 0):
+        return False
+
+    if "origin_order_num" in required_key_list and not (isinstance(order_info["origin_order_num"], int) and not isinstance(order_info["origin_order_num"], bool)):
+        return False
+
+    return order_info.get("e_order_condition", "NONE") in ORDER_CONDITION.__members__ and order_info.get("e_price_type", "NONE") in PRICE_TYPE.__members__
+
+
+class OrderBatch:
+    """
+    여러개의 주문을 한번에 요청하는 바스켓 주문 클래스
+
+    Attributes:
+        username (str): 사용자
+
+        batch_id (): 클라이언트가 정한 바스켓 주문 id
+
+        order_list (list[dict]): 주문 정보 리스트 (order 요청의 req_data와 같은 형식)
+
+        reject_dict (dict): 주문 인덱스 -> 거부 사유 (검증 실패한 주문)
+
+        order_num_dict (dict): 주문 인덱스 -> 주문번호 (처리 완료된 주문)
+
+        remain_count (int): 처리 결과를 기다리는 주문 수
+
+        start_time (float): 바스켓 주문 접수 시간 (time.perf_counter)
+
+        lock (threading.Lock): 처리 결과 기록시 사용하는 락
+    """
+
+    @staticmethod
+    def is_valid_order_list(order_list):
+        """
+        바스켓 주문 요청의 주문 리스트 형식 검사 (비어있지 않은 리스트, 주문별 입력값은 validate 에서 검사)
+
+        Parameters:
+            order_list (list[dict]): order_batch 요청의 order_list
+
+        Returns:
+            (bool): 검사 통과 여부
+        """
+        return isinstance(order_list, list) and len(order_list) > 0
+
+    def __init__(self, username, batch_id, order_list):
+        self.username = username
+        self.batch_id = batch_id
+        self.order_list = order_list
+
+        self.reject_dict = {}
+        self.order_num_dict = {}
+        self.remain_count = 0
+        self.start_time = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def validate(self, get_able_sell_qty, check_method=None):
+        """
+        바스켓 전체 주문을 한번에 검증 (입력값 (is_valid_order), 주문별 추가 검사, 종목별 매도 수량 합계 <= 매도 가능 수량)
+
+        Parameters:
+            get_able_sell_qty (function): 종목 코드 -> 매도 가능 수량 (메모리 잔고 조회)
+
+            check_method
+                (function): 주문 정보 -> 거부 사유 (None - 통과), 주문별 추가 검사 (order_risk.OrderRisk.check)
+
+                (None): 추가 검사 안함
+
+        Returns:
+            (dict): 주문 인덱스 -> 거부 사유
+        """
+        sell_qty_dict = {}
+
+        for idx, order_info in enumerate(self.order_list):
+            # 단일 주문과 같은 입력값 검사
+            if not is_valid_order(order_info):
+                self.reject_dict[idx] = "INVALID_ORDER"
+                continue
+
+            if check_method:
+                reject_reason = check_method(order_info)
+                if reject_reason:
+                    self.reject_dict[idx] = reject_reason
+                    continue
+
+            if order_info["order_type"] == "sell":
+                sell_qty = sell_qty_dict.get(order_info["stock_code"], 0) + order_info["qty"]
+                if sell_qty > get_able_sell_qty(order_info["stock_code"]):
+                    self.reject_dict[idx] = "EXCEED_ABLE_SELL_QTY"
+                    continue
+                sell_qty_dict[order_info["stock_code"]] = sell_qty
+
+        return self.reject_dict
+
+    def make_req_list(self):
+        """
+        검증을 통과한 주문들을 주문 분배 클래스에 넣을 주문 요청으로 변환
+
+        Returns:
+            (list[dict]): 주문 요청 리스트 ({"username", "req_type", "req_data", "batch", "batch_idx"})
+        """
+        req_list = [
+            {"username": self.username, "req_type": "order", "req_data": order_info, "batch": self, "batch_idx": idx}
+            for idx, order_info in enumerate(self.order_list)
+            if not idx in self.reject_dict
+        ]
+        self.remain_count = len(req_list)
+        return req_list
+
+    def set_result(self, idx, order_num):
+        """
+        주문 처리 결과 기록
+
+        Parameters:
+            idx (int): 주문 인덱스
+
+            order_num (int / bool): 주문번호 (False - 주문 실패)
+
+        Returns:
+            (bool): 바스켓의 모든 주문 처리 완료 여부
+        """
+        with self.lock:
+            self.order_num_dict[idx] = order_num
+            self.remain_count -= 1
+            return self.remain_count == 0
+
+    def get_summary(self):
+        """
+        바스켓 주문 처리 결과 요약 반환
+
+        Returns:
+            (dict): 바스켓 id, 전체/성공/실패/거부 주문 수, 거부 사유, 소요시간
+        """
+        success_count = sum(1 for order_num in self.order_num_dict.values() if order_num)
+        return {
+            "batch_id": self.batch_id,
+            "total": len(self.order_list),
+            "success": success_count,
+            "fail": len(self.order_num_dict) - success_count,
+            "reject": len(self.reject_dict),
+            "reject_reason": {str(idx): reason for idx, reason in self.reject_dict.items()},
+            "elapsed_ms": (time.perf_counter() - self.start_time) * 1000,
+        }
@@ -0,0 +1,133 @@
+# coding=utf-8
+import time
+from array import array
+
+from stock_symbol import StockSymbol
+from portfolio import Portfolio
+
+
+class OrderRisk:
+    """
+    주문 전 위험 검사 클래스
+
+    주문을 creon 서버로 보내기 전에 메모리 데이터만으로 주문을 검사함 (db 조회 없음)
+    (최대 주문 금액, 최대 주문 수량, 최근 체결가 대비 가격 범위, 매도 가능 수량, 사용자별 초당 주문 수)
+
+    Attributes:
+        max_notional (int): 주문 1건의 최대 주문 금액 (단위: 원)
+
+        max_qty (int): 주문 1건의 최대 주문 수량
+
+        price_band_percent (float): 최근 체결가 대비 주문가 허용 범위 (단위: %)
+
+        max_order_per_sec (float): 사용자별 초당 최대 주문 수
+
+        max_order_burst (int): 사용자별 연속으로 보낼수 있는 최대 주문 수
+
+        last_price_list (array): 종목 id 인덱스의 최근 체결가 (0 - 체결가 없음)
+
+        rate_dict (dict): 사용자 -> [남은 주문 가능 수, 마지막 갱신 시간]
+    """
+
+    max_notional = 100000000
+    max_qty = 100000
+    price_band_percent = 10.0
+    max_order_per_sec = 10.0
+    max_order_burst = 20
+
+    last_price_list = array("l")
+    rate_dict = {}
+
+    @classmethod
+    def update_last_price(cls, stock_id, price):
+        """
+        종목의 최근 체결가 갱신 (실시간 틱 이벤트에서 호출)
+
+        Parameters:
+            stock_id (int): 종목 id
+
+            price (int): 체결가
+        """
+        if stock_id >= len(cls.last_price_list):
+            StockSymbol.fit_list(cls.last_price_list, 0)
+        cls.last_price_list[stock_id] = price
+
+    @classmethod
+    def get_last_price(cls, stock_id):
+        """
+        종목의 최근 체결가 반환
+
+        Parameters:
+            stock_id (int): 종목 id
+
+        Returns:
+            (int): 최근 체결가 (0 - 체결가 없음)
+        """
+        if stock_id >= len(cls.last_price_list):
+            return 0
+        return cls.last_price_list[stock_id]
+
+    @classmethod
+    def check(cls, username, order_info, check_rate=True):
+        """
+        주문 위험 검사
+
+        Parameters:
+            username (str): 사용자
+
+            order_info (dict): 주문 정보 (order 요청의 req_data)
+
+            check_rate (bool): 사용자별 주문 수 제한 검사 여부
+
+        Returns:
+            (str): 거부 사유
+
+            (None): 검사 통과
+        """
+        if check_rate and not cls._take_rate(username):
+            return "RATE_LIMIT"
+
+        order_type = order_info["order_type"]
+        if order_type == "cancel":
+            return None
+
+        qty = order_info["qty"]
+        if qty > cls.max_qty:
+            return "EXCEED_MAX_QTY"
+
+        stock_id = StockSymbol.get_id(order_info["stock_code"])
+        last_price = cls.get_last_price(stock_id)
+        price = order_info.get("price") or last_price  # 시장가 주문은 최근 체결가 기준
+
+        if last_price and price and abs(price - last_price) * 100 > last_price * cls.price_band_percent:
+            return "OUT_OF_PRICE_BAND"
+
+        if price * qty > cls.max_notional:
+            return "EXCEED_MAX_NOTIONAL"
+
+        if order_type == "sell" and qty > Portfolio.get_able_sell_qty(stock_id):
+            return "EXCEED_ABLE_SELL_QTY"
+
+        return None
+
+    @classmethod
+    def _take_rate(cls, username):
+        """
+        사용자의 주문 가능 수를 하나 사용 (토큰 버킷)
+
+        Returns:
+            (bool): 주문 가능 여부
+        """
+        now = time.monotonic()
+        rate = cls.rate_dict.get(username)
+        if rate is None:
+            rate = cls.rate_dict[username] = [cls.max_order_burst, now]
+
+        rate[0] = min(cls.max_order_burst, rate[0] + (now - rate[1]) * cls.max_order_per_sec)
+        rate[1] = now
+
+        if rate[0] < 1:
+            return False
+
+        rate[0] -= 1
+        return True
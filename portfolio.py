@@ -0,0 +1,416 @@
+# coding=utf-8
+import threading
+from array import array
+
+import utils
+from stock_symbol import StockSymbol
+
+logger = utils.get_logger(__name__)
+
+TRADE_FEE_PERCENT = 0.011360
+SELL_TAX_PERCENT = 0.25
+
+# 평가금액 계산시 곱하는 값 (수수료, 세금 제외)
+_EVALUATION_RATE = 1 - (TRADE_FEE_PERCENT / 100 + SELL_TAX_PERCENT / 100)
+
+
+class Portfolio:
+    """
+    메모리상의 계좌 잔고 / 손익 계산 클래스
+
+    보유 종목을 슬롯(0 ~ count-1) 단위의 배열로 관리하며 틱마다 db 조회/갱신 없이 현재가만 변경하고
+    손익, 수익률, 평가금액은 전체 포트폴리오에 대해 한번에 계산함
+    db(KR_Stock_Balance)에는 주기적으로 혹은 가격 변동률이 기준을 넘었을 때 스냅샷을 저장함
+
+    Attributes:
+        lock (threading.Lock): 배열 변경시 사용하는 락
+
+        slot_list (array): 종목 id 인덱스의 슬롯 번호 (-1 - 미보유)
+
+        stock_id_list (array): 슬롯별 종목 id
+
+        avg_price_list (array): 슬롯별 평균 단가
+
+        profit_unit_price_list (array): 슬롯별 손익 단가
+
+        qty_list (array): 슬롯별 잔고 수량
+
+        able_sell_qty_list (array): 슬롯별 매도 가능 수량
+
+        cur_price_list (array): 슬롯별 현재가
+
+        saved_price_list (array): 슬롯별 마지막으로 db에 저장된 현재가
+
+        count (int): 보유 종목 수
+
+        version (int): 잔고 데이터가 변경될 때마다 증가하는 값
+
+        saved_version (int): 마지막으로 db에 저장된 시점의 version
+
+        persist_change_ratio (float): 마지막 저장 이후 이 비율(%) 이상 가격이 변하면 바로 db에 저장
+
+        persist_event (threading.Event): db 저장 스레드를 깨우는 이벤트
+    """
+
+    lock = threading.Lock()
+
+    slot_list = array("l")
+    stock_id_list = array("l")
+    avg_price_list = array("d")
+    profit_unit_price_list = array("d")
+    qty_list = array("q")
+    able_sell_qty_list = array("q")
+    cur_price_list = array("d")
+    saved_price_list = array("d")
+
+    count = 0
+    version = 0
+    saved_version = 0
+
+    persist_change_ratio = 0.5
+    persist_event = threading.Event()
+
+    @classmethod
+    def clear(cls):
+        """
+        잔고 데이터 전체 삭제
+        """
+        with cls.lock:
+            for slot_stock_id in cls.stock_id_list[: cls.count]:
+                cls.slot_list[slot_stock_id] = -1
+
+            for slot_array in cls._get_slot_arrays():
+                del slot_array[:]
+
+            cls.count = 0
+            cls.version += 1
+
+    @classmethod
+    def load(cls, balance_list):
+        """
+        잔고 데이터 전체를 새로 채움 (trade.BalanceData.update_stock_balance 에서 가져온 데이터)
+
+        Parameters:
+            balance_list (list[list]): [종목코드, 평균단가, 손익단가, 잔고수량, 매도가능수량, 현재가] 리스트
+        """
+        cls.clear()
+        for stock_code, avg_price, profit_unit_price, qty, able_sell_qty, cur_price in balance_list:
+            cls.set_position(stock_code, qty, able_sell_qty, avg_price, profit_unit_price, cur_price)
+
+    @classmethod
+    def get_position_list(cls):
+        """
+        잔고 데이터 전체 반환 (load 입력과 같은 형식, 스냅샷 저장 / 서버 잔고 비교용)
+
+        Returns:
+            (list[list]): [종목코드, 평균단가, 손익단가, 잔고수량, 매도가능수량, 현재가] 리스트
+        """
+        with cls.lock:
+            count = cls.count
+            return [
+                [StockSymbol.get_code(stock_id), avg_price, profit_unit_price, qty, able_sell_qty, cur_price]
+                for stock_id, avg_price, profit_unit_price, qty, able_sell_qty, cur_price in zip(
+                    cls.stock_id_list[:count],
+                    cls.avg_price_list[:count],
+                    cls.profit_unit_price_list[:count],
+                    cls.qty_list[:count],
+                    cls.able_sell_qty_list[:count],
+                    cls.cur_price_list[:count],
+                )
+            ]
+
+    @classmethod
+    def set_position(cls, stock_code, qty, able_sell_qty, avg_price, profit_unit_price, cur_price=None):
+        """
+        종목의 잔고 데이터 변경 (체결시), 잔고 수량이 0이면 삭제
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            qty (int): 잔고 수량
+
+            able_sell_qty (int): 매도 가능 수량
+
+            avg_price (float): 평균 단가
+
+            profit_unit_price (float): 손익 단가
+
+            cur_price
+                (int): 현재가
+
+                (None): 현재가 유지 (신규 종목일 경우 평균 단가)
+        """
+        stock_id = StockSymbol.get_id(stock_code)
+
+        with cls.lock:
+            StockSymbol.fit_list(cls.slot_list, -1)
+            slot = cls.slot_list[stock_id]
+
+            if qty == 0:
+                if slot >= 0:
+                    cls._remove_slot(slot)
+                cls.version += 1
+                cls.persist_event.set()
+                return
+
+            if slot < 0:
+                slot = cls.count
+                cls.slot_list[stock_id] = slot
+                cls.stock_id_list.append(stock_id)
+                for slot_array in cls._get_slot_arrays()[1:]:
+                    slot_array.append(0)
+                cls.count += 1
+                if cur_price is None:
+                    cur_price = avg_price
+
+            cls.avg_price_list[slot] = avg_price
+            cls.profit_unit_price_list[slot] = profit_unit_price
+            cls.qty_list[slot] = qty
+            cls.able_sell_qty_list[slot] = able_sell_qty
+            if cur_price is not None:
+                cls.cur_price_list[slot] = cur_price
+
+            cls.version += 1
+
+        cls.persist_event.set()
+
+    @classmethod
+    def set_able_sell_qty(cls, stock_code, able_sell_qty):
+        """
+        종목의 매도 가능 수량 변경
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            able_sell_qty (int): 매도 가능 수량
+        """
+        stock_id = StockSymbol.get_id(stock_code)
+        with cls.lock:
+            # 슬롯 삭제 (_remove_slot) 시 마지막 슬롯이 옮겨지므로 슬롯 조회와 변경을 같은 lock 안에서 함
+            slot = cls.get_slot(stock_id)
+            if slot < 0:
+                return
+
+            cls.able_sell_qty_list[slot] = able_sell_qty
+            cls.version += 1
+
+    @classmethod
+    def update_price(cls, stock_id, cur_price):
+        """
+        틱 수신시 보유 종목의 현재가 변경 (db 조회 없음)
+
+        Parameters:
+            stock_id (int): 종목 id
+
+            cur_price (int): 현재가
+        """
+        # 미보유 종목 틱은 lock 없이 바로 반환
+        if cls.get_slot(stock_id) < 0:
+            return
+
+        with cls.lock:
+            # 슬롯 삭제 (_remove_slot) 시 마지막 슬롯이 옮겨지므로 lock 안에서 다시 조회
+            slot = cls.get_slot(stock_id)
+            if slot < 0:
+                return
+
+            cls.cur_price_list[slot] = cur_price
+            cls.version += 1
+            saved_price = cls.saved_price_list[slot]
+
+        # 마지막 저장가 대비 변동률이 기준 이상이면 db 저장 스레드를 깨움
+        if not saved_price or abs(cur_price - saved_price) * 100 >= saved_price * cls.persist_change_ratio:
+            cls.persist_event.set()
+
+    @classmethod
+    def get_slot(cls, stock_id):
+        """
+        종목 id의 슬롯 번호 반환
+
+        Parameters:
+            stock_id (int): 종목 id
+
+        Returns:
+            (int): 슬롯 번호 (-1 - 미보유)
+        """
+        if stock_id >= len(cls.slot_list):
+            return -1
+        return cls.slot_list[stock_id]
+
+    @classmethod
+    def is_held(cls, stock_id):
+        """
+        종목 보유 여부 반환
+
+        Parameters:
+            stock_id (int): 종목 id
+
+        Returns:
+            (bool): 보유 여부
+        """
+        return cls.get_slot(stock_id) >= 0
+
+    @classmethod
+    def get_able_sell_qty(cls, stock_id):
+        """
+        종목의 매도 가능 수량 반환
+
+        Parameters:
+            stock_id (int): 종목 id
+
+        Returns:
+            (int): 매도 가능 수량 (미보유 종목은 0)
+        """
+        slot = cls.get_slot(stock_id)
+        if slot < 0:
+            return 0
+        return cls.able_sell_qty_list[slot]
+
+    @classmethod
+    def evaluate(cls):
+        """
+        전체 보유 종목의 손익, 수익률, 평가금액 계산
+
+        Returns:
+            (dict): {
+                "stock_id_list", "qty_list", "cur_price_list" - 슬롯별 데이터 복사본
+                "profit_list", "profit_ratio_list", "evaluation_list" - 슬롯별 계산값
+            }
+        """
+        with cls.lock:
+            count = cls.count
+            stock_id_list = cls.stock_id_list[:count]
+            profit_unit_price_list = cls.profit_unit_price_list[:count]
+            qty_list = cls.qty_list[:count]
+            cur_price_list = cls.cur_price_list[:count]
+
+        return {
+            "stock_id_list": stock_id_list,
+            "qty_list": qty_list,
+            "cur_price_list": cur_price_list,
+            "profit_list": [(cur - unit) * qty for cur, unit, qty in zip(cur_price_list, profit_unit_price_list, qty_list)],
+            "profit_ratio_list": [(cur / unit) * 100 - 100 if unit else 0.0 for cur, unit in zip(cur_price_list, profit_unit_price_list)],
+            "evaluation_list": [cur * qty * _EVALUATION_RATE for cur, qty in zip(cur_price_list, qty_list)],
+        }
+
+    @classmethod
+    def get_summary(cls):
+        """
+        포트폴리오 전체 손익 요약 반환 (클라이언트 전송용)
+
+        Returns:
+            (dict): 총 매입금액, 총 평가금액, 총 손익, 총 수익률, 종목별 데이터
+        """
+        with cls.lock:
+            count = cls.count
+            buy_amount = sum(unit * qty for unit, qty in zip(cls.profit_unit_price_list[:count], cls.qty_list[:count]))
+        pf = cls.evaluate()
+
+        total_profit = sum(pf["profit_list"])
+
+        return {
+            "total_buy": int(buy_amount),
+            "total_evaluation": int(sum(pf["evaluation_list"])),
+            "total_profit": int(total_profit),
+            "total_profit_ratio": total_profit / buy_amount * 100 if buy_amount else 0.0,
+            "stock_list": [
+                {
+                    "stock_code": StockSymbol.get_code(stock_id),
+                    "qty": qty,
+                    "current_price": int(cur_price),
+                    "profit": int(profit),
+                    "profit_ratio": profit_ratio,
+                    "evaluation": int(evaluation),
+                }
+                for stock_id, qty, cur_price, profit, profit_ratio, evaluation in zip(
+                    pf["stock_id_list"], pf["qty_list"], pf["cur_price_list"], pf["profit_list"], pf["profit_ratio_list"], pf["evaluation_list"]
+                )
+            ],
+        }
+
+    @classmethod
+    def persist(cls, db_kr_operation_data):
+        """
+        현재 잔고 손익 스냅샷을 db(KR_Stock_Balance)에 저장 (변경된 경우만)
+
+        Parameters:
+            db_kr_operation_data (database.MariaDB): KR_OPERATION_DATA db 인스턴스
+        """
+        version = cls.version
+        if version == cls.saved_version:
+            return
+
+        pf = cls.evaluate()
+        data_db = [
+            [int(cur_price), int(profit), profit_ratio, int(evaluation), StockSymbol.get_code(stock_id)]
+            for stock_id, cur_price, profit, profit_ratio, evaluation in zip(
+                pf["stock_id_list"], pf["cur_price_list"], pf["profit_list"], pf["profit_ratio_list"], pf["evaluation_list"]
+            )
+        ]
+
+        if data_db:
+            db_kr_operation_data.update(
+                "KR_Stock_Balance", ["current_price", "profit", "profit_ratio", "evaluation"], data_db, "stock_code = %s",
+            )
+
+        with cls.lock:
+            for stock_id, cur_price in zip(pf["stock_id_list"], pf["cur_price_list"]):
+                slot = cls.slot_list[stock_id]
+                if slot >= 0:
+                    cls.saved_price_list[slot] = cur_price
+
+        cls.saved_version = version
+
+    @classmethod
+    def start_persist(cls, db_kr_operation_data, interval=5):
+        """
+        db 저장 스레드 시작 (interval 초마다 혹은 변동률 기준 초과시 저장)
+
+        Parameters:
+            db_kr_operation_data (database.MariaDB): 저장 스레드 전용 KR_OPERATION_DATA db 인스턴스
+
+            interval (float): 저장 주기 (단위: 초)
+        """
+
+        def persist_loop():
+            while True:
+                cls.persist_event.wait(interval)
+                cls.persist_event.clear()
+                try:
+                    cls.persist(db_kr_operation_data)
+                except Exception:
+                    # 저장된 버전이 바뀌지 않으므로 다음 주기에 다시 저장함
+                    logger.exception("portfolio persist failed")
+
+        persist_thread = threading.Thread(target=persist_loop, daemon=True)
+        persist_thread.start()
+
+    @classmethod
+    def _get_slot_arrays(cls):
+        return (
+            cls.stock_id_list,
+            cls.avg_price_list,
+            cls.profit_unit_price_list,
+            cls.qty_list,
+            cls.able_sell_qty_list,
+            cls.cur_price_list,
+            cls.saved_price_list,
+        )
+
+    @classmethod
+    def _remove_slot(cls, slot):
+        """
+        슬롯 삭제 (마지막 슬롯을 삭제할 슬롯 위치로 옮김, lock 안에서 호출)
+        """
+        last_slot = cls.count - 1
+        cls.slot_list[cls.stock_id_list[slot]] = -1
+
+        if slot != last_slot:
+            cls.slot_list[cls.stock_id_list[last_slot]] = slot
+            for slot_array in cls._get_slot_arrays():
+                slot_array[slot] = slot_array[last_slot]
+
+        for slot_array in cls._get_slot_arrays():
+            del slot_array[last_slot]
+
+        cls.count = last_slot
@@ -0,0 +1,162 @@
+# coding=utf-8
+import sys
+import json
+import time
+import threading
+
+from latency_stats import LatencyHistogram
+
+
+class Profiler:
+    """
+    실행중 켜고 끌수 있는 프로파일러 클래스
+
+    켜져 있는 동안 이름 붙은 구간(span)의 실행 시간을 기록하고, 모든 스레드의 스택을 주기적으로 샘플링함
+    끌때 스택 샘플은 flamegraph 입력 형식(collapsed stack, *.folded)으로, 구간 요약은 json으로 저장함
+    꺼져 있을때 구간 기록 비용은 함수 호출 한번과 값 비교뿐임
+
+    Attributes:
+        enabled (bool): 프로파일링 중 여부
+
+        span_dict (dict): 구간 이름 -> LatencyHistogram (단위: us)
+
+        stack_count_dict (dict): collapsed stack 문자열 -> 샘플 수
+
+        sample_interval (float): 스택 샘플링 주기 (단위: 초)
+
+        sampler_thread (threading.Thread): 스택 샘플링 스레드
+
+        start_time (float): 프로파일링 시작 시간 (time.time)
+
+        lock (threading.Lock): 시작 / 종료시 사용하는 락
+    """
+
+    enabled = False
+    span_dict = {}
+    stack_count_dict = {}
+    sample_interval = 0.005
+    sampler_thread = None
+    start_time = None
+    lock = threading.Lock()
+
+    @classmethod
+    def start_span(cls):
+        """
+        구간 시작 시간 반환
+
+        Returns:
+            (int): 구간 시작 시간 (time.perf_counter_ns, 프로파일링 중이 아니면 0)
+        """
+        if cls.enabled:
+            return time.perf_counter_ns()
+        return 0
+
+    @classmethod
+    def end_span(cls, name, span_start):
+        """
+        구간 실행 시간 기록
+
+        Parameters:
+            name (str): 구간 이름
+
+            span_start (int): start_span 반환값 (0 이면 기록 안함)
+        """
+        if span_start:
+            histogram = cls.span_dict.get(name)
+            if histogram is None:
+                histogram = cls.span_dict.setdefault(name, LatencyHistogram())
+            histogram.record((time.perf_counter_ns() - span_start) // 1000)
+
+    @classmethod
+    def start(cls, sample_interval=0.005):
+        """
+        프로파일링 시작
+
+        Parameters:
+            sample_interval (float): 스택 샘플링 주기 (단위: 초)
+
+        Returns:
+            (bool): 시작 여부 (이미 프로파일링 중이면 False)
+        """
+        with cls.lock:
+            if cls.enabled:
+                return False
+
+            cls.span_dict = {}
+            cls.stack_count_dict = {}
+            cls.sample_interval = sample_interval
+            cls.start_time = time.time()
+            cls.enabled = True
+
+            cls.sampler_thread = threading.Thread(target=cls._sample_loop, daemon=True)
+            cls.sampler_thread.start()
+            return True
+
+    @classmethod
+    def stop(cls, file_prefix="profile"):
+        """
+        프로파일링 종료 후 결과 파일 저장
+
+        Parameters:
+            file_prefix (str): 결과 파일 이름 앞부분
+
+        Returns:
+            (dict): 결과 파일 경로와 구간 요약 (프로파일링 중이 아니었으면 None)
+        """
+        with cls.lock:
+            if not cls.enabled:
+                return None
+
+            cls.enabled = False
+            cls.sampler_thread.join()
+
+        file_name = file_prefix + "_" + time.strftime("%Y%m%d%H%M%S", time.localtime(cls.start_time))
+        folded_path = file_name + ".folded"
+        span_path = file_name + "_span.json"
+
+        with open(folded_path, "w") as folded_file:
+            for stack, count in sorted(cls.stack_count_dict.items()):
+                folded_file.write(stack + " " + str(count) + "\n")
+
+        span_summary = cls.get_span_summary()
+        with open(span_path, "w") as span_file:
+            json.dump({"duration": time.time() - cls.start_time, "span": span_summary}, span_file, indent=4)
+
+        return {"folded_path": folded_path, "span_path": span_path, "span": span_summary}
+
+    @classmethod
+    def get_span_summary(cls):
+        """
+        구간별 실행 시간 요약 반환
+
+        Returns:
+            (dict): 구간 이름 -> 통계 (LatencyHistogram.get_stats, 단위: ms) + 전체 시간 (total_ms)
+        """
+        span_summary = {}
+        for name, histogram in list(cls.span_dict.items()):
+            span_summary[name] = histogram.get_stats()
+            span_summary[name]["total_ms"] = histogram.total / 1000
+        return span_summary
+
+    @classmethod
+    def _sample_loop(cls):
+        own_thread_id = threading.get_ident()
+
+        while cls.enabled:
+            thread_name_dict = {thread.ident: thread.name for thread in threading.enumerate()}
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+
+                frame_list = []
+                while frame is not None:
+                    code = frame.f_code
+                    frame_list.append("{} ({}:{})".format(code.co_name, code.co_filename.replace("\\", "/").rsplit("/", 1)[-1], code.co_firstlineno))
+                    frame = frame.f_back
+
+                frame_list.append(thread_name_dict.get(thread_id, str(thread_id)))
+                stack = ";".join(reversed(frame_list))
+                cls.stack_count_dict[stack] = cls.stack_count_dict.get(stack, 0) + 1
+
+            time.sleep(cls.sample_interval)
@@ -0,0 +1,421 @@
+# coding=utf-8
+import time
+import struct
+import threading
+import multiprocessing
+from multiprocessing import shared_memory
+
+import utils
+import database
+from client_protocol import TICK_STRUCT
+
+logger = utils.get_logger(__name__)
+
+SHARD_RING_CAPACITY = 32768  # 샤드별 링 버퍼 레코드 수
+SHARD_BATCH_COUNT = 1024  # 처리 프로세스가 한번에 읽는 최대 레코드 수 (종목별 db insert 를 묶는 단위)
+SHARD_IDLE_SLEEP_SEC = 0.0005  # 링 버퍼가 비었을때 다시 확인하기까지 대기 시간
+
+# 처리 프로세스로 보내는 틱 레코드 (client_protocol.TICK_STRUCT 필드 + 종목 코드, 처리 프로세스는 종목 id 를 모르므로 테이블 이름으로 사용)
+SHARD_TICK_STRUCT = struct.Struct(TICK_STRUCT.format + "8s")
+# 처리된 틱 레코드 (TICK_STRUCT 필드 + 틱이 포함된 분봉 : 날짜시간(YYYYMMDDhhmm, 0 - 분봉 없음), 시가, 고가, 저가, 종가, 거래량)
+SHARD_RESULT_STRUCT = struct.Struct(TICK_STRUCT.format + "qiiiiq")
+
+# 링 버퍼 헤더 (8 byte 정수 칸, 생산자 / 소비자가 쓰는 칸은 다른 캐시 라인)
+_RING_HEADER_BYTE = 256
+_TAIL = 0  # 생산자가 채운 레코드 수
+_HEAD = 8  # 소비자가 읽은 레코드 수
+_CLOSED = 16  # 종료 요청 (1 - 남은 레코드를 처리하고 종료)
+_STAT_PROCESS = 24  # 처리한 레코드 수 (처리 프로세스가 씀)
+_STAT_DB_ERROR = 25  # db 저장 실패 수
+_STAT_BATCH = 26  # 묶음 수
+_READY = 27  # 처리 프로세스 준비 완료 (1 - db 연결 후 레코드를 읽기 시작함)
+
+SHARD_START_TIMEOUT_SEC = 30  # 처리 프로세스가 준비될때까지 기다리는 최대 시간
+
+
+class ShmRing:
+    """
+    프로세스 사이의 고정 크기 링 버퍼 (공유 메모리, 단일 생산자 / 단일 소비자)
+
+    event_ring.EventRing 과 같이 락 없이 생산자는 tail, 소비자는 head 만 증가시키고 레코드는 struct 로 공유 메모리에 직접 씀
+    레코드를 쓴 후 tail 을 쓰므로 소비자는 tail 까지의 레코드를 모두 읽을수 있음
+    (tail / head 는 정렬된 8 byte 칸이라 한번에 쓰여지고 x86 / x64 는 쓰기 순서가 바뀌지 않음, creon 이 동작하는 windows 기준)
+    버퍼가 가득 차면 put 은 False 반환 (COM 콜백은 기다리지 않고 버림)
+
+    Attributes:
+        record_struct (struct.Struct): 레코드 형식
+
+        capacity (int): 레코드 수 (2의 거듭제곱)
+
+        mask (int): 레코드 인덱스 마스크 (capacity - 1)
+
+        shm (multiprocessing.shared_memory.SharedMemory): 공유 메모리
+
+        index_view (memoryview): 헤더의 8 byte 정수 칸
+
+        overflow_count (int): 버퍼가 가득 차서 버린 레코드 수 (생산자 프로세스)
+
+        owner (bool): 공유 메모리를 만든 쪽인지 여부 (close 시 삭제)
+    """
+
+    def __init__(self, record_struct, capacity=SHARD_RING_CAPACITY, name=None):
+        """
+        Parameters:
+            record_struct (struct.Struct): 레코드 형식
+
+            capacity (int): 레코드 수 (2의 거듭제곱으로 올림, 연결할때는 만든 쪽과 같아야함)
+
+            name (str): 연결할 공유 메모리 이름 (None - 새로 만듦)
+        """
+        self.record_struct = record_struct
+        self.capacity = 1 << max(0, capacity - 1).bit_length()
+        self.mask = self.capacity - 1
+        self.owner = name is None
+
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=_RING_HEADER_BYTE + self.capacity * record_struct.size)
+            self.shm.buf[:_RING_HEADER_BYTE] = bytes(_RING_HEADER_BYTE)
+        else:
+            # RtShardPool 이 시작한 처리 프로세스는 만든 쪽과 resource_tracker 를 공유하므로 삭제는 만든 쪽 close 에서 한번만 됨
+            self.shm = shared_memory.SharedMemory(name=name)
+
+        self.index_view = self.shm.buf[:_RING_HEADER_BYTE].cast("q")
+        self.overflow_count = 0
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def put(self, *value_list):
+        """
+        레코드 추가 (생산자)
+
+        Returns:
+            (bool): 추가 여부 (False - 버퍼가 가득 참)
+        """
+        tail = self.index_view[_TAIL]
+        if tail - self.index_view[_HEAD] >= self.capacity:
+            self.overflow_count += 1
+            return False
+        self.record_struct.pack_into(self.shm.buf, _RING_HEADER_BYTE + (tail & self.mask) * self.record_struct.size, *value_list)
+        self.index_view[_TAIL] = tail + 1
+        return True
+
+    def get_batch(self, max_count=SHARD_BATCH_COUNT):
+        """
+        레코드 읽기 (소비자)
+
+        Parameters:
+            max_count (int): 최대 레코드 수
+
+        Returns:
+            (list[tuple]): 레코드 리스트 (없으면 빈 리스트)
+        """
+        head = self.index_view[_HEAD]
+        count = min(self.index_view[_TAIL] - head, max_count)
+        if count <= 0:
+            return []
+
+        buf = self.shm.buf
+        size = self.record_struct.size
+        unpack_from = self.record_struct.unpack_from
+        record_list = [unpack_from(buf, _RING_HEADER_BYTE + ((head + idx) & self.mask) * size) for idx in range(count)]
+        self.index_view[_HEAD] = head + count
+        return record_list
+
+    def get_depth(self):
+        return self.index_view[_TAIL] - self.index_view[_HEAD]
+
+    def close(self):
+        """
+        공유 메모리 연결 해제 (만든 쪽은 삭제까지)
+        """
+        self.index_view.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _run_shard(shard_index, in_name, out_name, capacity, db_config):
+    """
+    샤드 처리 프로세스 (종목별 실시간 테이블 저장, 1분봉 생성)
+
+    링 버퍼에서 최대 SHARD_BATCH_COUNT 개씩 읽어 종목별로 한번에 insert 한 후 (틱마다 db 연결 / commit 하지 않음)
+    분봉을 갱신하고 처리된 레코드를 결과 링 버퍼로 보냄 (결과 링 버퍼가 가득 차면 빌때까지 대기)
+
+    Parameters:
+        shard_index (int): 샤드 번호
+
+        in_name (str): 입력 링 버퍼 공유 메모리 이름
+
+        out_name (str): 결과 링 버퍼 공유 메모리 이름
+
+        capacity (int): 링 버퍼 레코드 수
+
+        db_config (dict): database.set_config 인자 (spawn 으로 시작한 프로세스는 설정을 물려받지 않음)
+    """
+    database.set_config(**db_config)
+
+    from stock_data_realtime import _STOCK_RT_DATA_COLUMNS, _STOCK_RT_DATA_TYPES, _MARKET_HOURS_KIND_NAME_DICT, _BAR_MARKET_HOURS_KIND_VALUE, _get_bar_time
+
+    in_ring = ShmRing(SHARD_TICK_STRUCT, capacity, in_name)
+    out_ring = ShmRing(SHARD_RESULT_STRUCT, capacity, out_name)
+    index_view = in_ring.index_view
+    db_kr_stock_data_realtime = database.MariaDB("KR_STOCK_DATA_REALTIME")
+    created_set = set()  # 이 프로세스에서 테이블 생성을 확인한 종목 코드
+    bar_dict = {}  # 종목 id -> [날짜시간(YYYYMMDDhhmm), 시가, 고가, 저가, 종가, 거래량]
+    column_list = _STOCK_RT_DATA_COLUMNS[1:]
+    bar_kind = _BAR_MARKET_HOURS_KIND_VALUE
+    index_view[_READY] = 1
+
+    while True:
+        record_list = in_ring.get_batch()
+        if not record_list:
+            if index_view[_CLOSED]:
+                break
+            time.sleep(SHARD_IDLE_SLEEP_SEC)
+            continue
+
+        # 종목별로 모아서 저장
+        row_dict = {}
+        for stock_id, date_time, kind, price, day_changed, qty, vol, stock_code in record_list:
+            row_list = row_dict.get(stock_code)
+            if row_list is None:
+                row_list = row_dict[stock_code] = []
+            row_list.append([date_time, _MARKET_HOURS_KIND_NAME_DICT[kind], price, day_changed, qty, vol])
+
+        for stock_code, row_list in row_dict.items():
+            table = stock_code.rstrip(b"\0").decode()
+            try:
+                if not table in created_set:
+                    db_kr_stock_data_realtime.create(table, _STOCK_RT_DATA_COLUMNS, _STOCK_RT_DATA_TYPES)
+                    created_set.add(table)
+                db_kr_stock_data_realtime.insert(table, column_list, row_list)
+            except Exception:
+                logger.exception("shard %d db insert error : %s", shard_index, table)
+                index_view[_STAT_DB_ERROR] += len(row_list)
+
+        for stock_id, date_time, kind, price, day_changed, qty, vol, _ in record_list:
+            bar = None
+            if kind == bar_kind:
+                bar_time = _get_bar_time(date_time)
+                bar = bar_dict.get(stock_id)
+                if bar is not None and bar[0] % 10000 == bar_time:
+                    if price > bar[2]:
+                        bar[2] = price
+                    elif price < bar[3]:
+                        bar[3] = price
+                    bar[4] = price
+                    bar[5] += qty
+                else:
+                    bar = bar_dict[stock_id] = [utils.get_current_datetime("%Y%m%d") * 10000 + bar_time, price, price, price, price, qty]
+
+            value_list = (stock_id, date_time, kind, price, day_changed, qty, vol) + (tuple(bar) if bar is not None else (0, 0, 0, 0, 0, 0))
+            while not out_ring.put(*value_list):
+                time.sleep(SHARD_IDLE_SLEEP_SEC)
+
+        index_view[_STAT_PROCESS] += len(record_list)
+        index_view[_STAT_BATCH] += 1
+
+    in_ring.close()
+    out_ring.close()
+
+
+class RtShardPool:
+    """
+    실시간 틱 처리를 종목별로 나눠 여러 프로세스에서 실행 (shard_count 가 0 이면 사용 안함, stock_data_realtime.TICK_RING 처리 스레드에서 모두 처리)
+
+    COM 콜백은 헤더 값을 종목 id % shard_count 번째 샤드의 공유 메모리 링 버퍼에 쓰기만 하고
+    처리 프로세스가 실시간 테이블 저장, 1분봉 생성을 하여 결과 링 버퍼로 돌려주면
+    결과 처리 스레드가 result_func 을 실행함 (잔고 / 주문 검사 가격 갱신, 클라이언트 전송은 소켓과 구독 정보가 있는 이 프로세스에서 함)
+    같은 종목은 항상 같은 샤드에서 순서대로 처리되므로 종목 안의 틱 순서는 유지됨
+
+    Attributes:
+        shard_count (int): 샤드 수 (0 - 사용 안함)
+
+        in_ring_list (list[ShmRing]): 샤드별 입력 링 버퍼
+
+        out_ring_list (list[ShmRing]): 샤드별 결과 링 버퍼
+
+        process_list (list[multiprocessing.Process]): 샤드별 처리 프로세스
+
+        result_func (function): 처리된 레코드마다 실행할 함수 (인자 - SHARD_RESULT_STRUCT 값 tuple)
+
+        result_thread (threading.Thread): 결과 처리 스레드
+
+        publish_count (int): 입력 링 버퍼에 넣은 레코드 수
+
+        result_count (int): result_func 을 실행한 레코드 수
+
+        running (bool): 결과 처리 스레드 실행 여부
+    """
+
+    shard_count = 0
+    in_ring_list = []
+    out_ring_list = []
+    process_list = []
+    result_func = None
+    result_thread = None
+    publish_count = 0
+    result_count = 0
+    running = False
+
+    @classmethod
+    def start(cls, shard_count, result_func, capacity=SHARD_RING_CAPACITY):
+        """
+        처리 프로세스, 결과 처리 스레드 시작 (실시간 구독 전에 호출)
+
+        Parameters:
+            shard_count (int): 샤드 수
+
+            result_func (function): 처리된 레코드마다 실행할 함수
+
+            capacity (int): 샤드별 링 버퍼 레코드 수
+        """
+        if cls.shard_count:
+            raise RuntimeError("rt shard already started")
+
+        db_config = {
+            "backend": database.DB_BACKEND,
+            "host": database.MARIA_DB_HOST,
+            "port": database.MARIA_DB_PORT,
+            "user": database.MARIA_DB_USER,
+            "password": database.MARIA_DB_PASSWORD,
+            "charset": database.MARIA_DB_CHARSET,
+        }
+        # windows 와 같은 방식 (fork 는 COM / 스레드 상태를 복사하므로 사용 안함)
+        context = multiprocessing.get_context("spawn")
+
+        cls.in_ring_list = [ShmRing(SHARD_TICK_STRUCT, capacity) for _ in range(shard_count)]
+        cls.out_ring_list = [ShmRing(SHARD_RESULT_STRUCT, capacity) for _ in range(shard_count)]
+        cls.process_list = [
+            context.Process(
+                target=_run_shard, args=(shard_index, in_ring.name, out_ring.name, capacity, db_config), name="rt_shard_" + str(shard_index), daemon=True,
+            )
+            for shard_index, (in_ring, out_ring) in enumerate(zip(cls.in_ring_list, cls.out_ring_list))
+        ]
+        for process in cls.process_list:
+            process.start()
+
+        # 처리 프로세스는 import / db 연결에 시간이 걸리므로 준비될때까지 대기 (그 전 틱은 링 버퍼에 쌓임)
+        deadline = time.monotonic() + SHARD_START_TIMEOUT_SEC
+        while not all(in_ring.index_view[_READY] for in_ring in cls.in_ring_list):
+            if time.monotonic() > deadline or not all(process.is_alive() for process in cls.process_list):
+                logger.warning("rt shard process not ready")
+                break
+            time.sleep(0.01)
+
+        cls.result_func = result_func
+        cls.publish_count = 0
+        cls.result_count = 0
+        cls.running = True
+        cls.result_thread = threading.Thread(target=cls.run_result, daemon=True)
+        cls.result_thread.start()
+        cls.shard_count = shard_count
+        logger.info("rt shard started : %d processes", shard_count)
+
+    @classmethod
+    def publish_tick(cls, stock_id, stock_code, record):
+        """
+        틱을 종목의 샤드로 보냄 (COM 콜백)
+
+        Parameters:
+            stock_id (int): 종목 id
+
+            stock_code (bytes): 종목 코드 (ascii, 8 byte 이하)
+
+            record (list): 헤더 값 레코드 (1 ~ 6 칸 : 시분초, 시장 시간 구분, 현재가, 대비, 순간체결수량, 거래량)
+
+        Returns:
+            (bool): 보냈는지 여부 (False - 링 버퍼가 가득 차서 버림)
+        """
+        shard_count = cls.shard_count
+        if not shard_count:
+            return False  # 종료중
+        if not cls.in_ring_list[stock_id % shard_count].put(stock_id, record[1], record[2], record[3], record[4], record[5], record[6], stock_code):
+            return False
+        cls.publish_count += 1
+        return True
+
+    @classmethod
+    def run_result(cls):
+        while cls.running:
+            processed = False
+            for out_ring in cls.out_ring_list:
+                for value_list in out_ring.get_batch():
+                    try:
+                        cls.result_func(value_list)
+                    except Exception:
+                        logger.exception("rt shard result error")
+                    cls.result_count += 1
+                    processed = True
+            if not processed:
+                time.sleep(SHARD_IDLE_SLEEP_SEC)
+
+    @classmethod
+    def wait_empty(cls, timeout=None):
+        """
+        보낸 틱이 모두 처리되어 result_func 까지 실행될때까지 대기
+
+        Parameters:
+            timeout (float): 최대 대기 시간 (단위: 초, None - 무한)
+
+        Returns:
+            (bool): 모두 처리됨 여부
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        publish_count = cls.publish_count
+        while cls.result_count < publish_count:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.001)
+        return True
+
+    @classmethod
+    def stop(cls, timeout=10.0):
+        """
+        남은 틱을 처리한 후 처리 프로세스, 결과 처리 스레드 종료
+        """
+        if not cls.shard_count:
+            return
+
+        cls.wait_empty(timeout)
+        cls.shard_count = 0  # 이후 COM 콜백은 TICK_RING 으로 처리
+        for in_ring in cls.in_ring_list:
+            in_ring.index_view[_CLOSED] = 1
+        for process in cls.process_list:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+        cls.running = False
+        cls.result_thread.join()
+        for ring in cls.in_ring_list + cls.out_ring_list:
+            ring.close()
+        cls.in_ring_list = []
+        cls.out_ring_list = []
+        cls.process_list = []
+
+    @classmethod
+    def get_stats(cls):
+        """
+        통계 반환
+
+        Returns:
+            (dict): 보낸 / 처리된 레코드 수, 샤드별 (처리 수, db 저장 실패 수, 묶음 수, 대기 레코드 수, 버린 레코드 수, 프로세스 동작 여부)
+        """
+        return {
+            "publish": cls.publish_count,
+            "result": cls.result_count,
+            "shard_list": [
+                {
+                    "process": in_ring.index_view[_STAT_PROCESS],
+                    "db_error": in_ring.index_view[_STAT_DB_ERROR],
+                    "batch": in_ring.index_view[_STAT_BATCH],
+                    "depth": in_ring.get_depth(),
+                    "overflow": in_ring.overflow_count,
+                    "alive": process.is_alive(),
+                }
+                for in_ring, process in zip(cls.in_ring_list, cls.process_list)
+            ],
+        }
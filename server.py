@@ -1,103 +1,385 @@
+import os
 import time
+import codecs
 import threading
-from queue import Queue
+from queue import Queue, Empty
 import socket
 import json
+import logging
 
+import utils
+import bootstrap
 import stock_data
 import trade
 import database
-from stock_data_realtime import StockTickRt, StockAskBidRt
-from trade_status_realtime import TradeStatusRt
+from stock_symbol import StockSymbol
+from portfolio import Portfolio
+from unconcluded_order import UnconcludedOrderBook
+from order_dispatch import OrderDispatcher, OrderBatch, is_valid_order
+from order_risk import OrderRisk
+from latency_stats import OrderLatency
+from metrics import Metrics
+from profiler import Profiler
+from snapshot import ServerSnapshot
+from creon_supervisor import CreonSupervisor
+from tick_reconcile import TickReconciler
+from history_stream import HistoryStream
+from auth import AuthService, AUTH_SUCCESS
+from creon_api import CpCybos, CreonLogin, LIMIT_TYPE
+from creon_api import CreonStockOrder
+from stock_data_realtime import StockTickRt, StockAskBidRt, RtDataCache, TICK_RING, ASK_BID_RING, MARKET_HOURS_KIND, RT_BAR_MAX_COUNT
+from stock_data_realtime import start_tick_shard
+from rt_shard import RtShardPool
+from trade_status_realtime import TradeStatusRt, CONCLUSION_RING
+from client_protocol import split_json, encode_send_data, ENCODING_JSON, ENCODING_BINARY, ENCODING_LIST, BINARY_PROTOCOL_VERSION
+from client_protocol import StreamCompressor, COMPRESSION_NONE, COMPRESSION_ZLIB, COMPRESSION_LIST
 from trade_info_enum import *
 
 HOST = ""
 PORT = 30565
+METRICS_PORT = 30566  # 지표 조회 http 포트 (로컬 접속만 허용)
+ADMIN_USERNAME_LIST = ["admin"]  # 관리자 요청(프로파일링 등)을 보낼수 있는 사용자
+RESTORE_GRACE_SEC = 60  # 스냅샷에서 구독을 복원한 사용자가 다시 접속하기를 기다리는 시간 (지나면 구독 삭제)
+SEND_BATCH_BYTE = 65536  # 클라이언트에게 한번에 보내는 최대 크기 (압축 전)
+MAX_FLUSH_MS = 50  # 클라이언트가 요청할수 있는 최대 전송 묶음 대기 시간 (압축 연결의 지연시간 상한)
+LOGIN_RECV_TIMEOUT_SEC = 5  # 접속 후 로그인 요청을 기다리는 최대 시간 (로그인 처리 스레드를 오래 점유하지 않도록)
 
+# 잔고 조회 응답의 종목별 컬럼 (portfolio.Portfolio.get_position_list 순서, db KR_Stock_Balance 컬럼 이름)
+BALANCE_POSITION_COLUMNS = ("stock_code", "average_unit_price", "profit_unit_price", "quantity", "able_sell_quantity", "current_price")
+
+# 스냅샷에 저장할 구독 요청 타입
+SUBSCRIPTION_REQ_TYPE_LIST = ("trade_status_rt_sub", "stock_tick_rt_sub", "stock_askbid_rt_sub", "portfolio_rt_sub")
+
+logger = utils.get_logger(__name__)
 
 class QuantServer:
     def __init__(self):
         self.client_conn_dict = {}
+        self.task_login = TaskLogin(self)
+        task_query = TaskQuery(self)
+        task_order = TaskOrder(self)
+        task_history = TaskHistory(self)
         self.task_list = {
             "trade_status_rt_sub": TaskTradeStatusRt(self),
-            "order": TaskOrder(self),
+            "order": task_order,
+            "order_batch": task_order,
             "stock_tick_rt_sub": TaskStockTickRt(self),
             "stock_askbid_rt_sub": TaskStockAskBidRt(self),
+            "portfolio_rt_sub": TaskPortfolioRt(self),
+            "unconcluded_order": task_query,
+            "balance": task_query,
+            "last_tick": task_query,
+            "last_askbid": task_query,
+            "recent_bar": task_query,
+            "stats": task_query,
+            "profile": task_query,
+            "history": task_history,
+            "history_ack": task_history,
         }
-
-    def start_server(self):
-        trade.BalanceData.update_stock_balance()
-        trade.TradeData.update_unconcluded_order()
-
-        db_kr_operation_data = database.MariaDB("KR_OPERATION_DATA")
-        balance_stock_code_list = db_kr_operation_data.select("KR_Stock_Balance", "stock_code")
+        self.ready_sec = 0.0  # 서버 시작 ~ 준비 완료 시간 (단위: 초)
+        self.warm_restarted = False  # 스냅샷 복원 여부
+        self.creon_supervisor = None  # creon 연결 감시 / 자동 재접속 스레드
+
+    def start_server(self, warm_restart=True):
+        """
+        서버 시작
+
+        warm_restart 이고 당일 스냅샷이 있으면 잔고, 미체결 주문, 최근 체결가, 구독 목록을 스냅샷에서 복원한 후
+        creon 서버와 달라진 부분만 갱신하고, 없으면 creon 서버에서 전체를 다시 가져옴
+
+        Parameters:
+            warm_restart (bool): 스냅샷 복원 여부
+        """
+        start = time.perf_counter()
+        StockSymbol.load()
+
+        snapshot = ServerSnapshot.load() if warm_restart else None
+        self.warm_restarted = snapshot is not None
+        if snapshot is None:
+            trade.BalanceData.update_stock_balance()
+            trade.TradeData.update_unconcluded_order()
+        else:
+            ServerSnapshot.restore(snapshot)
+            self.restore_subscription(snapshot["subscription"])  # 구독 등록은 잔고 비교와 동시에 진행
+            balance_diff_count = trade.BalanceData.reconcile_stock_balance()
+            order_diff_count = trade.TradeData.reconcile_unconcluded_order()
+            logger.info("snapshot restored : %s (balance diff %d, order diff %d)", snapshot["date_time"], balance_diff_count, order_diff_count)
+        Portfolio.start_persist(database.MariaDB("KR_OPERATION_DATA"))
+        UnconcludedOrderBook.start_persist(database.MariaDB("KR_OPERATION_DATA"))
+        trade.TradeDbWriter.start_persist(database.MariaDB("KR_OPERATION_DATA"))
+
+        balance_stock_code_list = [position[0] for position in Portfolio.get_position_list()]
         if balance_stock_code_list:
-            if not isinstance(balance_stock_code_list, list):
-                balance_stock_code_list = [balance_stock_code_list]
             req = {"username": "system", "req_type": "stock_data_rt", "req_data": {"set_status": True, "stock_code_list": balance_stock_code_list}}
             self.task_list["stock_tick_rt_sub"].insert_q(req)
 
-        task_socket_thread = threading.Thread(target=self.task_socket, daemon=True)
-        task_socket_thread.start()
+        self.register_metrics()
+        Metrics.start_http_server(METRICS_PORT)
 
-    def task_socket(self):
         server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         server_socket.bind((HOST, PORT))
         server_socket.listen(5)
+        task_socket_thread = threading.Thread(target=self.task_socket, args=(server_socket,), daemon=True)
+        task_socket_thread.start()
 
+        # 실시간 구독 등록이 끝나면 준비 완료
+        self.task_list["stock_tick_rt_sub"].sub_req_q.join()
+        self.task_list["stock_askbid_rt_sub"].sub_req_q.join()
+        self.ready_sec = time.perf_counter() - start
+        logger.info("server ready (%s) : %.3f sec", "warm" if self.warm_restarted else "cold", self.ready_sec)
+
+        ServerSnapshot.start(self.get_subscription_dict)
+        self.creon_supervisor = CreonSupervisor(self)
+        TickReconciler.start(lambda: list(self.task_list["stock_tick_rt_sub"].get_subscription()))
+
+    def get_subscription_dict(self):
+        """
+        구독 데이터 반환 (스냅샷 저장용)
+
+        Returns:
+            (dict): 요청 타입 -> 구독 데이터 (각 task 의 get_subscription 반환값)
+        """
+        return {req_type: self.task_list[req_type].get_subscription() for req_type in SUBSCRIPTION_REQ_TYPE_LIST}
+
+    def restore_subscription(self, subscription_dict):
+        """
+        스냅샷의 구독 목록 복원 (RESTORE_GRACE_SEC 안에 다시 접속하지 않은 사용자의 구독은 삭제)
+
+        Parameters:
+            subscription_dict (dict): 요청 타입 -> 구독 데이터 (get_subscription_dict 반환값)
+        """
+        restored_username_set = set()
+        for req_type in SUBSCRIPTION_REQ_TYPE_LIST:
+            if req_type in subscription_dict:
+                restored_username_set.update(self.task_list[req_type].restore_subscription(subscription_dict[req_type]))
+        restored_username_set.discard("system")
+
+        def delete_restored_user():
+            for username in restored_username_set:
+                if not username in self.client_conn_dict:
+                    logger.info("restored user not reconnected : %s", username)
+                    self.delete_subscription(username)
+
+        restore_timer = threading.Timer(RESTORE_GRACE_SEC, delete_restored_user)
+        restore_timer.daemon = True
+        restore_timer.start()
+
+    def register_metrics(self):
+        Metrics.gauge("quant_client_count", "connected clients", method=lambda: len(self.client_conn_dict))
+
+        for req_type, task in self.task_list.items():
+            if hasattr(task, "sub_req_q"):
+                Metrics.gauge("quant_sub_req_q_size", "subscribe request queue size", {"task": req_type}, task.sub_req_q.qsize)
+        Metrics.gauge("quant_order_q_size", "waiting orders", method=self.task_list["order"].order_dispatcher.get_queue_size)
+        Metrics.gauge("quant_query_q_size", "query request queue size", method=self.task_list["stats"].query_q.qsize)
+        Metrics.gauge("quant_login_q_size", "accepted connections waiting for login", method=self.task_login.login_q.qsize)
+        Metrics.gauge("quant_ready_seconds", "server start to ready time", {"warm": str(self.warm_restarted).lower()}, lambda: self.ready_sec)
+        Metrics.gauge("quant_snapshot_save_ms", "last snapshot save time", method=lambda: ServerSnapshot.last_save_ms)
+        for key in ("detect", "reconnect", "reconnect_fail", "resubscribe_fail", "last_recover_ms"):
+            Metrics.gauge(
+                "quant_creon_supervisor", "creon reconnect supervisor stats", {"stat": key}, lambda key=key: self.creon_supervisor.stats_dict[key] if self.creon_supervisor else 0,
+            )
+
+        for event_ring in (TICK_RING, ASK_BID_RING, CONCLUSION_RING):
+            Metrics.gauge("quant_event_ring_depth", "realtime event ring buffer depth", {"ring": event_ring.name}, event_ring.get_depth)
+            Metrics.gauge("quant_event_ring_overflow_total", "realtime events dropped on full ring buffer", {"ring": event_ring.name}, lambda event_ring=event_ring: event_ring.overflow_count)
+        Metrics.gauge("quant_event_ring_spill_total", "realtime events queued past full ring buffer", {"ring": CONCLUSION_RING.name}, lambda: CONCLUSION_RING.spill_count)
+
+        for e_limit_type in LIMIT_TYPE:
+            Metrics.gauge(
+                "quant_creon_limit_remain_count",
+                "creon request remain count",
+                {"limit_type": e_limit_type.name},
+                lambda e_limit_type=e_limit_type: CpCybos.get_limit_remain_count(e_limit_type),
+            )
+
+    def task_socket(self, server_socket):
         while True:
-            print("Waiting on port : %d" % PORT)
+            logger.info("Waiting on port : %d", PORT)
 
             socket_conn, addr = server_socket.accept()
 
-            login_thread = threading.Thread(target=self.login, args=(socket_conn,))
-            login_thread.start()
+            self.task_login.insert_q((socket_conn, addr))
+
+    def login(self, socket_conn, addr, db_mysql):
+        """
+        로그인 요청 처리 (TaskLogin 처리 스레드)
+
+        Parameters:
+            socket_conn (socket.socket): 접속한 소켓
 
-    def login(self, socket_conn):
+            addr (tuple): 접속 주소 (host, port)
 
+            db_mysql (database.MariaDB): 처리 스레드 전용 mysql db 인스턴스
+        """
         try:
+            socket_conn.settimeout(LOGIN_RECV_TIMEOUT_SEC)
             recv_data = socket_conn.recv(1024)
-        except:
-            return
-
-        username = json.loads(recv_data.decode("utf-8"))["username"]
-        password = json.loads(recv_data.decode("utf-8"))["password"]
+            socket_conn.settimeout(None)
 
-        db_mysql = database.MariaDB("mysql")
+            login_req = json.loads(recv_data.decode("utf-8"))
+            username = login_req["username"]
+            password = login_req["password"]
+        except (OSError, ValueError, KeyError, TypeError):
+            socket_conn.close()
+            return
 
-        if username in self.client_conn_dict:
-            self.client_conn_dict[username].close_client()
+        # 클라이언트가 요청한 전송 인코딩 (지원하지 않으면 json), 압축 (지원하지 않으면 압축 안함), 전송 묶음 대기 시간
+        encoding = login_req.get("encoding", ENCODING_JSON)
+        if not encoding in ENCODING_LIST:
+            encoding = ENCODING_JSON
+        compression = login_req.get("compression", COMPRESSION_NONE)
+        if not compression in COMPRESSION_LIST:
+            compression = COMPRESSION_NONE
+        flush_ms = min(max(0, login_req.get("flush_ms", 0)), MAX_FLUSH_MS)
+
+        auth_result = AuthService.authenticate(db_mysql, username, password, addr[0] if addr else None)
+        if auth_result == AUTH_SUCCESS:
+            # 인증된 후에만 기존 연결을 끊음 (잘못된 로그인 시도로 접속중인 사용자가 끊기지 않도록)
+            if username in self.client_conn_dict:
+                self.client_conn_dict[username].close_client()
 
-        if password == db_mysql.select("user", "Password", "User = '" + username + "'"):
             socket_conn.send("SUCCESS".encode("utf-8"))
-            print("login success : ", username)
-            self.client_conn_dict[username] = ClientConn(username, socket_conn, self)
+            logger.info("login success : %s (%s, %s)", username, encoding, compression)
+            client_conn = ClientConn(username, socket_conn, self, encoding, compression, flush_ms)
+            if encoding == ENCODING_BINARY:
+                # 시세 프레임보다 먼저 프로토콜 정보와 이미 구독중인(스냅샷에서 복원된) 종목의 id를 보냄
+                client_conn.insert_send_q(self.get_protocol_json())
+                sub_stock_code_set = set()
+                for req_type in ("stock_tick_rt_sub", "stock_askbid_rt_sub"):
+                    sub_stock_code_set.update(
+                        stock_code for stock_code, user_list in self.task_list[req_type].get_subscription().items() if username in user_list
+                    )
+                if sub_stock_code_set:
+                    client_conn.insert_send_q(self.get_symbol_map_json(sorted(sub_stock_code_set)))
+            self.client_conn_dict[username] = client_conn
 
         else:
-            print("login failed")
+            logger.warning("login failed : %s (%s)", username, auth_result)
             socket_conn.send("FAIL".encode("utf-8"))
             socket_conn.close()
 
+    def get_encoding(self, username):
+        """
+        클라이언트 전송 인코딩 반환
+
+        Returns:
+            (str): 인코딩 (client_protocol.ENCODING_LIST)
+
+            (None): 접속중이 아닌 사용자
+        """
+        client_conn = self.client_conn_dict.get(username)
+        return client_conn.encoding if client_conn is not None else None
+
+    def get_protocol_json(self):
+        """
+        binary 인코딩 클라이언트에게 로그인 직후 보내는 프로토콜 정보 (버전, 시장 시간 구분 플래그 값 -> 이름)
+        """
+        res_data = {
+            "encoding": ENCODING_BINARY,
+            "version": BINARY_PROTOCOL_VERSION,
+            "market_hours_kind": {e_kind.value: e_kind.name for e_kind in MARKET_HOURS_KIND},
+        }
+        return json.dumps({"res_type": "protocol", "res_data": res_data})
+
+    def get_symbol_map_json(self, stock_code_list):
+        """
+        binary 인코딩 클라이언트에게 보내는 종목 코드 -> 종목 id (바이너리 시세 프레임은 종목 id 로 보냄)
+
+        Parameters:
+            stock_code_list (list[str]): 종목 코드 리스트
+        """
+        return json.dumps({"res_type": "symbol_map", "res_data": {stock_code: StockSymbol.get_id(stock_code) for stock_code in stock_code_list}})
+
+    def close_server(self):
+        RtShardPool.stop()
+        OrderLatency.dump("order_latency_" + time.strftime("%Y%m%d%H%M%S") + ".json")  # 주문 단계별 지연시간 통계 저장
+        ServerSnapshot.save(self.get_subscription_dict())  # 재시작시 복원할 마지막 상태 저장
+
     def insert_send_q(self, username, data):
         if username in self.client_conn_dict:
             self.client_conn_dict[username].insert_send_q(data)
 
     def delete_client(self, username):
+        self.delete_subscription(username)
+        del self.client_conn_dict[username]
+
+    def delete_subscription(self, username):
         self.task_list["stock_tick_rt_sub"].delete_user(username)
         # self.task_list["stock_askbid_rt_sub"].delete_user(username)
         self.task_list["trade_status_rt_sub"].delete_user(username)
-        del self.client_conn_dict[username]
+        self.task_list["portfolio_rt_sub"].delete_user(username)
+        self.task_list["history"].delete_user(username)
+
+
+class TaskLogin(threading.Thread):
+    """
+    로그인 처리 스레드
+
+    접속 대기 스레드는 접속한 소켓을 login_q 에 넣기만 하고 (db 가 느려도 접속을 계속 받음)
+    처리 스레드 worker_count 개가 각자의 mysql db 연결로 로그인 요청을 처리함 (재접속이 몰려도 db 연결은 worker_count 개)
+
+    Attributes:
+        caller (QuantServer): 서버
+
+        login_q (queue.Queue): (소켓, 접속 주소) 대기열
+    """
+
+    def __init__(self, caller, worker_count=8):
+        """
+        Parameters:
+            caller (QuantServer): 서버
+
+            worker_count (int): 로그인 처리 스레드 수 (db 조회 대기와 pbkdf2 검사가 겹치도록 코어 수보다 크게)
+        """
+        threading.Thread.__init__(self)
+
+        self.caller = caller
+        self.login_q = Queue()
+
+        for _ in range(worker_count - 1):
+            threading.Thread(target=self.run, daemon=True).start()
+
+        self.setDaemon(True)
+        self.start()
+
+    def run(self):
+        db_mysql = None
+        while True:
+            socket_conn, addr = self.login_q.get()
+
+            start = time.perf_counter()
+            try:
+                if db_mysql is None:
+                    db_mysql = database.MariaDB("mysql")
+                self.caller.login(socket_conn, addr, db_mysql)
+            except Exception:
+                logger.exception("login error : %s", addr)
+                db_mysql = None  # db 연결 오류일수 있으므로 다음 로그인에서 다시 연결
+                socket_conn.close()
+            OrderLatency.get_histogram("login").record((time.perf_counter() - start) * 1000000)
+
+    def insert_q(self, data):
+        self.login_q.put(data)
 
 
 class ClientConn:
-    def __init__(self, username, socket_conn, caller):
+    def __init__(self, username, socket_conn, caller, encoding=ENCODING_JSON, compression=COMPRESSION_NONE, flush_ms=0):
         self.username = username
         self.socket_conn = socket_conn
+        self.encoding = encoding
+        self.compressor = StreamCompressor() if compression == COMPRESSION_ZLIB else None
+        self.flush_sec = flush_ms / 1000  # 첫 메시지 이후 전송 묶음을 더 모으는 시간 (0 - 대기열에 쌓인 만큼만)
         self.send_q = Queue()
         self.recv_q = Queue()
 
         self.caller = caller
 
+        Metrics.gauge("quant_send_q_size", "client send queue size", {"username": username}, self.send_q.qsize)
+        Metrics.gauge("quant_recv_q_size", "client recv queue size", {"username": username}, self.recv_q.qsize)
+        self.send_counter = Metrics.counter("quant_send_total", "messages sent to clients", {"username": username})
+        self.send_byte_counter = Metrics.counter("quant_send_byte_total", "bytes sent to clients (after compression)", {"username": username})
+
         socket_send_thread = threading.Thread(target=self.socket_send, daemon=True)
         socket_recv_thread = threading.Thread(target=self.socket_recv, daemon=True)
 
@@ -105,19 +387,43 @@ class ClientConn:
         socket_recv_thread.start()
 
     def socket_send(self):
-        while True:
+        # 대기열에 쌓인 메시지를 묶어서 한번에 보냄 (압축 연결은 묶음마다 flush 하므로 지연시간은 묶음 단위로 제한됨)
+        closing = False
+        while not closing:
             try:
                 send_data = self.send_q.get()
 
                 if send_data == "CLOSE":
                     break
 
-                self.socket_conn.sendall(send_data.encode("utf-8"))
+                data_list = [encode_send_data(send_data, self.encoding)]
+                batch_byte = len(data_list[0])
+                deadline = time.perf_counter() + self.flush_sec
+                while batch_byte < SEND_BATCH_BYTE:
+                    try:
+                        timeout = deadline - time.perf_counter()
+                        send_data = self.send_q.get(timeout=timeout) if timeout > 0 else self.send_q.get_nowait()
+                    except Empty:
+                        break
+
+                    if send_data == "CLOSE":
+                        closing = True
+                        break
+                    data_list.append(encode_send_data(send_data, self.encoding))
+                    batch_byte += len(data_list[-1])
+
+                data = b"".join(data_list) if len(data_list) > 1 else data_list[0]
+                if self.compressor is not None:
+                    data = self.compressor.compress(data)
+
+                self.socket_conn.sendall(data)
+                self.send_counter.inc(len(data_list))
+                self.send_byte_counter.inc(len(data))
             except:
                 break
 
             time.sleep(0.001)
-        print("send end")
+        logger.debug("send end : %s", self.username)
 
     def insert_send_q(self, data):
         self.send_q.put(data)
@@ -126,36 +432,46 @@ class ClientConn:
         execute_recv_req_thread = threading.Thread(target=self.execute_recv_req, daemon=True)
         execute_recv_req_thread.start()
 
+        utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+        buffer = ""
         while True:
             try:
-                recv_data = self.socket_conn.recv(1024).decode("utf-8")
+                recv_data = self.socket_conn.recv(4096)
             except:
                 self.close_client()
                 break
 
-            if recv_data == "CLOSE" or recv_data == "":
+            buffer += utf8_decoder.decode(recv_data)
+            if recv_data == b"" or buffer.startswith("CLOSE"):
                 self.close_client()
                 break
 
-            self.recv_q.put(recv_data)
+            recv_time = time.perf_counter()
+            req_list, buffer = split_json(buffer)
+            for req in req_list:
+                self.recv_q.put((req, recv_time))
 
     def execute_recv_req(self):
         while True:
-            recv_data = self.recv_q.get()
+            req, recv_time = self.recv_q.get()
 
-            if recv_data == "CLOSE":
+            if req == "CLOSE":
                 break
 
-            req = json.loads(recv_data)
             req["username"] = self.username
-            print(req)
+            req["latency"] = {"socket_recv": recv_time, "execute_recv_req": time.perf_counter()}
+            logger.debug("recv req : %s", req)
             self.caller.task_list[req["req_type"]].insert_q(req)
-        print("execute end")
+        logger.debug("execute end : %s", self.username)
 
     def close_client(self):
+        Metrics.remove("quant_send_q_size", {"username": self.username})
+        Metrics.remove("quant_recv_q_size", {"username": self.username})
+        Metrics.remove("quant_send_total", {"username": self.username})
+        Metrics.remove("quant_send_byte_total", {"username": self.username})
         self.socket_conn.close()
         self.insert_send_q("CLOSE")
-        self.recv_q.put("CLOSE")
+        self.recv_q.put(("CLOSE", None))
 
         self.caller.delete_client(self.username)
 
@@ -191,29 +507,202 @@ class TaskTradeStatusRt(threading.Thread):
                     self.sub_username_list.remove(username)
 
     def event(self, trade_info):
-        print("event!!!!")
-        if trade_info["e_conclusion_type"] == CONCLUSION_TYPE.CONCLUDED:
+        logger.debug("trade status event : %s", trade_info.order_num)
+        if trade_info.e_conclusion_type == CONCLUSION_TYPE.CONCLUDED:
             req = {
                 "username": "system",
                 "req_type": "stock_data_rt",
-                "req_data": {"set_status": bool(trade_info["balance_qty"]), "stock_code_list": [trade_info["stock_code"]]},
+                "req_data": {"set_status": bool(trade_info.balance_qty), "stock_code_list": [trade_info.stock_code]},
             }
             self.caller.task_list["stock_tick_rt_sub"].insert_q(req)
 
-        trade_info["e_order_type"] = trade_info["e_order_type"].name
-        trade_info["e_conclusion_type"] = trade_info["e_conclusion_type"].name
-        trade_info["e_modify_cancel_type"] = trade_info["e_modify_cancel_type"].name
-        trade_info["e_price_type"] = trade_info["e_price_type"].name
-        trade_info["e_order_condition"] = trade_info["e_order_condition"].name
+        data_json = trade_info.to_json()
+        for username in self.sub_username_list:
+            self.caller.insert_send_q(username, data_json)
+
+    def delete_user(self, username):
+        # 구독 목록은 task 스레드에서만 변경 (소켓 스레드에서 바로 지우지 않음)
+        self.insert_q({"username": username, "req_type": "trade_status_rt_sub", "req_data": {"set_status": False}})
+
+    def get_subscription(self):
+        return list(self.sub_username_list)
+
+    def restore_subscription(self, username_list):
+        for username in username_list:
+            self.insert_q({"username": username, "req_type": "trade_status_rt_sub", "req_data": {"set_status": True}})
+        return username_list
+
+    def resubscribe(self):
+        # creon 재접속 후 실시간 주문 체결 다시 등록
+        return self.trade_status_rt.subscribe()
+
+    def insert_q(self, data):
+        self.sub_req_q.put(data)
+
+
+class TaskQuery(threading.Thread):
+    def __init__(self, caller):
+        threading.Thread.__init__(self)
+
+        self.caller = caller
+        self.query_q = Queue()
+
+        # 조회 요청 타입 -> 처리 메소드 (db 조회 없이 서버 메모리 데이터로 응답, 최근 틱 / 분봉은 캐시에 없는 경우만 db 조회)
+        self.query_method_dict = {
+            "unconcluded_order": self.query_unconcluded_order,
+            "balance": self.query_balance,
+            "last_tick": self.query_last_tick,
+            "last_askbid": self.query_last_askbid,
+            "recent_bar": self.query_recent_bar,
+            "stats": self.query_stats,
+            "profile": self.query_profile,
+        }
+        # 관리자만 보낼수 있는 요청 타입
+        self.admin_req_type_set = {"profile"}
+
+        self.setDaemon(True)
+        self.start()
+
+    def run(self):
+        while True:
+            req = self.query_q.get()
+
+            if req["req_type"] in self.admin_req_type_set and not req["username"] in ADMIN_USERNAME_LIST:
+                res_data = {"error": "NOT_ADMIN"}
+            else:
+                # 잘못된 요청은 오류 응답만 보냄 (조회 스레드는 하나이므로 예외로 종료되지 않도록)
+                req_data = req.get("req_data") or {}
+                try:
+                    if not isinstance(req_data, dict):
+                        raise TypeError("req_data is not dict")
+                    res_data = self.query_method_dict[req["req_type"]](req_data)
+                except (KeyError, ValueError, TypeError) as e:
+                    logger.warning("invalid query request : %s %s (%s)", req["req_type"], req_data, e)
+                    res_data = {"error": "INVALID_REQUEST"}
+
+            json_dict = {"res_type": req["req_type"], "res_data": res_data}
+            self.caller.insert_send_q(req["username"], json.dumps(json_dict))
+
+            # 조회 종류별 지연시간 (소켓 수신 ~ 응답 전송 대기열 추가)
+            if "latency" in req:
+                OrderLatency.get_histogram("query>" + req["req_type"]).record((time.perf_counter() - req["latency"]["socket_recv"]) * 1000000)
+
+    def query_unconcluded_order(self, req_data):
+        stock_code = req_data.get("stock_code")
+        if stock_code is not None and not isinstance(stock_code, str):
+            raise ValueError("invalid stock_code")
+        return UnconcludedOrderBook.get_order_list(stock_code)
+
+    def query_balance(self, req_data):
+        # 종목별 잔고는 db(KR_Stock_Balance) 컬럼 이름으로 보냄
+        return {
+            "summary": Portfolio.get_summary(),
+            "position_list": [dict(zip(BALANCE_POSITION_COLUMNS, position)) for position in Portfolio.get_position_list()],
+        }
+
+    @staticmethod
+    def get_stock_code_list(req_data):
+        # 요청의 종목 코드 리스트 (종목 코드는 영문 / 숫자만)
+        stock_code_list = req_data.get("stock_code_list", ())
+        if not isinstance(stock_code_list, (list, tuple)) or not all(isinstance(stock_code, str) and stock_code.isalnum() for stock_code in stock_code_list):
+            raise ValueError("invalid stock_code_list")
+        return stock_code_list
+
+    def query_last_tick(self, req_data):
+        return {stock_code: RtDataCache.get_last_tick(stock_code) for stock_code in self.get_stock_code_list(req_data)}
+
+    def query_last_askbid(self, req_data):
+        return {stock_code: RtDataCache.get_last_ask_bid(stock_code) for stock_code in self.get_stock_code_list(req_data)}
+
+    def query_recent_bar(self, req_data):
+        stock_code = req_data["stock_code"]
+        if not isinstance(stock_code, str) or not stock_code.isalnum():
+            raise ValueError("invalid stock_code")
+        count = min(max(int(req_data.get("count", 30)), 1), RT_BAR_MAX_COUNT)
+        return {"stock_code": stock_code, "bar_list": RtDataCache.get_recent_bar_list(stock_code, count)}
+
+    def query_stats(self, req_data):
+        return dict(OrderLatency.get_stats(), query_cache=RtDataCache.get_stats(), db_cache=database.QueryCache.get_stats(), login=AuthService.get_stats(), rt_shard=RtShardPool.get_stats())
+
+    def query_profile(self, req_data):
+        # set_status True - 프로파일링 시작, False - 종료 후 결과 파일 저장, 없음 - 현재 구간 요약 조회
+        if not "set_status" in req_data:
+            return {"enabled": Profiler.enabled, "span": Profiler.get_span_summary()}
+
+        if req_data["set_status"]:
+            sample_interval_ms = float(req_data.get("sample_interval_ms", 5))
+            if not sample_interval_ms > 0:
+                raise ValueError("invalid sample_interval_ms")
+            started = Profiler.start(sample_interval_ms / 1000)
+            return {"enabled": True, "started": started}
+
+        result = Profiler.stop()
+        if result is None:
+            return {"enabled": False, "stopped": False}
+        logger.info("profile saved : %s, %s", result["folded_path"], result["span_path"])
+        return dict(result, enabled=False, stopped=True)
+
+    def insert_q(self, data):
+        self.query_q.put(data)
+
+
+class TaskPortfolioRt(threading.Thread):
+    def __init__(self, caller, push_interval=1):
+        threading.Thread.__init__(self)
+
+        self.caller = caller
+        self.push_interval = push_interval  # 포트폴리오 손익 전송 주기 (단위: 초)
+
+        self.sub_req_q = Queue()
+        self.sub_username_list = []
+        self.pushed_version = -1
+
+        self.setDaemon(True)
+        self.start()
+
+    def run(self):
+        while True:
+            try:
+                req = self.sub_req_q.get(timeout=self.push_interval)
+            except Empty:
+                self.push()
+                continue
+
+            username = req["username"]
+            sub_req = req["req_data"]
+
+            if sub_req["set_status"]:
+                if not username in self.sub_username_list:
+                    self.sub_username_list.append(username)
+                    self.pushed_version = -1  # 새 구독자에게 바로 전송
+            else:
+                if username in self.sub_username_list:
+                    self.sub_username_list.remove(username)
+
+            self.push()
 
-        data_json = {"res_type": "trade_status", "res_data": trade_info}
+    def push(self):
+        # 잔고 데이터가 바뀐 경우만 전송
+        version = Portfolio.version
+        if not self.sub_username_list or version == self.pushed_version:
+            return
+        self.pushed_version = version
 
+        data_json = json.dumps({"res_type": "portfolio_rt_data", "res_data": Portfolio.get_summary()})
         for username in self.sub_username_list:
-            self.caller.insert_send_q(username, json.dumps(data_json))
+            self.caller.insert_send_q(username, data_json)
 
     def delete_user(self, username):
-        if username in self.sub_username_list:
-            self.sub_username_list.remove(username)
+        # 구독 목록은 task 스레드에서만 변경 (소켓 스레드에서 바로 지우지 않음)
+        self.insert_q({"username": username, "req_type": "portfolio_rt_sub", "req_data": {"set_status": False}})
+
+    def get_subscription(self):
+        return list(self.sub_username_list)
+
+    def restore_subscription(self, username_list):
+        for username in username_list:
+            self.insert_q({"username": username, "req_type": "portfolio_rt_sub", "req_data": {"set_status": True}})
+        return username_list
 
     def insert_q(self, data):
         self.sub_req_q.put(data)
@@ -227,7 +716,7 @@ class TaskStockDataRt(threading.Thread):
         self.caller = caller
 
         self.sub_req_q = Queue()
-        self.sub_status_dict = {}
+        self.sub_status_list = []  # 종목 id 인덱스의 구독 상태 (None - 구독 안함, {"ins", "user_list"} - 구독중)
 
         self.setDaemon(True)
         self.start()
@@ -239,46 +728,167 @@ class TaskStockDataRt(threading.Thread):
             username = req["username"]
             sub_req = req["req_data"]
 
-            if sub_req["set_status"]:
-                for stock_code in sub_req["stock_code_list"]:
-                    if not stock_code in self.sub_status_dict:
-                        self.sub_status_dict[stock_code] = {}
-                        self.sub_status_dict[stock_code]["ins"] = self.rt_class(stock_code, self.event)
-                        self.sub_status_dict[stock_code]["user_list"] = []
-
-                    if not username in self.sub_status_dict[stock_code]["user_list"]:
-                        self.sub_status_dict[stock_code]["user_list"].append(username)
+            if sub_req.get("resubscribe"):
+                req["failed_list"] = self.execute_resubscribe(sub_req["stock_code_list"])
+                req["done_event"].set()
+                self.sub_req_q.task_done()
+                continue
+
+            if sub_req.get("delete_user"):
+                # 접속 종료된 사용자의 모든 구독 종목 해지 (delete_user)
+                stock_id_list = [
+                    stock_id for stock_id, sub_status in enumerate(self.sub_status_list) if sub_status is not None and username in sub_status["user_list"]
+                ]
             else:
+                # 클라이언트가 보낸 종목 코드는 여기서 한번만 id로 변환 (등록되지 않은 종목 코드는 등록하지 않고 오류 응답)
+                stock_code_list = []
+                stock_id_list = []
+                unknown_code_list = []
                 for stock_code in sub_req["stock_code_list"]:
-                    if stock_code in self.sub_status_dict:
-                        if username in self.sub_status_dict[stock_code]["user_list"]:
-                            self.sub_status_dict[stock_code]["user_list"].remove(username)
+                    stock_id = StockSymbol.find_id(stock_code)
+                    if stock_id is None:
+                        unknown_code_list.append(stock_code)
+                    else:
+                        stock_code_list.append(stock_code)
+                        stock_id_list.append(stock_id)
+
+                if unknown_code_list and sub_req["set_status"]:
+                    logger.warning("%s unknown stock code : %s %s", self.res_type, username, unknown_code_list[:10])
+                    res_data = {"error": "UNKNOWN_STOCK_CODE", "stock_code_list": unknown_code_list}
+                    self.caller.insert_send_q(username, json.dumps({"res_type": self.res_type, "res_data": res_data}))
+            StockSymbol.fit_list(self.sub_status_list)
 
-                        if not self.sub_status_dict[stock_code]["user_list"]:
-                            self.sub_status_dict[stock_code]["ins"].unsubscribe()
-                            del self.sub_status_dict[stock_code]
-            print(self.sub_status_dict)
+            if sub_req["set_status"]:
+                # binary 인코딩 클라이언트는 시세 프레임을 받기 전에 종목 id를 알아야 함
+                if self.caller.get_encoding(username) == ENCODING_BINARY:
+                    self.caller.insert_send_q(username, self.caller.get_symbol_map_json(stock_code_list))
+
+                for stock_id in stock_id_list:
+                    sub_status = self.sub_status_list[stock_id]
+                    if sub_status is None:
+                        sub_status = {"ins": self.rt_class(StockSymbol.get_code(stock_id), self.event, self.drop_event), "user_list": []}
+                        self.sub_status_list[stock_id] = sub_status
+
+                    if not username in sub_status["user_list"]:
+                        sub_status["user_list"].append(username)
+            else:
+                for stock_id in stock_id_list:
+                    sub_status = self.sub_status_list[stock_id]
+                    if sub_status is not None:
+                        if username in sub_status["user_list"]:
+                            sub_status["user_list"].remove(username)
+
+                        if not sub_status["user_list"]:
+                            sub_status["ins"].unsubscribe()
+                            self.sub_status_list[stock_id] = None
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s subscribe : %s",
+                    self.res_type,
+                    [StockSymbol.get_code(stock_id) for stock_id, sub_status in enumerate(self.sub_status_list) if sub_status is not None],
+                )
+            self.sub_req_q.task_done()
 
     def insert_q(self, data):
         self.sub_req_q.put(data)
 
+    def resubscribe(self, stock_code_list, timeout=30.0):
+        """
+        creon 재접속 후 구독중인 종목 다시 등록 (task 스레드에서 이 요청을 처리할때까지 대기)
+
+        Parameters:
+            stock_code_list (list[str]): 다시 등록할 종목 코드 리스트 (우선순위 순서)
+
+            timeout (float): 최대 대기 시간 (단위: 초, 넘으면 모든 종목을 등록하지 못한것으로 처리)
+
+        Returns:
+            (list[str]): 다시 등록하지 못한 종목 코드 리스트
+        """
+        req = {
+            "username": "system",
+            "req_type": self.res_type,
+            "req_data": {"resubscribe": True, "stock_code_list": stock_code_list},
+            "done_event": threading.Event(),
+        }
+        self.insert_q(req)
+        if not req["done_event"].wait(timeout):
+            logger.error("%s resubscribe timeout : %d codes", self.res_type, len(stock_code_list))
+            return list(stock_code_list)
+        return req["failed_list"]
+
+    def execute_resubscribe(self, stock_code_list):
+        failed_list = []
+        for stock_code in stock_code_list:
+            stock_id = StockSymbol.find_id(stock_code)
+            sub_status = self.sub_status_list[stock_id] if stock_id is not None and stock_id < len(self.sub_status_list) else None
+            if sub_status is None:
+                continue
+
+            # SUBSCRIBE 제한을 넘으면 남은 종목은 등록하지 않음 (우선순위가 낮은 종목부터 빠짐)
+            if not CpCybos.get_limit_remain_count(LIMIT_TYPE.SUBSCRIBE) or not sub_status["ins"].subscribe():
+                failed_list.append(stock_code)
+        return failed_list
+
+    def get_subscription(self):
+        # 종목 코드 -> 구독 사용자 리스트
+        return {
+            StockSymbol.get_code(stock_id): list(sub_status["user_list"])
+            for stock_id, sub_status in enumerate(list(self.sub_status_list))
+            if sub_status is not None
+        }
+
+    def restore_subscription(self, sub_dict):
+        # 사용자별로 구독 종목을 모아 한번에 요청 (system 사용자 먼저)
+        user_stock_code_dict = {"system": []}
+        for stock_code, user_list in sub_dict.items():
+            for username in user_list:
+                user_stock_code_dict.setdefault(username, []).append(stock_code)
+
+        for username, stock_code_list in user_stock_code_dict.items():
+            if stock_code_list:
+                self.insert_q({"username": username, "req_type": self.res_type, "req_data": {"set_status": True, "stock_code_list": stock_code_list}})
+        return [username for username, stock_code_list in user_stock_code_dict.items() if stock_code_list]
+
     def event(self, stock_rt_data):
-        if self.res_type == "stock_tick_rt_data":
-            stock_rt_data["e_market_hours_kind"] = stock_rt_data["e_market_hours_kind"].name
+        stock_id = stock_rt_data.stock_id
+        sub_status = self.sub_status_list[stock_id] if stock_id < len(self.sub_status_list) else None
+        if sub_status is None:
+            return
 
-        data_json = {"res_type": self.res_type, "res_data": stock_rt_data}
-        if stock_rt_data["stock_code"] in self.sub_status_dict:
-            for username in self.sub_status_dict[stock_rt_data["stock_code"]]["user_list"]:
-                self.caller.insert_send_q(username, json.dumps(data_json))
+        # 클라이언트 인코딩별로 한번만 변환 (json 은 보낼때만 종목 id를 종목 코드로 변환, binary 는 종목 id 그대로)
+        span_start = Profiler.start_span()
+        data_json = None
+        data_frame = None
+        for username in sub_status["user_list"]:
+            encoding = self.caller.get_encoding(username)
+            if encoding is None:
+                continue  # 접속중이 아닌 사용자 (system, 재접속 대기중인 사용자)
+
+            if encoding == ENCODING_BINARY:
+                if data_frame is None:
+                    data_frame = stock_rt_data.pack_frame()
+                self.caller.insert_send_q(username, data_frame)
+            else:
+                if data_json is None:
+                    data_json = stock_rt_data.to_json(StockSymbol.get_code(stock_id))
+                self.caller.insert_send_q(username, data_json)
+        Profiler.end_span(self.res_type + "_fan_out", span_start)
+
+    def drop_event(self, stock_id, evt_type, drop_count):
+        # 링 버퍼가 가득 차서 버린 이벤트 수를 다음 이벤트 전에 구독자에게 알림 (링 버퍼 처리 스레드에서 실행됨)
+        sub_status = self.sub_status_list[stock_id] if stock_id < len(self.sub_status_list) else None
+        if sub_status is None:
+            return
 
-    def delete_user(self, username):
-        for stock_code in self.sub_status_dict.keys():
-            if username in self.sub_status_dict[stock_code]["user_list"]:
-                self.sub_status_dict[stock_code]["user_list"].remove(username)
+        logger.warning("%s dropped : %s %d", evt_type, StockSymbol.get_code(stock_id), drop_count)
+        res_data = {"stock_code": StockSymbol.get_code(stock_id), "evt_type": evt_type, "drop_count": drop_count}
+        data_json = json.dumps({"res_type": "feed_drop", "res_data": res_data})
+        for username in sub_status["user_list"]:
+            self.caller.insert_send_q(username, data_json)
 
-            if not self.sub_status_dict[stock_code]["user_list"]:
-                self.sub_status_dict[stock_code]["ins"].unsubscribe()
-                del self.sub_status_dict[stock_code]
+    def delete_user(self, username):
+        # 구독 상태는 task 스레드에서만 변경 (여러 소켓 스레드가 동시에 해지하면 같은 종목을 두번 unsubscribe 할수 있음)
+        self.insert_q({"username": username, "req_type": self.res_type, "req_data": {"set_status": False, "delete_user": True}})
 
 
 class TaskStockTickRt(TaskStockDataRt):
@@ -291,65 +901,281 @@ class TaskStockAskBidRt(TaskStockDataRt):
         TaskStockDataRt.__init__(self, "stock_askbid_rt_data", StockAskBidRt, caller)
 
 
-class TaskOrder(threading.Thread):
-    def __init__(self, caller):
+class TaskHistory(threading.Thread):
+    """
+    과거 봉 조회(history) 요청 처리 스레드
+
+    요청마다 HistoryStream 을 만들어 시작 메시지를 보내고 종목별 작업을 처리 스레드들에 나눠 주며
+    처리 스레드는 각자의 db 연결로 종목을 동시에 읽어 보냄 (history_ack 는 대기열을 거치지 않고 바로 전송 창에 반영)
+    전송 창이 빈 작업은 HistoryStream 에 멈춰두고 ack 가 오면 다시 작업 대기열에 넣으며, ack 가 ACK_TIMEOUT_SEC 동안 없으면 요청 취소
+
+    Attributes:
+        caller (QuantServer): 서버
+
+        req_q (queue.Queue): history 요청 대기열
+
+        job_q (queue.Queue): (HistoryStream, 종목 코드, 다음 seq, 마지막으로 보낸 날짜시간) 작업 대기열
+
+        stream_dict (dict): (사용자, 요청 id) -> 전송중인 HistoryStream
+
+        lock (threading.Lock): stream_dict 변경시 사용하는 락
+    """
+
+    def __init__(self, caller, worker_count=4):
+        """
+        Parameters:
+            caller (QuantServer): 서버
+
+            worker_count (int): 종목을 동시에 읽는 처리 스레드 수
+        """
         threading.Thread.__init__(self)
-        self.order_q = Queue()
+
         self.caller = caller
+        self.req_q = Queue()
+        self.job_q = Queue()
+        self.stream_dict = {}
+        self.lock = threading.Lock()
+
+        Metrics.gauge("quant_history_job_q_size", "history symbol jobs waiting for a worker", method=self.job_q.qsize)
+        for _ in range(worker_count):
+            threading.Thread(target=self.run_worker, daemon=True).start()
 
         self.setDaemon(True)
         self.start()
 
     def run(self):
         while True:
-            req = self.order_q.get()
+            try:
+                req = self.req_q.get(timeout=1)
+            except Empty:
+                req = None
+            self.cancel_ack_timeout()
+            if req is None:
+                continue
 
             username = req["username"]
-            order_info = req["req_data"]
-
-            if order_info["order_type"] == "buy":
-                order_num = trade.Order.buy(
-                    order_info["stock_code"],
-                    order_info["qty"],
-                    ORDER_CONDITION[order_info["e_order_condition"]],
-                    PRICE_TYPE[order_info["e_price_type"]],
-                    order_info["price"],
-                )
-            elif order_info["order_type"] == "sell":
-                order_num = trade.Order.sell(
-                    order_info["stock_code"],
-                    order_info["qty"],
-                    ORDER_CONDITION[order_info["e_order_condition"]],
-                    PRICE_TYPE[order_info["e_price_type"]],
-                    order_info["price"],
-                )
-            elif order_info["order_type"] == "modify_type":
-                order_num = trade.Order.modify_type(
-                    order_info["origin_order_num"],
-                    order_info["stock_code"],
-                    order_info["qty"],
-                    ORDER_CONDITION[order_info["e_order_condition"]],
-                    PRICE_TYPE[order_info["e_price_type"]],
-                    order_info["price"],
-                )
-            elif order_info["order_type"] == "modify_price":
-                order_num = trade.Order.modify_price(order_info["origin_order_num"], order_info["stock_code"], order_info["qty"], order_info["price"])
-            elif order_info["order_type"] == "cancel":
-                order_num = trade.Order.cancel(order_info["origin_order_num"], order_info["stock_code"], order_info["qty"])
+            req_data = req.get("req_data") or {}
+
+            encoding = self.caller.get_encoding(username)
+            if encoding is None:
+                continue
+
+            try:
+                stream = HistoryStream.from_req_data(username, req_data, encoding)
+            except (KeyError, ValueError, TypeError) as e:
+                logger.warning("invalid history request : %s (%s)", req_data, e)
+                res_data = {"req_id": req_data.get("req_id"), "error": "INVALID_REQUEST"}
+                self.caller.insert_send_q(username, json.dumps({"res_type": "history_end", "res_data": res_data}))
+                continue
+
+            with self.lock:
+                if (username, stream.req_id) in self.stream_dict:
+                    res_data = {"req_id": stream.req_id, "error": "DUPLICATE_REQ_ID"}
+                    self.caller.insert_send_q(username, json.dumps({"res_type": "history_end", "res_data": res_data}))
+                    continue
+                self.stream_dict[(username, stream.req_id)] = stream
+
+            self.caller.insert_send_q(username, stream.get_start_json())
+            for stock_code in stream.stock_code_list:
+                self.job_q.put((stream, stock_code, 0, None))
+
+    def run_worker(self):
+        db_dict = {}  # db 이름 -> 처리 스레드 전용 db 인스턴스
+        while True:
+            stream, stock_code, seq, last_key = self.job_q.get()
+
+            db = db_dict.get(stream.db_name)
+            if db is None:
+                db = db_dict[stream.db_name] = database.MariaDB(stream.db_name)
+
+            if stream.fetch(db, stock_code, lambda data: self.caller.insert_send_q(stream.username, data), seq, last_key):
+                with self.lock:
+                    self.stream_dict.pop((stream.username, stream.req_id), None)
+                self.caller.insert_send_q(stream.username, stream.get_end_json())
+
+    def cancel_ack_timeout(self):
+        """
+        ack 를 ACK_TIMEOUT_SEC 동안 받지 못한 요청 취소 (멈춘 작업은 작업 대기열에 넣어 종료 메시지를 보내게 함)
+        """
+        with self.lock:
+            stream_list = [stream for stream in self.stream_dict.values() if stream.is_ack_timeout()]
+        for stream in stream_list:
+            logger.warning("history ack timeout : %s %s", stream.username, stream.req_id)
+            for job in stream.cancel():
+                self.job_q.put(job)
+
+    def delete_user(self, username):
+        with self.lock:
+            stream_list = [stream for key, stream in self.stream_dict.items() if key[0] == username]
+        for stream in stream_list:
+            for job in stream.cancel():
+                self.job_q.put(job)
+
+    def insert_q(self, data):
+        if data["req_type"] == "history_ack":
+            req_data = data.get("req_data") or {}
+            stream = self.stream_dict.get((data["username"], req_data.get("req_id")))
+            if stream is not None:
+                try:
+                    resume_list = stream.ack(req_data.get("count", 1))
+                except (ValueError, TypeError):
+                    logger.warning("invalid history ack : %s %s", data["username"], req_data)
+                    return
+                for job in resume_list:
+                    self.job_q.put(job)
+            return
+
+        self.req_q.put(data)
+
+
+# 주문 종류 -> creon_api.CreonStockOrder 의 주문 오브젝트 이름
+ORDER_COM_NAME_DICT = {"buy": "buy_sell", "sell": "buy_sell", "modify_type": "modify_type", "modify_price": "modify_price", "cancel": "cancel"}
+
 
-            json_dict = {"res_type": "order", "res_data": {"order_num": order_num}}
-            self.caller.insert_send_q(username, json.dumps(json_dict))
+class TaskOrder:
+    def __init__(self, caller, lane_count=4):
+        self.caller = caller
+
+        # 레인마다 주문 오브젝트를 따로 생성 (공용 오브젝트의 입력값을 여러 스레드가 덮어쓰지 않도록)
+        self.order_dispatcher = OrderDispatcher(self.execute_order, self.send_order_result, lane_count, CreonStockOrder, lambda: CreonLogin.generation)
+
+    def execute_order(self, req, creon_stock_order):
+        order_info = req["req_data"]
+
+        if order_info["order_type"] == "buy":
+            order_num = trade.Order.buy(
+                order_info["stock_code"],
+                order_info["qty"],
+                ORDER_CONDITION[order_info["e_order_condition"]],
+                PRICE_TYPE[order_info["e_price_type"]],
+                order_info["price"],
+                creon_stock_order,
+            )
+        elif order_info["order_type"] == "sell":
+            order_num = trade.Order.sell(
+                order_info["stock_code"],
+                order_info["qty"],
+                ORDER_CONDITION[order_info["e_order_condition"]],
+                PRICE_TYPE[order_info["e_price_type"]],
+                order_info["price"],
+                creon_stock_order,
+            )
+        elif order_info["order_type"] == "modify_type":
+            order_num = trade.Order.modify_type(
+                order_info["origin_order_num"],
+                order_info["stock_code"],
+                order_info["qty"],
+                ORDER_CONDITION[order_info["e_order_condition"]],
+                PRICE_TYPE[order_info["e_price_type"]],
+                order_info["price"],
+                creon_stock_order,
+            )
+        elif order_info["order_type"] == "modify_price":
+            order_num = trade.Order.modify_price(
+                order_info["origin_order_num"], order_info["stock_code"], order_info["qty"], order_info["price"], creon_stock_order
+            )
+        elif order_info["order_type"] == "cancel":
+            order_num = trade.Order.cancel(order_info["origin_order_num"], order_info["stock_code"], order_info["qty"], creon_stock_order)
+
+        # BlockRequest 시작 / 끝 시간 기록
+        creon_order_com = getattr(creon_stock_order, ORDER_COM_NAME_DICT[order_info["order_type"]])
+        if creon_order_com.rq_start_time is not None:
+            req["latency"]["block_request_start"] = creon_order_com.rq_start_time
+            req["latency"]["block_request_end"] = creon_order_com.rq_end_time
+
+        return order_num
+
+    def send_order_result(self, req, order_num):
+        latency = req["latency"]
+        OrderLatency.add_order(order_num, latency)
+        res_data = {
+            "order_num": order_num,
+            "latency_ms": {
+                "queue": (latency["dispatch"] - latency["submit"]) * 1000,  # 대기열 대기 시간
+                "ack": (latency["ack"] - latency["submit"]) * 1000,  # 주문 요청 ~ 주문번호 수신 시간
+            },
+        }
+
+        # 바스켓 주문의 경우 주문별 응답 후 모든 주문이 끝나면 요약 응답
+        order_batch = req.get("batch")
+        if order_batch:
+            res_data["batch_id"] = order_batch.batch_id
+            res_data["batch_idx"] = req["batch_idx"]
+            self.caller.insert_send_q(req["username"], json.dumps({"res_type": "order_batch_ack", "res_data": res_data}))
+
+            if order_batch.set_result(req["batch_idx"], order_num):
+                self.send_order_batch_summary(order_batch)
+            return
+
+        json_dict = {"res_type": "order", "res_data": res_data}
+        self.caller.insert_send_q(req["username"], json.dumps(json_dict))
+
+    def send_order_batch_summary(self, order_batch):
+        json_dict = {"res_type": "order_batch", "res_data": order_batch.get_summary()}
+        self.caller.insert_send_q(order_batch.username, json.dumps(json_dict))
+
+    def insert_batch(self, req):
+        # 형식이 잘못된 바스켓은 오류 응답만 보냄 (클라이언트 요청 처리 스레드에서 예외가 나지 않도록)
+        req_data = req.get("req_data")
+        if not isinstance(req_data, dict) or not OrderBatch.is_valid_order_list(req_data.get("order_list")):
+            logger.warning("invalid order batch request : %s %s", req["username"], req_data)
+            res_data = {"batch_id": req_data.get("batch_id") if isinstance(req_data, dict) else None, "error": "INVALID_REQUEST"}
+            self.caller.insert_send_q(req["username"], json.dumps({"res_type": "order_batch", "res_data": res_data}))
+            return
+
+        # 바스켓 전체를 메모리 잔고 기준으로 한번에 검증 후 통과한 주문만 분배 (사용자별 주문 수 제한은 주문마다 차감)
+        order_batch = OrderBatch(req["username"], req_data.get("batch_id"), req_data["order_list"])
+        order_batch.validate(
+            lambda stock_code: Portfolio.get_able_sell_qty(StockSymbol.get_id(stock_code)),
+            lambda order_info: OrderRisk.check(req["username"], order_info),
+        )
+
+        req_list = order_batch.make_req_list()
+        if not req_list:
+            self.send_order_batch_summary(order_batch)
+            return
+
+        for order_req in req_list:
+            self.order_dispatcher.insert(order_req)
 
     def insert_q(self, data):
-        self.order_q.put(data)
+        if data["req_type"] == "order_batch":
+            self.insert_batch(data)
+            return
+
+        # 입력값 / 주문 전 위험 검사, 거부된 주문은 creon 서버로 보내지 않고 바로 응답
+        if not is_valid_order(data.get("req_data")):
+            logger.warning("invalid order request : %s %s", data["username"], data.get("req_data"))
+            reject_reason = "INVALID_ORDER"
+        else:
+            reject_reason = OrderRisk.check(data["username"], data["req_data"])
+        if reject_reason:
+            json_dict = {"res_type": "order", "res_data": {"order_num": False, "reject_reason": reject_reason}}
+            self.caller.insert_send_q(data["username"], json.dumps(json_dict))
+            return
+
+        self.order_dispatcher.insert(data)
 
 
 def main():
+    logging.basicConfig(level=logging.INFO, format=utils.LOG_FORMAT)
+    config = bootstrap.init()
+    # 처리 프로세스마다 코어가 없으면 틱마다 직렬화 / 프로세스간 전달 비용만 늘어나므로 사용 안함
+    rt_shard_count = int(config["rt_shard_count"])
+    if rt_shard_count and rt_shard_count >= (os.cpu_count() or 1):
+        logger.warning("rt_shard_count %d ignored : needs more than %d cpu", rt_shard_count, rt_shard_count)
+    elif rt_shard_count:
+        start_tick_shard(rt_shard_count)
+
     quant_server = QuantServer()
     quant_server.start_server()
-    while True:
-        time.sleep(10)
+    try:
+        while True:
+            time.sleep(10)
+    except KeyboardInterrupt:
         pass
+    finally:
+        quant_server.close_server()
 
 
 if __name__ == "__main__":
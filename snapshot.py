@@ -0,0 +1,173 @@
+# coding=utf-8
+import os
+import gzip
+import json
+import time
+import threading
+
+import utils
+from stock_symbol import StockSymbol
+from portfolio import Portfolio
+from unconcluded_order import UnconcludedOrderBook
+from order_risk import OrderRisk
+
+logger = utils.get_logger(__name__)
+
+# 스냅샷 파일 형식 버전 (형식이 바뀌면 이전 파일은 복원하지 않음)
+SNAPSHOT_VERSION = 1
+
+
+class ServerSnapshot:
+    """
+    서버 상태 스냅샷 클래스 (빠른 재시작용)
+
+    구독 목록, 최근 체결가, 미체결 주문, 잔고를 주기적으로 로컬 파일(gzip json)에 저장하고
+    재시작시 파일에서 바로 복원함 (creon 서버와 달라진 부분은 복원후
+    trade.BalanceData.reconcile_stock_balance, trade.TradeData.reconcile_unconcluded_order 에서 맞춤)
+
+    Attributes:
+        file_path (str): 스냅샷 파일 경로
+
+        save_interval (float): 저장 주기 (단위: 초)
+
+        save_count (int): 저장 횟수
+
+        last_save_ms (float): 마지막 저장 시간 (단위: ms)
+
+        last_size (int): 마지막 저장 파일 크기 (단위: byte)
+
+        save_thread (threading.Thread): 저장 스레드
+
+        lock (threading.Lock): 저장시 사용하는 락
+    """
+
+    file_path = "server_snapshot.json.gz"
+    save_interval = 5
+
+    save_count = 0
+    last_save_ms = 0.0
+    last_size = 0
+
+    save_thread = None
+    lock = threading.Lock()
+
+    @classmethod
+    def make(cls, subscription_dict):
+        """
+        현재 서버 상태 스냅샷 생성
+
+        Parameters:
+            subscription_dict (dict): 요청 타입 -> 구독 데이터 (QuantServer.get_subscription_dict)
+
+        Returns:
+            (dict): 스냅샷
+        """
+        last_price_list = OrderRisk.last_price_list
+        return {
+            "version": SNAPSHOT_VERSION,
+            "date": time.strftime("%Y%m%d"),
+            "date_time": time.strftime("%Y%m%d%H%M%S"),
+            "subscription": subscription_dict,
+            "last_price": {StockSymbol.get_code(stock_id): price for stock_id, price in enumerate(last_price_list[:]) if price},
+            "position": Portfolio.get_position_list(),
+            "unconcluded_order": UnconcludedOrderBook.get_order_list(),
+        }
+
+    @classmethod
+    def save(cls, subscription_dict):
+        """
+        스냅샷을 파일로 저장 (임시 파일에 쓴 후 교체하므로 저장 중 종료되어도 이전 파일은 남음)
+
+        Parameters:
+            subscription_dict (dict): 요청 타입 -> 구독 데이터 (QuantServer.get_subscription_dict)
+        """
+        with cls.lock:
+            start = time.perf_counter()
+            data = json.dumps(cls.make(subscription_dict), separators=(",", ":")).encode("utf-8")
+
+            tmp_path = cls.file_path + ".tmp"
+            with open(tmp_path, "wb") as snapshot_file:
+                snapshot_file.write(gzip.compress(data, compresslevel=1))
+            os.replace(tmp_path, cls.file_path)
+
+            cls.save_count += 1
+            cls.last_save_ms = (time.perf_counter() - start) * 1000
+            cls.last_size = os.path.getsize(cls.file_path)
+
+    @classmethod
+    def load(cls):
+        """
+        스냅샷 파일 읽기 (파일이 없거나, 형식 버전이 다르거나, 오늘 저장된 스냅샷이 아니면 None)
+
+        Returns:
+            (dict): 스냅샷
+
+            (None): 복원할 스냅샷 없음
+        """
+        if not os.path.isfile(cls.file_path):
+            return None
+
+        try:
+            with open(cls.file_path, "rb") as snapshot_file:
+                snapshot = json.loads(gzip.decompress(snapshot_file.read()).decode("utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning("invalid snapshot : %s (%s)", cls.file_path, e)
+            return None
+
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            logger.info("snapshot version mismatch : %s", snapshot.get("version"))
+            return None
+
+        # 장이 바뀌면 잔고 / 미체결 주문이 크게 달라지므로 당일 스냅샷만 사용
+        if snapshot["date"] != time.strftime("%Y%m%d"):
+            logger.info("old snapshot : %s", snapshot["date_time"])
+            return None
+
+        return snapshot
+
+    @classmethod
+    def restore(cls, snapshot):
+        """
+        스냅샷의 잔고, 미체결 주문, 최근 체결가를 메모리에 복원 (db 반영 안함, 구독 목록은 QuantServer 에서 복원)
+
+        Parameters:
+            snapshot (dict): 스냅샷 (load 반환값)
+        """
+        Portfolio.load(snapshot["position"])
+        UnconcludedOrderBook.load(snapshot["unconcluded_order"])
+        for stock_code, price in snapshot["last_price"].items():
+            OrderRisk.update_last_price(StockSymbol.get_id(stock_code), price)
+
+    @classmethod
+    def start(cls, get_subscription_dict, interval=None):
+        """
+        저장 스레드 시작 (interval 초마다 저장)
+
+        Parameters:
+            get_subscription_dict (method): 구독 데이터를 반환하는 메소드 (QuantServer.get_subscription_dict)
+
+            interval (float): 저장 주기 (단위: 초, None - save_interval)
+        """
+        if interval is not None:
+            cls.save_interval = interval
+
+        def save_loop():
+            while True:
+                time.sleep(cls.save_interval)
+                try:
+                    cls.save(get_subscription_dict())
+                except Exception:
+                    logger.exception("snapshot save failed")
+
+        cls.save_thread = threading.Thread(target=save_loop, daemon=True)
+        cls.save_thread.start()
+
+    @classmethod
+    def get_stats(cls):
+        """
+        저장 통계 반환
+
+        Returns:
+            (dict): 저장 횟수, 마지막 저장 시간(ms), 파일 크기(byte)
+        """
+        return {"save_count": cls.save_count, "last_save_ms": cls.last_save_ms, "last_size": cls.last_size}
@@ -1,18 +1,56 @@
 # coding=utf-8
-from database import MariaDB
+import bootstrap
+from database import MariaDB, STOCK_LIST_CACHE_TTL_SEC
 from creon_api import CreonLogin, CreonCpCodeMgr, CreonStockChart
 from stock_info_enum import MARKET_KIND
 
+# 일봉 차트 데이터 db 컬럼/타입 (KR_STOCK_DATA_1DAY, 종목마다 테이블)
+CHART_DAY_COLUMNS_AND_TYPES = {
+    "date": "INT PRIMARY KEY",
+    "open": "INT",
+    "high": "INT",
+    "low": "INT",
+    "close": "INT",
+    "volume": "INT",
+    "shares_listed": "BIGINT",
+    "foreign_limit": "BIGINT",
+    "foreign_hold": "BIGINT",
+    "foreign_ratio": "DOUBLE",
+    "agency_net_buy": "BIGINT",
+    "agency_acc_net_buy": "BIGINT",
+}
+# 분봉 차트 데이터 db 컬럼/타입 (KR_STOCK_DATA_1MIN, 종목마다 테이블)
+CHART_MINUTE_COLUMNS_AND_TYPES = {
+    "date_time": "BIGINT PRIMARY KEY",
+    "open": "INT",
+    "high": "INT",
+    "low": "INT",
+    "close": "INT",
+    "volume": "INT",
+}
+
 
 class StockData:
     """
     주식 데이터 관련 클래스
 
     Attributes:
-        db_kr_operation_data (database.MariaDB): db 통신 관련 클래스 인스턴스
+        db_kr_operation_data (database.MariaDB): db 통신 관련 클래스 인스턴스 (get_db 처음 호출시 연결)
     """
 
-    db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
+    db_kr_operation_data = None
+
+    @classmethod
+    def get_db(cls):
+        """
+        db 인스턴스 반환 (처음 호출시 연결)
+
+        Returns:
+            (database.MariaDB): KR_OPERATION_DATA db 인스턴스
+        """
+        if cls.db_kr_operation_data is None:
+            cls.db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
+        return cls.db_kr_operation_data
 
     @classmethod
     def update_stock_list(cls):
@@ -47,10 +85,10 @@ class StockData:
             ]
 
             # 종목데이터가 db 테이블에 이미 있을경우 update 없을경우 insert
-            if cls.db_kr_operation_data.is_exist("KR_Stock_List", "stock_code = '" + stock_code + "'"):
-                cls.db_kr_operation_data.update("KR_Stock_List", columns_db[1:], data_db[1:], "stock_code = " + "'" + stock_code + "'")
+            if cls.get_db().is_exist("KR_Stock_List", "stock_code = '" + stock_code + "'"):
+                cls.get_db().update("KR_Stock_List", columns_db[1:], data_db[1:], "stock_code = " + "'" + stock_code + "'")
             else:
-                cls.db_kr_operation_data.insert("KR_Stock_List", columns_db, data_db)
+                cls.get_db().insert("KR_Stock_List", columns_db, data_db)
 
     @classmethod
     def update_all_chart_data(cls, chart_type):
@@ -60,7 +98,7 @@ class StockData:
         Parameters:
             chart_type (str): 업데이트할 차트데이터의 종류 ("D" - 1일봉 차트, "m" - 1분봉차트)
         """
-        stock_code_list = cls.db_kr_operation_data.select("KR_Stock_List", "stock_code")  # db에 저장된 모든 종목의 코드와 이름 가져옴
+        stock_code_list = cls.get_db().select("KR_Stock_List", "stock_code")  # db에 저장된 모든 종목의 코드와 이름 가져옴
 
         # stock_code_list에 있는 종목 모두 chart_type에 해당하는 차트데이터 업데이트
         for idx, stock_code in enumerate(stock_code_list):
@@ -78,40 +116,18 @@ class StockData:
             chart_type (str): 업데이트할 차트데이터의 종류 ("D" - 1일봉 차트, "m" - 1분봉차트)
         """
         # 현재 업데이트 상태 출력
-        stock_name = cls.db_kr_operation_data.select("KR_Stock_List", "stock_name", "stock_code = '" + stock_code + "'")
+        stock_name = cls.get_db().select("KR_Stock_List", "stock_name", "stock_code = '" + stock_code + "'", STOCK_LIST_CACHE_TTL_SEC)
         print("UPDATE 1" + chart_type + " DATA " + stock_code + " " + stock_name + "\n\n")
 
         # 일봉 데이터일 경우의 데이터셋
         if chart_type == "D":
-            # 일봉 차트 데이터 db 컬럼/타입
-            columns_and_types = {
-                "date": "INT PRIMARY KEY",
-                "open": "INT",
-                "high": "INT",
-                "low": "INT",
-                "close": "INT",
-                "volume": "INT",
-                "shares_listed": "BIGINT",
-                "foreign_limit": "BIGINT",
-                "foreign_hold": "BIGINT",
-                "foreign_ratio": "DOUBLE",
-                "agency_net_buy": "BIGINT",
-                "agency_acc_net_buy": "BIGINT",
-            }
+            columns_and_types = CHART_DAY_COLUMNS_AND_TYPES
             db_KR_STOCK_DATA = MariaDB("KR_STOCK_DATA_1DAY")  # 일봉 차트 데이터 db 컬럼
             recent_date_time_column = "recent_1day_data_date"  # 일봉 차트 데이터 db 컬럼
             creon_idxs = (0, 2, 3, 4, 5, 8, 12, 14, 16, 17, 20, 21)  # 일봉차트 데이터에 필요한 차트데이터 인덱스 (creon api 기준)
         # 분봉 데이터일 경우의 데이터셋
         elif chart_type == "m":
-            # 분봉 차트 데이터 db 컬럼/타입
-            columns_and_types = {
-                "date_time": "BIGINT PRIMARY KEY",
-                "open": "INT",
-                "high": "INT",
-                "low": "INT",
-                "close": "INT",
-                "volume": "INT",
-            }
+            columns_and_types = CHART_MINUTE_COLUMNS_AND_TYPES
             db_KR_STOCK_DATA = MariaDB("KR_STOCK_DATA_1MIN")  # 일봉 차트 데이터 db 컬럼
             recent_date_time_column = "recent_1min_data_date_time"  # 분봉 차트 데이터 db 컬럼
             creon_idxs = (0, 1, 2, 3, 4, 5, 8)  # 분봉차트 데이터에 필요한 차트데이터 인덱스 (creon api 기준)
@@ -125,7 +141,9 @@ class StockData:
             data_types_db.append(value)
 
         # 최근 데이터의 날짜/시간을 가져옴
-        recent_data_date_time = cls.db_kr_operation_data.select("KR_Stock_List", recent_date_time_column, "stock_code = '" + stock_code + "'")
+        recent_data_date_time = cls.get_db().select(
+            "KR_Stock_List", recent_date_time_column, "stock_code = '" + stock_code + "'", STOCK_LIST_CACHE_TTL_SEC
+        )
 
         all_rcv_chart_data_db = cls.get_chart_data(stock_code, creon_idxs, chart_type, 1, recent_data_date_time)  # 서버에서 차트 데이터 가져옴
 
@@ -134,7 +152,7 @@ class StockData:
             db_KR_STOCK_DATA.insert(stock_code, columns_db, all_rcv_chart_data_db)  # 서버에서 가져온 데이터 db에 insert
 
             # 최근 데이터 날짜/시간 업데이트
-            cls.db_kr_operation_data.update(
+            cls.get_db().update(
                 "KR_Stock_List", recent_date_time_column, all_rcv_chart_data_db[0][0], "stock_code = '" + stock_code + "'",
             )
         else:
@@ -218,6 +236,7 @@ class StockData:
 
 
 def main():
+    bootstrap.init()
     CreonLogin.connect()
 
     # StockData.update_stock_list()
@@ -1,10 +1,25 @@
 # coding=utf-8
+import time
 import enum
+import threading
+from array import array
+from collections import deque
+from itertools import islice
 from dataclasses import dataclass
 
-from creon_api import CreonStockCur, CreonStockJpBid
+import utils
+from creon_api import CreonStockCur, CreonStockJpBid, HeaderDecoder
 from database import MariaDB
+from stock_symbol import StockSymbol
 from trade import BalanceData
+from order_risk import OrderRisk
+from metrics import Metrics
+from profiler import Profiler
+from event_ring import EventRing
+from rt_shard import RtShardPool
+from client_protocol import FRAME_TICK, FRAME_ASK_BID, TICK_STRUCT, ASK_BID_STRUCT, TICK_FRAME_STRUCT, ASK_BID_FRAME_STRUCT
+
+logger = utils.get_logger(__name__)
 
 # 주식 실시간 데이터 db 컬럼
 _STOCK_RT_DATA_COLUMNS = (
@@ -20,13 +35,103 @@ _STOCK_RT_DATA_COLUMNS = (
 _STOCK_RT_DATA_TYPES = (
     "BIGINT NOT NULL AUTO_INCREMENT PRIMARY KEY",
     "INT",
-    "ENUM('PRE_EXPECTED','REGULAR','AFTER','AFTER_EXPECTED')",
+    "ENUM('PRE_EXPECTED','REGULAR','AFTER','AFTER_EXPECTED','BACKFILL')",
     "INT",
     "INT",
     "INT",
     "INT",
 )
 
+# 누락 보정 틱의 시장 시간 구분 (creon 이벤트가 아닌 tick_reconcile.TickReconciler 가 분봉으로 채운 틱)
+BACKFILL_MARKET_HOURS_KIND = "BACKFILL"
+
+# 종목별 메모리 분봉 최대 수 (하루 정규장 분봉 수 이상)
+RT_BAR_MAX_COUNT = 400
+
+# 틱 이벤트 헤더 필드 (StockCur)
+_TICK_HEADER_DECODER = HeaderDecoder(
+    (
+        ("date_time", 18),  # 시분초
+        ("market_hours_kind", 20),  # 예상 체결가 구분 플래그 (동시호가 / 장중)
+        ("price", 13),  # 현재가
+        ("day_changed", 2),  # 대비
+        ("qty", 17),  # 순간체결수량
+        ("vol", 9),  # 거래량
+    )
+)
+# 호가 이벤트 헤더 필드 (StockJpBid, 1 ~ 10차 매도호가, 매수호가, 매도잔량, 매수잔량 순서, 총 매도잔량, 총 매수잔량)
+_ASK_BID_HEADER_DECODER = HeaderDecoder(
+    [
+        (name + str(level), header_idx + offset)
+        for level, header_idx in enumerate((3, 7, 11, 15, 19, 27, 31, 35, 39, 43), 1)
+        for offset, name in enumerate(("ask", "bid", "ask_vol", "bid_vol"))
+    ]
+    + [("tot_ask", 23), ("tot_bid", 24)]
+)
+
+
+class TickDbBuffer:
+    """
+    실시간 틱 db insert 묶음 (TICK_RING 처리 스레드에서만 사용)
+
+    틱마다 db 연결 / insert 하지 않고 종목별로 모아두었다가 TICK_RING 의 flush 에서 종목별로 한번에 insert 함
+    (처리 스레드가 flush_count 개 처리할 때마다, 처리할 틱이 없어지면 flush)
+
+    Attributes:
+        row_dict (dict): 이벤트 핸들러 (StockRtEvent) -> 저장할 db 행 리스트
+
+        db_kr_stock_data_realtime (database.MariaDB): 처리 스레드 전용 KR_STOCK_DATA_REALTIME db 인스턴스 (처음 flush 할때 연결)
+    """
+
+    row_dict = {}
+    db_kr_stock_data_realtime = None
+
+    @classmethod
+    def append(cls, handler, row):
+        row_list = cls.row_dict.get(handler)
+        if row_list is None:
+            row_list = cls.row_dict[handler] = []
+        row_list.append(row)
+
+    @classmethod
+    def flush(cls):
+        if not cls.row_dict:
+            return
+
+        row_dict = cls.row_dict
+        cls.row_dict = {}
+        if cls.db_kr_stock_data_realtime is None:
+            cls.db_kr_stock_data_realtime = MariaDB("KR_STOCK_DATA_REALTIME")
+
+        span_start = Profiler.start_span()
+        for handler, row_list in row_dict.items():
+            if not handler.active:
+                continue  # 실시간 등록 해지된 종목 (테이블 삭제됨)
+            try:
+                cls.db_kr_stock_data_realtime.insert(handler.stock_code, _STOCK_RT_DATA_COLUMNS[1:], row_list)
+            except Exception:
+                logger.exception("tick db insert error : %s", handler.stock_code)
+        Profiler.end_span("tick_db_insert", span_start)
+
+
+# 실시간 이벤트 링 버퍼 (COM 콜백 -> 처리 스레드, 레코드 : [핸들러, 헤더 필드 ...])
+# 가득 차면 이벤트를 버리고 종목별 버린 수를 세어 다음 이벤트 처리 전 / 처리할 이벤트가 없어졌을때 구독자에게 알림 (StockRtEvent.drop_method)
+TICK_RING = EventRing("tick", 32768, 1 + len(_TICK_HEADER_DECODER), flush_method=TickDbBuffer.flush)
+ASK_BID_RING = EventRing("ask_bid", 8192, 1 + len(_ASK_BID_HEADER_DECODER))
+
+# 종목 id 인덱스의 틱 이벤트 핸들러 (샤드 처리 결과를 받을 핸들러, rt_shard.RtShardPool 사용시)
+_SHARD_TICK_HANDLER_LIST = []
+
+# 종목별 실시간 이벤트 수신 횟수
+_TICK_COUNTER = Metrics.stock_counter("quant_tick_total", "realtime tick events received", {"evt_type": "tick"})
+_ASKBID_COUNTER = Metrics.stock_counter("quant_tick_total", "realtime tick events received", {"evt_type": "ask_bid"})
+
+
+def _get_bar_time(hhmmss):
+    # 틱 시분초 -> 틱이 포함된 분봉 시간 (creon 과 같이 봉이 끝나는 분, hhmm)
+    minute = hhmmss // 10000 * 60 + hhmmss // 100 % 100 + 1
+    return minute // 60 * 100 + minute % 60
+
 
 class MARKET_HOURS_KIND(enum.Enum):
     """
@@ -39,6 +144,512 @@ class MARKET_HOURS_KIND(enum.Enum):
     AFTER_EXPECTED = ord("5")  # 장후 예상 체결
 
 
+# 시장 시간 구분 플래그 값 -> 이름 (이벤트마다 enum 을 만들지 않도록 미리 만들어 둠)
+_MARKET_HOURS_KIND_NAME_DICT = {e_kind.value: e_kind.name for e_kind in MARKET_HOURS_KIND}
+# 메모리 분봉을 만들때 사용하는 시장 시간 구분 값 (creon 분봉은 정규장 체결만 포함)
+_BAR_MARKET_HOURS_KIND_VALUE = MARKET_HOURS_KIND.REGULAR.value
+
+# 클라이언트 전송 json 형식 (json.dumps 결과와 같은 키 순서 / 구분자)
+_TICK_JSON_FORMAT = (
+    '{{"res_type": "stock_tick_rt_data", "res_data": {{"date_time": {}, "e_market_hours_kind": "{}", '
+    '"price": {}, "day_changed": {}, "qty": {}, "vol": {}, "stock_code": "{}"}}}}'
+)
+_ASK_BID_JSON_FORMAT = (
+    '{{"res_type": "stock_askbid_rt_data", "res_data": {{"ask": [{}], "bid": [{}], "ask_vol": [{}], "bid_vol": [{}], '
+    '"tot_ask": {}, "tot_bid": {}, "stock_code": "{}"}}}}'
+)
+
+
+class TickRecord:
+    """
+    실시간 틱 레코드 (이벤트마다 dict / enum 을 만들지 않고 json, db 행, 바이너리 형식으로 바로 변환)
+
+    Attributes:
+        stock_id (int): 종목 id (stock_symbol.StockSymbol)
+
+        date_time (int): 시분초
+
+        market_hours_kind (int): 예상 체결가 구분 플래그 (MARKET_HOURS_KIND 값)
+
+        price (int): 현재가
+
+        day_changed (int): 대비
+
+        qty (int): 순간체결수량
+
+        vol (int): 거래량
+
+        STRUCT (struct.Struct): 바이너리 형식 (client_protocol.TICK_STRUCT)
+    """
+
+    __slots__ = ("stock_id", "date_time", "market_hours_kind", "price", "day_changed", "qty", "vol")
+
+    STRUCT = TICK_STRUCT
+
+    def __init__(self, stock_id, date_time, market_hours_kind, price, day_changed, qty, vol):
+        self.stock_id = stock_id
+        self.date_time = date_time
+        self.market_hours_kind = market_hours_kind
+        self.price = price
+        self.day_changed = day_changed
+        self.qty = qty
+        self.vol = vol
+
+    @property
+    def e_market_hours_kind(self):
+        return MARKET_HOURS_KIND(self.market_hours_kind)
+
+    def to_db_row(self):
+        """
+        실시간 테이블 행 (_STOCK_RT_DATA_COLUMNS[1:] 순서)
+        """
+        return [self.date_time, _MARKET_HOURS_KIND_NAME_DICT[self.market_hours_kind], self.price, self.day_changed, self.qty, self.vol]
+
+    def to_json(self, stock_code):
+        """
+        클라이언트 전송 json 문자열 ({"res_type": "stock_tick_rt_data", "res_data"})
+
+        Parameters:
+            stock_code (str): 종목 코드 (클라이언트에게는 종목 id 대신 보냄)
+        """
+        return _TICK_JSON_FORMAT.format(
+            self.date_time, _MARKET_HOURS_KIND_NAME_DICT[self.market_hours_kind], self.price, self.day_changed, self.qty, self.vol, stock_code
+        )
+
+    def to_dict(self, stock_code):
+        """
+        조회 응답용 dict (to_json 의 res_data 와 같은 형식)
+
+        Parameters:
+            stock_code (str): 종목 코드
+        """
+        return {
+            "date_time": self.date_time,
+            "e_market_hours_kind": _MARKET_HOURS_KIND_NAME_DICT[self.market_hours_kind],
+            "price": self.price,
+            "day_changed": self.day_changed,
+            "qty": self.qty,
+            "vol": self.vol,
+            "stock_code": stock_code,
+        }
+
+    def pack(self):
+        """
+        바이너리 형식 (STRUCT)
+        """
+        return self.STRUCT.pack(self.stock_id, self.date_time, self.market_hours_kind, self.price, self.day_changed, self.qty, self.vol)
+
+    def pack_frame(self):
+        """
+        클라이언트 전송 바이너리 프레임 (client_protocol.FRAME_TICK)
+        """
+        return TICK_FRAME_STRUCT.pack(FRAME_TICK, self.stock_id, self.date_time, self.market_hours_kind, self.price, self.day_changed, self.qty, self.vol)
+
+    @classmethod
+    def unpack(cls, data, offset=0):
+        """
+        바이너리 형식에서 레코드 생성
+
+        Parameters:
+            data (bytes): 바이너리 데이터
+
+            offset (int): 레코드 시작 위치
+        """
+        return cls(*cls.STRUCT.unpack_from(data, offset))
+
+
+class AskBidRecord:
+    """
+    실시간 10차 호가 레코드 (이벤트마다 dict / 리스트를 만들지 않고 json, 바이너리 형식으로 바로 변환)
+
+    Attributes:
+        stock_id (int): 종목 id (stock_symbol.StockSymbol)
+
+        value_list (list[int]): 1 ~ 10차 (매도호가, 매수호가, 매도잔량, 매수잔량) 40개, 총 매도잔량, 총 매수잔량
+
+        STRUCT (struct.Struct): 바이너리 형식 (client_protocol.ASK_BID_STRUCT)
+    """
+
+    __slots__ = ("stock_id", "value_list")
+
+    STRUCT = ASK_BID_STRUCT
+
+    def __init__(self, stock_id, value_list):
+        self.stock_id = stock_id
+        self.value_list = value_list
+
+    @property
+    def ask(self):
+        return self.value_list[0:40:4]
+
+    @property
+    def bid(self):
+        return self.value_list[1:40:4]
+
+    @property
+    def ask_vol(self):
+        return self.value_list[2:40:4]
+
+    @property
+    def bid_vol(self):
+        return self.value_list[3:40:4]
+
+    @property
+    def tot_ask(self):
+        return self.value_list[40]
+
+    @property
+    def tot_bid(self):
+        return self.value_list[41]
+
+    def to_json(self, stock_code):
+        """
+        클라이언트 전송 json 문자열 ({"res_type": "stock_askbid_rt_data", "res_data"})
+
+        Parameters:
+            stock_code (str): 종목 코드
+        """
+        value_list = self.value_list
+        return _ASK_BID_JSON_FORMAT.format(
+            ", ".join(map(str, value_list[0:40:4])),
+            ", ".join(map(str, value_list[1:40:4])),
+            ", ".join(map(str, value_list[2:40:4])),
+            ", ".join(map(str, value_list[3:40:4])),
+            value_list[40],
+            value_list[41],
+            stock_code,
+        )
+
+    def to_dict(self, stock_code):
+        """
+        조회 응답용 dict (to_json 의 res_data 와 같은 형식)
+
+        Parameters:
+            stock_code (str): 종목 코드
+        """
+        return {
+            "ask": self.ask,
+            "bid": self.bid,
+            "ask_vol": self.ask_vol,
+            "bid_vol": self.bid_vol,
+            "tot_ask": self.tot_ask,
+            "tot_bid": self.tot_bid,
+            "stock_code": stock_code,
+        }
+
+    def pack(self):
+        """
+        바이너리 형식 (STRUCT)
+        """
+        return self.STRUCT.pack(self.stock_id, *self.value_list)
+
+    def pack_frame(self):
+        """
+        클라이언트 전송 바이너리 프레임 (client_protocol.FRAME_ASK_BID)
+        """
+        return ASK_BID_FRAME_STRUCT.pack(FRAME_ASK_BID, self.stock_id, *self.value_list)
+
+    @classmethod
+    def unpack(cls, data, offset=0):
+        """
+        바이너리 형식에서 레코드 생성
+
+        Parameters:
+            data (bytes): 바이너리 데이터
+
+            offset (int): 레코드 시작 위치
+        """
+        values = cls.STRUCT.unpack_from(data, offset)
+        return cls(values[0], list(values[1:]))
+
+
+class FeedHeartbeat:
+    """
+    종목별 마지막 실시간 이벤트 수신 기록 클래스 (creon 연결 감시용, creon_supervisor.CreonSupervisor)
+
+    Attributes:
+        last_time_list (array): 종목 id 인덱스의 마지막 이벤트 수신 시간 (time.monotonic, 0 - 수신 없음)
+
+        last_tick_time_list (array): 종목 id 인덱스의 마지막 틱 시분초 (hhmmss, 0 - 수신 없음)
+
+        last_time (float): 전체 종목의 마지막 이벤트 수신 시간 (time.monotonic)
+    """
+
+    last_time_list = array("d")
+    last_tick_time_list = array("l")
+    last_time = 0.0
+
+    @classmethod
+    def beat(cls, stock_id, tick_time=0):
+        """
+        이벤트 수신 기록
+
+        Parameters:
+            stock_id (int): 종목 id
+
+            tick_time (int): 틱 시분초 (hhmmss, 0 - 호가 이벤트)
+        """
+        now = time.monotonic()
+        if stock_id >= len(cls.last_time_list):
+            StockSymbol.fit_list(cls.last_time_list, 0.0)
+            StockSymbol.fit_list(cls.last_tick_time_list, 0)
+        cls.last_time_list[stock_id] = now
+        if tick_time:
+            cls.last_tick_time_list[stock_id] = tick_time
+        cls.last_time = now
+
+    @classmethod
+    def get_last_tick_time(cls, stock_id):
+        """
+        종목의 마지막 틱 시분초 반환
+
+        Parameters:
+            stock_id (int): 종목 id
+
+        Returns:
+            (int): 마지막 틱 시분초 (hhmmss, 0 - 수신 없음)
+        """
+        if stock_id >= len(cls.last_tick_time_list):
+            return 0
+        return cls.last_tick_time_list[stock_id]
+
+
+class RtDataCache:
+    """
+    종목별 최근 실시간 데이터 메모리 캐시 (조회 요청을 db 조회 없이 응답, server.TaskQuery)
+
+    실시간 처리 스레드(StockRtEvent.process)에서 마지막 틱 / 호가와 정규장 틱으로 만든 1분봉을 갱신하고
+    캐시에 없는 경우만 db(마지막 틱 - KR_STOCK_DATA_REALTIME, 분봉 - KR_STOCK_DATA_1MIN)에서 가져옴
+    db 조회는 조회 처리 스레드 하나에서만 하므로 db 인스턴스는 처음 조회시 하나만 만듦
+
+    Attributes:
+        tick_list (list): 종목 id 인덱스의 마지막 틱 (TickRecord, None - 없음)
+
+        ask_bid_list (list): 종목 id 인덱스의 마지막 호가 (AskBidRecord, None - 없음)
+
+        bar_list (list): 종목 id 인덱스의 분봉 deque ([날짜시간(YYYYMMDDhhmm), 시가, 고가, 저가, 종가, 거래량], 오래된 순, 최대 RT_BAR_MAX_COUNT개)
+
+        stats_dict (dict): 조회 종류 -> {"hit": 캐시로 응답한 수, "miss": 캐시에 없어 db를 조회한 수 (호가는 db 조회 없음)}
+
+        lock (threading.Lock): 분봉 변경 / 복사시 사용하는 락
+
+        db_kr_stock_data_realtime (database.MariaDB): 실시간 틱 db 인스턴스 (처음 db 조회시 연결)
+
+        db_kr_stock_data_1min (database.MariaDB): 1분봉 db 인스턴스 (처음 db 조회시 연결)
+    """
+
+    tick_list = []
+    ask_bid_list = []
+    bar_list = []
+    stats_dict = {"last_tick": {"hit": 0, "miss": 0}, "last_askbid": {"hit": 0, "miss": 0}, "recent_bar": {"hit": 0, "miss": 0}}
+    lock = threading.Lock()
+    db_kr_stock_data_realtime = None
+    db_kr_stock_data_1min = None
+
+    @classmethod
+    def _fit(cls, stock_id):
+        if stock_id >= len(cls.tick_list):
+            StockSymbol.fit_list(cls.tick_list)
+            StockSymbol.fit_list(cls.ask_bid_list)
+            StockSymbol.fit_list(cls.bar_list)
+
+    @classmethod
+    def update_tick(cls, rt_data, shard_bar=None):
+        """
+        마지막 틱 / 분봉 갱신 (틱 처리 스레드)
+
+        Parameters:
+            rt_data (TickRecord): 틱 레코드
+
+            shard_bar (tuple): 샤드 처리 프로세스가 만든 틱이 포함된 분봉 (날짜시간, 시가, 고가, 저가, 종가, 거래량, None - 여기서 만듦)
+        """
+        stock_id = rt_data.stock_id
+        cls._fit(stock_id)
+        cls.tick_list[stock_id] = rt_data
+
+        if rt_data.market_hours_kind != _BAR_MARKET_HOURS_KIND_VALUE:
+            return
+
+        if shard_bar is not None:
+            with cls.lock:
+                bar_deque = cls.bar_list[stock_id]
+                if bar_deque is None:
+                    bar_deque = cls.bar_list[stock_id] = deque(maxlen=RT_BAR_MAX_COUNT)
+                if bar_deque and bar_deque[-1][0] == shard_bar[0]:
+                    bar_deque[-1][1:] = shard_bar[1:]
+                else:
+                    bar_deque.append(list(shard_bar))
+            return
+
+        price = rt_data.price
+        bar_time = _get_bar_time(rt_data.date_time)
+        with cls.lock:
+            bar_deque = cls.bar_list[stock_id]
+            if bar_deque is None:
+                bar_deque = cls.bar_list[stock_id] = deque(maxlen=RT_BAR_MAX_COUNT)
+
+            bar = bar_deque[-1] if bar_deque else None
+            if bar is not None and bar[0] % 10000 == bar_time:
+                if price > bar[2]:
+                    bar[2] = price
+                elif price < bar[3]:
+                    bar[3] = price
+                bar[4] = price
+                bar[5] += rt_data.qty
+            else:
+                # 새 분봉을 시작할때만 날짜를 구함
+                bar_deque.append([utils.get_current_datetime("%Y%m%d") * 10000 + bar_time, price, price, price, price, rt_data.qty])
+
+    @classmethod
+    def update_ask_bid(cls, rt_data):
+        """
+        마지막 호가 갱신 (호가 처리 스레드)
+
+        Parameters:
+            rt_data (AskBidRecord): 호가 레코드
+        """
+        cls._fit(rt_data.stock_id)
+        cls.ask_bid_list[rt_data.stock_id] = rt_data
+
+    @classmethod
+    def clear(cls, stock_id, evt_type):
+        """
+        실시간 등록 해지한 종목의 캐시 삭제 (다시 등록할때까지 빠진 구간이 있는 데이터로 응답하지 않도록)
+
+        Parameters:
+            stock_id (int): 종목 id
+
+            evt_type (str): 이벤트의 종류 ("tick" - 틱 / 분봉, "ask_bid" - 호가)
+        """
+        if stock_id >= len(cls.tick_list):
+            return
+
+        if evt_type == "tick":
+            cls.tick_list[stock_id] = None
+            with cls.lock:
+                cls.bar_list[stock_id] = None
+        else:
+            cls.ask_bid_list[stock_id] = None
+
+    @classmethod
+    def _get_record(cls, record_list, stock_code):
+        stock_id = StockSymbol.id_dict.get(stock_code)  # 등록되지 않은 종목 코드는 등록하지 않음
+        if stock_id is None or stock_id >= len(record_list):
+            return None
+        return record_list[stock_id]
+
+    @classmethod
+    def get_last_tick(cls, stock_code):
+        """
+        마지막 틱 반환 (캐시에 없으면 실시간 테이블의 마지막 틱, 보정 틱 제외)
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+        Returns:
+            (dict): 틱 데이터 (TickRecord.to_dict)
+
+            (None): 틱 없음 (실시간 등록 안된 종목)
+        """
+        rt_data = cls._get_record(cls.tick_list, stock_code)
+        if rt_data is not None:
+            cls.stats_dict["last_tick"]["hit"] += 1
+            return rt_data.to_dict(stock_code)
+
+        cls.stats_dict["last_tick"]["miss"] += 1
+        if cls.db_kr_stock_data_realtime is None:
+            cls.db_kr_stock_data_realtime = MariaDB("KR_STOCK_DATA_REALTIME")
+        try:
+            row = cls.db_kr_stock_data_realtime.select(
+                stock_code, _STOCK_RT_DATA_COLUMNS[1:], "market_hours_kind <> '" + BACKFILL_MARKET_HOURS_KIND + "' ORDER BY id DESC LIMIT 1"
+            )
+        except Exception:
+            return None  # 실시간 테이블 없음
+        if not row:
+            return None
+
+        return {
+            "date_time": row[0],
+            "e_market_hours_kind": row[1],
+            "price": row[2],
+            "day_changed": row[3],
+            "qty": row[4],
+            "vol": row[5],
+            "stock_code": stock_code,
+        }
+
+    @classmethod
+    def get_last_ask_bid(cls, stock_code):
+        """
+        마지막 호가 반환 (호가는 db에 저장하지 않으므로 캐시만 확인)
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+        Returns:
+            (dict): 호가 데이터 (AskBidRecord.to_dict)
+
+            (None): 호가 없음
+        """
+        rt_data = cls._get_record(cls.ask_bid_list, stock_code)
+        if rt_data is None:
+            cls.stats_dict["last_askbid"]["miss"] += 1
+            return None
+
+        cls.stats_dict["last_askbid"]["hit"] += 1
+        return rt_data.to_dict(stock_code)
+
+    @classmethod
+    def get_recent_bar_list(cls, stock_code, count):
+        """
+        최근 1분봉 반환 (캐시 분봉이 모자라면 모자란 만큼 1분봉 db에서 가져와 앞에 붙임)
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            count (int): 분봉 수
+
+        Returns:
+            (list[list]): 분봉 리스트 ([날짜시간(YYYYMMDDhhmm), 시가, 고가, 저가, 종가, 거래량], 오래된 순, 최대 count개)
+        """
+        with cls.lock:
+            bar_deque = cls._get_record(cls.bar_list, stock_code)
+            if bar_deque is None:
+                bar_list = []
+            else:
+                bar_list = [list(bar) for bar in islice(bar_deque, max(0, len(bar_deque) - count), None)]
+
+        if len(bar_list) >= count:
+            cls.stats_dict["recent_bar"]["hit"] += 1
+            return bar_list
+
+        cls.stats_dict["recent_bar"]["miss"] += 1
+        if cls.db_kr_stock_data_1min is None:
+            cls.db_kr_stock_data_1min = MariaDB("KR_STOCK_DATA_1MIN")
+        where = "date_time < " + str(bar_list[0][0]) if bar_list else "1"
+        try:
+            row_list = cls.db_kr_stock_data_1min.select(
+                stock_code,
+                ["date_time", "open", "high", "low", "close", "volume"],
+                where + " ORDER BY date_time DESC LIMIT " + str(count - len(bar_list)),
+            )
+        except Exception:
+            return bar_list  # 분봉 테이블 없음
+        if not row_list:
+            return bar_list
+        if not isinstance(row_list[0], (list, tuple)):
+            row_list = [row_list]  # 한줄인 경우
+
+        return [list(row) for row in reversed(row_list)] + bar_list
+
+    @classmethod
+    def get_stats(cls):
+        """
+        조회 종류별 캐시 응답 / 캐시에 없던 조회 수 반환
+        """
+        return {query_type: dict(stats) for query_type, stats in cls.stats_dict.items()}
+
+
 class StockTickRt:
     """
     실시간 주식 틱데이터 관련 클래스
@@ -46,40 +657,61 @@ class StockTickRt:
     Attributes:
         stock_code (str): 종목 코드
 
+        stock_id (int): 종목 id (stock_symbol.StockSymbol)
+
         method (method): 실행할 호출한 인스턴스의 메소드
 
+        drop_method (method): 링 버퍼가 가득 차서 이벤트를 버린 경우 실행할 메소드
+
         db_kr_stock_data_realtime (database.MariaDB): db통신 관련 클래스 인스턴스
 
         creon_stock_cur (creon_api.CreonStockCur): 실행시킬 메소드가 있는 클래스(creon 실시간 주식 데이터 관련)의 인스턴스
+
+        handler (StockRtEvent): 이벤트 핸들러 (subscribe 호출시 생성)
     """
 
-    def __init__(self, stock_code, method=None):
+    def __init__(self, stock_code, method=None, drop_method=None):
         """
         Parameters:
             stock_code (str): 종목 코드
             
             method (method): 실행할 호출한 인스턴스의 메소드
+
+            drop_method (method): 링 버퍼가 가득 차서 이벤트를 버린 경우 실행할 메소드 (종목 id, 이벤트 종류, 버린 이벤트 수)
         """
         self.stock_code = stock_code
+        self.stock_id = StockSymbol.get_id(stock_code)
         self.method = method
+        self.drop_method = drop_method
 
         # 실시간 종목 데이터 테이블 생성
         self.db_kr_stock_data_realtime = MariaDB("KR_STOCK_DATA_REALTIME")
         self.db_kr_stock_data_realtime.create(self.stock_code, _STOCK_RT_DATA_COLUMNS, _STOCK_RT_DATA_TYPES)
 
+        self.subscribe()
+
+    def subscribe(self):
+        """
+        실시간 등록 (creon 재접속 후에는 이전 오브젝트가 동작하지 않으므로 오브젝트를 새로 만들어 등록)
+
+        Returns:
+            (bool): 등록 성공 여부
+        """
         self.creon_stock_cur = CreonStockCur()
 
         # 이벤트 핸들러 세팅
-        handler = self.creon_stock_cur.get_handler(StockRtEvent)
-        handler.set_params("tick", self.creon_stock_cur, method)
+        self.handler = self.creon_stock_cur.get_handler(StockRtEvent)
+        self.handler.set_params("tick", self.creon_stock_cur, self.stock_id, self.method, self.drop_method)
 
         # stock_code에 대한 실시간 등록
         self.creon_stock_cur.set_input_value(0, self.stock_code)
         self.creon_stock_cur.subscribe()
-        self.creon_stock_cur.check_rq_status()
+        return self.creon_stock_cur.check_rq_status()
 
     def unsubscribe(self):
         self.creon_stock_cur.unsubscribe()  # 실시간 등록 해지
+        self.handler.active = False  # 링 버퍼에 남은 이벤트 처리 안함
+        RtDataCache.clear(self.stock_id, "tick")
         self.db_kr_stock_data_realtime.drop(self.stock_code)  # 실시간 종목 데이터 테이블 삭제
 
 
@@ -90,48 +722,86 @@ class StockAskBidRt:
     Attributes:
         stock_code (str): 종목 코드
 
+        stock_id (int): 종목 id (stock_symbol.StockSymbol)
+
         method (method): 실행할 호출한 인스턴스의 메소드
 
+        drop_method (method): 링 버퍼가 가득 차서 이벤트를 버린 경우 실행할 메소드
+
 
         creon_stock_cur (creon_api.CreonStockCur): 실행시킬 메소드가 있는 클래스(creon 실시간 주식 데이터 관련)의 인스턴스
+
+        handler (StockRtEvent): 이벤트 핸들러 (subscribe 호출시 생성)
     """
 
-    def __init__(self, stock_code, method=None):
+    def __init__(self, stock_code, method=None, drop_method=None):
         """
         Parameters:
             stock_code (str): 종목 코드
             
             method (method): 실행할 호출한 인스턴스의 메소드
+
+            drop_method (method): 링 버퍼가 가득 차서 이벤트를 버린 경우 실행할 메소드 (종목 id, 이벤트 종류, 버린 이벤트 수)
         """
         self.stock_code = stock_code
+        self.stock_id = StockSymbol.get_id(stock_code)
         self.method = method
+        self.drop_method = drop_method
+
+        self.subscribe()
+
+    def subscribe(self):
+        """
+        실시간 등록 (creon 재접속 후에는 이전 오브젝트가 동작하지 않으므로 오브젝트를 새로 만들어 등록)
 
+        Returns:
+            (bool): 등록 성공 여부
+        """
         self.creon_stock_jp_bid = CreonStockJpBid()
 
         # 이벤트 핸들러 세팅
-        handler = self.creon_stock_jp_bid.get_handler(StockRtEvent)
-        handler.set_params("ask_bid", self.creon_stock_jp_bid, method)
+        self.handler = self.creon_stock_jp_bid.get_handler(StockRtEvent)
+        self.handler.set_params("ask_bid", self.creon_stock_jp_bid, self.stock_id, self.method, self.drop_method)
 
         # stock_code에 대한 실시간 등록
         self.creon_stock_jp_bid.set_input_value(0, self.stock_code)
         self.creon_stock_jp_bid.subscribe()
-        self.creon_stock_jp_bid.check_rq_status()
+        return self.creon_stock_jp_bid.check_rq_status()
 
     def unsubscribe(self):
         self.creon_stock_jp_bid.unsubscribe()  # 실시간 등록 해지
+        self.handler.active = False  # 링 버퍼에 남은 이벤트 처리 안함
+        RtDataCache.clear(self.stock_id, "ask_bid")
 
 
 class StockRtEvent:
     """
     실시간 주식 데이터 들어올시 발생되는 이벤트 클래스
 
+    COM 콜백(OnReceived)에서는 헤더 값만 링 버퍼(TICK_RING / ASK_BID_RING) 레코드에 복사하고 바로 반환하며
+    데이터 변환, db insert, 잔고 / 가격 업데이트, 호출한 인스턴스의 메소드 실행은 링 버퍼의 처리 스레드에서 함 (process)
+
     Attributes:
         client (CreonStockCur): 실행시킬 메소드가 있는 클래스(creon 실시간 주식 데이터 관련)의 인스턴스
 
+        stock_id (int): 종목 id (stock_symbol.StockSymbol)
+
         method (method): 실행할 호출한 인스턴스의 메소드
+
+        header_reader (method): 헤더 읽기 COM 메소드 (client.get_header_reader)
+
+        active (bool): 처리 여부 (실시간 등록 해지후 링 버퍼에 남은 이벤트는 처리하지 않음)
+
+        drop_method (method): 링 버퍼가 가득 차서 이벤트를 버린 경우 실행할 메소드 (종목 id, 이벤트 종류, 버린 이벤트 수)
+
+        drop_count (int): 링 버퍼가 가득 차서 버린 이벤트 수 (COM 콜백에서만 변경)
+
+        notified_drop_count (int): drop_method 로 알린 버린 이벤트 수 (처리 스레드에서만 변경)
+
+        drop_pending (bool): 링 버퍼의 drop_deque 에 들어가 있는지 여부
     """
 
-    def set_params(self, evt_type, client, method=None):
+    def set_params(self, evt_type, client, stock_id, method=None, drop_method=None):
         """
         파라메터 설정
 
@@ -140,66 +810,170 @@ class StockRtEvent:
 
             client (CreonStockCur): 실행시킬 메소드가 있는 클래스(creon 실시간 주식 데이터 관련)의 인스턴스
 
+            stock_id (int): 종목 id (stock_symbol.StockSymbol)
+
             method (method): 실행할 호출한 인스턴스의 메소드
+
+            drop_method (method): 링 버퍼가 가득 차서 이벤트를 버린 경우 실행할 메소드 (버린 후 처음 처리하는 이벤트 전에 실행)
         """
         self.evt_type = evt_type
         self.client = client
+        self.stock_id = stock_id
+        self.stock_code = StockSymbol.get_code(stock_id)
         self.method = method
+        self.drop_method = drop_method
+        self.drop_count = 0
+        self.notified_drop_count = 0
+        self.drop_pending = False
+        self.header_reader = client.get_header_reader()
+        self.active = True
+
+        if evt_type == "tick":
+            # 샤드 처리용 (레코드는 핸들러마다 하나, COM 콜백은 한 스레드에서만 호출됨)
+            self.shard_record = [None] * (1 + len(_TICK_HEADER_DECODER))
+            self.stock_code_byte = self.stock_code.encode("ascii")
+            StockSymbol.fit_list(_SHARD_TICK_HANDLER_LIST)
+            _SHARD_TICK_HANDLER_LIST[stock_id] = self
+
+        (TICK_RING if evt_type == "tick" else ASK_BID_RING).start()
 
     def OnReceived(self):
         """
-        이벤트 발생시 실행됨
+        이벤트 발생시 실행됨 (헤더 필드를 링 버퍼에 한번에 읽어 넣기만 함, 버퍼가 가득 차면 이벤트를 버리고 drop_count 증가)
         """
-
         if self.evt_type == "tick":
-            # 실시간 데이터 가져온후 리스트화
-            rt_data = {
-                "stock_code": self.client.get_header_value(0),  # 종목 코드
-                "date_time": self.client.get_header_value(18),  # 시분초
-                "e_market_hours_kind": MARKET_HOURS_KIND(self.client.get_header_value(20)),  # 예상 체결가 구분 플래그 (동시호가 / 장중)
-                "price": self.client.get_header_value(13),  # 현재가
-                "day_changed": self.client.get_header_value(2),  # 대비
-                "qty": self.client.get_header_value(17),  # 순간체결수량
-                "vol": self.client.get_header_value(9),  # 거래량
-            }
-
-            data_db = [
-                rt_data["date_time"],
-                rt_data["e_market_hours_kind"].name,
-                rt_data["price"],
-                rt_data["day_changed"],
-                rt_data["qty"],
-                rt_data["vol"],
-            ]
-
-            # db에 데이터 insert
-            db_kr_stock_data_realtime = MariaDB("KR_STOCK_DATA_REALTIME")
-            db_kr_stock_data_realtime.insert(rt_data["stock_code"], _STOCK_RT_DATA_COLUMNS[1:], data_db)
-
-            BalanceData.update_current_price(rt_data["stock_code"], self.client.get_header_value(13))
+            _TICK_COUNTER.inc(self.stock_id)
+
+            if RtShardPool.shard_count:
+                record = self.shard_record
+                _TICK_HEADER_DECODER.read_into(self.header_reader, record)
+                FeedHeartbeat.beat(self.stock_id, record[1])
+                RtShardPool.publish_tick(self.stock_id, self.stock_code_byte, record)
+                return
+
+            record = TICK_RING.claim()
+            if record is None:
+                self.drop(TICK_RING)
+                FeedHeartbeat.beat(self.stock_id, self.header_reader(18))
+                return
+
+            span_start = Profiler.start_span()
+            record[0] = self
+            _TICK_HEADER_DECODER.read_into(self.header_reader, record)
+            Profiler.end_span("tick_header_read", span_start)
+            FeedHeartbeat.beat(self.stock_id, record[1])
+            TICK_RING.publish()
 
         elif self.evt_type == "ask_bid":
-            rt_data = {
-                "stock_code": self.client.get_header_value(0),
-                "ask": [0 for _ in range(10)],
-                "bid": [0 for _ in range(10)],
-                "ask_vol": [0 for _ in range(10)],
-                "bid_vol": [0 for _ in range(10)],
-            }
-            data_index = [3, 7, 11, 15, 19, 27, 31, 35, 39, 43]
-            for idx in range(10):
-                rt_data["ask"][idx] = self.client.get_header_value(data_index[idx])
-                rt_data["bid"][idx] = self.client.get_header_value(data_index[idx] + 1)
-                rt_data["ask_vol"][idx] = self.client.get_header_value(data_index[idx] + 2)
-                rt_data["bid_vol"][idx] = self.client.get_header_value(data_index[idx] + 3)
-
-            rt_data["tot_ask"] = self.client.get_header_value(23)
-            rt_data["tot_bid"] = self.client.get_header_value(24)
+            _ASKBID_COUNTER.inc(self.stock_id)
+            FeedHeartbeat.beat(self.stock_id)
+
+            record = ASK_BID_RING.claim()
+            if record is None:
+                self.drop(ASK_BID_RING)
+                return
+
+            span_start = Profiler.start_span()
+            record[0] = self
+            _ASK_BID_HEADER_DECODER.read_into(self.header_reader, record)
+            Profiler.end_span("ask_bid_header_read", span_start)
+            ASK_BID_RING.publish()
+
+    def drop(self, event_ring):
+        """
+        링 버퍼가 가득 차서 이벤트를 버림 (COM 콜백, 처음 버린 경우만 링 버퍼의 drop_deque 에 넣음)
+
+        Parameters:
+            event_ring (event_ring.EventRing): 가득 찬 링 버퍼
+        """
+        self.drop_count += 1
+        if not self.drop_pending:
+            self.drop_pending = True
+            event_ring.drop_deque.append(self)
+
+    def notify_drop(self):
+        """
+        버린 이벤트 수를 drop_method 로 알림 (링 버퍼 처리 스레드에서 실행됨, 다음 이벤트 처리 전 / 처리할 이벤트가 없어졌을때)
+        """
+        # drop_pending 을 먼저 끄므로 그 후에 버린 이벤트는 다시 drop_deque 에 들어감
+        self.drop_pending = False
+        drop_count = self.drop_count
+        if drop_count != self.notified_drop_count:
+            if self.active and self.drop_method:
+                self.drop_method(self.stock_id, self.evt_type, drop_count - self.notified_drop_count)
+            self.notified_drop_count = drop_count
+
+    def process(self, record):
+        """
+        링 버퍼 레코드 처리 (링 버퍼 처리 스레드에서 실행됨)
+
+        Parameters:
+            record (list): OnReceived 에서 채운 레코드 ([핸들러, 헤더 값 ...], 호출한 인스턴스의 메소드에는 TickRecord / AskBidRecord 전달)
+        """
+        if not self.active:
+            return
+
+        # 버린 이벤트가 있으면 이 이벤트를 보내기 전에 구독자에게 알림
+        if self.drop_pending:
+            self.notify_drop()
+
+        if self.evt_type == "tick":
+            rt_data = TickRecord(self.stock_id, record[1], record[2], record[3], record[4], record[5], record[6])
+
+            # db insert 는 종목별로 모아서 TICK_RING flush 에서 함
+            TickDbBuffer.append(self, rt_data.to_db_row())
+
+            self.update_tick_price(rt_data)
+
+        else:
+            # 레코드 1 ~ 40 : 1 ~ 10차 (매도호가, 매수호가, 매도잔량, 매수잔량), 41 : 총 매도잔량, 42 : 총 매수잔량 (_ASK_BID_HEADER_DECODER)
+            rt_data = AskBidRecord(self.stock_id, record[1:43])
+            RtDataCache.update_ask_bid(rt_data)
+
+        if self.method:
+            self.method(rt_data)
+
+    def update_tick_price(self, rt_data, shard_bar=None):
+        span_start = Profiler.start_span()
+        BalanceData.update_current_price(self.stock_id, rt_data.price)
+        OrderRisk.update_last_price(self.stock_id, rt_data.price)
+        RtDataCache.update_tick(rt_data, shard_bar)
+        Profiler.end_span("tick_price_update", span_start)
+
+    def process_shard_result(self, value_list):
+        """
+        샤드 처리 프로세스가 저장 / 분봉 생성을 끝낸 틱 처리 (rt_shard.RtShardPool 결과 처리 스레드에서 실행됨)
+
+        Parameters:
+            value_list (tuple): rt_shard.SHARD_RESULT_STRUCT 값 (틱 필드 7개 + 분봉 6개)
+        """
+        if not self.active:
+            return
+
+        rt_data = TickRecord(*value_list[:7])
+        self.update_tick_price(rt_data, value_list[7:] if value_list[7] else None)
 
         if self.method:
             self.method(rt_data)
 
 
+def _process_shard_result(value_list):
+    stock_id = value_list[0]
+    handler = _SHARD_TICK_HANDLER_LIST[stock_id] if stock_id < len(_SHARD_TICK_HANDLER_LIST) else None
+    if handler is not None:
+        handler.process_shard_result(value_list)
+
+
+def start_tick_shard(shard_count):
+    """
+    실시간 틱 처리를 shard_count 개 프로세스로 나눠서 시작 (실시간 구독 전에 호출, 종료는 rt_shard.RtShardPool.stop)
+
+    Parameters:
+        shard_count (int): 처리 프로세스 수
+    """
+    RtShardPool.start(shard_count, _process_shard_result)
+
+
 def main():
     pass
 
@@ -0,0 +1,143 @@
+# coding=utf-8
+import sys
+import threading
+
+
+class StockSymbol:
+    """
+    종목 코드(str) <-> 종목 id(int) 변환 클래스
+
+    실시간 처리 경로에서는 종목 코드 문자열 대신 0부터 시작하는 연속된 정수 id를 사용하고
+    (종목별 상태를 dict 대신 id 인덱스 리스트로 관리), 클라이언트로 보낼때만 종목 코드로 변환함
+
+    Attributes:
+        code_list (list[str]): id 순서의 종목 코드 리스트 (code_list[id] = 종목 코드)
+
+        id_dict (dict): 종목 코드 -> id
+
+        lock (threading.Lock): 신규 종목 등록시 사용하는 락
+    """
+
+    code_list = []
+    id_dict = {}
+    lock = threading.Lock()
+
+    @classmethod
+    def load(cls, stock_code_list=None):
+        """
+        종목 코드 리스트를 받아 id 등록 (이미 등록된 종목은 기존 id 유지)
+
+        stock_code_list가 없을 경우 db(KR_Stock_List)의 종목코드를 등록하고
+        db에 종목이 없을 경우 creon 서버에서 종목코드를 가져와 등록
+
+        Parameters:
+            stock_code_list
+                (list[str]): 등록할 종목 코드 리스트
+
+                (None): db 혹은 creon 서버의 전체 종목 코드 등록
+        """
+        if stock_code_list is None:
+            from database import MariaDB
+
+            stock_code_list = MariaDB("KR_OPERATION_DATA").select("KR_Stock_List", "stock_code")
+
+            if not stock_code_list:
+                from creon_api import CreonCpCodeMgr
+                from stock_info_enum import MARKET_KIND
+
+                stock_code_list = CreonCpCodeMgr.get_stock_code_list(MARKET_KIND.KOSPI) + CreonCpCodeMgr.get_stock_code_list(MARKET_KIND.KOSDAQ)
+
+        if not isinstance(stock_code_list, (list, tuple)):
+            stock_code_list = [stock_code_list]
+
+        for stock_code in stock_code_list:
+            cls.get_id(stock_code)
+
+    @classmethod
+    def get_id(cls, stock_code):
+        """
+        종목 코드를 받아 종목 id 반환 (등록되지 않은 종목일 경우 새로 등록)
+
+        등록된 종목은 지워지지 않고 종목 id 인덱스 리스트가 모두 늘어나므로 클라이언트가 보낸 종목 코드는 find_id 로 확인한 뒤 사용
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+        Returns:
+            (int): 종목 id
+        """
+        stock_id = cls.id_dict.get(stock_code)
+        if stock_id is not None:
+            return stock_id
+
+        with cls.lock:
+            stock_id = cls.id_dict.get(stock_code)
+            if stock_id is None:
+                stock_id = len(cls.code_list)
+                cls.code_list.append(sys.intern(stock_code))
+                cls.id_dict[cls.code_list[stock_id]] = stock_id
+
+        return stock_id
+
+    @classmethod
+    def find_id(cls, stock_code):
+        """
+        등록된 종목 코드의 종목 id 반환 (등록되지 않은 종목은 등록하지 않음)
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+        Returns:
+            (int): 종목 id
+
+            (None): 등록되지 않은 종목 혹은 문자열이 아님
+        """
+        if not isinstance(stock_code, str):
+            return None
+        return cls.id_dict.get(stock_code)
+
+    @classmethod
+    def get_code(cls, stock_id):
+        """
+        종목 id를 받아 종목 코드 반환
+
+        Parameters:
+            stock_id (int): 종목 id
+
+        Returns:
+            (str): 종목 코드
+        """
+        return cls.code_list[stock_id]
+
+    @classmethod
+    def get_count(cls):
+        """
+        등록된 종목 수 반환
+
+        Returns:
+            (int): 등록된 종목 수
+        """
+        return len(cls.code_list)
+
+    @classmethod
+    def fit_list(cls, id_list, fill=None):
+        """
+        종목 id 인덱스 리스트의 길이를 등록된 종목 수에 맞게 늘림 (새로 등록된 종목 대응)
+
+        Parameters:
+            id_list (list): 종목 id를 인덱스로 사용하는 리스트 (bytearray, array.array 포함)
+
+            fill (): 늘어난 칸에 채울 값
+        """
+        lack_count = len(cls.code_list) - len(id_list)
+        if lack_count > 0:
+            id_list.extend([fill] * lack_count)
+
+
+def main():
+    StockSymbol.load()
+    print(StockSymbol.get_count())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,407 @@
+# coding=utf-8
+import sys
+import time
+import threading
+
+import utils
+import bootstrap
+from database import MariaDB
+from creon_api import CreonLogin
+from stock_data import StockData
+from stock_data_realtime import _STOCK_RT_DATA_COLUMNS, BACKFILL_MARKET_HOURS_KIND, _get_bar_time
+
+logger = utils.get_logger(__name__)
+
+# 분봉 데이터 인덱스 (creon api 기준, 날짜, 시간, 시가, 고가, 저가, 종가, 거래량)
+_MINUTE_BAR_CREON_IDXS = (0, 1, 2, 3, 4, 5, 8)
+# 하루 분봉 최대 수 (09:01 ~ 15:30)
+_MINUTE_BAR_DAY_COUNT = 400
+
+# 체결로 보는 시장 시간 구분 (예상 체결은 누적 거래량에 포함되지 않음)
+_TRADE_MARKET_HOURS_KIND_LIST = ("REGULAR", "AFTER")
+# 분봉을 만들때 사용하는 시장 시간 구분 (creon 분봉은 정규장 체결만 포함)
+_BAR_MARKET_HOURS_KIND_LIST = ("REGULAR", BACKFILL_MARKET_HOURS_KIND)
+
+# 누락 확인 결과 db 컬럼 / 타입
+_REPORT_COLUMNS = (
+    "date",
+    "stock_code",
+    "tick_count",
+    "vol_gap_count",
+    "vol_gap_qty",
+    "head_qty",
+    "bar_count",
+    "chart_bar_count",
+    "short_bar_count",
+    "short_qty",
+    "mismatch_bar_count",
+    "fill_bar_count",
+)
+_REPORT_TYPES = ("INT", "VARCHAR(10)", "INT", "INT", "BIGINT", "BIGINT", "INT", "INT", "INT", "BIGINT", "INT", "INT")
+
+
+class TickReconciler:
+    """
+    실시간 틱 데이터(KR_STOCK_DATA_REALTIME) 누락 확인 / 보정 클래스
+
+    재접속이나 COM 스레드 과부하로 실시간 이벤트가 빠지면 실시간 테이블에 조용히 구멍이 생기므로
+    1. 연속된 틱의 누적 거래량(StockCur 헤더 9) 차이와 순간 체결 수량을 비교해 빠진 수량을 찾고
+    2. 틱으로 만든 1분봉을 creon 1분봉(StockData.get_chart_data)과 비교해
+       거래량이 모자란 분봉은 모자란 수량만큼 보정 틱(market_hours_kind BACKFILL)을 넣고 (fill)
+       creon 분봉과 맞지 않는 분봉(거래량 초과, 고가 / 저가 범위 밖, creon 분봉 없음)은 결과에 표시함
+    종목 / 날짜별 결과는 KR_OPERATION_DATA.KR_Tick_Gap_Report 테이블에 저장
+
+    Attributes:
+        report_table (str): 결과 테이블 이름 (KR_OPERATION_DATA db)
+
+        run_time (int): 매일 자동 확인 시작 시분초 (hhmmss, start 참고)
+
+        run_thread (threading.Thread): 자동 확인 스레드
+    """
+
+    report_table = "KR_Tick_Gap_Report"
+    run_time = 153500
+
+    run_thread = None
+
+    @classmethod
+    def get_tick_list(cls, stock_code):
+        """
+        실시간 테이블의 틱 리스트 반환 (수신 순서)
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+        Returns:
+            (list[list]): 틱 리스트 ([시분초, 시장 시간 구분, 현재가, 대비, 순간체결수량, 누적거래량])
+        """
+        row_list = MariaDB("KR_STOCK_DATA_REALTIME").select(stock_code, _STOCK_RT_DATA_COLUMNS)
+        if not row_list:
+            return []
+        if not isinstance(row_list[0], (list, tuple)):
+            row_list = [row_list]  # 한줄인 경우
+
+        return [list(row[1:]) for row in sorted(row_list, key=lambda row: row[0])]
+
+    @classmethod
+    def find_volume_gap(cls, tick_list):
+        """
+        누적 거래량으로 빠진 체결 수량 찾기 (보정 틱, 예상 체결 틱은 제외)
+
+        Parameters:
+            tick_list (list[list]): 틱 리스트 (get_tick_list 반환값)
+
+        Returns:
+            (list[list]): 빠진 구간 리스트 ([이전 틱 시분초, 틱 시분초, 빠진 수량], 이전 틱의 누적 거래량이 더 큰 경우(순서 바뀜)는 음수)
+
+            (int): 첫 틱 이전의 누적 거래량 (구독 전 체결 또는 첫 틱 전에 빠진 수량)
+        """
+        gap_list = []
+        head_qty = 0
+        prev_tick = None
+        for tick in tick_list:
+            if not tick[1] in _TRADE_MARKET_HOURS_KIND_LIST:
+                continue
+
+            if prev_tick is None:
+                head_qty = tick[5] - tick[4]
+            else:
+                missing_qty = tick[5] - prev_tick[5] - tick[4]
+                if missing_qty:
+                    gap_list.append([prev_tick[0], tick[0], missing_qty])
+            prev_tick = tick
+
+        return gap_list, head_qty
+
+    @classmethod
+    def build_minute_bar(cls, tick_list):
+        """
+        틱으로 1분봉 만들기 (정규장 틱과 보정 틱)
+
+        Parameters:
+            tick_list (list[list]): 틱 리스트 (get_tick_list 반환값)
+
+        Returns:
+            (dict): 분봉 시간(hhmm, 봉이 끝나는 분) -> [시가, 고가, 저가, 종가, 거래량]
+        """
+        bar_dict = {}
+        for tick in tick_list:
+            if not tick[1] in _BAR_MARKET_HOURS_KIND_LIST:
+                continue
+
+            price = tick[2]
+            bar_time = _get_bar_time(tick[0])
+            bar = bar_dict.get(bar_time)
+            if bar is None:
+                bar_dict[bar_time] = [price, price, price, price, tick[4]]
+            else:
+                bar[1] = max(bar[1], price)
+                bar[2] = min(bar[2], price)
+                bar[3] = price
+                bar[4] += tick[4]
+
+        return bar_dict
+
+    @classmethod
+    def get_chart_bar(cls, stock_code, date):
+        """
+        creon 1분봉 가져오기 (진행중인 분봉 제외)
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            date (int): 날짜 (YYYYMMDD)
+
+        Returns:
+            (dict): 분봉 시간(hhmm) -> [시가, 고가, 저가, 종가, 거래량]
+
+            (None): 데이터 요청 오류
+        """
+        row_list = StockData.get_chart_data(stock_code, _MINUTE_BAR_CREON_IDXS, "m", 1, date * 10000, _MINUTE_BAR_DAY_COUNT)
+        if row_list is None:
+            return None
+
+        # 당일 진행중인 분봉은 아직 바뀌므로 비교하지 않음
+        end_bar_time = 9999
+        if date == utils.get_current_datetime("%Y%m%d"):
+            end_bar_time = utils.get_current_datetime("%H%M")
+
+        return {row[0] % 10000: row[1:] for row in row_list if row[0] // 10000 == date and row[0] % 10000 <= end_bar_time}
+
+    @classmethod
+    def compare_bar(cls, tick_bar_dict, chart_bar_dict):
+        """
+        틱으로 만든 분봉과 creon 분봉 비교
+
+        Parameters:
+            tick_bar_dict (dict): 틱으로 만든 분봉 (build_minute_bar 반환값)
+
+            chart_bar_dict (dict): creon 분봉 (get_chart_bar 반환값)
+
+        Returns:
+            (list[list]): 거래량이 모자란 분봉 리스트 ([분봉 시간, 모자란 수량], 시간순)
+
+            (list[list]): 맞지 않는 분봉 리스트 ([분봉 시간, 사유 ("OVER" - 거래량 초과, "RANGE" - 고가 / 저가 범위 밖, "NO_CHART" - creon 분봉 없음)], 시간순)
+        """
+        short_list = []
+        mismatch_list = []
+        for bar_time in sorted(set(tick_bar_dict) | set(chart_bar_dict)):
+            tick_bar = tick_bar_dict.get(bar_time)
+            chart_bar = chart_bar_dict.get(bar_time)
+
+            if chart_bar is None:
+                if bar_time <= max(chart_bar_dict, default=0):
+                    mismatch_list.append([bar_time, "NO_CHART"])
+                continue
+
+            if tick_bar is None:
+                if chart_bar[4]:
+                    short_list.append([bar_time, chart_bar[4]])
+                continue
+
+            if tick_bar[1] > chart_bar[1] or tick_bar[2] < chart_bar[2]:
+                mismatch_list.append([bar_time, "RANGE"])
+            if tick_bar[4] > chart_bar[4]:
+                mismatch_list.append([bar_time, "OVER"])
+            elif tick_bar[4] < chart_bar[4]:
+                short_list.append([bar_time, chart_bar[4] - tick_bar[4]])
+
+        return short_list, mismatch_list
+
+    @classmethod
+    def fill(cls, stock_code, tick_list, chart_bar_dict, short_list):
+        """
+        거래량이 모자란 분봉마다 보정 틱 추가 (분봉 마지막 초, creon 분봉 종가, 모자란 수량, creon 분봉 기준 누적 거래량)
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            tick_list (list[list]): 틱 리스트 (get_tick_list 반환값, 대비 계산용)
+
+            chart_bar_dict (dict): creon 분봉 (get_chart_bar 반환값)
+
+            short_list (list[list]): 거래량이 모자란 분봉 리스트 (compare_bar 반환값)
+        """
+        # 전일 종가 (현재가 - 대비)
+        prev_close = None
+        for tick in tick_list:
+            if tick[1] in _TRADE_MARKET_HOURS_KIND_LIST:
+                prev_close = tick[2] - tick[3]
+                break
+
+        acc_vol = 0
+        acc_vol_dict = {}
+        for bar_time in sorted(chart_bar_dict):
+            acc_vol += chart_bar_dict[bar_time][4]
+            acc_vol_dict[bar_time] = acc_vol
+
+        data_db = []
+        for bar_time, short_qty in short_list:
+            minute = bar_time // 100 * 60 + bar_time % 100 - 1
+            close = chart_bar_dict[bar_time][3]
+            data_db.append(
+                [
+                    (minute // 60 * 100 + minute % 60) * 100 + 59,
+                    BACKFILL_MARKET_HOURS_KIND,
+                    close,
+                    close - prev_close if prev_close is not None else 0,
+                    short_qty,
+                    acc_vol_dict[bar_time],
+                ]
+            )
+
+        if data_db:
+            MariaDB("KR_STOCK_DATA_REALTIME").insert(stock_code, _STOCK_RT_DATA_COLUMNS[1:], data_db)
+
+    @classmethod
+    def reconcile(cls, stock_code, date=None, fill=True):
+        """
+        종목의 실시간 틱 누락 확인 / 보정 후 결과 저장
+
+        Parameters:
+            stock_code (str): 종목 코드
+
+            date (int): 실시간 테이블의 날짜 (YYYYMMDD, None - 오늘)
+
+            fill (bool): 거래량이 모자란 분봉 보정 여부 (False - 결과만 저장)
+
+        Returns:
+            (dict): 결과 (_REPORT_COLUMNS 키 + "vol_gap_list", "short_list", "mismatch_list")
+
+            (None): creon 분봉 요청 오류
+        """
+        if date is None:
+            date = utils.get_current_datetime("%Y%m%d")
+
+        tick_list = cls.get_tick_list(stock_code)
+        chart_bar_dict = cls.get_chart_bar(stock_code, date)
+        if chart_bar_dict is None:
+            logger.error("chart request failed : %s", stock_code)
+            return None
+
+        vol_gap_list, head_qty = cls.find_volume_gap(tick_list)
+        tick_bar_dict = cls.build_minute_bar(tick_list)
+        short_list, mismatch_list = cls.compare_bar(tick_bar_dict, chart_bar_dict)
+        if fill:
+            cls.fill(stock_code, tick_list, chart_bar_dict, short_list)
+
+        report = {
+            "date": date,
+            "stock_code": stock_code,
+            "tick_count": len(tick_list),
+            "vol_gap_count": len(vol_gap_list),
+            "vol_gap_qty": sum(gap[2] for gap in vol_gap_list),
+            "head_qty": head_qty,
+            "bar_count": len(tick_bar_dict),
+            "chart_bar_count": len(chart_bar_dict),
+            "short_bar_count": len(short_list),
+            "short_qty": sum(short[1] for short in short_list),
+            "mismatch_bar_count": len(mismatch_list),
+            "fill_bar_count": len(short_list) if fill else 0,
+        }
+        cls.save_report(report)
+
+        if vol_gap_list or short_list or mismatch_list:
+            logger.warning(
+                "tick gap %s : vol gap %d (%d), short bar %d (%d), mismatch bar %d",
+                stock_code,
+                report["vol_gap_count"],
+                report["vol_gap_qty"],
+                report["short_bar_count"],
+                report["short_qty"],
+                report["mismatch_bar_count"],
+            )
+
+        report.update({"vol_gap_list": vol_gap_list, "short_list": short_list, "mismatch_list": mismatch_list})
+        return report
+
+    @classmethod
+    def save_report(cls, report):
+        """
+        결과를 db에 저장 (같은 날짜 / 종목 결과가 있으면 덮어씀)
+
+        Parameters:
+            report (dict): 결과 (_REPORT_COLUMNS 키)
+        """
+        db_kr_operation_data = StockData.get_db()
+        db_kr_operation_data.create(cls.report_table, _REPORT_COLUMNS, _REPORT_TYPES)
+
+        data_db = [report[column] for column in _REPORT_COLUMNS]
+        where = "date = " + str(report["date"]) + " AND stock_code = '" + report["stock_code"] + "'"
+        if db_kr_operation_data.is_exist(cls.report_table, where):
+            db_kr_operation_data.update(cls.report_table, _REPORT_COLUMNS[2:], data_db[2:], where)
+        else:
+            db_kr_operation_data.insert(cls.report_table, _REPORT_COLUMNS, data_db)
+
+    @classmethod
+    def reconcile_all(cls, stock_code_list, date=None, fill=True):
+        """
+        여러 종목 누락 확인 / 보정
+
+        Parameters:
+            stock_code_list (list[str]): 종목 코드 리스트
+
+            date (int): 실시간 테이블의 날짜 (YYYYMMDD, None - 오늘)
+
+            fill (bool): 거래량이 모자란 분봉 보정 여부
+
+        Returns:
+            (list[dict]): 종목별 결과 (reconcile 반환값, 오류난 종목 제외)
+        """
+        report_list = []
+        for stock_code in stock_code_list:
+            try:
+                report = cls.reconcile(stock_code, date, fill)
+            except Exception:
+                logger.exception("tick reconcile failed : %s", stock_code)
+                continue
+            if report is not None:
+                report_list.append(report)
+        return report_list
+
+    @classmethod
+    def start(cls, get_stock_code_list, run_time=None):
+        """
+        자동 확인 스레드 시작 (매일 run_time 이후 한번, 그 시점에 실시간 구독중인 종목)
+
+        Parameters:
+            get_stock_code_list (method): 확인할 종목 코드 리스트를 반환하는 메소드
+
+            run_time (int): 확인 시작 시분초 (hhmmss, None - run_time)
+        """
+        if run_time is not None:
+            cls.run_time = run_time
+
+        def run_loop():
+            last_run_date = None
+            while True:
+                time.sleep(10)
+                date = utils.get_current_datetime("%Y%m%d")
+                if date == last_run_date or utils.get_current_datetime("%H%M%S") < cls.run_time:
+                    continue
+
+                last_run_date = date
+                report_list = cls.reconcile_all(get_stock_code_list(), date)
+                logger.info("tick reconcile done : %d stocks, %d with gap", len(report_list), len([report for report in report_list if report["short_bar_count"]]))
+
+        cls.run_thread = threading.Thread(target=run_loop, daemon=True)
+        cls.run_thread.start()
+
+
+def main():
+    """
+    실시간 틱 누락 확인 / 보정 (python tick_reconcile.py 종목코드 [종목코드 ...])
+    """
+    bootstrap.init()
+    CreonLogin.connect()
+
+    for report in TickReconciler.reconcile_all(sys.argv[1:]):
+        print(
+            "{} vol gap {} ({}), short bar {} ({}), mismatch bar {}".format(
+                report["stock_code"], report["vol_gap_count"], report["vol_gap_qty"], report["short_bar_count"], report["short_qty"], report["mismatch_bar_count"]
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
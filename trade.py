@@ -1,16 +1,64 @@
 # coding=utf-8
+import time
+import threading
+from queue import Queue
 from dataclasses import dataclass
 
-from creon_api import CreonStockOrder, CreonCpTdUtil, CreonBalance, CreonUnconcluded
-from database import MariaDB
+import utils
+from creon_api import CreonStockOrder, CreonCpTdUtil, CreonBalance, CreonUnconcluded, CreonLogin
+from database import MariaDB, STOCK_LIST_CACHE_TTL_SEC
+from portfolio import Portfolio, TRADE_FEE_PERCENT, SELL_TAX_PERCENT
+from unconcluded_order import UnconcludedOrderBook
 from trade_info_enum import ORDER_TYPE, CONCLUSION_TYPE, MODIFY_CANCEL_TYPE, PRICE_TYPE, ORDER_CONDITION
 
-# 주문 오브젝트 초기화
-_g_creon_td_util = CreonCpTdUtil()
-_g_creon_td_util.trade_init()
+logger = utils.get_logger(__name__)
+
+# 서버에서 가져온 미체결 잔량 데이터의 db 컬럼
+_UNCONCLUDED_ORDER_COLUMNS_DB = ("order_number", "order_type", "stock_code", "stock_name", "quantity", "price_type", "price")
+
+# 거래 기록 (주문/체결) db 컬럼 (trade_status_realtime.TradeStatusRecord.to_db_row 순서)
+_TRADE_HISTORY_COLUMNS_DB = (
+    "date_time",
+    "order_number",
+    "conclusion_type",
+    "order_type",
+    "modify_cancel_type",
+    "origin_order_number",
+    "stock_code",
+    "stock_name",
+    "quantity",
+    "price_type",
+    "order_condition",
+    "price",
+    "total_price",
+    "average_price",
+    "able_sell_quantity",
+    "balance_quantity",
+)
+
+_g_creon_td_util = None
+_g_creon_td_util_generation = None
+_g_creon_td_util_lock = threading.Lock()
+
+
+def get_td_util():
+    """
+    주문 오브젝트 초기화 후 반환 (처음 호출시, creon 재연결 후 처음 호출시 초기화)
+
+    Returns:
+        (creon_api.CreonCpTdUtil): 계좌, 계좌 상품 코드가 설정된 주문 초기화 클래스 인스턴스
+    """
+    global _g_creon_td_util, _g_creon_td_util_generation
 
-TRADE_FEE_PERCENT = 0.011360
-SELL_TAX_PERCENT = 0.25
+    generation = CreonLogin.generation
+    if _g_creon_td_util is None or _g_creon_td_util_generation != generation:
+        with _g_creon_td_util_lock:
+            if _g_creon_td_util is None or _g_creon_td_util_generation != generation:
+                creon_td_util = CreonCpTdUtil()
+                creon_td_util.trade_init()
+                _g_creon_td_util = creon_td_util
+                _g_creon_td_util_generation = generation
+    return _g_creon_td_util
 
 
 class Order:
@@ -18,13 +66,30 @@ class Order:
     주식 주문 관련 클래스
 
     Attributes:
-        creon_stock_order (creon_api.CreonStockOrder): creon 주문 관련 클래스 인스턴스
+        creon_stock_order (creon_api.CreonStockOrder): creon 주문 관련 클래스 인스턴스 (get_creon_stock_order 처음 호출시 생성)
+
+        creon_stock_order_generation (int): creon_stock_order 를 만들때의 creon 재연결 횟수
     """
 
-    creon_stock_order = CreonStockOrder()
+    creon_stock_order = None
+    creon_stock_order_generation = None
+
+    @classmethod
+    def get_creon_stock_order(cls):
+        """
+        클래스 공용 주문 오브젝트 반환 (처음 호출시, creon 재연결 후 처음 호출시 생성)
+
+        Returns:
+            (creon_api.CreonStockOrder): 주문 오브젝트
+        """
+        generation = CreonLogin.generation
+        if cls.creon_stock_order is None or cls.creon_stock_order_generation != generation:
+            cls.creon_stock_order = CreonStockOrder()
+            cls.creon_stock_order_generation = generation
+        return cls.creon_stock_order
 
     @classmethod
-    def buy(cls, stock_code, qty, e_order_condition, e_price_type, price):
+    def buy(cls, stock_code, qty, e_order_condition, e_price_type, price, creon_stock_order=None):
         """
         매수 주문
 
@@ -39,15 +104,20 @@ class Order:
 
             price (int): 주문가
 
+            creon_stock_order
+                (creon_api.CreonStockOrder): 주문에 사용할 주문 오브젝트 (주문 처리 스레드마다 따로 사용)
+
+                (None): 클래스 공용 주문 오브젝트 사용
+
         Returns:
             (int): 주문번호
 
             (bool): False - 주문 실패한 경우 (오류)
         """
-        return cls.buy_sell(ORDER_TYPE.BUY, stock_code, qty, e_order_condition, e_price_type, price)
+        return cls.buy_sell(ORDER_TYPE.BUY, stock_code, qty, e_order_condition, e_price_type, price, creon_stock_order)
 
     @classmethod
-    def sell(cls, stock_code, qty, e_order_condition, e_price_type, price):
+    def sell(cls, stock_code, qty, e_order_condition, e_price_type, price, creon_stock_order=None):
         """
         매도 주문
 
@@ -62,15 +132,20 @@ class Order:
 
             price (int): 주문가
 
+            creon_stock_order
+                (creon_api.CreonStockOrder): 주문에 사용할 주문 오브젝트 (주문 처리 스레드마다 따로 사용)
+
+                (None): 클래스 공용 주문 오브젝트 사용
+
         Returns:
             (int): 주문번호
 
             (bool): False - 주문 실패한 경우 (오류)
         """
-        return cls.buy_sell(ORDER_TYPE.SELL, stock_code, qty, e_order_condition, e_price_type, price)
+        return cls.buy_sell(ORDER_TYPE.SELL, stock_code, qty, e_order_condition, e_price_type, price, creon_stock_order)
 
     @classmethod
-    def buy_sell(cls, e_order_type, stock_code, qty, e_order_condition, e_price_type, price):
+    def buy_sell(cls, e_order_type, stock_code, qty, e_order_condition, e_price_type, price, creon_stock_order=None):
         """
         매수/매도 주문
 
@@ -87,29 +162,36 @@ class Order:
 
             price (int): 주문가
 
+            creon_stock_order
+                (creon_api.CreonStockOrder): 주문에 사용할 주문 오브젝트 (주문 처리 스레드마다 따로 사용)
+
+                (None): 클래스 공용 주문 오브젝트 사용
+
         Returns:
             (int): 주문번호
 
             (bool): False - 주문 실패한 경우 (오류)
         """
-        cls.creon_stock_order.buy_sell.set_input_value(0, e_order_type.value)
-        cls.creon_stock_order.buy_sell.set_input_value(1, _g_creon_td_util.account)
-        cls.creon_stock_order.buy_sell.set_input_value(2, _g_creon_td_util.product_code)
-        cls.creon_stock_order.buy_sell.set_input_value(3, stock_code)
-        cls.creon_stock_order.buy_sell.set_input_value(4, qty)
-        cls.creon_stock_order.buy_sell.set_input_value(5, price)
-        cls.creon_stock_order.buy_sell.set_input_value(7, e_order_condition.value)
-        cls.creon_stock_order.buy_sell.set_input_value(8, e_price_type.value)
-
-        cls.creon_stock_order.buy_sell.block_request()
-        if not cls.creon_stock_order.buy_sell.check_rq_status():
+        creon_stock_order = creon_stock_order or cls.get_creon_stock_order()
+
+        creon_stock_order.buy_sell.set_input_value(0, e_order_type.value)
+        creon_stock_order.buy_sell.set_input_value(1, get_td_util().account)
+        creon_stock_order.buy_sell.set_input_value(2, get_td_util().product_code)
+        creon_stock_order.buy_sell.set_input_value(3, stock_code)
+        creon_stock_order.buy_sell.set_input_value(4, qty)
+        creon_stock_order.buy_sell.set_input_value(5, price)
+        creon_stock_order.buy_sell.set_input_value(7, e_order_condition.value)
+        creon_stock_order.buy_sell.set_input_value(8, e_price_type.value)
+
+        creon_stock_order.buy_sell.block_request()
+        if not creon_stock_order.buy_sell.check_rq_status():
             return False
 
-        order_number = cls.creon_stock_order.buy_sell.get_header_value(8)
+        order_number = creon_stock_order.buy_sell.get_header_value(8)
         return order_number
 
     @classmethod
-    def modify_price(cls, origin_order_num, stock_code, qty, price):
+    def modify_price(cls, origin_order_num, stock_code, qty, price, creon_stock_order=None):
         """
         가격 정정 주문
 
@@ -122,29 +204,36 @@ class Order:
 
             price (int): 정정 주문가
 
+            creon_stock_order
+                (creon_api.CreonStockOrder): 주문에 사용할 주문 오브젝트 (주문 처리 스레드마다 따로 사용)
+
+                (None): 클래스 공용 주문 오브젝트 사용
+
         Returns:
             (int): 주문번호
 
             (bool): False - 주문 실패한 경우 (오류)
         """
-        cls.creon_stock_order.modify_price.set_input_value(1, origin_order_num)
-        cls.creon_stock_order.modify_price.set_input_value(2, _g_creon_td_util.account)
-        cls.creon_stock_order.modify_price.set_input_value(3, _g_creon_td_util.product_code)
-        cls.creon_stock_order.modify_price.set_input_value(4, stock_code)
-        cls.creon_stock_order.modify_price.set_input_value(5, qty)
-        cls.creon_stock_order.modify_price.set_input_value(6, price)
+        creon_stock_order = creon_stock_order or cls.get_creon_stock_order()
 
-        cls.creon_stock_order.modify_price.block_request()
+        creon_stock_order.modify_price.set_input_value(1, origin_order_num)
+        creon_stock_order.modify_price.set_input_value(2, get_td_util().account)
+        creon_stock_order.modify_price.set_input_value(3, get_td_util().product_code)
+        creon_stock_order.modify_price.set_input_value(4, stock_code)
+        creon_stock_order.modify_price.set_input_value(5, qty)
+        creon_stock_order.modify_price.set_input_value(6, price)
 
-        if not cls.creon_stock_order.modify_price.check_rq_status():
+        creon_stock_order.modify_price.block_request()
+
+        if not creon_stock_order.modify_price.check_rq_status():
             return False
 
-        order_number = cls.creon_stock_order.modify_price.get_header_value(7)
+        order_number = creon_stock_order.modify_price.get_header_value(7)
 
         return order_number
 
     @classmethod
-    def modify_type(cls, origin_order_num, stock_code, qty, e_order_condition, e_price_type, price):
+    def modify_type(cls, origin_order_num, stock_code, qty, e_order_condition, e_price_type, price, creon_stock_order=None):
         """
         유형 정정 주문
 
@@ -161,30 +250,37 @@ class Order:
 
             price (int): 정정 주문가
 
+            creon_stock_order
+                (creon_api.CreonStockOrder): 주문에 사용할 주문 오브젝트 (주문 처리 스레드마다 따로 사용)
+
+                (None): 클래스 공용 주문 오브젝트 사용
+
         Returns:
             (int): 주문번호
 
             (bool): False - 주문 실패한 경우 (오류)
         """
-        cls.creon_stock_order.modify_type.set_input_value(1, origin_order_num)
-        cls.creon_stock_order.modify_type.set_input_value(2, _g_creon_td_util.account)
-        cls.creon_stock_order.modify_type.set_input_value(3, _g_creon_td_util.product_code)
-        cls.creon_stock_order.modify_type.set_input_value(4, stock_code)
-        cls.creon_stock_order.modify_type.set_input_value(5, qty)
-        cls.creon_stock_order.modify_type.set_input_value(6, price)
-        cls.creon_stock_order.modify_type.set_input_value(8, e_order_condition.value)
-        cls.creon_stock_order.modify_type.set_input_value(9, e_price_type.value)
+        creon_stock_order = creon_stock_order or cls.get_creon_stock_order()
 
-        cls.creon_stock_order.modify_type.block_request()
+        creon_stock_order.modify_type.set_input_value(1, origin_order_num)
+        creon_stock_order.modify_type.set_input_value(2, get_td_util().account)
+        creon_stock_order.modify_type.set_input_value(3, get_td_util().product_code)
+        creon_stock_order.modify_type.set_input_value(4, stock_code)
+        creon_stock_order.modify_type.set_input_value(5, qty)
+        creon_stock_order.modify_type.set_input_value(6, price)
+        creon_stock_order.modify_type.set_input_value(8, e_order_condition.value)
+        creon_stock_order.modify_type.set_input_value(9, e_price_type.value)
 
-        if not cls.creon_stock_order.modify_type.check_rq_status():
+        creon_stock_order.modify_type.block_request()
+
+        if not creon_stock_order.modify_type.check_rq_status():
             return False
 
-        order_number = cls.creon_stock_order.modify_type.get_header_value(8)
+        order_number = creon_stock_order.modify_type.get_header_value(8)
         return order_number
 
     @classmethod
-    def cancel(cls, origin_order_num, stock_code, qty=0):
+    def cancel(cls, origin_order_num, stock_code, qty=0, creon_stock_order=None):
         """
         취소주문
 
@@ -195,158 +291,243 @@ class Order:
 
             qty (int): 취소 수량
 
+            creon_stock_order
+                (creon_api.CreonStockOrder): 주문에 사용할 주문 오브젝트 (주문 처리 스레드마다 따로 사용)
+
+                (None): 클래스 공용 주문 오브젝트 사용
+
         Returns:
             (int): 주문번호
 
             (bool): False - 주문 실패한 경우 (오류)
         """
-        cls.creon_stock_order.cancel.set_input_value(1, origin_order_num)
-        cls.creon_stock_order.cancel.set_input_value(2, _g_creon_td_util.account)
-        cls.creon_stock_order.cancel.set_input_value(3, _g_creon_td_util.product_code)
-        cls.creon_stock_order.cancel.set_input_value(4, stock_code)
-        cls.creon_stock_order.cancel.set_input_value(5, qty)
+        creon_stock_order = creon_stock_order or cls.get_creon_stock_order()
+
+        creon_stock_order.cancel.set_input_value(1, origin_order_num)
+        creon_stock_order.cancel.set_input_value(2, get_td_util().account)
+        creon_stock_order.cancel.set_input_value(3, get_td_util().product_code)
+        creon_stock_order.cancel.set_input_value(4, stock_code)
+        creon_stock_order.cancel.set_input_value(5, qty)
 
-        cls.creon_stock_order.cancel.block_request()
+        creon_stock_order.cancel.block_request()
 
-        if not cls.creon_stock_order.cancel.check_rq_status():
+        if not creon_stock_order.cancel.check_rq_status():
             return False
 
-        order_number = cls.creon_stock_order.cancel.get_header_value(6)
+        order_number = creon_stock_order.cancel.get_header_value(6)
         return order_number
 
 
+class TradeDbWriter:
+    """
+    거래 기록 / 잔고 db 반영 클래스
+
+    체결 이벤트 처리 스레드(trade_status_realtime.CONCLUSION_RING)는 메모리 상태(Portfolio, UnconcludedOrderBook)만 바꾸고 바로 클라이언트에 전송하며
+    거래 기록 insert, 잔고 is_exist / select / insert / update 는 저장 스레드가 들어온 순서대로 반영함
+
+    Attributes:
+        persist_q (queue.Queue): db 반영할 (메소드, 인자) 큐 (메소드는 db 인스턴스를 첫번째 인자로 받음)
+    """
+
+    persist_q = Queue()
+
+    @classmethod
+    def put(cls, method, *args):
+        """
+        db 반영할 작업 추가
+
+        Parameters:
+            method (function): 저장 스레드에서 실행할 메소드 (db 인스턴스, *args)
+
+            args (tuple): 메소드 인자
+        """
+        cls.persist_q.put((method, args))
+
+    @classmethod
+    def persist(cls, db_kr_operation_data, change):
+        """
+        작업 하나를 db에 반영
+
+        Parameters:
+            db_kr_operation_data (database.MariaDB): KR_OPERATION_DATA db 인스턴스
+
+            change (tuple): (메소드, 인자)
+        """
+        method, args = change
+        method(db_kr_operation_data, *args)
+
+    @classmethod
+    def start_persist(cls, db_kr_operation_data, retry_interval=1.0, max_retry=5):
+        """
+        db 반영 스레드 시작 (실패한 작업은 순서가 바뀌지 않도록 그 자리에서 다시 시도)
+
+        Parameters:
+            db_kr_operation_data (database.MariaDB): 저장 스레드 전용 KR_OPERATION_DATA db 인스턴스
+
+            retry_interval (float): 실패시 다시 시도하기 전 대기 시간 (단위: 초)
+
+            max_retry (int): 작업 하나당 최대 재시도 횟수 (넘으면 로그만 남기고 버림)
+        """
+
+        def persist_loop():
+            while True:
+                change = cls.persist_q.get()
+                for retry in range(max_retry + 1):
+                    try:
+                        cls.persist(db_kr_operation_data, change)
+                        break
+                    except Exception:
+                        logger.exception("trade db persist failed (%d/%d) : %s%s", retry + 1, max_retry + 1, change[0].__name__, change[1])
+                        if retry < max_retry:
+                            time.sleep(retry_interval)
+                else:
+                    logger.error("trade db change dropped : %s%s", change[0].__name__, change[1])
+
+        persist_thread = threading.Thread(target=persist_loop, daemon=True)
+        persist_thread.start()
+
+
 class TradeData:
     """
     거래 데이터 관련 클래스
 
     Attributes:
-        db_kr_operation_data (database.MariaDB): db 통신 관련 클래스 인스턴스
+        db_kr_operation_data (database.MariaDB): db 통신 관련 클래스 인스턴스 (get_db 처음 호출시 연결)
     """
 
-    db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
+    db_kr_operation_data = None
 
     @classmethod
-    def add_trade_history(cls, trade_info):
+    def get_db(cls):
         """
-        거래 기록 (주문/체결) db에 저장
+        db 인스턴스 반환 (처음 호출시 연결)
 
-        Parameters:
-            trade_info (dict): 주식 주문 체결 데이터
-        """
-        trade_info_db = {
-            "date_time": trade_info["date_time"],
-            "order_number": trade_info["order_num"],
-            "conclusion_type": trade_info["e_conclusion_type"].name,
-            "order_type": trade_info["e_order_type"].name,
-            "modify_cancel_type": trade_info["e_modify_cancel_type"].name,
-            "origin_order_number": trade_info["origin_order_num"],
-            "stock_code": trade_info["stock_code"],
-            "stock_name": trade_info["stock_name"],
-            "quantity": trade_info["qty"],
-            "price_type": trade_info["e_price_type"].name,
-            "order_condition": trade_info["e_order_condition"].name,
-            "price": trade_info["price"],
-            "total_price": trade_info["total_price"],
-            "average_price": trade_info["avg_price"],
-            "able_sell_quantity": trade_info["able_sell_qty"],
-            "balance_quantity": trade_info["balance_qty"],
-        }
+        Returns:
+            (database.MariaDB): KR_OPERATION_DATA db 인스턴스
+        """
+        if cls.db_kr_operation_data is None:
+            cls.db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
+        return cls.db_kr_operation_data
 
-        columns_db = []
-        data_db = []
+    @classmethod
+    def add_trade_history(cls, trade_info):
+        """
+        거래 기록 (주문/체결) db에 저장 (TradeDbWriter 저장 스레드가 반영)
 
-        for key, value in trade_info_db.items():
-            columns_db.append(key)
-            data_db.append(value)
+        Parameters:
+            trade_info (trade_status_realtime.TradeStatusRecord): 주식 주문 체결 데이터
+        """
+        # 거래 정보가 체결 데이터일 경우 체결 기록 db, 주문 데이터일 경우 주문 기록 db에 추가
+        table = "KR_Conclusion_History" if trade_info.e_conclusion_type == CONCLUSION_TYPE.CONCLUDED else "KR_Order_History"
+        TradeDbWriter.put(cls.insert_trade_history, table, trade_info.to_db_row())
 
-        # 거래 정보가 체결 데이터일 경우 체결 기록 db에 추가
-        if trade_info["e_conclusion_type"] == CONCLUSION_TYPE.CONCLUDED:
-            cls.db_kr_operation_data.insert("KR_Conclusion_History", columns_db, data_db)
-        # 거래 정보가 주문 데이터일 경우 주문 기록 db에 추가
-        else:
-            cls.db_kr_operation_data.insert("KR_Order_History", columns_db, data_db)
+    @staticmethod
+    def insert_trade_history(db_kr_operation_data, table, data_db):
+        db_kr_operation_data.insert(table, _TRADE_HISTORY_COLUMNS_DB, data_db)
 
     @classmethod
-    def update_unconcluded_order(cls):
+    def get_unconcluded_order_list(cls):
         """
-        미체결 잔량 정보를 서버로부터 가져와 갱신
+        미체결 잔량 정보를 서버로부터 가져와 반환
+
+        Returns:
+            (list[list]): [주문번호, 주문타입 이름, 종목코드, 종목명, 수량, 주문호가구분, 가격] 리스트 (_UNCONCLUDED_ORDER_COLUMNS_DB 순서)
         """
         creon_unconcluded = CreonUnconcluded()
 
-        creon_unconcluded.set_input_value(0, _g_creon_td_util.account)
-        creon_unconcluded.set_input_value(1, _g_creon_td_util.product_code)
+        creon_unconcluded.set_input_value(0, get_td_util().account)
+        creon_unconcluded.set_input_value(1, get_td_util().product_code)
         creon_unconcluded.set_input_value(7, 500)
 
-        all_rcv_data_db = creon_unconcluded.get_data_list([1, 13, 3, 4, 11, 21, 7], 500, 5)
-
-        if not all_rcv_data_db:
-            cls.db_kr_operation_data.delete("KR_Unconcluded_Order")
-            return
+        all_rcv_data_db = creon_unconcluded.get_data_list([1, 13, 3, 4, 11, 21, 7], 500, 5) or []
 
         # 가져온 데이터 수정 (주문 타입(매수/매도) 열거형 이름으로)
         for rcv_row in all_rcv_data_db:
             rcv_row[1] = ORDER_TYPE(rcv_row[1]).name
 
-        columns_db = ["order_number", "order_type", "stock_code", "stock_name", "quantity", "price_type", "price"]
+        return all_rcv_data_db
+
+    @classmethod
+    def update_unconcluded_order(cls):
+        """
+        미체결 잔량 정보를 서버로부터 가져와 갱신
+        """
+        all_rcv_data_db = cls.get_unconcluded_order_list()
+
+        if not all_rcv_data_db:
+            cls.get_db().delete("KR_Unconcluded_Order")
+            UnconcludedOrderBook.load([])
+            return
 
-        cls.db_kr_operation_data.delete("KR_Unconcluded_Order")
-        cls.db_kr_operation_data.insert("KR_Unconcluded_Order", columns_db, all_rcv_data_db)
+        cls.get_db().delete("KR_Unconcluded_Order")
+        cls.get_db().insert("KR_Unconcluded_Order", _UNCONCLUDED_ORDER_COLUMNS_DB, all_rcv_data_db)
+
+        # 메모리 미체결 주문 목록 갱신
+        UnconcludedOrderBook.load([dict(zip(_UNCONCLUDED_ORDER_COLUMNS_DB, rcv_row)) for rcv_row in all_rcv_data_db])
+
+    @classmethod
+    def reconcile_unconcluded_order(cls):
+        """
+        메모리 미체결 주문 목록(스냅샷에서 복원)을 서버의 미체결 잔량과 비교해 달라진 주문만 갱신
+        (db에는 unconcluded_order.UnconcludedOrderBook 저장 스레드가 반영)
+
+        Returns:
+            (int): 추가 / 수량 변경 / 삭제된 주문 수
+        """
+        creon_order_dict = {rcv_row[0]: dict(zip(_UNCONCLUDED_ORDER_COLUMNS_DB, rcv_row)) for rcv_row in cls.get_unconcluded_order_list()}
+        order_dict = {order["order_number"]: order for order in UnconcludedOrderBook.get_order_list()}
+
+        diff_count = 0
+        for order_num, creon_order in creon_order_dict.items():
+            order = order_dict.get(order_num)
+            if order is not None and order["quantity"] == creon_order["quantity"]:
+                continue
+
+            if order is not None:
+                UnconcludedOrderBook.remove_qty(order_num, order["quantity"])
+            UnconcludedOrderBook.add(creon_order)
+            diff_count += 1
+
+        for order_num in order_dict.keys() - creon_order_dict.keys():
+            UnconcludedOrderBook.remove_qty(order_num, order_dict[order_num]["quantity"])
+            diff_count += 1
+
+        return diff_count
 
     @classmethod
     def add_unconcluded_order(cls, trade_info):
         """
-        미체결 주문 목록 db에 미체결 주문 추가
+        미체결 주문 목록에 미체결 주문 추가 (db에는 unconcluded_order.UnconcludedOrderBook 저장 스레드가 반영)
 
         Parameters:
-            trade_info (dict): 주식 주문 체결 데이터
+            trade_info (trade_status_realtime.TradeStatusRecord): 주식 주문 체결 데이터
         """
         # 미체결 데이터 및 컬럼
         unconcluded_order_db = {
-            "date_time": trade_info["date_time"],
-            "order_number": trade_info["order_num"],
-            "order_type": trade_info["e_order_type"].name,
-            "stock_code": trade_info["stock_code"],
-            "stock_name": trade_info["stock_name"],
-            "quantity": trade_info["qty"],
-            "price_type": trade_info["e_price_type"].name,
-            "order_condition": trade_info["e_order_condition"].name,
-            "price": trade_info["price"],
+            "date_time": trade_info.date_time,
+            "order_number": trade_info.order_num,
+            "order_type": trade_info.e_order_type.name,
+            "stock_code": trade_info.stock_code,
+            "stock_name": trade_info.stock_name,
+            "quantity": trade_info.qty,
+            "price_type": trade_info.e_price_type.name,
+            "order_condition": trade_info.e_order_condition.name,
+            "price": trade_info.price,
         }
-        columns_db = []
-        data_db = []
-        for key, value in unconcluded_order_db.items():
-            columns_db.append(key)
-            data_db.append(value)
-
-        cls.db_kr_operation_data.insert("KR_Unconcluded_Order", columns_db, data_db)  # db에 데이터 추가
+        UnconcludedOrderBook.add(unconcluded_order_db)
 
     @classmethod
     def remove_unconcluded_order(cls, order_num, qty):
         """
-        미체결 주문 목록 db의 order_number에 해당하는 미체결 주문의 수량을
-        qty만큼 차감
+        미체결 주문 목록의 order_number에 해당하는 미체결 주문의 수량을
+        qty만큼 차감 (db에는 unconcluded_order.UnconcludedOrderBook 저장 스레드가 반영)
 
         Parameters:
             order_num (int): 미체결 주문 번호
 
             qty (int): 체결/수정/취소 된 수량 (빼줄 값)
         """
-
-        # 업데이트할 미체결 주문량 계산 (갱신될_값 = 미체결_수량 - 체결된or갱신된_수량)
-        unconcluded_qty = cls.db_kr_operation_data.select("KR_Unconcluded_Order", "quantity", "order_number = " + str(order_num))
-        if not unconcluded_qty:
-            return
-        new_unconcluded_qty = unconcluded_qty - qty
-
-        # 미체결 수량이 0으로 바뀌었을 경우 미체결 주문 데이터 삭제 후 리턴
-        if new_unconcluded_qty == 0:
-            cls.db_kr_operation_data.delete("KR_Unconcluded_Order", "order_number = " + str(order_num))
-            return
-
-        # 미체결 수량 업데이트
-        cls.db_kr_operation_data.update(
-            "KR_Unconcluded_Order", "quantity", new_unconcluded_qty, "order_number = " + str(order_num),
-        )
+        UnconcludedOrderBook.remove_qty(order_num, qty)
 
 
 class BalanceData:
@@ -354,34 +535,58 @@ class BalanceData:
     잔고 데이터 클래스
 
     Attributes:
-        db_kr_operation_data (database.MariaDB): db 통신 관련 클래스 인스턴스
+        db_kr_operation_data (database.MariaDB): db 통신 관련 클래스 인스턴스 (get_db 처음 호출시 연결)
     """
 
-    db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
+    db_kr_operation_data = None
 
     @classmethod
-    def update_stock_balance(cls):
+    def get_db(cls):
         """
-        주식 잔고 데이터를 서버로부터 가져와 갱신
+        db 인스턴스 반환 (처음 호출시 연결)
+
+        Returns:
+            (database.MariaDB): KR_OPERATION_DATA db 인스턴스
+        """
+        if cls.db_kr_operation_data is None:
+            cls.db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
+        return cls.db_kr_operation_data
+
+    @classmethod
+    def get_stock_balance_list(cls):
+        """
+        주식 잔고 데이터를 서버로부터 가져와 반환
+
+        Returns:
+            (list[list]): [종목코드, 종목명, 평균단가, 손익단가, 잔고수량, 매도가능수량, 손익, 수익률, 평가금액] 리스트
+                (손익, 평가금액은 creon 단위 그대로 1000배 값)
         """
         creon_balance = CreonBalance()
 
         # 받아올 값 세팅
-        creon_balance.set_input_value(0, _g_creon_td_util.account)
-        creon_balance.set_input_value(1, _g_creon_td_util.product_code)
+        creon_balance.set_input_value(0, get_td_util().account)
+        creon_balance.set_input_value(1, get_td_util().product_code)
         creon_balance.set_input_value(2, 500)
         creon_balance.set_input_value(3, "2")
 
-        all_rcv_data_db = creon_balance.get_data_list([12, 0, 17, 18, 7, 15, 10, 11, 9], 500, 7)
+        return creon_balance.get_data_list([12, 0, 17, 18, 7, 15, 10, 11, 9], 500, 7) or []
+
+    @classmethod
+    def update_stock_balance(cls):
+        """
+        주식 잔고 데이터를 서버로부터 가져와 갱신
+        """
+        all_rcv_data_db = cls.get_stock_balance_list()
 
         if not all_rcv_data_db:
-            cls.db_kr_operation_data.delete("KR_Stock_Balance")
+            cls.get_db().delete("KR_Stock_Balance")
+            Portfolio.clear()
             return
 
         for rcv_row in all_rcv_data_db:
             stock_code = rcv_row[0]
-            stock_info = cls.db_kr_operation_data.select(
-                "KR_Stock_List", ["market_kind", "section_kind", "wics_code"], "stock_code ='" + stock_code + "'"
+            stock_info = cls.get_db().select(
+                "KR_Stock_List", ["market_kind", "section_kind", "wics_code"], "stock_code ='" + stock_code + "'", STOCK_LIST_CACHE_TTL_SEC,
             )
             rcv_row[2:1] = stock_info
 
@@ -403,13 +608,47 @@ class BalanceData:
             "profit_ratio",
             "evaluation",
         ]
-        cls.db_kr_operation_data.delete("KR_Stock_Balance")
-        cls.db_kr_operation_data.insert("KR_Stock_Balance", columns_db, all_rcv_data_db)
+        cls.get_db().delete("KR_Stock_Balance")
+        cls.get_db().insert("KR_Stock_Balance", columns_db, all_rcv_data_db)
+
+        # 메모리 잔고 갱신 (현재가 = 손익단가 + 손익 / 수량)
+        Portfolio.load(
+            [
+                [rcv_row[0], rcv_row[5], rcv_row[6], rcv_row[7], rcv_row[8], round(rcv_row[6] + rcv_row[9] / rcv_row[7]) if rcv_row[7] else rcv_row[5]]
+                for rcv_row in all_rcv_data_db
+            ]
+        )
+
+    @classmethod
+    def reconcile_stock_balance(cls):
+        """
+        메모리 잔고(스냅샷에서 복원)를 서버의 잔고와 비교해 잔고수량, 매도가능수량, 평균단가가 달라진 종목만 갱신
+
+        Returns:
+            (int): 추가 / 변경 / 삭제된 종목 수
+        """
+        creon_balance_dict = {rcv_row[0]: rcv_row for rcv_row in cls.get_stock_balance_list()}
+        position_dict = {position[0]: position for position in Portfolio.get_position_list()}
+
+        diff_count = 0
+        for stock_code, rcv_row in creon_balance_dict.items():
+            position = position_dict.get(stock_code)
+            if position is not None and (position[1], position[3], position[4]) == (rcv_row[2], rcv_row[4], rcv_row[5]):
+                continue
+
+            cls.change_stock_balance(stock_code, rcv_row[4], rcv_row[5], rcv_row[2])
+            diff_count += 1
+
+        for stock_code in position_dict.keys() - creon_balance_dict.keys():
+            cls.change_stock_balance(stock_code, 0, 0, 0)
+            diff_count += 1
+
+        return diff_count
 
     @classmethod
     def change_stock_balance(cls, stock_code, balance_qty, able_sell_qty, avg_price):
         """
-        db에 주식 잔고 데이터를 변경
+        주식 잔고 데이터를 변경 (메모리 잔고는 바로 변경, db는 TradeDbWriter 저장 스레드가 반영)
 
         Parameters:
             stock_code (str): 종목 코드
@@ -420,69 +659,75 @@ class BalanceData:
 
             avg_price (int): 평균 단가
         """
+        if balance_qty == 0:
+            Portfolio.set_position(stock_code, 0, 0, 0, 0)
+            profit_unit_price = 0
+        else:
+            profit_unit_price = avg_price / (1 - (TRADE_FEE_PERCENT / 100 + SELL_TAX_PERCENT / 100))  # 손익단가 계산
+            Portfolio.set_position(stock_code, balance_qty, able_sell_qty, avg_price, profit_unit_price)
+
+        TradeDbWriter.put(cls.persist_stock_balance, stock_code, balance_qty, able_sell_qty, avg_price, profit_unit_price)
+
+    @staticmethod
+    def persist_stock_balance(db_kr_operation_data, stock_code, balance_qty, able_sell_qty, avg_price, profit_unit_price):
+        """
+        db에 주식 잔고 데이터를 변경 (TradeDbWriter 저장 스레드에서 실행됨)
+        """
         # 해당 종목의 잔고가 0일 경우 잔고 테이블에서 종목 삭제 후 리턴
         if balance_qty == 0:
-            cls.db_kr_operation_data.delete("KR_Stock_Balance", "stock_code = '" + stock_code + "'")
+            db_kr_operation_data.delete("KR_Stock_Balance", "stock_code = '" + stock_code + "'")
             return
 
         # 잔고 테이블에 종목이 없을경우 종목 추가
-        if not cls.db_kr_operation_data.is_exist("KR_Stock_Balance", "stock_code = '" + stock_code + "'"):
-            db_data = [stock_code, cls.db_kr_operation_data.select("KR_Stock_List", "stock_name", "stock_code = '" + stock_code + "'")]
-            db_data += cls.db_kr_operation_data.select(
-                "KR_Stock_List", ["market_kind", "section_kind", "wics_code"], "stock_code = '" + stock_code + "'",
+        if not db_kr_operation_data.is_exist("KR_Stock_Balance", "stock_code = '" + stock_code + "'"):
+            db_data = [stock_code, db_kr_operation_data.select("KR_Stock_List", "stock_name", "stock_code = '" + stock_code + "'", STOCK_LIST_CACHE_TTL_SEC)]
+            db_data += db_kr_operation_data.select(
+                "KR_Stock_List", ["market_kind", "section_kind", "wics_code"], "stock_code = '" + stock_code + "'", STOCK_LIST_CACHE_TTL_SEC,
             )
-            cls.db_kr_operation_data.insert(
+            db_kr_operation_data.insert(
                 "KR_Stock_Balance", ["stock_code", "stock_name", "market_kind", "section_kind", "wics_code"], db_data,
             )
 
         # 종목 잔고 데이터 갱신
-        profit_unit_price = avg_price / (1 - (TRADE_FEE_PERCENT / 100 + SELL_TAX_PERCENT / 100))  # 손익단가 계산
         data_db = [avg_price, profit_unit_price, balance_qty, able_sell_qty]
         columns_db = ["average_unit_price", "profit_unit_price", "quantity", "able_sell_quantity"]
-        cls.db_kr_operation_data.update(
+        db_kr_operation_data.update(
             "KR_Stock_Balance", columns_db, data_db, "stock_code = '" + stock_code + "'",
         )
 
     @classmethod
     def change_able_sell_quantity(cls, stock_code, able_sell_qty):
         """
-        주식 잔고 db에 stock_code에 해당하는 종목의 매도 가능 수량을 변경
+        stock_code에 해당하는 종목의 매도 가능 수량을 변경 (메모리 잔고는 바로 변경, db는 TradeDbWriter 저장 스레드가 반영)
 
         Parameters:
             stock_code (str): 종목 코드
 
             able_sell_qty (int): 업데이트 할 매도 가능 수량
         """
-        cls.db_kr_operation_data.update(
+        Portfolio.set_able_sell_qty(stock_code, able_sell_qty)
+        TradeDbWriter.put(cls.persist_able_sell_quantity, stock_code, able_sell_qty)
+
+    @staticmethod
+    def persist_able_sell_quantity(db_kr_operation_data, stock_code, able_sell_qty):
+        db_kr_operation_data.update(
             "KR_Stock_Balance", "able_sell_quantity", able_sell_qty, "stock_code = '" + stock_code + "'",
         )
 
     @classmethod
-    def update_current_price(cls, stock_code, cur_price):
+    def update_current_price(cls, stock_id, cur_price):
         """
-        계좌 잔고에 stock_code 종목의 현재가, 손익, 수익률, 평가금액 업데이트
+        계좌 잔고에 stock_id 종목의 현재가 업데이트
+
+        손익, 수익률, 평가금액은 portfolio.Portfolio 에서 메모리상으로 계산되며
+        db에는 Portfolio 저장 스레드가 주기적으로 저장함
 
         Parameters:
-            stock_code (str): 종목 코드
+            stock_id (int): 종목 id (stock_symbol.StockSymbol)
             
             cur_price (int): 종목의 현재가
         """
-        data_db = cls.db_kr_operation_data.select("KR_Stock_Balance", ["profit_unit_price", "quantity"], "stock_code = '" + stock_code + "'")
-        if not data_db:
-            return
-        profit_unit_price = data_db[0]
-        qty = data_db[1]
-
-        profit = (cur_price - profit_unit_price) * qty
-        profit_ratio = (cur_price / profit_unit_price) * 100 - 100
-        evaluation = cur_price * qty * (1 - (TRADE_FEE_PERCENT / 100 + SELL_TAX_PERCENT / 100))
-
-        cls.db_kr_operation_data.update(
-            "KR_Stock_Balance",
-            ["current_price", "profit", "profit_ratio", "evaluation"],
-            [cur_price, int(profit), profit_ratio, int(evaluation)],
-            "stock_code ='" + stock_code + "'",
-        )
+        Portfolio.update_price(stock_id, cur_price)
 
 
 def main():
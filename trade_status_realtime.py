@@ -1,11 +1,297 @@
 # coding=utf-8
-import utils
-from creon_api import CreonCpConclusion
+import time
+import json
+import struct
+
+from creon_api import CreonCpConclusion, HeaderDecoder
 from trade import TradeData, BalanceData
-from database import MariaDB
+from unconcluded_order import UnconcludedOrderBook
+from latency_stats import OrderLatency
+from event_ring import EventRing
 
 from trade_info_enum import ORDER_TYPE, CONCLUSION_TYPE, MODIFY_CANCEL_TYPE, PRICE_TYPE, ORDER_CONDITION
 
+# 주문 체결 이벤트 헤더 필드 (CpConclusion)
+_CONCLUSION_HEADER_DECODER = HeaderDecoder(
+    (
+        ("stock_name", 2),  # 주식이름
+        ("qty", 3),  # 수량
+        ("price", 4),  # (접수된 or 체결된) 가격
+        ("order_num", 5),  # 주문 번호
+        ("origin_order_num", 6),  # 원 주문번호
+        ("stock_code", 9),  # 종목 코드
+        ("order_type", 12),  # 주문 타입 (매수, 매도)
+        ("conclusion_type", 14),  # 체결 타입 (체결, 확인, 거부, 접수)
+        ("modify_cancel_type", 16),  # 정정 취소 타입
+        ("price_type", 18),  # 호가 타입 (일반, 시장가)
+        ("order_condition", 19),  # 주문 조건 (IOC, FOK)
+        ("avg_price", 21),  # 평균단가
+        ("able_sell_qty", 22),  # 매도 가능 수량
+        ("balance_qty", 23),  # 체결 기준 수량
+    )
+)
+
+# 주문 체결 이벤트 링 버퍼 (COM 콜백 -> 처리 스레드, 레코드 : [핸들러, 수신 시간(time.time), 수신 시간(time.perf_counter), 헤더 필드 ...])
+# 체결 이벤트를 버리면 미체결 / 잔고가 틀려지므로 가득 찬 경우에도 버리지 않음 (spill)
+CONCLUSION_RING = EventRing("conclusion", 4096, 3 + len(_CONCLUSION_HEADER_DECODER), spill=True)
+
+
+# 열거형 값 -> 열거형 / 열거형 -> 이름 (이벤트마다 열거형 생성, name 조회를 하지 않도록 미리 만들어 둠)
+_ORDER_TYPE_DICT = {e.value: e for e in ORDER_TYPE}
+_CONCLUSION_TYPE_DICT = {e.value: e for e in CONCLUSION_TYPE}
+_MODIFY_CANCEL_TYPE_DICT = {e.value: e for e in MODIFY_CANCEL_TYPE}
+_PRICE_TYPE_DICT = {e.value: e for e in PRICE_TYPE}
+_ORDER_CONDITION_DICT = {e.value: e for e in ORDER_CONDITION}
+_ENUM_NAME_DICT = {e: e.name for enum_class in (ORDER_TYPE, CONCLUSION_TYPE, MODIFY_CANCEL_TYPE, PRICE_TYPE, ORDER_CONDITION) for e in enum_class}
+
+# 클라이언트 전송 json 형식 (json.dumps 결과와 같은 키 순서 / 구분자)
+_TRADE_STATUS_JSON_FORMAT = (
+    '{{"res_type": "trade_status", "res_data": {{"date_time": {}, "stock_name": {}, "qty": {}, "price": {}, "order_num": {}, '
+    '"origin_order_num": {}, "stock_code": {}, "e_order_type": "{}", "e_conclusion_type": "{}", "e_modify_cancel_type": "{}", '
+    '"e_price_type": "{}", "e_order_condition": "{}", "avg_price": {}, "able_sell_qty": {}, "balance_qty": {}, "total_price": {}}}}}'
+)
+
+
+def _encode_utf8(text, size):
+    """
+    utf-8 고정 길이 필드 값 (size 바이트를 넘으면 글자 중간에서 자르지 않도록 글자 단위로 자름)
+
+    Parameters:
+        text (str): 문자열
+
+        size (int): 필드 크기 (단위: 바이트)
+
+    Returns:
+        (bytes): utf-8 바이트 (size 이하)
+    """
+    data = text.encode("utf-8")
+    if len(data) > size:
+        data = data[:size].decode("utf-8", "ignore").encode("utf-8")
+    return data
+
+
+class TradeStatusRecord:
+    """
+    실시간 주문 체결 레코드 (이벤트마다 dict 를 만들지 않고 json, db 행, 바이너리 형식으로 바로 변환)
+
+    Attributes:
+        date_time (int): 날짜 시간 YYYYMMDDHHmmSS
+
+        stock_name (str): 주식이름
+
+        qty (int): 수량
+
+        price (int): (접수된 or 체결된) 가격
+
+        order_num (int): 주문 번호
+
+        origin_order_num (int): 원 주문번호
+
+        stock_code (str): 종목 코드
+
+        e_order_type (trade_info_enum.ORDER_TYPE): 주문 타입 (매수, 매도)
+
+        e_conclusion_type (trade_info_enum.CONCLUSION_TYPE): 체결 타입 (체결, 확인, 거부, 접수)
+
+        e_modify_cancel_type (trade_info_enum.MODIFY_CANCEL_TYPE): 정정 취소 타입
+
+        e_price_type (trade_info_enum.PRICE_TYPE): 호가 타입 (일반, 시장가)
+
+        e_order_condition (trade_info_enum.ORDER_CONDITION): 주문 조건 (IOC, FOK)
+
+        avg_price (int): 평균단가
+
+        able_sell_qty (int): 매도 가능 수량
+
+        balance_qty (int): 체결 기준 수량
+
+        total_price (int): 거래 금액 # TODO : 거래 수수료 및 세금 계산 필요
+
+        STRUCT (struct.Struct): 바이너리 형식 (열거형은 값, 문자열은 utf-8 고정 길이, 주식이름은 40 바이트를 넘으면 글자 단위로 잘림)
+    """
+
+    __slots__ = (
+        "date_time",
+        "stock_name",
+        "qty",
+        "price",
+        "order_num",
+        "origin_order_num",
+        "stock_code",
+        "e_order_type",
+        "e_conclusion_type",
+        "e_modify_cancel_type",
+        "e_price_type",
+        "e_order_condition",
+        "avg_price",
+        "able_sell_qty",
+        "balance_qty",
+        "total_price",
+    )
+
+    STRUCT = struct.Struct("<q40sqqqq12s2s2s2s2s2sqqqq")
+
+    def __init__(
+        self,
+        date_time,
+        stock_name,
+        qty,
+        price,
+        order_num,
+        origin_order_num,
+        stock_code,
+        e_order_type,
+        e_conclusion_type,
+        e_modify_cancel_type,
+        e_price_type,
+        e_order_condition,
+        avg_price,
+        able_sell_qty,
+        balance_qty,
+        total_price=None,
+    ):
+        self.date_time = date_time
+        self.stock_name = stock_name
+        self.qty = qty
+        self.price = price
+        self.order_num = order_num
+        self.origin_order_num = origin_order_num
+        self.stock_code = stock_code
+        self.e_order_type = e_order_type
+        self.e_conclusion_type = e_conclusion_type
+        self.e_modify_cancel_type = e_modify_cancel_type
+        self.e_price_type = e_price_type
+        self.e_order_condition = e_order_condition
+        self.avg_price = avg_price
+        self.able_sell_qty = able_sell_qty
+        self.balance_qty = balance_qty
+        self.total_price = total_price
+
+    @classmethod
+    def from_record(cls, record):
+        """
+        링 버퍼 레코드에서 생성 (열거형은 미리 만들어 둔 값 -> 열거형 dict 에서 찾음)
+
+        Parameters:
+            record (list): TradeStatusRtEvent.OnReceived 에서 채운 레코드
+        """
+        return cls(
+            int(time.strftime("%Y%m%d%H%M%S", time.localtime(record[1]))),
+            record[3],
+            record[4],
+            record[5],
+            record[6],
+            record[7],
+            record[8],
+            _ORDER_TYPE_DICT[record[9]],
+            _CONCLUSION_TYPE_DICT[record[10]],
+            _MODIFY_CANCEL_TYPE_DICT[record[11]],
+            _PRICE_TYPE_DICT[record[12]],
+            _ORDER_CONDITION_DICT[record[13]],
+            record[14],
+            record[15],
+            record[16],
+        )
+
+    def to_db_row(self):
+        """
+        거래 기록 테이블 행 (trade._TRADE_HISTORY_COLUMNS_DB 순서)
+        """
+        return [
+            self.date_time,
+            self.order_num,
+            _ENUM_NAME_DICT[self.e_conclusion_type],
+            _ENUM_NAME_DICT[self.e_order_type],
+            _ENUM_NAME_DICT[self.e_modify_cancel_type],
+            self.origin_order_num,
+            self.stock_code,
+            self.stock_name,
+            self.qty,
+            _ENUM_NAME_DICT[self.e_price_type],
+            _ENUM_NAME_DICT[self.e_order_condition],
+            self.price,
+            self.total_price,
+            self.avg_price,
+            self.able_sell_qty,
+            self.balance_qty,
+        ]
+
+    def to_json(self):
+        """
+        클라이언트 전송 json 문자열 ({"res_type": "trade_status", "res_data"})
+        """
+        return _TRADE_STATUS_JSON_FORMAT.format(
+            self.date_time,
+            json.dumps(self.stock_name),
+            self.qty,
+            self.price,
+            self.order_num,
+            self.origin_order_num,
+            json.dumps(self.stock_code),
+            _ENUM_NAME_DICT[self.e_order_type],
+            _ENUM_NAME_DICT[self.e_conclusion_type],
+            _ENUM_NAME_DICT[self.e_modify_cancel_type],
+            _ENUM_NAME_DICT[self.e_price_type],
+            _ENUM_NAME_DICT[self.e_order_condition],
+            self.avg_price,
+            self.able_sell_qty,
+            self.balance_qty,
+            json.dumps(self.total_price),
+        )
+
+    def pack(self):
+        """
+        바이너리 형식 (STRUCT)
+        """
+        return self.STRUCT.pack(
+            self.date_time,
+            _encode_utf8(self.stock_name, 40),
+            self.qty,
+            self.price,
+            self.order_num,
+            self.origin_order_num,
+            self.stock_code.encode("ascii"),
+            self.e_order_type.value.encode("ascii"),
+            self.e_conclusion_type.value.encode("ascii"),
+            self.e_modify_cancel_type.value.encode("ascii"),
+            self.e_price_type.value.encode("ascii"),
+            self.e_order_condition.value.encode("ascii"),
+            self.avg_price,
+            self.able_sell_qty,
+            self.balance_qty,
+            self.total_price or 0,
+        )
+
+    @classmethod
+    def unpack(cls, data, offset=0):
+        """
+        바이너리 형식에서 레코드 생성
+
+        Parameters:
+            data (bytes): 바이너리 데이터
+
+            offset (int): 레코드 시작 위치
+        """
+        values = cls.STRUCT.unpack_from(data, offset)
+        return cls(
+            values[0],
+            values[1].rstrip(b"\0").decode("utf-8", "ignore"),
+            values[2],
+            values[3],
+            values[4],
+            values[5],
+            values[6].rstrip(b"\0").decode("ascii"),
+            _ORDER_TYPE_DICT[values[7].rstrip(b"\0").decode("ascii")],
+            _CONCLUSION_TYPE_DICT[values[8].rstrip(b"\0").decode("ascii")],
+            _MODIFY_CANCEL_TYPE_DICT[values[9].rstrip(b"\0").decode("ascii")],
+            _PRICE_TYPE_DICT[values[10].rstrip(b"\0").decode("ascii")],
+            _ORDER_CONDITION_DICT[values[11].rstrip(b"\0").decode("ascii")],
+            values[12],
+            values[13],
+            values[14],
+            values[15],
+        )
+
 
 class TradeStatusRt:
     """
@@ -14,18 +300,28 @@ class TradeStatusRt:
     Attributes:
         method (instance): 실행시킬 호출한 인스턴스의 메소드
 
-        creon_conclusion (creon_api.CreonCpConclusion): 실행시킬 메소드가 있는 클래스(creon 실시간 주문 체결 데이터 관련)의 인스턴스
+        creon_conclusion (creon_api.CreonCpConclusion): 실행시킬 메소드가 있는 클래스(creon 실시간 주문 체결 데이터 관련)의 인스턴스 (subscribe 호출시 생성)
     """
 
     def __init__(self, method=None):
+        self.method = method
+        self.creon_conclusion = None
+
+    def subscribe(self):
+        """
+        실시간 등록 (creon 재접속 후에는 이전 오브젝트가 동작하지 않으므로 오브젝트를 새로 만들어 등록)
+
+        Returns:
+            (bool): 등록 성공 여부
+        """
         self.creon_conclusion = CreonCpConclusion()
 
         # 이벤트 핸들러 세팅
         handler = self.creon_conclusion.get_handler(TradeStatusRtEvent)
-        handler.set_params(self.creon_conclusion, method)
+        handler.set_params(self.creon_conclusion, self.method)
 
-    def subscribe(self):
         self.creon_conclusion.subscribe()  # 실시간 등록
+        return self.creon_conclusion.check_rq_status()
 
     def unsubscribe(self):
         self.creon_conclusion.unsubscribe()  # 실시간 등록 해지
@@ -35,15 +331,21 @@ class TradeStatusRtEvent:
     """
     실시간 주문 접수 및 체결 이벤트 관련 클래스
 
+    COM 콜백(OnReceived)에서는 헤더 값과 수신 시간만 링 버퍼(CONCLUSION_RING) 레코드에 복사하고 바로 반환하며
+    주문 / 잔고 업데이트와 호출한 인스턴스의 메소드 실행은 링 버퍼의 처리 스레드에서 함 (process)
+
     Attributes:
         client (creon_api.CreonCpConclusion): 실행시킬 메소드가 있는 클래스(creon 실시간 주문 체결 데이터 관련)의 인스턴스
 
         method (instance): 실행시킬 호출한 인스턴스의 메소드  
+
+        header_reader (method): 헤더 읽기 COM 메소드 (client.get_header_reader)
     """
 
     def __init__(self):
         self.client = None
         self.method = None
+        self.header_reader = None
 
     def set_params(self, client, method=None):
         """
@@ -56,65 +358,64 @@ class TradeStatusRtEvent:
         """
         self.client = client
         self.method = method
+        self.header_reader = client.get_header_reader()
+
+        CONCLUSION_RING.start()
 
     def OnReceived(self):
         """
-        이벤트 발생시 실행
+        이벤트 발생시 실행 (헤더 필드를 링 버퍼에 한번에 읽어 넣기만 함, 버퍼가 가득 차면 spill_deque 에 넣음)
+        """
+        record = CONCLUSION_RING.claim()
+        record[0] = self
+        record[1] = time.time()
+        record[2] = time.perf_counter()
+        _CONCLUSION_HEADER_DECODER.read_into(self.header_reader, record, 3)
+        CONCLUSION_RING.publish()
+
+    def process(self, record):
+        """
+        링 버퍼 레코드 처리 (링 버퍼 처리 스레드에서 실행됨)
+
+        Parameters:
+            record (list): OnReceived 에서 채운 레코드 ([핸들러, 수신 시간, 수신 시간(perf_counter), 헤더 값 ...], 호출한 인스턴스의 메소드에는 TradeStatusRecord 전달)
         """
         # 이벤트 발생된 주문 정보
-        trade_info = {
-            "date_time": utils.get_current_datetime("%Y%m%d%H%M%S"),  # 날짜 시간 YYYYMMDDHHmmSS
-            "stock_name": self.client.get_header_value(2),  # 주식이름
-            "qty": self.client.get_header_value(3),  # 수량
-            "price": self.client.get_header_value(4),  # (접수된 or 체결된) 가격
-            "order_num": self.client.get_header_value(5),  # 주문 번호
-            "origin_order_num": self.client.get_header_value(6),  # 원 주문번호
-            "stock_code": self.client.get_header_value(9),  # 종목 코드
-            "e_order_type": ORDER_TYPE(self.client.get_header_value(12)),  # 주문 타입 (매수, 매도)
-            "e_conclusion_type": CONCLUSION_TYPE(self.client.get_header_value(14)),  # 체결 타입 (체결, 확인, 거부, 접수)
-            "e_modify_cancel_type": MODIFY_CANCEL_TYPE(self.client.get_header_value(16)),  # 정정 취소 타입
-            "e_price_type": PRICE_TYPE(self.client.get_header_value(18)),  # 호가 타입 (일반, 시장가)
-            "e_order_condition": ORDER_CONDITION(self.client.get_header_value(19)),  # 주문 조건 (IOC, FOK)
-            "avg_price": self.client.get_header_value(21),  # 평균단가
-            "able_sell_qty": self.client.get_header_value(22),  # 매도 가능 수량
-            "balance_qty": self.client.get_header_value(23),  # 체결 기준 수량
-            "total_price": None,  # 거래 금액 # TODO : 거래 수수료 및 세금 계산 필요
-        }
+        trade_info = TradeStatusRecord.from_record(record)
+
+        OrderLatency.add_trade_status(trade_info.order_num, _ENUM_NAME_DICT[trade_info.e_conclusion_type], record[2])  # 주문번호 반환 ~ 이벤트 수신 시간 기록
 
         # 정정 주문의 경우 수량이 0이면 원주문의 전체 수량을 선택한다는것임 따라서 원 주문의 주문 수량을 가져옴 (그외 주문은 이상이 없음)
-        if trade_info["e_modify_cancel_type"] == MODIFY_CANCEL_TYPE.MODIFY and trade_info["qty"] == 0:
-            db_kr_operation_data = MariaDB("KR_OPERATION_DATA")
-            trade_info["qty"] = db_kr_operation_data.select(
-                "KR_Unconcluded_Order", "quantity", "order_number = " + str(trade_info["origin_order_num"])
-            )
+        if trade_info.e_modify_cancel_type == MODIFY_CANCEL_TYPE.MODIFY and trade_info.qty == 0:
+            trade_info.qty = UnconcludedOrderBook.get_qty(trade_info.origin_order_num) or 0
 
-        trade_info["total_price"] = trade_info["price"] * trade_info["qty"]  # 거래 금액 # TODO : 거래 수수료 및 세금 계산 필요
+        trade_info.total_price = trade_info.price * trade_info.qty  # 거래 금액 # TODO : 거래 수수료 및 세금 계산 필요
 
         TradeData.add_trade_history(trade_info)  # 주문 / 체결 정보 업데이트
 
         # db 매도 가능 수량 변경 (정정/취소 주문이 접수된 경우는 creon api 에서 값이 0으로 오기 때문에 제외)
-        if not (trade_info["e_conclusion_type"] == CONCLUSION_TYPE.RECEIVED and not trade_info["e_modify_cancel_type"] == MODIFY_CANCEL_TYPE.NONE):
-            BalanceData.change_able_sell_quantity(trade_info["stock_code"], trade_info["able_sell_qty"])
+        if not (trade_info.e_conclusion_type == CONCLUSION_TYPE.RECEIVED and not trade_info.e_modify_cancel_type == MODIFY_CANCEL_TYPE.NONE):
+            BalanceData.change_able_sell_quantity(trade_info.stock_code, trade_info.able_sell_qty)
 
         # 접수된 주문이 아닌 경우 db 미체결 잔량 차감
-        if not trade_info["e_conclusion_type"] == CONCLUSION_TYPE.RECEIVED:
+        if not trade_info.e_conclusion_type == CONCLUSION_TYPE.RECEIVED:
 
             # 정정/취소 주문인경우 원미체결 주문 잔량 차감
-            if trade_info["e_conclusion_type"] == CONCLUSION_TYPE.CONFIRMED:
-                TradeData.remove_unconcluded_order(trade_info["origin_order_num"], trade_info["qty"])
+            if trade_info.e_conclusion_type == CONCLUSION_TYPE.CONFIRMED:
+                TradeData.remove_unconcluded_order(trade_info.origin_order_num, trade_info.qty)
             else:
-                TradeData.remove_unconcluded_order(trade_info["order_num"], trade_info["qty"])
+                TradeData.remove_unconcluded_order(trade_info.order_num, trade_info.qty)
 
         # (접수된 매수/매도 주문) or (확인된 정정 주문) 인 경우 미체결 주문 db에 추가
-        if (trade_info["e_conclusion_type"] == CONCLUSION_TYPE.RECEIVED and trade_info["e_modify_cancel_type"] == MODIFY_CANCEL_TYPE.NONE) or (
-            trade_info["e_conclusion_type"] == CONCLUSION_TYPE.CONFIRMED and trade_info["e_modify_cancel_type"] == MODIFY_CANCEL_TYPE.MODIFY
+        if (trade_info.e_conclusion_type == CONCLUSION_TYPE.RECEIVED and trade_info.e_modify_cancel_type == MODIFY_CANCEL_TYPE.NONE) or (
+            trade_info.e_conclusion_type == CONCLUSION_TYPE.CONFIRMED and trade_info.e_modify_cancel_type == MODIFY_CANCEL_TYPE.MODIFY
         ):
             TradeData.add_unconcluded_order(trade_info)
 
         # 체결된 주문인 경우 잔고 데이터 업데이트
-        if trade_info["e_conclusion_type"] == CONCLUSION_TYPE.CONCLUDED:
+        if trade_info.e_conclusion_type == CONCLUSION_TYPE.CONCLUDED:
             BalanceData.change_stock_balance(
-                trade_info["stock_code"], trade_info["balance_qty"], trade_info["able_sell_qty"], trade_info["avg_price"]
+                trade_info.stock_code, trade_info.balance_qty, trade_info.able_sell_qty, trade_info.avg_price
             )
 
         if self.method:
@@ -0,0 +1,198 @@
+# coding=utf-8
+import time
+import threading
+from queue import Queue
+
+import utils
+
+logger = utils.get_logger(__name__)
+
+# 미체결 주문 db 컬럼
+UNCONCLUDED_ORDER_COLUMNS = (
+    "date_time",
+    "order_number",
+    "order_type",
+    "stock_code",
+    "stock_name",
+    "quantity",
+    "price_type",
+    "order_condition",
+    "price",
+)
+
+
+class UnconcludedOrderBook:
+    """
+    메모리상의 미체결 주문 목록 클래스
+
+    체결/정정/취소 이벤트마다 db(KR_Unconcluded_Order)를 조회하지 않고 메모리에서 바로 처리하며
+    db에는 저장 스레드가 변경 내역을 순서대로 비동기 반영함
+
+    Attributes:
+        lock (threading.Lock): 주문 목록 변경시 사용하는 락
+
+        order_dict (dict): 주문번호 -> 미체결 주문 데이터 (dict, 키는 UNCONCLUDED_ORDER_COLUMNS)
+
+        stock_order_dict (dict): 종목코드 -> 미체결 주문번호 set
+
+        persist_q (queue.Queue): db 반영할 변경 내역 큐
+    """
+
+    lock = threading.Lock()
+    order_dict = {}
+    stock_order_dict = {}
+    persist_q = Queue()
+
+    @classmethod
+    def load(cls, order_list):
+        """
+        미체결 주문 목록 전체를 새로 채움 (db 반영 안함, trade.TradeData.update_unconcluded_order 에서 사용)
+
+        Parameters:
+            order_list (list[dict]): 미체결 주문 데이터 리스트
+        """
+        with cls.lock:
+            cls.order_dict.clear()
+            cls.stock_order_dict.clear()
+            for order in order_list:
+                cls._add(order)
+
+    @classmethod
+    def add(cls, order):
+        """
+        미체결 주문 추가
+
+        Parameters:
+            order (dict): 미체결 주문 데이터 (키는 UNCONCLUDED_ORDER_COLUMNS)
+        """
+        with cls.lock:
+            cls._add(order)
+
+        cls.persist_q.put(("insert", dict(order)))
+
+    @classmethod
+    def remove_qty(cls, order_num, qty):
+        """
+        order_num 미체결 주문의 수량을 qty 만큼 차감 (체결/정정/취소), 수량이 0이 되면 삭제
+
+        Parameters:
+            order_num (int): 미체결 주문 번호
+
+            qty (int): 체결/수정/취소 된 수량 (빼줄 값)
+        """
+        with cls.lock:
+            order = cls.order_dict.get(order_num)
+            if order is None:
+                return
+
+            new_qty = order["quantity"] - qty
+            if new_qty <= 0:
+                del cls.order_dict[order_num]
+                stock_order_set = cls.stock_order_dict[order["stock_code"]]
+                stock_order_set.discard(order_num)
+                if not stock_order_set:
+                    del cls.stock_order_dict[order["stock_code"]]
+            else:
+                order["quantity"] = new_qty
+
+        if new_qty <= 0:
+            cls.persist_q.put(("delete", order_num))
+        else:
+            cls.persist_q.put(("update", order_num, new_qty))
+
+    @classmethod
+    def get_qty(cls, order_num):
+        """
+        미체결 주문의 남은 수량 반환
+
+        Parameters:
+            order_num (int): 미체결 주문 번호
+
+        Returns:
+            (int): 남은 수량
+
+            (None): 미체결 주문이 없는 경우
+        """
+        order = cls.order_dict.get(order_num)
+        if order is None:
+            return None
+        return order["quantity"]
+
+    @classmethod
+    def get_order_list(cls, stock_code=None):
+        """
+        미체결 주문 목록 반환
+
+        Parameters:
+            stock_code
+                (str): 종목 코드 (해당 종목의 미체결 주문만 반환)
+
+                (None): 전체 미체결 주문 반환
+
+        Returns:
+            (list[dict]): 미체결 주문 데이터 복사본 리스트
+        """
+        with cls.lock:
+            if stock_code is None:
+                return [dict(order) for order in cls.order_dict.values()]
+
+            return [dict(cls.order_dict[order_num]) for order_num in cls.stock_order_dict.get(stock_code, ())]
+
+    @classmethod
+    def start_persist(cls, db_kr_operation_data, retry_interval=1.0, max_retry=5):
+        """
+        db 반영 스레드 시작
+
+        반영에 실패한 변경 내역은 순서가 바뀌지 않도록 다음 내역으로 넘어가지 않고 그 자리에서 다시 시도함
+
+        Parameters:
+            db_kr_operation_data (database.MariaDB): 저장 스레드 전용 KR_OPERATION_DATA db 인스턴스
+
+            retry_interval (float): 실패시 다시 시도하기 전 대기 시간 (단위: 초)
+
+            max_retry (int): 변경 내역 하나당 최대 재시도 횟수 (넘으면 로그만 남기고 버림)
+        """
+
+        def persist_loop():
+            while True:
+                change = cls.persist_q.get()
+                for retry in range(max_retry + 1):
+                    try:
+                        cls.persist(db_kr_operation_data, change)
+                        break
+                    except Exception:
+                        logger.exception("unconcluded order persist failed (%d/%d) : %s", retry + 1, max_retry + 1, change)
+                        if retry < max_retry:
+                            time.sleep(retry_interval)
+                else:
+                    logger.error("unconcluded order change dropped : %s", change)
+
+        persist_thread = threading.Thread(target=persist_loop, daemon=True)
+        persist_thread.start()
+
+    @classmethod
+    def persist(cls, db_kr_operation_data, change):
+        """
+        변경 내역 하나를 db(KR_Unconcluded_Order)에 반영
+
+        Parameters:
+            db_kr_operation_data (database.MariaDB): KR_OPERATION_DATA db 인스턴스
+
+            change (tuple): ("insert", 주문 데이터) / ("update", 주문번호, 수량) / ("delete", 주문번호)
+        """
+        if change[0] == "insert":
+            order = change[1]
+            columns_db = [column for column in UNCONCLUDED_ORDER_COLUMNS if column in order]
+            db_kr_operation_data.insert("KR_Unconcluded_Order", columns_db, [order[column] for column in columns_db])
+        elif change[0] == "update":
+            db_kr_operation_data.update("KR_Unconcluded_Order", "quantity", change[2], "order_number = " + str(change[1]))
+        elif change[0] == "delete":
+            db_kr_operation_data.delete("KR_Unconcluded_Order", "order_number = " + str(change[1]))
+
+    @classmethod
+    def _add(cls, order):
+        """
+        미체결 주문 추가 (lock 안에서 호출)
+        """
+        cls.order_dict[order["order_number"]] = order
+        cls.stock_order_dict.setdefault(order["stock_code"], set()).add(order["order_number"])
@@ -1,6 +1,16 @@
 # coding=utf-8
+import os
+import time
+import logging
+import threading
 from datetime import datetime
 
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s : %(message)s"
+
+# lower_thread_priority 로 낮출 우선순위 (windows - THREAD_PRIORITY_BELOW_NORMAL, 그 외 - nice 값)
+_THREAD_PRIORITY_BELOW_NORMAL = -1
+_LOW_PRIORITY_NICE = 5
+
 
 def get_current_datetime(time_format):
     """
@@ -15,3 +25,82 @@ def get_current_datetime(time_format):
     """
     now = datetime.now()
     return int(now.strftime(time_format))
+
+
+def lower_thread_priority():
+    """
+    현재 스레드의 스케줄링 우선순위를 한단계 낮춤 (처리 스레드가 CPU 를 쓰는 동안에도 COM 메시지 루프 스레드가 먼저 실행되도록)
+
+    Returns:
+        (bool): 변경 여부 (지원하지 않는 환경이면 False)
+    """
+    try:
+        if os.name == "nt":
+            import ctypes
+
+            kernel32 = ctypes.windll.kernel32
+            return bool(kernel32.SetThreadPriority(kernel32.GetCurrentThread(), _THREAD_PRIORITY_BELOW_NORMAL))
+
+        # linux 는 스레드 id 로 스레드 하나의 nice 값만 바꿈
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), _LOW_PRIORITY_NICE)
+        return True
+    except (AttributeError, OSError):
+        return False
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    같은 로그 메시지(포맷 문자열 기준)를 interval 초마다 최대 max_count 번만 출력하는 필터
+
+    Attributes:
+        interval (float): 제한 주기 (단위: 초)
+
+        max_count (int): 주기당 최대 출력 횟수
+
+        count_dict (dict): 로그 메시지 포맷 -> [주기 시작 시간, 출력 횟수, 생략된 횟수]
+    """
+
+    def __init__(self, interval=1.0, max_count=10):
+        logging.Filter.__init__(self)
+        self.interval = interval
+        self.max_count = max_count
+        self.count_dict = {}
+
+    def filter(self, record):
+        key = record.msg
+        now = time.monotonic()
+        count = self.count_dict.get(key)
+
+        # 새 주기 시작 (이전 주기에 생략된 횟수를 메시지에 붙임)
+        if count is None or now - count[0] >= self.interval:
+            if count is not None and count[2]:
+                record.msg = str(key) + " (" + str(count[2]) + " suppressed)"
+            self.count_dict[key] = [now, 1, 0]
+            return True
+
+        if count[1] < self.max_count:
+            count[1] += 1
+            return True
+
+        count[2] += 1
+        return False
+
+
+def get_logger(name, interval=1.0, max_count=10):
+    """
+    같은 메시지 출력 횟수가 제한된 로거 반환
+
+    Parameters:
+        name (str): 로거 이름 (모듈 이름)
+
+        interval (float): 제한 주기 (단위: 초)
+
+        max_count (int): 주기당 같은 메시지의 최대 출력 횟수
+
+    Returns:
+        (logging.Logger): 로거
+    """
+    logger = logging.getLogger(name)
+    if not any(isinstance(log_filter, RateLimitFilter) for log_filter in logger.filters):
+        logger.addFilter(RateLimitFilter(interval, max_count))
+    return logger